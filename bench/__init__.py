@@ -0,0 +1,3 @@
+"""
+基准测试和压测脚本的辅助模块（合成数据等），不被 Bot 运行时代码导入
+"""
@@ -0,0 +1,200 @@
+"""
+合成持有者/持仓数据（只供基准测试和压测脚本使用，不属于 Bot 运行时代码）
+按固定随机种子生成一个可复现的"市场"，用于在任意规模下测量分析函数（真实代币很难凑出上万大户）：
+- 代币热度服从幂律（Zipf）：少数热门代币被大多数钱包持有，大量长尾代币只有零星持有者
+- 钱包总资产、单个代币价格服从对数正态分布（长尾）
+- 大户持有目标代币的数量按排名幂律递减，约 90% 的钱包持有 SOL
+- 植入若干地址集群：每组地址共同持有几个冷门代币，集群分析应能找出它们
+
+输出形状与上游和爬虫保持一致：OKX 持有者排行行、钱包持仓响应（精简后）、extract_top_tokens 的代币列表，
+以及与 analyze_token_holders 相同结构的分析结果
+"""
+
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+from src.services.okx_crawler import SOL_TOKEN_ADDRESS, HolderTokenAggregator
+
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+TARGET_SUPPLY = 1_000_000_000
+
+
+class SyntheticMarket:
+    """一个目标代币的前 N 名大户及其持仓"""
+
+    def __init__(self, holders: int = 100, tokens: int = 100, seed: int = 0, zipf_alpha: float = 1.1,
+                 tokens_per_holder: int = 8, clusters: Optional[int] = None, cluster_size: int = 6,
+                 cluster_tokens: int = 3, target_share: float = 0.8, target_address: Optional[str] = None):
+        """
+        Args:
+            holders: 大户数量
+            tokens: 代币总数（含目标代币和 SOL）
+            seed: 随机种子，相同参数和种子生成完全相同的数据
+            zipf_alpha: 代币热度幂律指数，越大越集中在头部代币
+            tokens_per_holder: 每个钱包持有代币数的中位数
+            clusters: 植入的集群数量，默认每 100 个大户一个
+            cluster_size: 每个集群的地址数
+            cluster_tokens: 每个集群共同持有的冷门代币数
+            target_share: 持仓列表中包含目标代币的钱包比例
+            target_address: 目标代币地址，默认随机生成
+        """
+        if tokens < 3:
+            raise ValueError("tokens 至少为 3（目标代币、SOL 和至少一个其他代币）")
+        self.holder_count = holders
+        self.seed = seed
+        self._random = random.Random(seed)
+
+        self.tokens = self._generate_tokens(tokens, target_address)
+        self.target_address = self.tokens[0]["address"]
+        self.target_symbol = self.tokens[0]["symbol"]
+        self.wallets = [self._address() for _ in range(holders)]
+        self._target_amounts = self._generate_target_amounts(holders)
+
+        # 钱包地址 -> {代币序号: 持仓价值}
+        self.holdings: Dict[str, Dict[int, float]] = {}
+        self._generate_holdings(zipf_alpha, tokens_per_holder, target_share)
+
+        self.planted_clusters: List[Dict] = []
+        if clusters is None:
+            clusters = max(1, holders // 100)
+        self._plant_clusters(clusters, min(cluster_size, holders), cluster_tokens)
+        self._portfolios: Optional[List[Tuple[int, str, List[Dict]]]] = None
+
+    def _address(self) -> str:
+        return "".join(self._random.choice(BASE58_ALPHABET) for _ in range(44))
+
+    def _generate_tokens(self, count: int, target_address: Optional[str]) -> List[Dict]:
+        tokens = [
+            {"address": target_address or self._address(), "symbol": "TARGET", "name": "Synthetic Target", "chain": "Solana",
+             "price": self._random.lognormvariate(math.log(0.001), 1.0)},
+            {"address": SOL_TOKEN_ADDRESS, "symbol": "SOL", "name": "Solana", "chain": "Solana", "price": 150.0},
+        ]
+        for index in range(2, count):
+            tokens.append({
+                "address": self._address(),
+                "symbol": f"TKN{index}",
+                "name": f"Synthetic Token {index}",
+                "chain": "Solana",
+                "price": self._random.lognormvariate(math.log(0.01), 3.0),
+            })
+        return tokens
+
+    def _generate_target_amounts(self, holders: int) -> List[float]:
+        """目标代币持仓按排名幂律递减，前 N 名合计约占供应量的一半"""
+        weights = [1 / (rank ** 0.8) for rank in range(1, holders + 1)]
+        scale = TARGET_SUPPLY * 0.5 / sum(weights)
+        return [weight * scale for weight in weights]
+
+    def _generate_holdings(self, zipf_alpha: float, tokens_per_holder: int, target_share: float) -> None:
+        # 其他代币按序号幂律分配热度（序号越小越热门）
+        others = list(range(2, len(self.tokens)))
+        cum_weights = []
+        total = 0.0
+        for rank, _ in enumerate(others, 1):
+            total += 1 / (rank ** zipf_alpha)
+            cum_weights.append(total)
+        target_price = self.tokens[0]["price"]
+
+        for wallet, target_amount in zip(self.wallets, self._target_amounts):
+            wallet_value = self._random.lognormvariate(math.log(20000), 1.5)
+            count = min(len(others), max(1, int(self._random.lognormvariate(math.log(tokens_per_holder), 0.7))))
+            chosen = set()
+            while len(chosen) < count:
+                chosen.update(self._random.choices(others, cum_weights=cum_weights, k=count - len(chosen)))
+
+            if self._random.random() < 0.9:
+                chosen.add(1)
+            shares = {index: self._random.lognormvariate(0, 1.0) for index in chosen}
+            share_total = sum(shares.values())
+            holding = {index: wallet_value * share / share_total for index, share in shares.items()}
+            if self._random.random() < target_share:
+                holding[0] = target_amount * target_price
+            self.holdings[wallet] = holding
+
+    def _plant_clusters(self, count: int, size: int, token_count: int) -> None:
+        """每个集群的地址额外持有同一组长尾代币"""
+        tail = list(range(max(2, len(self.tokens) // 2), len(self.tokens)))
+        if size < 2 or not tail:
+            return
+        for _ in range(count):
+            members = self._random.sample(self.wallets, size)
+            shared = self._random.sample(tail, min(token_count, len(tail)))
+            for wallet in members:
+                for index in shared:
+                    self.holdings[wallet].setdefault(index, self._random.lognormvariate(math.log(2000), 1.0))
+            self.planted_clusters.append({
+                "addresses": members,
+                "tokens": [self.tokens[index]["address"] for index in shared],
+            })
+
+    def holder_rows(self) -> List[Dict]:
+        """OKX 持有者排行（精简后的字段，数值为字符串）"""
+        target_price = self.tokens[0]["price"]
+        return [
+            {
+                "holderWalletAddress": wallet,
+                "holdAmount": f"{amount:.6f}",
+                "holdAmountPercentage": f"{amount / TARGET_SUPPLY * 100:.6f}",
+                "holdVolume": f"{amount * target_price:.6f}",
+            }
+            for wallet, amount in zip(self.wallets, self._target_amounts)
+        ]
+
+    def top_tokens(self, wallet: str) -> List[Dict]:
+        """与 extract_top_tokens 输出相同的代币列表（按价值降序）"""
+        tokens = []
+        for index, value in self.holdings[wallet].items():
+            token = self.tokens[index]
+            tokens.append({
+                "chain": token["chain"],
+                "symbol": token["symbol"],
+                "name": token["name"],
+                "address": token["address"],
+                "balance": value / token["price"],
+                "value_usd": value,
+                "price_usd": token["price"],
+            })
+        tokens.sort(key=lambda x: x["value_usd"], reverse=True)
+        return tokens
+
+    def portfolio(self, wallet: str) -> Dict:
+        """OKX 钱包持仓响应的 data 部分（精简后的字段，数值为字符串）"""
+        return {"tokens": {"tokenlist": [
+            {
+                "symbol": token["symbol"],
+                "name": token["name"],
+                "chainName": token["chain"],
+                "coinAmount": f"{token['balance']:.6f}",
+                "coinUnitPrice": f"{token['price_usd']:.10g}",
+                "currencyAmount": f"{token['value_usd']:.2f}",
+                "coinBalanceDetails": [{"address": token["address"]}],
+            }
+            for token in self.top_tokens(wallet)
+        ]}}
+
+    def holder_portfolios(self) -> List[Tuple[int, str, List[Dict]]]:
+        """按排名的 (排名, 钱包地址, 代币列表)，即步骤3逐个合并的输入"""
+        if self._portfolios is None:
+            self._portfolios = [(rank, wallet, self.top_tokens(wallet)) for rank, wallet in enumerate(self.wallets, 1)]
+        return self._portfolios
+
+    def analysis_result(self, min_value: float = 50, min_holders: int = 5) -> Dict:
+        """与 analyze_token_holders 结构相同的分析结果（只包含下游分析和格式化读取的字段）"""
+        aggregator = HolderTokenAggregator(self.target_address)
+        for rank, wallet, tokens in self.holder_portfolios():
+            aggregator.add_holder(rank, wallet, tokens)
+        sorted_tokens = aggregator.top_tokens(min_value=min_value, min_holders=min_holders)
+        return {
+            "token_address": self.target_address,
+            "top_holders_count": self.holder_count,
+            "total_holders_analyzed": aggregator.holder_count,
+            "target_token_actual_holders": len(aggregator.target_token_holders),
+            "original_holders_data": self.holder_rows(),
+            "token_statistics": {
+                "total_unique_tokens": len(sorted_tokens),
+                "total_portfolio_value": sum(token["total_value"] for token in sorted_tokens),
+                "top_tokens_by_value": sorted_tokens,
+            },
+        }
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+持有者分析基准测试
+先对线上录制一次真实分析的全部上游响应（持有者 + 钱包持仓，含耗时），之后在本地回放，
+按不同执行模式重复运行 analyze_token_holders，比较墙钟时间、请求数和各阶段耗时分位数。
+调整 max_concurrent_threads、重试退避等参数时用数据代替猜测。
+基准测试不改动生产状态：不写分析存档、不学习基础设施地址，原始响应和分析结果产物写入临时目录，结束后删除。
+
+执行模式:
+    sequential  单线程逐个获取钱包
+    threaded    多线程获取钱包（默认模式）
+    hedged      多线程 + 慢请求对冲
+    deep        深度扫描（需要用 --deep 录制）
+
+用法:
+    python bench_analysis.py record <代币地址> --holders 50            # 录制到 config/cassettes/<代币地址>.json.gz
+    python bench_analysis.py run config/cassettes/<代币地址>.json.gz --modes sequential,threaded,hedged
+    python bench_analysis.py run <录制文件> --latency lognormal:0.3,0.6 --error-rate 0.05 --rate-limit 10 \\
+        --set max_concurrent_threads=10 --set retry_base_delay=0.5 --iterations 5 --output bench.json
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# 添加项目目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.config import get_config
+from src.services.http_client import get_http_client
+from src.services.resilience import get_upstream_registry
+from src.services.artifact_store import get_artifact_store
+from src.services.replay_transport import Cassette, RecordingAdapter, ReplayAdapter, DEFAULT_CASSETTE_DIR
+from src.utils import json_codec
+from src.utils.data_manager import DataManager
+from src.utils.logger import get_log_pipeline
+from src.utils.tracing import trace, current_trace
+
+# 各模式相对当前配置的覆盖项，以及是否使用多线程
+MODES = {
+    "sequential": ({"wallet_hedging_enabled": False, "deep_scan_enabled": False}, False),
+    "threaded": ({"wallet_hedging_enabled": False, "deep_scan_enabled": False}, True),
+    "hedged": ({"wallet_hedging_enabled": True, "deep_scan_enabled": False}, True),
+    "deep": ({"wallet_hedging_enabled": False, "deep_scan_enabled": True}, True),
+}
+
+# 基准测试期间固定的配置：只走 OKX 网页数据源，保留完整追踪，不写分析存档，不学习基础设施地址
+BENCH_OVERRIDES = {
+    "data_providers": ["okx_web"],
+    "provider_mode": "failover",
+    "trace_enabled": True,
+    "trace_max_spans": 100000,
+    "archive_enabled": False,
+    "infra_learning_enabled": False,
+}
+
+# 分析产物（原始持有者响应、分析结果）的临时目录，由 main 创建和删除
+_artifact_dir = None
+
+
+def percentile(values, ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def apply_overrides(overrides: dict) -> dict:
+    """修改 analysis 配置，返回原值用于恢复"""
+    analysis_config = get_config().analysis
+    previous = {}
+    for key, value in overrides.items():
+        previous[key] = getattr(analysis_config, key, None)
+        setattr(analysis_config, key, value)
+    return previous
+
+
+def parse_set_options(options) -> dict:
+    """解析 --set key=value（值按 JSON 解析，失败时作为字符串）"""
+    overrides = {}
+    analysis_config = get_config().analysis
+    for option in options or []:
+        key, _, raw = option.partition("=")
+        if not hasattr(analysis_config, key):
+            raise SystemExit(f"❌ 未知的 analysis 配置项: {key}")
+        try:
+            overrides[key] = json_codec.loads(raw)
+        except ValueError:
+            overrides[key] = raw
+    return overrides
+
+
+def analyze(token_address: str, holders: int, use_threading: bool):
+    """在一条追踪中执行一次分析，返回 (结果, 墙钟秒数, span 列表)"""
+    from src.services.okx_crawler import OKXCrawlerForBot
+
+    crawler = OKXCrawlerForBot()
+    if _artifact_dir:
+        crawler.data_manager = DataManager(_artifact_dir)
+    with trace("bench"):
+        bench_trace = current_trace()
+        started = time.perf_counter()
+        result = crawler.analyze_token_holders(
+            token_address, top_holders_count=holders, use_threading=use_threading, freshness="realtime"
+        )
+        elapsed = time.perf_counter() - started
+    return result, elapsed, bench_trace.finish()
+
+
+def record(args) -> None:
+    path = args.cassette or os.path.join(DEFAULT_CASSETTE_DIR, f"{args.token}.json.gz")
+    apply_overrides(dict(BENCH_OVERRIDES, deep_scan_enabled=args.deep, wallet_hedging_enabled=False))
+
+    cassette = Cassette(meta={
+        "token_address": args.token,
+        "holders": args.holders,
+        "deep": args.deep,
+        "recorded_at": time.time(),
+    })
+    http_client = get_http_client()
+    http_client.install_transport(RecordingAdapter(
+        cassette, pool_connections=1, pool_maxsize=http_client.pool_size(), max_retries=0
+    ))
+    print(f"🎙️ 开始录制: {args.token} (前 {args.holders} 名大户{'，深度扫描' if args.deep else ''})")
+    try:
+        result, elapsed, _ = analyze(args.token, args.holders, use_threading=True)
+    finally:
+        http_client.install_transport(None)
+
+    cassette.meta["wall_seconds"] = round(elapsed, 3)
+    cassette.save(path)
+    analyzed = (result or {}).get("total_holders_analyzed", 0)
+    print(f"💾 已录制 {len(cassette)} 个响应（{len(cassette.entries)} 个不同请求），分析 {analyzed} 个大户，"
+          f"耗时 {elapsed:.1f}s -> {path}")
+
+
+def run_mode(mode: str, cassette: Cassette, adapter: ReplayAdapter, args, extra_overrides: dict) -> dict:
+    """按一种模式重复运行分析并汇总"""
+    overrides, use_threading = MODES[mode]
+    previous = apply_overrides(dict(overrides, **extra_overrides))
+    # 每种模式从干净的重试预算、熔断和延迟样本开始
+    get_upstream_registry().reset()
+    adapter.reset_stats()
+
+    token_address = cassette.meta["token_address"]
+    holders = cassette.meta.get("holders", 20)
+    walls = []
+    analyzed = []
+    stage_durations = defaultdict(list)
+    try:
+        for iteration in range(args.warmup + args.iterations):
+            result, elapsed, spans = analyze(token_address, holders, use_threading)
+            if iteration < args.warmup:
+                adapter.reset_stats()
+                continue
+            walls.append(elapsed)
+            analyzed.append((result or {}).get("total_holders_analyzed", 0))
+            for finished in spans:
+                if finished.parent is not None:  # 根 span 与 analyze_token_holders 重复
+                    stage_durations[finished.name].append(finished.duration)
+            print(f"  {mode} #{iteration - args.warmup + 1}: {elapsed:.2f}s，分析 {analyzed[-1]} 个大户")
+    finally:
+        apply_overrides(previous)
+
+    return {
+        "mode": mode,
+        "iterations": len(walls),
+        "wall_seconds": {
+            "avg": round(sum(walls) / len(walls), 3) if walls else 0.0,
+            "p50": round(percentile(walls, 0.5), 3),
+            "max": round(max(walls), 3) if walls else 0.0,
+        },
+        "holders_analyzed": analyzed,
+        "requests": adapter.get_stats(),
+        "stages": {
+            name: {
+                "count": len(durations),
+                "p50_ms": round(percentile(durations, 0.5) * 1000, 1),
+                "p99_ms": round(percentile(durations, 0.99) * 1000, 1),
+                "total_s_per_run": round(sum(durations) / len(walls), 3) if walls else 0.0,
+            }
+            for name, durations in sorted(stage_durations.items())
+        },
+    }
+
+
+def print_report(reports) -> None:
+    print("\n📊 基准测试结果")
+    print(f"{'模式':<12}{'墙钟avg':>10}{'墙钟p50':>10}{'请求':>8}{'429':>6}{'未命中':>8}{'超时':>6}")
+    for report in reports:
+        wall, requests = report["wall_seconds"], report["requests"]
+        rejected = requests["injected_429"] + requests["rate_limited"]
+        print(f"{report['mode']:<12}{wall['avg']:>10.2f}{wall['p50']:>10.2f}{requests['requests']:>8}"
+              f"{rejected:>6}{requests['misses']:>8}{requests['timeouts']:>6}")
+    for report in reports:
+        print(f"\n[{report['mode']}] 各阶段耗时")
+        print(f"  {'阶段':<28}{'次数':>8}{'p50(ms)':>10}{'p99(ms)':>10}{'每次合计(s)':>12}")
+        for name, stage in report["stages"].items():
+            print(f"  {name:<28}{stage['count']:>8}{stage['p50_ms']:>10.1f}{stage['p99_ms']:>10.1f}"
+                  f"{stage['total_s_per_run']:>12.3f}")
+
+
+def run(args) -> None:
+    cassette = Cassette.load(args.cassette)
+    if "token_address" not in cassette.meta:
+        raise SystemExit("❌ 录制文件缺少代币信息")
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise SystemExit(f"❌ 未知模式: {', '.join(unknown)}（可选 {', '.join(MODES)}）")
+    if "deep" in modes and not cassette.meta.get("deep"):
+        print("⚠️ 录制时未开启深度扫描，deep 模式的分页请求将回放为未命中")
+
+    extra_overrides = parse_set_options(args.set)
+    apply_overrides(BENCH_OVERRIDES)
+    adapter = ReplayAdapter(cassette, latency=args.latency, error_rate=args.error_rate,
+                            rate_limit=args.rate_limit, retry_after=args.retry_after, seed=args.seed)
+    http_client = get_http_client()
+    http_client.install_transport(adapter)
+    print(f"▶️ 回放 {args.cassette}: {len(cassette)} 个响应，延迟 {args.latency}，"
+          f"429 概率 {args.error_rate}，限速 {args.rate_limit or '无'}/s")
+    try:
+        reports = [run_mode(mode, cassette, adapter, args, extra_overrides) for mode in modes]
+    finally:
+        http_client.install_transport(None)
+
+    print_report(reports)
+    if args.output:
+        json_codec.dump({
+            "cassette": args.cassette,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+            "overrides": extra_overrides,
+            "reports": reports,
+        }, args.output)
+        print(f"\n💾 结果已保存: {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="持有者分析基准测试（录制/回放）")
+    parser.add_argument("--verbose", "-v", action="store_true", help="在控制台输出分析过程日志")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="对线上录制一次分析的上游响应")
+    record_parser.add_argument("token", help="代币地址")
+    record_parser.add_argument("--holders", type=int, default=20, help="分析的大户数量")
+    record_parser.add_argument("--deep", action="store_true", help="开启深度扫描（录制分页请求）")
+    record_parser.add_argument("--cassette", help="录制文件路径，默认 config/cassettes/<代币地址>.json.gz")
+
+    run_parser = subparsers.add_parser("run", help="回放录制内容并运行基准测试")
+    run_parser.add_argument("cassette", help="录制文件路径")
+    run_parser.add_argument("--modes", default="sequential,threaded,hedged", help="逗号分隔的执行模式")
+    run_parser.add_argument("--iterations", "-n", type=int, default=3, help="每种模式的运行次数")
+    run_parser.add_argument("--warmup", type=int, default=0, help="每种模式不计入结果的预热次数")
+    run_parser.add_argument("--latency", default="recorded",
+                            help="延迟分布: recorded[:系数] / fixed:秒 / uniform:最小,最大 / lognormal:中位数,sigma / none")
+    run_parser.add_argument("--error-rate", type=float, default=0.0, help="随机注入 429 的概率")
+    run_parser.add_argument("--rate-limit", type=float, default=0.0, help="每个主机每秒最多正常响应数，超出返回 429")
+    run_parser.add_argument("--retry-after", type=float, default=1.0, help="注入的 429 的 Retry-After 秒数")
+    run_parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    run_parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="覆盖 analysis 配置项，可重复")
+    run_parser.add_argument("--output", "-o", help="把结果保存为 JSON")
+
+    args = parser.parse_args()
+    if not args.verbose:
+        # 日志照常写入文件，控制台只显示警告和测试结果
+        get_log_pipeline().configure(console_level="WARNING")
+
+    global _artifact_dir
+    _artifact_dir = tempfile.mkdtemp(prefix="bench_analysis_")
+    try:
+        if args.command == "record":
+            record(args)
+        else:
+            run(args)
+    finally:
+        get_artifact_store().flush()
+        shutil.rmtree(_artifact_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
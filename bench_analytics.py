@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+分析函数规模基准测试
+用合成数据（幂律代币热度 + 植入的地址集群，见 bench/synthetic_data.py）在不同大户数 × 代币数下
+测量步骤3持仓合并、目标代币排名、地址集群分析和两个消息格式化函数的耗时与峰值内存：
+- 每个规模重复运行取最快值和中位数，另跑一次 tracemalloc 记录峰值内存
+- 按已测规模外推耗时，预计超过 --budget 秒的规模直接跳过（O(n²) 的函数在上万大户时可能要跑很久）
+- 每个输出计算指纹（与顺序无关的规范化 JSON 的 SHA-256，进程固定 PYTHONHASHSEED=0），同一函数的多个实现必须输出一致
+- 结果追加到 config/benchmarks/analytics.jsonl（记录 git 提交），并与上一次相同参数的运行对比，
+  标出变慢/变快和输出变化
+
+函数:
+    aggregate       步骤3：逐个合并大户持仓并筛选排序（HolderTokenAggregator）
+    rankings        analyze_target_token_rankings
+    clusters        analyze_address_clusters
+    tokens_table    format_tokens_table
+    cluster_format  format_cluster_analysis
+
+用法:
+    python bench_analytics.py                                          # 默认网格 100/1000/10000 大户 × 10/100/1000 代币
+    python bench_analytics.py --holders 100,1000 --tokens 100 --functions clusters,rankings --repeat 5
+    python bench_analytics.py --impl clusters=my_module:analyze_address_clusters   # 对比另一个实现的耗时和输出
+    python bench_analytics.py --baseline a1b2c3d --strict                          # 与指定提交的结果对比，退步时返回非0
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# 添加项目目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.config import get_config
+from src.services.okx_crawler import (
+    HolderTokenAggregator,
+    analyze_address_clusters,
+    analyze_target_token_rankings,
+    format_cluster_analysis,
+    format_tokens_table,
+)
+from bench.synthetic_data import SyntheticMarket
+from src.utils import json_codec
+from src.utils.logger import get_log_pipeline
+
+DEFAULT_RESULTS_PATH = "config/benchmarks/analytics.jsonl"
+
+
+def aggregate_holders(holder_portfolios, target_token_address):
+    """步骤3：逐个合并大户持仓，筛选持有人数>=5 且 总价值>=50U 的代币"""
+    aggregator = HolderTokenAggregator(target_token_address)
+    for rank, holder_address, top_tokens in holder_portfolios:
+        aggregator.add_holder(rank, holder_address, top_tokens)
+    return aggregator.top_tokens(min_value=50, min_holders=5)
+
+
+# 函数名 -> (说明, 从规模数据构造参数, {实现名: 实现})
+# 第一个实现为基准，其余实现（如优化版本，或 --impl 指定的）输出必须与其一致
+BENCHMARKS = {
+    "aggregate": (
+        "步骤3持仓合并",
+        lambda data: (data.market.holder_portfolios(), data.market.target_address),
+        {"current": aggregate_holders},
+    ),
+    "rankings": (
+        "目标代币排名",
+        lambda data: (data.result, data.result["original_holders_data"]),
+        {"current": analyze_target_token_rankings},
+    ),
+    "clusters": (
+        "地址集群分析",
+        lambda data: (data.result,),
+        {"current": analyze_address_clusters},
+    ),
+    "tokens_table": (
+        "代币排行表格",
+        lambda data: (data.result["token_statistics"], None, "value", "bench", data.market.target_symbol),
+        {"current": format_tokens_table},
+    ),
+    "cluster_format": (
+        "集群分析消息",
+        lambda data: (data.output("clusters"),),
+        {"current": format_cluster_analysis},
+    ),
+}
+
+
+class SizeData:
+    """一个规模下的输入数据和各函数基准实现的输出（供依赖它的函数使用）"""
+
+    def __init__(self, market: SyntheticMarket):
+        self.market = market
+        self.result = market.analysis_result()
+        self.outputs = {}
+        self.skipped = set()
+
+    def output(self, name: str):
+        if name in self.skipped:
+            return None
+        if name not in self.outputs:
+            _, prepare, implementations = BENCHMARKS[name]
+            self.outputs[name] = call_quietly(next(iter(implementations.values())), prepare(self))
+        return self.outputs[name]
+
+
+def call_quietly(func, args):
+    """调用时丢弃函数自己的 print 输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def canonical(value):
+    """
+    规范化输出用于比较：字典按键排序，列表/集合按内容排序，多行文本按行排序，浮点数保留6位有效数字
+    集合转列表的先后、同分项的排序、累加顺序造成的微小误差都不算差异
+    """
+    if hasattr(value, "to_dict"):  # telebot 按钮
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {str(key): canonical(value[key]) for key in sorted(value, key=str)}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sorted((canonical(item) for item in value), key=json_codec.dumps)
+    if isinstance(value, float):
+        return float(f"{value:.6g}")
+    if isinstance(value, str) and "\n" in value:
+        return sorted(value.split("\n"))
+    return value
+
+
+def fingerprint(value) -> str:
+    return hashlib.sha256(json_codec.dumps_bytes(canonical(value))).hexdigest()[:16]
+
+
+def parse_sizes(spec: str):
+    return [int(value) for value in spec.split(",") if value.strip()]
+
+
+def load_implementations(options) -> None:
+    """--impl 函数名=模块:属性，加入到对应函数的实现列表"""
+    for option in options or []:
+        name, _, target = option.partition("=")
+        module_name, _, attribute = target.partition(":")
+        if name not in BENCHMARKS or not attribute:
+            raise SystemExit(f"❌ 无效的 --impl: {option}（格式 函数名=模块:属性，函数名可选 {', '.join(BENCHMARKS)}）")
+        func = getattr(importlib.import_module(module_name), attribute)
+        BENCHMARKS[name][2][f"{module_name}:{attribute}"] = func
+
+
+def git_revision():
+    """当前提交的短哈希，工作区有未提交修改时加 -dirty"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=10, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def predict_seconds(series, holders: int):
+    """按同一函数、同一代币数下已测的耗时外推（两个点时用实测增长指数，否则按平方增长）"""
+    if not series:
+        return None
+    last_holders, last_seconds = series[-1]
+    exponent = 2.0
+    if len(series) >= 2:
+        previous_holders, previous_seconds = series[-2]
+        if previous_seconds > 0 and last_holders != previous_holders:
+            exponent = max(1.0, math.log(last_seconds / previous_seconds) / math.log(last_holders / previous_holders))
+    return last_seconds * (holders / last_holders) ** exponent
+
+
+def measure(func, args, repeat: int, budget: float, memory: bool) -> dict:
+    """重复计时（预算内最多 repeat 次），再跑一次 tracemalloc 记录峰值内存"""
+    timings = []
+    output = None
+    while len(timings) < repeat and (not timings or sum(timings) + timings[0] <= budget):
+        started = time.perf_counter()
+        output = call_quietly(func, args)
+        timings.append(time.perf_counter() - started)
+
+    peak_kb = None
+    if memory and timings[0] * 3 <= budget:  # tracemalloc 会让运行慢2~3倍
+        tracemalloc.start()
+        try:
+            call_quietly(func, args)
+            peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "seconds_min": round(timings[0], 6),
+        "seconds_median": round(timings[len(timings) // 2], 6),
+        "peak_kb": peak_kb,
+        "fingerprint": fingerprint(output),
+    }, output
+
+
+def run_suite(args, functions) -> list:
+    results = []
+    series = {}  # (函数, 实现, 代币数) -> [(大户数, 秒)]
+    for tokens in parse_sizes(args.tokens):
+        for holders in parse_sizes(args.holders):
+            started = time.perf_counter()
+            data = SizeData(SyntheticMarket(holders=holders, tokens=tokens, seed=args.seed))
+            print(f"\n🧪 {holders} 大户 × {tokens} 代币：{len(data.result['token_statistics']['top_tokens_by_value'])} "
+                  f"个代币进入统计，生成用时 {time.perf_counter() - started:.1f}s")
+
+            for name in functions:
+                _, prepare, implementations = BENCHMARKS[name]
+                reference = None
+                for implementation, func in implementations.items():
+                    entry = {"function": name, "implementation": implementation, "holders": holders, "tokens": tokens}
+                    results.append(entry)
+                    key = (name, implementation, tokens)
+                    predicted = predict_seconds(series.get(key), holders)
+                    if predicted is not None and predicted > args.budget:
+                        entry.update(status="skipped", predicted_seconds=round(predicted, 1))
+                        print(f"  ⏭️ {name}[{implementation}] 预计 {predicted:.0f}s，超过预算 {args.budget:.0f}s，跳过")
+                        if reference is None:
+                            data.skipped.add(name)
+                        continue
+
+                    call_args = prepare(data)
+                    if call_args[0] is None:
+                        entry.update(status="skipped", reason="依赖的函数未运行")
+                        continue
+                    try:
+                        measured, output = measure(func, call_args, args.repeat, args.budget, not args.no_memory)
+                    except Exception as e:
+                        entry.update(status="error", error=f"{type(e).__name__}: {e}")
+                        print(f"  ❌ {name}[{implementation}] 出错: {e}")
+                        continue
+
+                    entry.update(status="ok", **measured)
+                    series.setdefault(key, []).append((holders, measured["seconds_min"]))
+                    if reference is None:
+                        reference = measured["fingerprint"]
+                        data.outputs.setdefault(name, output)
+                    else:
+                        entry["matches_reference"] = measured["fingerprint"] == reference
+                    memory = f"{measured['peak_kb']:,.0f}KB" if measured["peak_kb"] is not None else "-"
+                    mismatch = "  ❗ 输出与基准实现不一致" if entry.get("matches_reference") is False else ""
+                    print(f"  ⏱️ {name}[{implementation}] {measured['seconds_min'] * 1000:,.1f}ms "
+                          f"(中位 {measured['seconds_median'] * 1000:,.1f}ms × {measured['runs']})，峰值内存 {memory}{mismatch}")
+    return results
+
+
+def load_history(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    runs = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                runs.append(json_codec.loads(line))
+            except ValueError:
+                continue
+    return runs
+
+
+def find_baseline(history: list, record: dict, baseline: str = None):
+    """相同种子和集群/排行配置的上一次运行；指定 baseline 时取该提交最近的一次"""
+    for run in reversed(history):
+        if run.get("seed") != record["seed"] or run.get("config") != record["config"]:
+            continue
+        if baseline and not (run.get("commit") or "").startswith(baseline) and run.get("label") != baseline:
+            continue
+        return run
+    return None
+
+
+def compare(record: dict, baseline: dict, threshold: float, min_seconds: float) -> list:
+    """返回 [(级别, 描述)]，级别为 regression / improvement / changed"""
+    previous = {
+        (entry["function"], entry["implementation"], entry["holders"], entry["tokens"]): entry
+        for entry in baseline["results"] if entry.get("status") == "ok"
+    }
+    findings = []
+    for entry in record["results"]:
+        if entry.get("status") != "ok":
+            continue
+        old = previous.get((entry["function"], entry["implementation"], entry["holders"], entry["tokens"]))
+        if old is None:
+            continue
+        label = f"{entry['function']}[{entry['implementation']}] {entry['holders']}×{entry['tokens']}"
+        if old.get("fingerprint") != entry["fingerprint"]:
+            findings.append(("changed", f"{label} 输出与 {baseline.get('commit')} 不同"))
+        # 两次都很快时计时噪声远大于真实差异，不判断快慢
+        if max(old["seconds_min"], entry["seconds_min"]) >= min_seconds and old["seconds_min"] > 0:
+            ratio = entry["seconds_min"] / old["seconds_min"]
+            if ratio > 1 + threshold:
+                findings.append(("regression", f"{label} 变慢 {ratio:.2f}x"
+                                               f"（{old['seconds_min'] * 1000:,.1f} -> {entry['seconds_min'] * 1000:,.1f}ms）"))
+            elif ratio < 1 / (1 + threshold):
+                findings.append(("improvement", f"{label} 变快 {1 / ratio:.2f}x"))
+    return findings
+
+
+def print_report(results: list) -> None:
+    print("\n📊 规模测试结果（最快耗时 ms / 峰值内存 KB）")
+    print(f"{'函数':<16}{'实现':<16}{'大户':>8}{'代币':>7}{'耗时':>12}{'内存':>11}{'增长指数':>10}  指纹")
+    previous = {}
+    for entry in sorted(results, key=lambda e: (list(BENCHMARKS).index(e["function"]), e["implementation"],
+                                                e["tokens"], e["holders"])):
+        head = f"{entry['function']:<16}{entry['implementation'][:15]:<16}{entry['holders']:>8}{entry['tokens']:>7}"
+        if entry.get("status") != "ok":
+            print(f"{head}{'跳过' if entry.get('status') == 'skipped' else '出错':>12}")
+            continue
+        # 大户数增长时耗时的增长指数（1≈线性，2≈平方）
+        key = (entry["function"], entry["implementation"], entry["tokens"])
+        growth = ""
+        if key in previous:
+            old_holders, old_seconds = previous[key]
+            if old_seconds > 0 and entry["holders"] != old_holders:
+                growth = f"{math.log(entry['seconds_min'] / old_seconds) / math.log(entry['holders'] / old_holders):.2f}"
+        previous[key] = (entry["holders"], entry["seconds_min"])
+        memory = f"{entry['peak_kb']:,.0f}" if entry.get("peak_kb") is not None else "-"
+        print(f"{head}{entry['seconds_min'] * 1000:>12,.1f}{memory:>11}{growth:>10}  {entry['fingerprint']}")
+
+
+def main():
+    # 集合遍历顺序随字符串哈希种子变化，会改变集群分析中同分项的先后和截断结果，固定种子使各次运行的输出可比
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        os.environ["PYTHONHASHSEED"] = "0"
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    parser = argparse.ArgumentParser(description="分析函数规模基准测试（合成数据）")
+    parser.add_argument("--holders", default="100,1000,10000", help="逗号分隔的大户数量")
+    parser.add_argument("--tokens", default="10,100,1000", help="逗号分隔的代币数量")
+    parser.add_argument("--functions", default=",".join(BENCHMARKS), help="逗号分隔的函数名")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据的随机种子")
+    parser.add_argument("--repeat", "-n", type=int, default=3, help="每个规模的最多运行次数")
+    parser.add_argument("--budget", type=float, default=30.0, help="单个函数在单个规模下的耗时预算（秒）")
+    parser.add_argument("--no-memory", action="store_true", help="不测峰值内存")
+    parser.add_argument("--impl", action="append", metavar="FUNC=MODULE:ATTR", help="加入另一个实现进行对比，可重复")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH, help="结果历史文件（JSONL）")
+    parser.add_argument("--label", help="本次运行的标签（可在 --baseline 中引用）")
+    parser.add_argument("--baseline", help="对比的提交哈希前缀或标签，默认上一次相同参数的运行")
+    parser.add_argument("--threshold", type=float, default=0.2, help="耗时变化超过该比例时标记变慢/变快")
+    parser.add_argument("--min-ms", type=float, default=20.0, help="耗时低于该值（毫秒）时不判断变慢/变快")
+    parser.add_argument("--strict", action="store_true", help="出现变慢、输出变化或实现不一致时返回非0")
+    parser.add_argument("--no-save", action="store_true", help="不写入结果历史")
+    parser.add_argument("--verbose", "-v", action="store_true", help="在控制台输出日志")
+    args = parser.parse_args()
+
+    functions = [name.strip() for name in args.functions.split(",") if name.strip()]
+    unknown = [name for name in functions if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"❌ 未知函数: {', '.join(unknown)}（可选 {', '.join(BENCHMARKS)}）")
+    load_implementations(args.impl)
+    if not args.verbose:
+        get_log_pipeline().configure(console_level="WARNING")
+
+    analysis_config = get_config().analysis
+    record = {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_revision(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "json_backend": json_codec.BACKEND,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        # 影响输出的配置：不同时输出指纹不可比
+        "config": {
+            "ranking_size": analysis_config.ranking_size,
+            "detail_buttons_count": analysis_config.detail_buttons_count,
+            "cluster_min_common_tokens": analysis_config.cluster_min_common_tokens,
+            "cluster_min_addresses": analysis_config.cluster_min_addresses,
+            "cluster_max_addresses": analysis_config.cluster_max_addresses,
+        },
+    }
+    print(f"▶️ 规模测试 {record['commit'] or '(非 git 目录)'}：大户 {args.holders} × 代币 {args.tokens}，"
+          f"种子 {args.seed}，预算 {args.budget:.0f}s")
+    record["results"] = run_suite(args, functions)
+    print_report(record["results"])
+
+    findings = [("mismatch", f"{entry['function']}[{entry['implementation']}] {entry['holders']}×{entry['tokens']} "
+                             f"输出与基准实现不一致")
+                for entry in record["results"] if entry.get("matches_reference") is False]
+    baseline = find_baseline(load_history(args.results), record, args.baseline)
+    if baseline:
+        print(f"\n🔍 与 {baseline.get('commit')}（{baseline.get('run_at')}）对比")
+        findings += compare(record, baseline, args.threshold, args.min_ms / 1000)
+    elif args.baseline:
+        print(f"\n⚠️ 未找到 {args.baseline} 的相同参数运行记录")
+    icons = {"regression": "🐢", "improvement": "🚀", "changed": "❗", "mismatch": "❗"}
+    for level, message in findings:
+        print(f"  {icons[level]} {message}")
+    if baseline and not findings:
+        print("  ✅ 耗时和输出均无明显变化")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+        with open(args.results, "ab") as f:
+            f.write(json_codec.dumps_bytes(record) + b"\n")
+        print(f"\n💾 结果已追加到 {args.results}")
+    if args.strict and any(level in ("regression", "changed", "mismatch") for level, _ in findings):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
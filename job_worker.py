@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+持久化任务队列 worker
+从 SQLite 任务队列领取大户分析任务并执行，结果写回队列由 Bot 进程投递。
+
+用法:
+    python job_worker.py                 # 启动1个worker进程
+    python job_worker.py --processes 4   # 启动4个worker进程
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+import multiprocessing
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+# 队列为空时的轮询间隔（秒）
+IDLE_POLL_INTERVAL = 1.0
+# 失败重试的基础延迟（秒），按尝试次数指数增长
+RETRY_BASE_DELAY = 30
+
+
+def run_holder_analysis(payload: dict) -> dict:
+    """执行大户分析任务"""
+    from src.services.okx_crawler import OKXCrawlerForBot
+
+    result = OKXCrawlerForBot().analyze_token_holders(
+        payload["token_address"],
+        top_holders_count=payload.get("top_holders_count", 100),
+        freshness=payload.get("freshness"),
+    )
+    if not result or not result.get("token_statistics"):
+        raise RuntimeError("分析结果为空")
+    return result
+
+
+# 任务类型 -> 执行函数
+JOB_HANDLERS = {
+    "holder_analysis": run_holder_analysis,
+}
+
+
+def _heartbeat_loop(job_queue, job_id: int, worker_id: str, lease_seconds: int, done: threading.Event):
+    """任务执行期间定期续租，防止长任务被其他worker重复领取"""
+    while not done.wait(max(5, lease_seconds / 3)):
+        if not job_queue.heartbeat(job_id, worker_id, lease_seconds):
+            break
+
+
+def worker_main(index: int) -> None:
+    """单个worker进程主循环"""
+    from src.core.config import setup_proxy
+    from src.utils.logger import get_logger
+    from src.services.job_queue import get_job_queue, new_worker_id, get_job_queue_settings
+    from src.services.http_client import get_http_client
+
+    logger = get_logger(f"job_worker_{index}")
+    setup_proxy()
+    get_http_client().warm_up()
+
+    settings = get_job_queue_settings()
+    lease_seconds = settings["lease_seconds"]
+    job_queue = get_job_queue()
+    worker_id = new_worker_id()
+
+    stopping = threading.Event()
+
+    def handle_stop(signum, frame):
+        # 执行中的任务完成后再退出，未完成的任务在租约到期后会被重新领取
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    logger.info(f"👷 worker {worker_id} 已启动，数据库: {job_queue.db_path}")
+
+    while not stopping.is_set():
+        try:
+            job = job_queue.lease(worker_id, lease_seconds, kinds=list(JOB_HANDLERS))
+        except Exception as e:
+            logger.error(f"❌ 领取任务失败: {e}")
+            time.sleep(IDLE_POLL_INTERVAL * 5)
+            continue
+
+        if job is None:
+            stopping.wait(IDLE_POLL_INTERVAL)
+            continue
+
+        logger.info(f"▶️ 开始任务 job={job['id']} kind={job['kind']} 第{job['attempts']}次尝试")
+        start_time = time.time()
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat_loop,
+            args=(job_queue, job["id"], worker_id, lease_seconds, done),
+            daemon=True,
+        )
+        heartbeat.start()
+
+        try:
+            result = JOB_HANDLERS[job["kind"]](job["payload"])
+            done.set()
+            if job_queue.complete(job["id"], worker_id, result):
+                logger.info(f"✅ 任务完成 job={job['id']}, 耗时 {time.time() - start_time:.1f}s")
+            else:
+                logger.warning(f"⚠️ 任务租约已失效，结果被丢弃 job={job['id']}")
+        except Exception as e:
+            done.set()
+            will_retry = job_queue.fail(job["id"], worker_id, str(e), retry_delay=RETRY_BASE_DELAY)
+            logger.error(f"❌ 任务失败 job={job['id']}: {e}{'，稍后重试' if will_retry else '，已放弃'}")
+
+    logger.info(f"👋 worker {worker_id} 已退出")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="持久化任务队列 worker")
+    parser.add_argument("--processes", "-n", type=int, default=1, help="worker进程数量")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        worker_main(1)
+        return
+
+    processes = []
+    for index in range(1, args.processes + 1):
+        process = multiprocessing.Process(target=worker_main, args=(index,), name=f"JobWorker-{index}")
+        process.start()
+        processes.append(process)
+
+    def forward_signal(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
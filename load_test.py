@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+并发用户压测
+在本进程启动替身上游（stand_in_upstreams.py）和一个真实的 TokenAnalysisBot，模拟 N 个群组混合发出 /ca1、/cajup
+和按钮点击，测量单进程能承载多少并发群组：
+- 每个群组是一个闭环用户：发出命令或点击按钮 → 等待 Bot 完成响应 → 思考时间（指数分布）→ 下一次交互
+- 首次响应：从注入更新到 Bot 对该交互的第一个 API 调用（确认消息或回调应答）
+- 完成：命令的确认消息被编辑为带按钮的结果（/cajup 为带"重新分析"按钮的汇总），按钮点击后出现带按钮的
+  结果或非进度类的回调应答；以 ❌ 或"⏳ 当前"开头的回复记为错误
+- 按阶段逐步增加群组数（--groups 5,10,20），每阶段报告各类交互的吞吐量、首次响应和完成耗时 p50/p99、
+  超时和错误数，以及各上游和 Telegram 的请求数与 429 比例
+
+注意: Bot 启动时会照常清空 storage/ 目录；配置修改只在本进程内生效，不会写回 config.json
+
+用法:
+    python load_test.py --groups 5,10,20 --duration 120
+    python load_test.py --groups 10 --mix ca1=6,callback=3,cajup=1 --think 5 --latency okx=lognormal:0.5,0.6 \\
+        --rate-limit okx=20 --error-rate okx=0.02
+    python load_test.py --groups 20 --frontend async --set scheduler_max_workers=6 --output load.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+# 添加项目目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_analysis import apply_overrides, parse_set_options, percentile
+from stand_in_upstreams import SERVICES, StandInUpstreams, add_fault_arguments, faults_from_args
+from src.core.config import get_config
+from src.utils import json_codec
+
+ACTIONS = ("ca1", "callback", "cajup")
+# 不模拟的按钮：占位按钮、配置菜单，以及 /cajup 汇总上重新开始整轮分析的按钮
+SKIPPED_CALLBACKS = ("noop", "dummy", "back_to_config", "cajup_restart", "cajup_more")
+CAJUP_DONE_CALLBACKS = ("cajup_restart", "cajup_more")
+ERROR_PREFIXES = ("❌", "⏳ 当前")
+# /cajup 已有分析在进行时的回复（同样开头的编辑是进度更新）
+CAJUP_BUSY_PREFIX = "📊 <b>热门代币榜单分析进行中"
+# 回调应答为进度提示时，结果稍后以带按钮的消息给出
+PROGRESS_ANSWERS = ("🎯", "📊 开始", "🔄")
+
+# 爬虫涨幅警报发往的替身群组（与模拟群组一起占用 Telegram 全局发送额度）
+ALERT_CHAT_ID = -999
+# 压测期间固定的 analysis 配置：只走 OKX 网页数据源，不写存档，不学习基础设施地址，分析在本进程内执行
+LOAD_OVERRIDES = {
+    "data_providers": ["okx_web"],
+    "archive_enabled": False,
+    "infra_learning_enabled": False,
+    "job_queue_enabled": False,
+}
+
+
+class Interaction:
+    """一次用户交互（命令或按钮点击）"""
+
+    def __init__(self, action: str, chat_id: int, stage: int):
+        self.action = action
+        self.chat_id = chat_id
+        self.stage = stage
+        self.started_at = time.time()
+        self.first_response_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self.outcome = "pending"
+        self.ack_message_id: Optional[int] = None
+        self.target_message_id: Optional[int] = None
+        self.callback_id: Optional[str] = None
+        self.done = threading.Event()
+
+    def respond(self, at: float) -> None:
+        if self.first_response_at is None:
+            self.first_response_at = at
+
+    def finish(self, at: float, outcome: str) -> None:
+        self.respond(at)
+        self.completed_at = at
+        self.outcome = outcome
+        self.done.set()
+
+    @property
+    def first_response(self) -> Optional[float]:
+        return self.first_response_at - self.started_at if self.first_response_at else None
+
+    @property
+    def completion(self) -> Optional[float]:
+        return self.completed_at - self.started_at if self.completed_at else None
+
+
+class LoadDriver:
+    """注入用户操作，并根据替身 Telegram 记录的 Bot 调用判断每次交互的响应和完成"""
+
+    def __init__(self, upstreams: StandInUpstreams, args):
+        self.upstreams = upstreams
+        self.telegram = upstreams.telegram
+        self.args = args
+        self.tokens = upstreams.catalog.addresses(args.token_pool)
+        # 热门代币被反复查询（命中结果缓存），长尾代币偶尔出现
+        self.token_weights = [1 / rank for rank in range(1, len(self.tokens) + 1)]
+        self.mix = parse_mix(args.mix)
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Interaction] = {}
+        # 群组 -> 最近带按钮的消息 [(消息ID, 按钮列表)]
+        self._keyboards: Dict[int, deque] = defaultdict(lambda: deque(maxlen=5))
+        self.interactions: List[Interaction] = []
+        self.telegram.add_listener(self.on_bot_call)
+
+    def on_bot_call(self, record: Dict) -> None:
+        if record["status"] != 200:
+            return
+        at = record["at"]
+        chat_id, message_id = record["chat_id"], record["message_id"]
+        text = record["text"] or ""
+        buttons = record["buttons"]
+        with self._lock:
+            if record["method"] == "answerCallbackQuery":
+                interaction = next((item for item in self._pending.values()
+                                    if item.callback_id == record["callback_query_id"]), None)
+                if interaction is not None:
+                    interaction.respond(at)
+                    if text.startswith(ERROR_PREFIXES):
+                        self._finish(interaction, at, "error")
+                    elif not text.startswith(PROGRESS_ANSWERS):
+                        self._finish(interaction, at, "ok")
+                return
+
+            if chat_id is None:
+                return
+            usable = [data for data in buttons if not data.startswith(SKIPPED_CALLBACKS)]
+            if usable and message_id is not None:
+                keyboards = self._keyboards[chat_id]
+                for entry in list(keyboards):
+                    if entry[0] == message_id:
+                        keyboards.remove(entry)
+                keyboards.append((message_id, usable))
+
+            interaction = self._pending.get(chat_id)
+            if interaction is None:
+                return
+            is_send = record["method"].startswith("send")
+            if interaction.action == "callback":
+                related = is_send or message_id == interaction.target_message_id
+            else:
+                if interaction.ack_message_id is None and is_send:
+                    interaction.ack_message_id = message_id
+                related = is_send or message_id == interaction.ack_message_id
+            if not related:
+                # 之前交互的消息稍后被编辑（如超时的分析完成）
+                return
+            interaction.respond(at)
+
+            if text.startswith(ERROR_PREFIXES) or (is_send and text.startswith(CAJUP_BUSY_PREFIX)):
+                self._finish(interaction, at, "error")
+            elif interaction.action == "cajup":
+                if any(data.startswith(CAJUP_DONE_CALLBACKS) for data in buttons):
+                    self._finish(interaction, at, "ok")
+            elif interaction.action == "ca1":
+                if buttons and message_id == interaction.ack_message_id:
+                    self._finish(interaction, at, "ok")
+            elif buttons:
+                self._finish(interaction, at, "ok")
+
+    def _finish(self, interaction: Interaction, at: float, outcome: str) -> None:
+        interaction.finish(at, outcome)
+        if self._pending.get(interaction.chat_id) is interaction:
+            del self._pending[interaction.chat_id]
+
+    def choose_action(self, chat_id: int, rng: random.Random) -> str:
+        action = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        if action == "callback" and not self._keyboards.get(chat_id):
+            # 还没有可点击的结果时先发命令
+            return "ca1"
+        return action
+
+    def issue(self, action: str, chat_id: int, stage: int, rng: random.Random) -> Interaction:
+        """注入一次用户操作（在登记后才注入，避免 Bot 的调用早于登记）"""
+        interaction = Interaction(action, chat_id, stage)
+        with self._lock:
+            self._pending[chat_id] = interaction
+            self.interactions.append(interaction)
+            if action == "callback":
+                entry = rng.choice(list(self._keyboards[chat_id]))
+                interaction.target_message_id = entry[0]
+                interaction.callback_id = self.telegram.push_callback(chat_id, entry[0], rng.choice(entry[1]))
+                if interaction.callback_id is not None:
+                    return interaction
+                # 消息已被删除，改为发命令
+                self._keyboards[chat_id].remove(entry)
+                interaction.action = action = "ca1"
+        if action == "ca1":
+            token = rng.choices(self.tokens, weights=self.token_weights)[0]
+            self.telegram.push_message(chat_id, f"/ca1 {token}")
+        else:
+            self.telegram.push_message(chat_id, f"/cajup {self.args.cajup_tokens}")
+        return interaction
+
+    def expire(self, interaction: Interaction) -> None:
+        with self._lock:
+            if not interaction.done.is_set():
+                interaction.outcome = "timeout"
+                if self._pending.get(interaction.chat_id) is interaction:
+                    del self._pending[interaction.chat_id]
+
+    def run_group(self, chat_id: int, stage: int, start_delay: float, deadline: float, seed: int) -> None:
+        """一个群组的闭环用户"""
+        rng = random.Random(seed)
+        time.sleep(start_delay)
+        while time.time() < deadline:
+            interaction = self.issue(self.choose_action(chat_id, rng), chat_id, stage, rng)
+            if not interaction.done.wait(self.args.timeout):
+                self.expire(interaction)
+            if self.args.think > 0:
+                time.sleep(rng.expovariate(1 / self.args.think))
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in ACTIONS:
+            raise SystemExit(f"❌ 未知交互类型: {name}（可选 {', '.join(ACTIONS)}）")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise SystemExit("❌ --mix 至少需要一种权重大于 0 的交互")
+    return mix
+
+
+def configure_bot(upstreams: StandInUpstreams, chat_ids: List[int], args) -> str:
+    """
+    把 Bot 指向替身上游，返回临时配置文件路径
+
+    爬虫循环每轮都会重新加载配置文件，所以修改后的配置写入临时文件并让配置管理器改读该文件，
+    config.json 本身不变
+    """
+    config = get_config()
+    bot_config = config.bot
+    bot_config.telegram_token = "123456789:LOAD-TEST"
+    bot_config.telegram_api_url = upstreams.url("telegram")
+    bot_config.telegram_chat_id = str(ALERT_CHAT_ID)
+    bot_config.frontend_mode = args.frontend
+    bot_config.webhook_enabled = False
+    if not args.verbose:
+        bot_config.log_console_level = "WARNING"
+    config.proxy.enabled = False
+    config.proxy.pool = []
+    apply_overrides(dict(LOAD_OVERRIDES, http_upstream_overrides=upstreams.upstream_overrides(),
+                         **parse_set_options(args.set)))
+    allowed_groups = config.ca1_allowed_groups
+    if allowed_groups:
+        allowed_groups.extend(str(chat_id) for chat_id in chat_ids if str(chat_id) not in allowed_groups)
+
+    fd, path = tempfile.mkstemp(prefix="load_test_", suffix=".json")
+    os.close(fd)
+    config.config_file = path
+    config.save_config()
+    return path
+
+
+def start_bot(upstreams: StandInUpstreams) -> None:
+    from main import TokenAnalysisBot
+
+    bot = TokenAnalysisBot()
+    threading.Thread(target=bot.start, daemon=True, name="LoadTestBot").start()
+    deadline = time.time() + 30
+    while not upstreams.telegram.get_stats()["by_method"].get("getUpdates"):
+        if time.time() > deadline:
+            raise SystemExit("❌ Bot 30 秒内没有开始拉取更新")
+        time.sleep(0.2)
+
+
+def _stats_delta(before: Dict[str, Dict], after: Dict[str, Dict]) -> Dict[str, Dict]:
+    delta = {}
+    for name, stats in after.items():
+        delta[name] = {key: value - before[name].get(key, 0) for key, value in stats.items()
+                       if isinstance(value, (int, float))}
+        if "by_method" in stats:
+            delta[name]["by_method"] = {method: count - before[name]["by_method"].get(method, 0)
+                                        for method, count in stats["by_method"].items()}
+    return delta
+
+
+def _rejected_ratio(stats: Dict) -> float:
+    rejected = stats.get("injected_429", 0) + stats.get("rate_limited", 0) + stats.get("chat_rate_limited", 0)
+    requests = stats.get("requests", 0) - stats.get("by_method", {}).get("getUpdates", 0)
+    return rejected / requests if requests > 0 else 0.0
+
+
+def summarize(interactions: List[Interaction], elapsed: float) -> Dict[str, Dict]:
+    """按交互类型汇总吞吐量和延迟"""
+    summary = {}
+    for action in ACTIONS:
+        items = [item for item in interactions if item.action == action]
+        if not items:
+            continue
+        completed = [item for item in items if item.outcome in ("ok", "error")]
+        first = [item.first_response for item in items if item.first_response is not None]
+        done = [item.completion for item in items if item.outcome == "ok"]
+        summary[action] = {
+            "count": len(items),
+            "ok": len([item for item in items if item.outcome == "ok"]),
+            "errors": len([item for item in items if item.outcome == "error"]),
+            "timeouts": len([item for item in items if item.outcome == "timeout"]),
+            "unfinished": len([item for item in items if item.outcome == "pending"]),
+            "throughput_per_s": round(len(completed) / elapsed, 3) if elapsed > 0 else 0.0,
+            "first_response_p50_s": round(percentile(first, 0.5), 3),
+            "first_response_p99_s": round(percentile(first, 0.99), 3),
+            "completion_p50_s": round(percentile(done, 0.5), 3),
+            "completion_p99_s": round(percentile(done, 0.99), 3),
+        }
+    return summary
+
+
+def run_stage(driver: LoadDriver, stage: int, groups: int, args) -> Dict:
+    upstreams = driver.upstreams
+    chat_ids = [-(1000000 * (stage + 1) + index) for index in range(groups)]
+    before = upstreams.get_stats()
+    started = time.time()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(
+            target=driver.run_group,
+            args=(chat_id, stage, args.ramp_up * index / groups, deadline, args.seed * 100003 + chat_id),
+            daemon=True, name=f"LoadGroup{chat_id}",
+        )
+        for index, chat_id in enumerate(chat_ids)
+    ]
+    print(f"\n▶️ 阶段 {stage + 1}: {groups} 个群组，持续 {args.duration:.0f}s")
+    for thread in threads:
+        thread.start()
+    # 截止后不再发起新交互，进行中的交互最多再等一个超时
+    for thread in threads:
+        thread.join(max(0.0, deadline + args.timeout + args.think * 5 - time.time()))
+    elapsed = time.time() - started
+
+    interactions = [item for item in driver.interactions if item.stage == stage]
+    upstream_delta = _stats_delta(before, upstreams.get_stats())
+    report = {
+        "groups": groups,
+        "elapsed_s": round(elapsed, 1),
+        "actions": summarize(interactions, elapsed),
+        "upstreams": {
+            name: {
+                "requests": stats.get("requests", 0),
+                "rejected_429_ratio": round(_rejected_ratio(stats), 4),
+                "failed_502": stats.get("failed", 0),
+            }
+            for name, stats in upstream_delta.items()
+        },
+        "telegram_calls": upstream_delta["telegram"].get("by_method", {}),
+    }
+    report["bot"] = collect_bot_stats()
+    print_stage(report)
+    return report
+
+
+def collect_bot_stats() -> Dict:
+    """Bot 侧出站队列、调度器和结果缓存的统计快照"""
+    from src.services.telegram_outbox import get_telegram_outbox
+    from src.services.scheduler import get_scheduler
+    from src.services.result_cache import get_result_cache
+
+    return {
+        "outbox": get_telegram_outbox().get_stats(),
+        "scheduler": get_scheduler().get_stats(),
+        "result_cache": get_result_cache().get_stats(),
+    }
+
+
+def print_stage(report: Dict) -> None:
+    print(f"📊 {report['groups']} 个群组，{report['elapsed_s']}s")
+    print(f"  {'交互':<10}{'次数':>6}{'成功':>6}{'错误':>6}{'超时':>6}{'吞吐/s':>9}"
+          f"{'首响p50':>9}{'首响p99':>9}{'完成p50':>9}{'完成p99':>9}")
+    for action, stats in report["actions"].items():
+        print(f"  {action:<10}{stats['count']:>6}{stats['ok']:>6}{stats['errors']:>6}{stats['timeouts']:>6}"
+              f"{stats['throughput_per_s']:>9.2f}{stats['first_response_p50_s']:>9.2f}"
+              f"{stats['first_response_p99_s']:>9.2f}{stats['completion_p50_s']:>9.2f}{stats['completion_p99_s']:>9.2f}")
+    upstreams = "，".join(f"{name} {stats['requests']} 次 (429 {stats['rejected_429_ratio']:.1%})"
+                         for name, stats in report["upstreams"].items())
+    print(f"  上游: {upstreams}")
+    outbox = report["bot"]["outbox"]
+    print(f"  出站队列: {', '.join(f'{key}={value}' for key, value in outbox.items())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发用户压测（替身上游 + 真实 Bot）")
+    parser.add_argument("--groups", default="5,10,20", help="逗号分隔的各阶段群组数")
+    parser.add_argument("--duration", type=float, default=120, help="每个阶段发起交互的秒数")
+    parser.add_argument("--ramp-up", type=float, default=10, help="每个阶段内群组依次加入的总秒数")
+    parser.add_argument("--mix", default="ca1=5,callback=4,cajup=1", help="交互类型权重")
+    parser.add_argument("--think", type=float, default=3.0, help="两次交互之间的平均思考秒数（指数分布）")
+    parser.add_argument("--timeout", type=float, default=300, help="单次交互等待完成的最长秒数")
+    parser.add_argument("--token-pool", type=int, default=20, help="/ca1 查询的代币数量（按热度幂律选择）")
+    parser.add_argument("--cajup-tokens", type=int, default=3, help="/cajup 分析的代币数")
+    parser.add_argument("--frontend", choices=["threaded", "async"], default="threaded", help="Bot 接收更新的前端")
+    parser.add_argument("--holders", type=int, default=100, help="替身 OKX 每个代币的持有者排行人数")
+    parser.add_argument("--group-rate", type=float, default=20, help="替身 Telegram 单个群组每分钟发送上限，0 表示不限")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="覆盖 analysis 配置项，可重复")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", "-o", help="把结果保存为 JSON")
+    parser.add_argument("--verbose", "-v", action="store_true", help="在控制台输出 Bot 日志")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    stages = [int(count) for count in args.groups.split(",") if count.strip()]
+    faults = faults_from_args(args)
+    upstreams = StandInUpstreams(faults, holders=args.holders, seed=args.seed,
+                                 group_rate_per_minute=args.group_rate).start()
+    for name in SERVICES:
+        print(f"🌐 替身 {name:<9} {upstreams.url(name)}  ({faults[name].describe()})")
+
+    all_chat_ids = [-(1000000 * (stage + 1) + index) for stage, groups in enumerate(stages) for index in range(groups)]
+    config_path = configure_bot(upstreams, all_chat_ids, args)
+    try:
+        start_bot(upstreams)
+        print("🤖 Bot 已开始拉取更新")
+
+        driver = LoadDriver(upstreams, args)
+        reports = [run_stage(driver, stage, groups, args) for stage, groups in enumerate(stages)]
+
+        if args.output:
+            json_codec.dump({
+                "args": {key: value for key, value in vars(args).items()},
+                "faults": {name: vars(fault) for name, fault in faults.items()},
+                "stages": reports,
+            }, args.output)
+            print(f"\n💾 结果已保存: {args.output}")
+    finally:
+        # 临时配置文件含完整的用户配置，出错或中断时也要删除
+        upstreams.stop()
+        if os.path.exists(config_path):
+            os.remove(config_path)
+    sys.stdout.flush()
+    # 调度器等线程池不是守护线程，直接退出，不等待进行中的分析
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,14 +15,30 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 # 导入日志模块和健康检查
-from src.utils.logger import get_logger
-from src.utils.health_check import get_health_status, update_service_status, increment_stat
+from src.utils.logger import get_logger, get_log_pipeline, configure_logging
+from src.utils.health_check import (
+    get_health_status, update_service_status, increment_stat, register_stats_provider, register_registry
+)
 
 import telebot
-from src.core.config import get_config, setup_proxy
+from src.core.config import get_config, setup_proxy, setup_telegram_api
 from src.services.crawler import PumpFunCrawler
 from src.services.blacklist import is_blacklisted
 from src.services.formatter import MessageFormatter
+from src.services.prefetcher import get_prefetcher
+from src.services.http_client import get_http_client
+from src.services.resilience import get_upstream_registry
+from src.services.proxy_pool import get_proxy_pool
+from src.services.data_providers import get_provider_stats
+from src.services.wallet_cache import get_wallet_cache
+from src.services.price_table import get_price_table
+from src.services.result_cache import get_result_cache
+from src.services.artifact_store import get_artifact_store
+from src.services.analysis_archive import get_analysis_archive
+from src.services.telegram_outbox import QueuedTeleBot, get_telegram_outbox
+from src.utils.tracing import get_trace_stats
+from src.services.async_frontend import AsyncBotFrontend, is_async_mode
+from src.services.okx_crawler import hedge_stats, analysis_cache
 from src.handlers.base import BaseCommandHandler
 from src.handlers.config import ConfigCommandHandler
 from src.handlers.holding_analysis import HoldingAnalysisHandler
@@ -46,6 +62,7 @@ class TokenAnalysisBot:
         
         try:
             self.config = get_config()
+            configure_logging(self.config.bot)
             update_service_status("telegram_bot", "initializing")
             
             # Bot重启时清空所有存储文件
@@ -54,9 +71,29 @@ class TokenAnalysisBot:
             
             self.data_manager = DataManager()
             setup_proxy()
+            setup_telegram_api()
+
+            # 预热上游连接，并在健康检查中暴露每个主机的连接复用和延迟
+            http_client = get_http_client()
+            http_client.warm_up()
+            register_stats_provider("http", http_client.get_stats, label="host")
+            register_stats_provider("upstream", get_upstream_registry().get_stats, label="upstream")
+            register_stats_provider("wallet_hedge", lambda: dict(hedge_stats))
+            register_stats_provider("egress", get_proxy_pool().get_stats, label="egress")
+            register_stats_provider("provider", get_provider_stats, label="provider")
+            register_stats_provider("wallet_cache", get_wallet_cache().get_stats)
+            register_stats_provider("price_table", get_price_table().get_stats)
+            get_price_table().start()
+            register_stats_provider("telegram_outbox", get_telegram_outbox().get_stats)
+            register_stats_provider("trace", get_trace_stats, label="span")
+            register_stats_provider("logging", get_log_pipeline().get_stats)
+            register_stats_provider("artifacts", get_artifact_store().get_stats)
+            if self.config.analysis.archive_enabled:
+                get_analysis_archive().prune()
+                register_stats_provider("archive", get_analysis_archive().get_stats)
             
-            # 初始化机器人
-            self.bot = telebot.TeleBot(self.config.bot.telegram_token)
+            # 初始化机器人（发送类调用经出站队列统一限速；asyncio 前端模式下处理器在前端线程池中执行）
+            self.bot = QueuedTeleBot(telebot.TeleBot(self.config.bot.telegram_token, threaded=not is_async_mode()))
             self.logger.info("✅ Telegram Bot 初始化成功")
             update_service_status("telegram_bot", "healthy")
             
@@ -71,6 +108,7 @@ class TokenAnalysisBot:
             self.jupiter_monitor_handler = JupiterMonitorHandler(self.bot)
             self.auto_pump_handler = AutoPumpAnalysisHandler(self.bot)
             self.logger.info("✅ 所有处理器初始化成功")
+            self._register_registries()
             
         except Exception as e:
             update_service_status("telegram_bot", "error", str(e))
@@ -80,6 +118,24 @@ class TokenAnalysisBot:
         # 注册处理器
         self._register_handlers()
     
+    def _register_registries(self):
+        """在诊断端点中报告各内存注册表的大小（按会话嵌套的表统计总条目数）"""
+        def nested_size(mapping):
+            return sum(len(value) for value in list(mapping.values()))
+
+        register_registry("analysis_cache", lambda: len(analysis_cache))
+        register_registry("result_cache", lambda: get_result_cache().get_stats().get("entries", 0))
+        register_registry("jupiter.token_messages", lambda: nested_size(self.jupiter_handler.token_messages))
+        register_registry("jupiter.analysis_threads", lambda: len(self.jupiter_handler.analysis_threads))
+        register_registry("jupiter.analysis_status", lambda: len(self.jupiter_handler.analysis_status))
+        register_registry("jupiter_monitor.monitor_threads", lambda: len(self.jupiter_monitor_handler.monitor_threads))
+        register_registry("jupiter_monitor.previous_tokens", lambda: nested_size(self.jupiter_monitor_handler.previous_tokens))
+        register_registry("jupiter_monitor.token_first_seen", lambda: nested_size(self.jupiter_monitor_handler.token_first_seen))
+        register_registry("auto_pump.analysis_threads", lambda: len(self.auto_pump_handler.analysis_threads))
+        register_registry("auto_pump.analyzed_tokens", lambda: nested_size(self.auto_pump_handler.analyzed_tokens))
+        register_registry("wallet_cache", lambda: get_wallet_cache().get_stats().get("entries", 0))
+        register_registry("price_table", lambda: get_price_table().get_stats().get("entries", 0))
+
     def _register_handlers(self):
         """注册所有处理器"""
         self.logger.info("📝 注册消息处理器...")
@@ -147,7 +203,7 @@ class TokenAnalysisBot:
             # 检查黑名单
             if is_blacklisted(mint):
                 blacklisted_count += 1
-                self.logger.debug(f"🚫 代币 {mint} 在黑名单中，跳过")
+                self.logger.debug_sampled("🚫 代币 %s 在黑名单中，跳过", mint)
                 continue
             
             try:
@@ -192,8 +248,8 @@ class TokenAnalysisBot:
                     )
                     
                     results.append(result)
-                    self.logger.debug(f"✅ 符合条件的代币: {token.symbol}({mint[:8]}...) "
-                                    f"涨幅: {change:.2%}, 市值: ${now_cap:,.0f}")
+                    self.logger.debug("✅ 符合条件的代币: %s(%s...) 涨幅: %.2f%%, 市值: $%.0f",
+                                      token.symbol, mint[:8], change * 100, now_cap)
                 else:
                     threshold_filtered_count += 1
                     
@@ -251,6 +307,9 @@ class TokenAnalysisBot:
                     self.logger.info(f"📈 价格分析完成，耗时: {analysis_duration:.2f}秒")
                     
                     if results:
+                        # 预取涨幅靠前代币的大户分析（可选，低优先级）
+                        get_prefetcher().submit_alerts(results)
+                        
                         # 计算时间差
                         old_ts = datetime.fromtimestamp(os.path.getmtime(str(pre_path))).strftime('%Y-%m-%d %H:%M:%S')
                         new_ts = datetime.fromtimestamp(os.path.getmtime(str(now_path))).strftime('%Y-%m-%d %H:%M:%S')
@@ -342,15 +401,10 @@ class TokenAnalysisBot:
                     
                     sent_pages += 1
                     self.logger.info(f"✅ 第{page+1}/{pages}页发送成功")
-                    
-                    if page < pages - 1:
-                        self.logger.debug("⏳ 页面间等待1.2秒...")
-                        time.sleep(1.2)
                         
                 except Exception as e:
                     failed_pages += 1
                     self.logger.error(f"❌ 第{page+1}页发送失败: {e}")
-                    time.sleep(3)
             
             self.logger.info(f"📊 消息发送完成: 成功{sent_pages}页, 失败{failed_pages}页")
                     
@@ -372,6 +426,10 @@ class TokenAnalysisBot:
             # 更新统计信息
             increment_stat("requests_total", 0)  # 初始化统计
             
+            if is_async_mode():
+                self._run_async_frontend()
+                return
+
             # 启动bot轮询
             while True:
                 try:
@@ -390,6 +448,16 @@ class TokenAnalysisBot:
             self.logger.error_with_solution(e, "Bot启动失败")
             raise
 
+    def _run_async_frontend(self):
+        """以 asyncio 前端接收更新（长轮询或 webhook），处理器在前端线程池中执行"""
+        frontend = AsyncBotFrontend(
+            self.bot, self.config.bot.telegram_token, on_heartbeat=self.health_status.update_heartbeat
+        )
+        register_stats_provider("frontend", frontend.get_stats)
+        self.logger.info("⚡ 使用 asyncio 前端接收Telegram更新")
+        self.health_status.update_heartbeat()
+        frontend.run()
+
     def cleanup(self):
         """清理资源"""
         self.logger.info("🧹 正在清理资源...")
@@ -20,6 +20,36 @@ class BotConfig:
     threshold: float = 0.05
     min_market_cap: float = 0
     min_age_days: int = 10
+    # Telegram 出站队列：全局和每个会话限速，429 按 retry_after 重试，同一消息的编辑合并
+    outbox_enabled: bool = True
+    outbox_global_rate_per_second: float = 25
+    outbox_chat_rate_per_second: float = 1.0  # 私聊
+    outbox_group_rate_per_minute: float = 20  # 群组
+    outbox_chat_burst: int = 3
+    outbox_max_retries: int = 3
+    outbox_send_timeout_seconds: int = 120  # 等待发送结果的最长时间
+    # 接收更新的前端：threaded 为 TeleBot 同步轮询；async 为 asyncio 前端（AsyncTeleBot 长轮询或 webhook）
+    frontend_mode: str = "threaded"
+    async_handler_workers: int = 8  # async 模式下执行处理器的线程数
+    async_max_pending_updates: int = 100  # async 模式下处理中（含排队）的更新上限，达到后暂停拉取或拒绝 webhook
+    webhook_enabled: bool = False  # async 模式下用 webhook 代替长轮询
+    webhook_listen_host: str = "127.0.0.1"
+    webhook_listen_port: int = 8443
+    webhook_path: str = "/telegram"
+    webhook_public_url: str = ""  # 向 Telegram 注册的公网 HTTPS 地址，留空则需自行注册
+    webhook_secret_token: str = ""  # 校验 X-Telegram-Bot-Api-Secret-Token；留空时仅在自动注册 webhook 时随机生成
+    telegram_api_url: str = ""  # 代替 https://api.telegram.org 的 Bot API 地址（本地替身或自建 Bot API 服务）
+    # 健康检查服务器的 /debug 诊断端点（采样分析、内存分配、线程栈、注册表大小），需携带 debug_token
+    debug_endpoints_enabled: bool = False
+    debug_token: str = ""
+    debug_profile_max_seconds: int = 30  # 单次采样分析的最长时长（不超过300秒）
+    debug_listen_host: str = "127.0.0.1"  # 诊断端点单独监听的地址（token 为明文 HTTP，默认只允许本机访问）
+    debug_listen_port: int = 8081
+    # 日志：所有模块经队列由单个写入线程批量写出，可按模块调整级别
+    log_level: str = "DEBUG"  # 模块日志器默认级别
+    log_console_level: str = "INFO"
+    log_module_levels: dict = None  # 例如 {"okx_crawler": "WARNING"}
+    log_debug_sample_every: int = 100  # 逐条处理的调试日志每多少条记录一次
 
 
 @dataclass
@@ -34,10 +64,105 @@ class AnalysisConfig:
     cluster_max_addresses: int = 50
     clusters_per_page: int = 3
     max_concurrent_threads: int = 5  # 多线程爬取的最大线程数
+    # 基础设施地址自动学习（跨代币高频出现或资产特征异常的地址直接排除）
+    infra_learning_enabled: bool = True
+    infra_min_tokens_analyzed: int = 200  # 至少分析多少个代币后才开始按频率学习
+    infra_min_holder_count: int = 30  # 作为大户出现的代币数下限（与比例同时满足才学习）
+    infra_holder_ratio: float = 0.3  # 在超过该比例的代币中作为大户出现即视为基础设施
+    infra_decay_tokens: int = 1000  # 有效样本达到该数量后出现次数减半，旧数据逐步淡出
+    infra_learned_ttl_days: float = 7  # 学习到的地址有效期（天），过期后重新参与分析
+    infra_max_portfolio_value: float = 5000000  # 资产总价值超过该值（美元）视为基础设施
+    infra_save_interval_seconds: int = 60  # 索引延迟保存间隔，窗口内的修改合并为一次后台写入
+    # 分析结果缓存（stale-while-revalidate）
+    result_cache_enabled: bool = True
+    result_cache_fresh_seconds: int = 300  # 新鲜窗口内直接返回缓存
+    result_cache_stale_seconds: int = 1800  # 过期窗口内先返回旧结果并后台刷新
+    result_cache_max_entries: int = 200
+    # Pump警报后预取涨幅靠前代币的分析结果
+    prefetch_enabled: bool = False
+    prefetch_top_n: int = 3  # 每轮警报预取的代币数量
+    prefetch_max_per_hour: int = 30  # 每小时最多预取次数
+    prefetch_max_inflight: int = 1  # 进行中的分析数达到该值时暂缓预取
+    prefetch_job_ttl: int = 120  # 预取任务等待超过该秒数即放弃
+    # 分析任务调度（有界线程池，交互 > 自动pump > 批量）
+    scheduler_max_workers: int = 3  # 同时执行的分析任务数
+    scheduler_max_queue: int = 100  # 全局最大排队任务数
+    scheduler_max_queue_per_chat: int = 20  # 单个群组最大排队任务数
+    scheduler_job_timeout_seconds: int = 180  # 单个任务的执行截止时间，到期后分析提前结束，0 表示不限制
+    # 持久化任务队列（需另外启动 job_worker.py）
+    job_queue_enabled: bool = False
+    job_queue_path: str = "config/job_queue.db"
+    job_queue_lease_seconds: int = 300  # 租约时长，worker崩溃后任务在租约到期后被重新领取
+    job_queue_max_attempts: int = 3
+    job_queue_retention_hours: int = 24  # 已投递任务的保留时长
+    # 共享HTTP连接池
+    http_pool_maxsize: int = 0  # 每个主机的连接池大小，0 表示按 max_concurrent_threads × scheduler_max_workers 计算
+    http_timeout: int = 30  # 默认请求超时（秒）
+    http_warmup_enabled: bool = True  # 启动时预热上游连接
+    http_upstream_overrides: dict = None  # 主机 -> 替代地址，例如 {"web3.okx.com": "http://127.0.0.1:18090"}（本地替身上游）
+    # 上游重试策略与熔断器
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 1.0  # 去相关抖动的基础等待（秒）
+    retry_max_delay: float = 30.0  # 单次重试最长等待（秒），包括 Retry-After
+    retry_budget_ratio: float = 0.2  # 每分钟重试次数不超过请求数的该比例（另有5次保底）
+    circuit_failure_threshold: int = 5  # 连续失败该次数后熔断
+    circuit_recovery_timeout: int = 30  # 熔断后多少秒进入半开探测
+    # 钱包资产对冲请求与分析截止时间
+    wallet_hedging_enabled: bool = False  # 单个钱包请求超过近期p90耗时后再发一次，先返回者胜出
+    wallet_hedge_min_delay: float = 1.0  # 触发对冲的最短等待（秒）
+    wallet_hedge_budget_ratio: float = 0.1  # 对冲请求不超过钱包请求数的该比例
+    wallet_hedge_pool_size: int = 10  # 单线程模式等零散请求共用的对冲线程池大小（多线程分析使用各自的线程池）
+    analysis_deadline_seconds: int = 120  # 单次分析获取钱包资产的截止时间，0 表示不限制
+    # 持有者/钱包资产数据源：okx_web / okx_v5 / fixture，按顺序故障转移
+    data_providers: List[str] = None
+    provider_mode: str = "failover"  # failover: 依次尝试；race: 同时请求前 provider_race_count 个，取最先返回者
+    provider_race_count: int = 2
+    provider_fixture_dir: str = "config/fixtures"  # fixture 数据源读取的目录
+    provider_okx_v5_api_key: str = ""  # okx_v5 数据源使用的 API Key
+    # 钱包数据新鲜度：realtime 强制上游刷新；recent 接受N分钟内的缓存；archival 接受任何本地缓存
+    freshness_tier: str = "realtime"  # /ca1 交互式分析
+    prefetch_freshness_tier: str = "recent"  # Pump警报预取
+    wallet_cache_recent_minutes: int = 30
+    wallet_cache_max_entries: int = 5000
+    # 共享价格表：缓存的持仓和分析结果按最新价格重估，recent 等级下持仓数量可复用更久
+    price_table_enabled: bool = True
+    price_table_refresh_seconds: int = 30  # 后台批量刷新间隔
+    price_table_max_age_seconds: int = 300  # 超过此时长的价格不用于重估
+    price_table_batch_size: int = 50  # 每次批量刷新的代币数
+    price_table_max_entries: int = 20000
+    price_table_track_seconds: int = 3600  # 只刷新该时长内用于重估过的代币
+    # 分析耗时追踪：各阶段 span 汇总到分析结果的 timings 和 /status，可选写入 JSONL
+    trace_enabled: bool = True
+    trace_max_spans: int = 5000  # 单条追踪保留的 span 明细上限（超出只计入汇总）
+    trace_export_enabled: bool = False
+    trace_export_path: str = "config/traces/analysis_traces.jsonl"
+    trace_export_max_mb: int = 50  # 超过后轮转为 .1
+    # 分析产物（原始持有者数据、分析结果、Jupiter 抓取结果）后台压缩写入
+    artifact_write_behind: bool = True  # 关闭时在调用线程中同步写入
+    artifact_compression: str = "gzip"  # gzip / zstd（需安装 zstandard）/ none
+    artifact_compression_level: int = 6
+    artifact_queue_max: int = 200  # 队列写满时丢弃新产物
+    artifact_batch_size: int = 20
+    # 分析结果存档（SQLite，按代币和时间索引，结果缓存未命中时从存档读取）
+    archive_enabled: bool = True
+    archive_path: str = "config/analysis_archive.db"
+    archive_max_age_days: int = 30  # 超过保存时长的记录被淘汰
+    archive_max_mb: int = 500  # 压缩后总大小上限，超出时淘汰最旧的记录
+    # 深度扫描：持有者和钱包持仓分页并行获取，流式合并统计
+    deep_scan_enabled: bool = False
+    deep_scan_max_holders: int = 500  # 最多分析的大户数量
+    deep_scan_holder_page_size: int = 100
+    deep_scan_wallet_page_size: int = 50  # 钱包持仓每页代币数
+    deep_scan_wallet_max_pages: int = 10
+    deep_scan_page_workers: int = 3  # 单次分页并行请求数
+    deep_scan_max_tracked_tokens: int = 20000  # 统计时最多跟踪的代币数（内存上限）
+    deep_scan_max_detail_entries: int = 200000  # 所有代币的大户持有明细总条数上限，超过后淘汰持有人数最少的低价值代币
     # 已知的池子地址列表（即使OKX检测不到也要识别）
     known_pool_addresses: List[str] = None
     
     def __post_init__(self):
+        if self.data_providers is None:
+            self.data_providers = ["okx_web"]
         if self.known_pool_addresses is None:
             self.known_pool_addresses = [
                 "5Q544fKrFoe6tsEbD7S8EmxGTJYAKtTVhAW5Q5pge4j1"  # 已知池子地址
@@ -51,6 +176,21 @@ class ProxyConfig:
     http_proxy: str = "http://127.0.0.1:10808"
     https_proxy: str = "http://127.0.0.1:10808"
     enabled: bool = False
+    # 代理出口池：配置多个出口后，pool_hosts 中的主机按出口轮流分摊请求（每个出口独立限速）
+    pool: List[str] = None
+    pool_hosts: List[str] = None
+    pool_rate_per_second: float = 2.0
+    pool_burst: int = 5
+    pool_cooldown_seconds: int = 60
+    pool_max_wait_seconds: int = 30
+    pool_health_check_url: str = "https://web3.okx.com"
+    pool_health_check_interval: int = 60
+
+    def __post_init__(self):
+        if self.pool is None:
+            self.pool = []
+        if self.pool_hosts is None:
+            self.pool_hosts = ["web3.okx.com"]
 
 
 @dataclass
@@ -65,6 +205,7 @@ class CapumpConfig:
     max_tokens_per_batch: int = 10
     analysis_timeout: int = 180
     notification_enabled: bool = True
+    freshness_tier: str = "recent"  # 自动分析的钱包数据新鲜度等级
 
 
 @dataclass  
@@ -77,6 +218,7 @@ class JupiterConfig:
     period: str = "24h"
     max_tokens_per_analysis: int = 50
     default_token_count: int = 10
+    freshness_tier: str = "recent"  # 批量分析的钱包数据新鲜度等级
 
 
 class ConfigManager:
@@ -150,6 +292,7 @@ class ConfigManager:
             http_proxy=os.getenv("HTTP_PROXY", "http://127.0.0.1:10808"),
             https_proxy=os.getenv("HTTPS_PROXY", "http://127.0.0.1:10808"),
             enabled=os.getenv("PROXY_ENABLED", "true").lower() == "true",
+            pool=[url.strip() for url in os.getenv("PROXY_POOL", "").split(",") if url.strip()],
         )
 
         self._capump_config = CapumpConfig(
@@ -215,6 +358,9 @@ class ConfigManager:
                 proxy_data = config_data["proxy"]
                 if hasattr(self._proxy_config, "__dict__"):
                     for key, value in proxy_data.items():
+                        if key == "pool" and not value:
+                            # 空列表视为未配置，保留 PROXY_POOL 环境变量的设置
+                            continue
                         if hasattr(self._proxy_config, key):
                             setattr(self._proxy_config, key, value)
             
@@ -372,3 +518,22 @@ def setup_proxy():
         os.environ.pop("http_proxy", None)
         os.environ.pop("https_proxy", None)
         logger.info("✅ 代理已禁用")
+
+
+def setup_telegram_api():
+    """
+    配置了 telegram_api_url 时，让 Bot API 请求发往该地址
+    asyncio 版本（依赖 aiohttp）只在 frontend_mode 为 async 时配置，默认的 threaded 模式不需要安装 aiohttp
+    """
+    api_url = (config_manager.bot.telegram_api_url or "").rstrip("/")
+    if not api_url:
+        return
+    from telebot import apihelper
+
+    apihelper.API_URL = api_url + "/bot{0}/{1}"
+    apihelper.FILE_URL = api_url + "/file/bot{0}/{1}"
+    if config_manager.bot.frontend_mode == "async":
+        from telebot import asyncio_helper
+
+        asyncio_helper.API_URL = api_url + "/bot{0}/{1}"
+        asyncio_helper.FILE_URL = api_url + "/file/bot{0}/{1}"
@@ -29,7 +29,6 @@ class AutoPumpAnalysisHandler(BaseCommandHandler):
 
 import time
 import threading
-import json
 import os
 from typing import Dict, Set
 from telebot import TeleBot
@@ -38,6 +37,9 @@ from ..core.config import get_config
 from ..services.blacklist import is_blacklisted
 from ..utils.data_manager import DataManager
 from ..utils.logger import get_logger
+from ..utils import json_codec
+from ..services.result_cache import get_result_cache, format_cache_age
+from ..services.scheduler import get_scheduler, PRIORITY_AUTO_PUMP
 
 # 导入OKX相关功能
 try:
@@ -61,6 +63,8 @@ class AutoPumpAnalysisHandler:
         self.analysis_threads: Dict[str, threading.Thread] = {}  # chat_id -> thread
         self.stop_flags: Dict[str, threading.Event] = {}  # chat_id -> stop_event
         self.analyzed_tokens: Dict[str, Set[str]] = {}  # chat_id -> set of analyzed tokens
+        self.result_cache = get_result_cache()  # 分析结果缓存
+        self.scheduler = get_scheduler()  # 分析任务调度器
         
         self.logger.info("🔧 AutoPumpAnalysisHandler 初始化开始")
         
@@ -93,8 +97,8 @@ class AutoPumpAnalysisHandler:
         """加载自动分析状态"""
         try:
             if os.path.exists(self.status_file):
-                with open(self.status_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(self.status_file, 'rb') as f:
+                    data = json_codec.loads(f.read())
                     self.analysis_status = data.get('analysis_status', {})
                     # 重置已分析的代币列表（重启后重新开始）
                     self.analyzed_tokens = {chat_id: set() for chat_id in self.analysis_status.keys()}
@@ -121,8 +125,7 @@ class AutoPumpAnalysisHandler:
                 'last_updated': time.time()
             }
             
-            with open(self.status_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            json_codec.dump(data, self.status_file)
         except Exception as e:
             print(f"保存自动pump分析状态失败: {e}")
     
@@ -248,6 +251,9 @@ class AutoPumpAnalysisHandler:
         if chat_id in self.stop_flags:
             self.stop_flags[chat_id].set()
         
+        # 取消该群组排队中和运行中的自动分析任务
+        self.scheduler.cancel_jobs(chat_id=chat_id, tag="auto_pump")
+        
         if chat_id in self.analysis_threads:
             thread = self.analysis_threads[chat_id]
             if thread.is_alive():
@@ -442,13 +448,22 @@ class AutoPumpAnalysisHandler:
                     print(f"❌ 发送开始消息失败: {e}")
                     continue
                 
-                # 创建OKX爬虫并执行分析
+                # 执行分析（优先使用结果缓存）
+                cache_info = {'state': 'miss', 'age': 0}
                 try:
-                    crawler = OKXCrawlerForBot()
-                    result = crawler.analyze_token_holders(
-                        token_address, 
-                        top_holders_count=self.config.analysis.top_holders_count
+                    job = self.scheduler.submit(
+                        self.result_cache.get_or_analyze,
+                        args=(token_address, self.config.analysis.top_holders_count),
+                        kwargs={"freshness": self.config.capump.freshness_tier},
+                        chat_id=chat_id,
+                        priority=PRIORITY_AUTO_PUMP,
+                        tag="auto_pump",
                     )
+                    job_result = job.wait() if job else None
+                    if job and job.cancelled:
+                        print(f"📊 群组 {chat_id}: 分析任务已取消（功能已关闭）")
+                        break
+                    result, cache_info = job_result or (None, cache_info)
                     
                     if result and result.get("token_statistics"):
                         # 导入格式化函数
@@ -476,8 +491,11 @@ class AutoPumpAnalysisHandler:
                                 f"🔥 <b>自动pump分析结果</b> ({i+1}/{len(pump_tokens)})\n"
                                 f"📈 检测涨幅: {token_data['change']:.1%}\n"
                                 f"💰 市值变化: ${token_data['old_cap']:,.0f} → ${token_data['new_cap']:,.0f}\n"
-                                f"🕐 分析时间: {time.strftime('%H:%M:%S')}\n\n"
+                                f"🕐 分析时间: {time.strftime('%H:%M:%S')}\n"
                             )
+                            if cache_info['state'] != 'miss':
+                                pump_info += f"♻️ 缓存结果（{format_cache_age(cache_info['age'])}前）\n"
+                            pump_info += "\n"
                             
                             final_msg = pump_info + table_msg
                             
@@ -557,8 +575,8 @@ class AutoPumpAnalysisHandler:
                     except:
                         pass
                 
-                # 避免API限制，添加延迟（最后一个不延迟）
-                if i < len(pump_tokens) - 1:
+                # 避免API限制，添加延迟（最后一个和命中缓存的不延迟）
+                if i < len(pump_tokens) - 1 and cache_info['state'] == 'miss':
                     time.sleep(15)  # 增加到15秒间隔
                 
             except Exception as e:
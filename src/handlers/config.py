@@ -3,11 +3,13 @@
 处理 /config 命令和相关回调
 """
 
+import time
 from telebot import TeleBot
 from telebot.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from ..core.config import get_config
 from ..services.formatter import MessageFormatter
 from ..services.blacklist import get_blacklist_manager
+from ..services.infra_addresses import get_infra_address_index
 from ..handlers.base import BaseCommandHandler
 
 
@@ -19,6 +21,7 @@ class ConfigCommandHandler(BaseCommandHandler):
         self.config = get_config()
         self.formatter = MessageFormatter()
         self.blacklist_manager = get_blacklist_manager()
+        self.infra_index = get_infra_address_index()
 
     def handle_config(self, message: Message) -> None:
         """处理 /config 命令"""
@@ -41,9 +44,10 @@ class ConfigCommandHandler(BaseCommandHandler):
             InlineKeyboardButton("🪐 Jupiter分析", callback_data="config_jup_analysis"),
         )
 
-        # 黑名单管理
+        # 黑名单与基础设施地址管理
         keyboard.add(
             InlineKeyboardButton("🚫 黑名单管理", callback_data="blacklist_menu"),
+            InlineKeyboardButton("🏗️ 基础设施地址", callback_data="infra_menu"),
         )
 
         return keyboard
@@ -199,6 +203,101 @@ class ConfigCommandHandler(BaseCommandHandler):
         self.bot.send_message(call.message.chat.id, response, parse_mode="HTML")
         self.bot.answer_callback_query(call.id)
 
+    def handle_infra_menu(self, call: CallbackQuery) -> None:
+        """处理基础设施地址菜单"""
+        stats = self.infra_index.get_stats()
+        infra_msg = (
+            "🏗️ <b>基础设施地址管理</b>\n\n"
+            f"自动学习地址: {stats['learned']} 个\n"
+            f"手动添加地址: {stats['manual']} 个\n"
+            f"已忽略地址: {stats['ignored']} 个\n"
+            f"有效样本代币: {stats['tokens_analyzed']} 个\n"
+            f"跟踪中的地址: {stats['tracked_addresses']} 个\n\n"
+            "💡 在大量代币中高频出现或资产总价值异常的地址会被自动学习并在获取资产前直接排除，"
+            "学习条目到期后自动恢复分析，移除后的地址不会再被自动学习"
+        )
+
+        keyboard = InlineKeyboardMarkup()
+        keyboard.add(
+            InlineKeyboardButton("➕ 添加地址", callback_data="infra_add"),
+            InlineKeyboardButton("➖ 移除地址", callback_data="infra_remove"),
+        )
+        keyboard.add(
+            InlineKeyboardButton("📋 学习列表", callback_data="infra_view"),
+            InlineKeyboardButton("📌 手动列表", callback_data="infra_view_manual"),
+        )
+        keyboard.add(InlineKeyboardButton("↩️ 返回配置", callback_data="back_to_config"))
+
+        self.bot.edit_message_text(
+            infra_msg,
+            call.message.chat.id,
+            call.message.message_id,
+            parse_mode="HTML",
+            reply_markup=keyboard,
+        )
+        self.bot.answer_callback_query(call.id)
+
+    def handle_add_infra(self, call: CallbackQuery) -> None:
+        """处理添加基础设施地址"""
+        msg = self.bot.send_message(call.message.chat.id, "请输入要排除的基础设施钱包地址：")
+        self.bot.register_next_step_handler(msg, self._add_infra_address)
+        self.bot.answer_callback_query(call.id)
+
+    def _add_infra_address(self, message: Message) -> None:
+        """添加基础设施地址"""
+        address = message.text.strip()
+
+        if self.infra_index.add_address(address):
+            response = self.formatter.format_success_message(f"已添加基础设施地址: {address}")
+        else:
+            response = self.formatter.format_error_message("该地址已在排除列表中")
+
+        self.bot.reply_to(message, response, parse_mode="HTML")
+
+    def handle_remove_infra(self, call: CallbackQuery) -> None:
+        """处理移除基础设施地址"""
+        msg = self.bot.send_message(call.message.chat.id, "请输入要恢复分析的钱包地址：")
+        self.bot.register_next_step_handler(msg, self._remove_infra_address)
+        self.bot.answer_callback_query(call.id)
+
+    def _remove_infra_address(self, message: Message) -> None:
+        """移除基础设施地址"""
+        address = message.text.strip()
+
+        if self.infra_index.remove_address(address):
+            response = self.formatter.format_success_message(f"已移除基础设施地址: {address}")
+        else:
+            response = self.formatter.format_error_message("该地址不在排除列表中")
+
+        self.bot.reply_to(message, response, parse_mode="HTML")
+
+    def handle_view_infra(self, call: CallbackQuery, source: str = "learned") -> None:
+        """处理查看基础设施地址审核列表（自动学习与手动添加分开查看）"""
+        entries = self.infra_index.get_review_list(source=source)
+        title = "手动添加的基础设施地址" if source == "manual" else "自动学习的基础设施地址"
+
+        if not entries:
+            response = f"🏗️ 暂无{title}"
+        else:
+            source_names = {"frequency": "高频", "portfolio": "资产", "manual": "手动"}
+            response = f"🏗️ <b>{title}</b> (共{len(entries)}个)\n\n"
+            for i, entry in enumerate(entries[:20], 1):  # 只显示前20个
+                response += (
+                    f"{i}. <code>{entry['address']}</code>\n"
+                    f"   [{source_names.get(entry['source'], entry['source'])}] "
+                    f"{entry['reason']} · 出现 {entry['count']} 次"
+                )
+                if entry.get("expires_at"):
+                    remaining_days = max(0.0, (entry["expires_at"] - time.time()) / 86400)
+                    response += f" · {remaining_days:.1f} 天后过期"
+                response += "\n"
+
+            if len(entries) > 20:
+                response += f"\n... 还有 {len(entries) - 20} 个地址"
+
+        self.bot.send_message(call.message.chat.id, response, parse_mode="HTML")
+        self.bot.answer_callback_query(call.id)
+
     def handle_auto_alert_config(self, call: CallbackQuery) -> None:
         """处理自动警报配置页面"""
         config = self.config.bot
@@ -567,6 +666,26 @@ class ConfigCommandHandler(BaseCommandHandler):
         def view_blacklist_handler(call):
             self.handle_view_blacklist(call)
 
+        @self.bot.callback_query_handler(func=lambda call: call.data == "infra_menu")
+        def infra_menu_handler(call):
+            self.handle_infra_menu(call)
+
+        @self.bot.callback_query_handler(func=lambda call: call.data == "infra_add")
+        def add_infra_handler(call):
+            self.handle_add_infra(call)
+
+        @self.bot.callback_query_handler(func=lambda call: call.data == "infra_remove")
+        def remove_infra_handler(call):
+            self.handle_remove_infra(call)
+
+        @self.bot.callback_query_handler(func=lambda call: call.data == "infra_view")
+        def view_infra_handler(call):
+            self.handle_view_infra(call)
+
+        @self.bot.callback_query_handler(func=lambda call: call.data == "infra_view_manual")
+        def view_manual_infra_handler(call):
+            self.handle_view_infra(call, source="manual")
+
         @self.bot.callback_query_handler(func=lambda call: call.data == "back_to_config")
         def back_to_config_handler(call):
             self.handle_back_to_config(call)
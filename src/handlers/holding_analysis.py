@@ -4,12 +4,22 @@
 """
 
 import time
-import threading
+from types import SimpleNamespace
 from telebot import TeleBot
 from telebot.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from ..core.config import get_config
 from ..services.formatter import MessageFormatter
 from ..handlers.base import BaseCommandHandler
+from ..services.scheduler import get_scheduler, PRIORITY_INTERACTIVE
+from ..utils.tracing import span, traced, current_timings
+from ..services.result_cache import get_result_cache, format_cache_age
+from ..services.job_queue import (
+    get_job_queue,
+    get_job_dispatcher,
+    get_job_queue_settings,
+    JOB_HOLDER_ANALYSIS,
+    STATUS_DONE,
+)
 
 # 导入OKX相关功能
 try:
@@ -23,7 +33,8 @@ try:
         format_target_token_rankings,
         analysis_cache,
         start_cache_cleanup,
-        cleanup_expired_cache
+        cleanup_expired_cache,
+        get_analyzed_holders_count,
     )
 except ImportError:
     print("⚠️ 无法导入OKX爬虫模块，/ca1功能可能不可用")
@@ -58,6 +69,20 @@ class HoldingAnalysisHandler(BaseCommandHandler):
         # 启动全局缓存清理（只启动一次）
         start_cache_cleanup()
 
+        # 分析结果缓存（同一代币重复分析时直接复用）
+        self.result_cache = get_result_cache()
+
+        # 分析任务调度器
+        self.scheduler = get_scheduler()
+
+        # 持久化任务队列：分析交给独立的worker进程执行，结果由投递线程回传
+        self.job_queue_settings = get_job_queue_settings()
+        if self.job_queue_settings["enabled"]:
+            self.job_queue = get_job_queue()
+            self.job_dispatcher = get_job_dispatcher()
+            self.job_dispatcher.register("ca1", self._deliver_queued_result)
+            self.job_dispatcher.start()
+
     def handle_ca1(self, message: Message) -> None:
         """处理 /ca1 命令 - OKX大户分析"""
         try:
@@ -131,17 +156,31 @@ class HoldingAnalysisHandler(BaseCommandHandler):
                 f"🔍 正在分析代币大户持仓...\n"
                 f"代币地址: `{token_address}`\n"
                 f"⏳ 预计需要1-2分钟，请稍候...\n"
-                f"📊 将分析前100名大户的持仓情况",
+                f"📊 将分析前{get_analyzed_holders_count(self.config.analysis.top_holders_count)}名大户的持仓情况",
                 parse_mode="Markdown",
             )
 
-            # 在后台线程中运行分析
-            analysis_thread = threading.Thread(
-                target=self._run_analysis, 
-                args=(processing_msg, token_address), 
-                daemon=True
+            if self.job_queue_settings["enabled"]:
+                self._enqueue_durable_analysis(processing_msg, token_address, chat_id)
+                return
+
+            # 提交到调度器，按交互优先级执行
+            job = self.scheduler.submit(
+                self._run_analysis,
+                args=(processing_msg, token_address),
+                chat_id=chat_id,
+                priority=PRIORITY_INTERACTIVE,
+                tag="ca1",
+                on_position=lambda position: self._update_queue_position(
+                    processing_msg, token_address, position
+                ),
             )
-            analysis_thread.start()
+            if job is None:
+                self.bot.edit_message_text(
+                    "⏳ 当前分析任务过多，请稍后再试",
+                    processing_msg.chat.id,
+                    processing_msg.message_id,
+                )
             
         except Exception as e:
             self.logger.error_with_solution(e, f"ca1命令处理失败 - 用户: {message.from_user.username}")
@@ -154,6 +193,188 @@ class HoldingAnalysisHandler(BaseCommandHandler):
             )
             self.reply_with_topic(message, error_msg)
 
+    def _enqueue_durable_analysis(self, processing_msg, token_address: str, chat_id) -> None:
+        """通过持久化任务队列执行分析（新鲜缓存直接返回）"""
+        top_holders_count = self.config.analysis.top_holders_count
+        cached, age = self.result_cache.peek(token_address, top_holders_count, self.config.analysis.freshness_tier)
+        fresh_ttl = getattr(self.config.analysis, "result_cache_fresh_seconds", 300)
+        if cached is not None and age <= fresh_ttl:
+            self._show_analysis_result(processing_msg, token_address, cached, {"state": "fresh", "age": age})
+            return
+
+        job_id = self.job_queue.enqueue(
+            JOB_HOLDER_ANALYSIS,
+            {
+                "token_address": token_address,
+                "top_holders_count": top_holders_count,
+                "freshness": self.config.analysis.freshness_tier,
+                "delivery": {
+                    "source": "ca1",
+                    "chat_id": processing_msg.chat.id,
+                    "message_id": processing_msg.message_id,
+                },
+            },
+            chat_id=chat_id,
+            priority=PRIORITY_INTERACTIVE,
+            max_attempts=self.job_queue_settings["max_attempts"],
+        )
+        self.logger.info(f"📥 分析任务已入队: job={job_id}, token={token_address}")
+
+        position = self.job_queue.get_position(job_id)
+        if position > 1:
+            self._update_queue_position(processing_msg, token_address, position)
+
+    def _deliver_queued_result(self, job: dict) -> None:
+        """投递持久化队列中完成的分析任务（Bot重启后同样会投递）"""
+        payload = job["payload"]
+        delivery = payload["delivery"]
+        token_address = payload["token_address"]
+        processing_msg = SimpleNamespace(
+            chat=SimpleNamespace(id=delivery["chat_id"]),
+            message_id=delivery["message_id"],
+        )
+
+        result = job.get("result")
+        if job["status"] == STATUS_DONE and result and result.get("token_statistics"):
+            self.result_cache.put(token_address, payload["top_holders_count"], result)
+            self._show_analysis_result(processing_msg, token_address, result)
+            self.logger.info(f"📬 已投递分析结果: job={job['id']}, token={token_address}")
+            return
+
+        self.bot.edit_message_text(
+            f"❌ 分析失败\n"
+            f"代币地址: {token_address}\n\n"
+            f"已尝试 {job['attempts']} 次: {job.get('error') or '未知错误'}\n\n"
+            f"💡 请稍后重试",
+            processing_msg.chat.id,
+            processing_msg.message_id,
+        )
+
+    def _update_queue_position(self, processing_msg, token_address: str, position: int):
+        """更新排队位置提示，position 为 0 表示已开始分析"""
+        if position > 0:
+            status_line = f"⏳ 排队中: 第{position}位"
+        else:
+            status_line = "⏳ 预计需要1-2分钟，请稍候..."
+
+        self.bot.edit_message_text(
+            f"🔍 正在分析代币大户持仓...\n"
+            f"代币地址: `{token_address}`\n"
+            f"{status_line}\n"
+            f"📊 将分析前{get_analyzed_holders_count(self.config.analysis.top_holders_count)}名大户的持仓情况",
+            processing_msg.chat.id,
+            processing_msg.message_id,
+            parse_mode="Markdown",
+        )
+
+    def _show_analysis_result(self, processing_msg, token_address: str, result: dict, cache_info: dict = None):
+        """缓存分析结果并将结果表格更新到消息中"""
+        # 缓存分析结果
+        cache_key = f"{processing_msg.chat.id}_{processing_msg.message_id}"
+        analysis_cache[cache_key] = {
+            "result": result,
+            "token_address": token_address,
+            "timestamp": time.time(),
+        }
+
+        print(f"缓存分析结果: cache_key={cache_key}")
+
+        # 获取目标代币信息
+        target_token_info = None
+        for token in result["token_statistics"]["top_tokens_by_value"]:
+            if token.get("address") == token_address:
+                target_token_info = token
+                break
+        
+        target_symbol = target_token_info.get("symbol", "Unknown") if target_token_info else "Unknown"
+
+        # 格式化表格消息（默认按人数排序）
+        with span("render"):
+            table_msg, table_markup = format_tokens_table(
+                result["token_statistics"],
+                max_tokens=self.config.analysis.ranking_size,
+                sort_by="count",
+                cache_key=cache_key,
+                target_token_symbol=target_symbol,
+            )
+        
+        # 添加分析信息
+        analysis_info = f"\n📊 <b>{target_symbol} 分析统计</b>\n"
+        analysis_info += f"🕒 分析时间: {result.get('analysis_time', '').split('T')[0]}\n"
+        analysis_info += f"👥 分析地址: 前{result.get('total_holders_analyzed', 0)} 个\n"
+        target_holders = result.get("target_token_actual_holders", 0)
+        if target_holders > 0:
+            analysis_info += f"🎯 实际持有 {target_symbol}: {target_holders} 人\n"
+        analysis_info += f"📈 统计范围: 每个地址的前10大持仓\n"
+        missing_wallets = result.get("filtering_stats", {}).get("missing_wallets_count", 0)
+        if missing_wallets:
+            analysis_info += f"⏰ {missing_wallets} 个地址超时未返回，未计入统计\n"
+        freshness = result.get("freshness") or {}
+        if freshness.get("cached_wallets"):
+            oldest_age = time.time() - freshness.get("oldest_data_at", time.time())
+            analysis_info += f"📦 {freshness['cached_wallets']} 个地址使用缓存持仓，最旧数据 {format_cache_age(oldest_age)}前\n"
+        if result.get("revalued"):
+            analysis_info += f"💱 已按最新价格重估 {result['revalued']['tokens']} 个代币\n"
+        if cache_info and cache_info.get("state") == "stale":
+            analysis_info += f"♻️ 缓存结果（{format_cache_age(cache_info['age'])}前），正在后台刷新...\n"
+        elif cache_info and cache_info.get("state") == "fresh":
+            analysis_info += f"⚡ 缓存结果（{format_cache_age(cache_info['age'])}前）\n"
+
+        final_msg = table_msg + analysis_info
+
+        # 创建完整的按钮布局
+        if table_markup:
+            # 添加排序切换按钮
+            table_markup.add(
+                InlineKeyboardButton(
+                    "💰 按价值排序", callback_data=f"ca1_sort_value_{cache_key}"
+                ),
+                InlineKeyboardButton(
+                    "👥 按人数排序 ✅", callback_data=f"ca1_sort_count_{cache_key}"
+                ),
+            )
+            # 添加集群分析和排名分析按钮
+            table_markup.add(
+                InlineKeyboardButton(
+                    "🎯 地址集群分析", callback_data=f"ca1_cluster_{cache_key}"
+                ),
+                InlineKeyboardButton(
+                    "📊 代币排名分析", callback_data=f"ca1_ranking_{cache_key}"
+                )
+            )
+            markup = table_markup
+        else:
+            # 如果没有代币详情按钮，只添加排序、集群和排名按钮
+            markup = InlineKeyboardMarkup(row_width=2)
+            markup.add(
+                InlineKeyboardButton(
+                    "💰 按价值排序", callback_data=f"ca1_sort_value_{cache_key}"
+                ),
+                InlineKeyboardButton(
+                    "👥 按人数排序 ✅", callback_data=f"ca1_sort_count_{cache_key}"
+                ),
+            )
+            markup.add(
+                InlineKeyboardButton(
+                    "🎯 地址集群分析", callback_data=f"ca1_cluster_{cache_key}"
+                ),
+                InlineKeyboardButton(
+                    "📊 代币排名分析", callback_data=f"ca1_ranking_{cache_key}"
+                )
+            )
+
+        # 更新消息
+        with span("send"):
+            self.bot.edit_message_text(
+                final_msg,
+                processing_msg.chat.id,
+                processing_msg.message_id,
+                parse_mode="HTML",
+                reply_markup=markup,
+                disable_web_page_preview=True,
+            )
+
+    @traced("ca1")
     def _run_analysis(self, processing_msg, token_address: str):
         """在后台运行分析"""
         start_time = time.time()
@@ -163,114 +384,32 @@ class HoldingAnalysisHandler(BaseCommandHandler):
             # 清理过期缓存
             cleanup_expired_cache()
 
-            # 创建OKX爬虫实例
-            crawler = OKXCrawlerForBot()
-
-            # 执行分析
-            result = crawler.analyze_token_holders(
-                token_address, top_holders_count=self.config.analysis.top_holders_count
+            # 执行分析（优先使用结果缓存，过期结果会在后台刷新后更新消息）
+            result, cache_info = self.result_cache.get_or_analyze(
+                token_address,
+                self.config.analysis.top_holders_count,
+                on_refresh=lambda new_result: self._show_analysis_result(
+                    processing_msg, token_address, new_result
+                ),
+                freshness=self.config.analysis.freshness_tier,
             )
 
             if result and result.get("token_statistics"):
-                # 缓存分析结果
-                cache_key = f"{processing_msg.chat.id}_{processing_msg.message_id}"
-                analysis_cache[cache_key] = {
-                    "result": result,
-                    "token_address": token_address,
-                    "timestamp": time.time(),
-                }
-
-                print(f"缓存分析结果: cache_key={cache_key}")
-
-                # 获取目标代币信息
-                target_token_info = None
-                for token in result["token_statistics"]["top_tokens_by_value"]:
-                    if token.get("address") == token_address:
-                        target_token_info = token
-                        break
-                
-                target_symbol = target_token_info.get("symbol", "Unknown") if target_token_info else "Unknown"
-
-                # 格式化表格消息（默认按人数排序）
-                table_msg, table_markup = format_tokens_table(
-                    result["token_statistics"],
-                    max_tokens=self.config.analysis.ranking_size,
-                    sort_by="count",
-                    cache_key=cache_key,
-                    target_token_symbol=target_symbol,
-                )
-                
-                # 添加分析信息
-                analysis_info = f"\n📊 <b>{target_symbol} 分析统计</b>\n"
-                analysis_info += f"🕒 分析时间: {result.get('analysis_time', '').split('T')[0]}\n"
-                analysis_info += f"👥 分析地址: 前{result.get('total_holders_analyzed', 0)} 个\n"
-                target_holders = result.get("target_token_actual_holders", 0)
-                if target_holders > 0:
-                    analysis_info += f"🎯 实际持有 {target_symbol}: {target_holders} 人\n"
-                analysis_info += f"📈 统计范围: 每个地址的前10大持仓\n"
-
-                final_msg = table_msg + analysis_info
-
-                # 创建完整的按钮布局
-                if table_markup:
-                    # 添加排序切换按钮
-                    table_markup.add(
-                        InlineKeyboardButton(
-                            "💰 按价值排序", callback_data=f"ca1_sort_value_{cache_key}"
-                        ),
-                        InlineKeyboardButton(
-                            "👥 按人数排序 ✅", callback_data=f"ca1_sort_count_{cache_key}"
-                        ),
-                    )
-                    # 添加集群分析和排名分析按钮
-                    table_markup.add(
-                        InlineKeyboardButton(
-                            "🎯 地址集群分析", callback_data=f"ca1_cluster_{cache_key}"
-                        ),
-                        InlineKeyboardButton(
-                            "📊 代币排名分析", callback_data=f"ca1_ranking_{cache_key}"
-                        )
-                    )
-                    markup = table_markup
-                else:
-                    # 如果没有代币详情按钮，只添加排序、集群和排名按钮
-                    markup = InlineKeyboardMarkup(row_width=2)
-                    markup.add(
-                        InlineKeyboardButton(
-                            "💰 按价值排序", callback_data=f"ca1_sort_value_{cache_key}"
-                        ),
-                        InlineKeyboardButton(
-                            "👥 按人数排序 ✅", callback_data=f"ca1_sort_count_{cache_key}"
-                        ),
-                    )
-                    markup.add(
-                        InlineKeyboardButton(
-                            "🎯 地址集群分析", callback_data=f"ca1_cluster_{cache_key}"
-                        ),
-                        InlineKeyboardButton(
-                            "📊 代币排名分析", callback_data=f"ca1_ranking_{cache_key}"
-                        )
-                    )
+                self._show_analysis_result(processing_msg, token_address, result, cache_info)
 
-                # 更新消息
-                self.bot.edit_message_text(
-                    final_msg,
-                    processing_msg.chat.id,
-                    processing_msg.message_id,
-                    parse_mode="HTML",
-                    reply_markup=markup,
-                    disable_web_page_preview=True,
-                )
-                
-                # 记录成功的性能数据
+                # 记录成功的性能数据（附带本次请求各阶段耗时）
                 analysis_duration = time.time() - start_time
+                timings = current_timings() or {}
                 self.logger.log_performance(
                     f"代币分析-{token_address}", 
                     analysis_duration,
                     {
                         "token_count": len(result.get("token_statistics", {}).get("top_tokens_by_value", [])),
                         "holders_analyzed": result.get('total_holders_analyzed', 0),
-                        "target_holders": result.get("target_token_actual_holders", 0)
+                        "target_holders": result.get("target_token_actual_holders", 0),
+                        "stages": {
+                            name: stage["total_seconds"] for name, stage in timings.get("stages", {}).items()
+                        },
                     }
                 )
                 self.logger.info(f"分析完成: {token_address}, 耗时: {analysis_duration:.2f}s")
@@ -644,13 +783,17 @@ class HoldingAnalysisHandler(BaseCommandHandler):
                 parse_mode="HTML",
             )
 
-            # 在后台线程中运行集群分析
-            cluster_thread = threading.Thread(
-                target=self._run_cluster_analysis,
+            # 提交到调度器的工作线程池运行集群分析（CPU密集，不再为每次点击创建线程）
+            job = self.scheduler.submit(
+                self._run_cluster_analysis,
                 args=(call, cache_key, result, token_address),
-                daemon=True,
+                chat_id=call.message.chat.id,
+                priority=PRIORITY_INTERACTIVE,
+                tag="cluster",
             )
-            cluster_thread.start()
+            if job is None:
+                self._show_scheduler_busy(call, cache_key, "集群分析")
+                return
 
             self.bot.answer_callback_query(call.id, "🎯 开始集群分析...")
 
@@ -658,6 +801,21 @@ class HoldingAnalysisHandler(BaseCommandHandler):
             print(f"集群分析回调错误: cache_key={cache_key}, error={str(e)}")
             self.bot.answer_callback_query(call.id, f"❌ 启动集群分析失败: {str(e)}")
 
+    def _show_scheduler_busy(self, call: CallbackQuery, cache_key: str, action: str) -> None:
+        """调度队列已满时把「正在分析」消息改为稍后再试，并提供返回按钮"""
+        markup = InlineKeyboardMarkup()
+        markup.add(
+            InlineKeyboardButton("⬅️ 返回代币排行", callback_data=f"ca1_sort_count_{cache_key}")
+        )
+        self.bot.edit_message_text(
+            f"⏳ 当前分析任务过多，{action}未能开始\n💡 请稍后点击返回，再重新发起",
+            call.message.chat.id,
+            call.message.message_id,
+            reply_markup=markup,
+        )
+        self.bot.answer_callback_query(call.id, "⏳ 当前分析任务过多，请稍后再试")
+
+    @traced("ca1_cluster")
     def _run_cluster_analysis(
         self, call: CallbackQuery, cache_key: str, result: dict, token_address: str, page: int = 1
     ):
@@ -675,11 +833,12 @@ class HoldingAnalysisHandler(BaseCommandHandler):
 
             # 格式化集群分析结果（支持分页）
             clusters_per_page = self.config.analysis.clusters_per_page
-            cluster_msg, current_page, total_pages = format_cluster_analysis(
-                cluster_result, 
-                page=page, 
-                clusters_per_page=clusters_per_page
-            )
+            with span("render"):
+                cluster_msg, current_page, total_pages = format_cluster_analysis(
+                    cluster_result, 
+                    page=page, 
+                    clusters_per_page=clusters_per_page
+                )
 
             # 创建分页按钮
             markup = InlineKeyboardMarkup(row_width=3)
@@ -887,13 +1046,17 @@ class HoldingAnalysisHandler(BaseCommandHandler):
                 parse_mode="HTML",
             )
 
-            # 在后台线程中运行排名分析
-            ranking_thread = threading.Thread(
-                target=self._run_ranking_analysis,
+            # 提交到调度器的工作线程池运行排名分析
+            job = self.scheduler.submit(
+                self._run_ranking_analysis,
                 args=(call, cache_key, result, token_address),
-                daemon=True,
+                chat_id=call.message.chat.id,
+                priority=PRIORITY_INTERACTIVE,
+                tag="ranking",
             )
-            ranking_thread.start()
+            if job is None:
+                self._show_scheduler_busy(call, cache_key, "排名分析")
+                return
 
             self.bot.answer_callback_query(call.id, "📊 开始排名分析...")
 
@@ -901,6 +1064,7 @@ class HoldingAnalysisHandler(BaseCommandHandler):
             print(f"排名分析回调错误: error={str(e)}")
             self.bot.answer_callback_query(call.id, f"❌ 启动排名分析失败: {str(e)}")
 
+    @traced("ca1_ranking")
     def _run_ranking_analysis(
         self, call: CallbackQuery, cache_key: str, result: dict, token_address: str
     ):
@@ -919,7 +1083,8 @@ class HoldingAnalysisHandler(BaseCommandHandler):
                 }
 
                 # 格式化排名消息
-                ranking_msg = format_target_token_rankings(ranking_result)
+                with span("render"):
+                    ranking_msg = format_target_token_rankings(ranking_result)
 
                 # 创建排名按钮 (1-10名 + >10名)
                 markup = InlineKeyboardMarkup(row_width=5)
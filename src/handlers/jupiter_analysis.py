@@ -11,6 +11,15 @@ from telebot.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from ..core.config import get_config
 from ..services.blacklist import is_blacklisted
 from ..handlers.base import BaseCommandHandler
+from ..services.scheduler import get_scheduler, current_job, PRIORITY_BATCH
+from ..services.result_cache import get_result_cache, format_cache_age
+from ..services.job_queue import (
+    get_job_queue,
+    get_job_dispatcher,
+    get_job_queue_settings,
+    JOB_HOLDER_ANALYSIS,
+    STATUS_DONE,
+)
 
 # 导入Jupiter爬虫
 try:
@@ -29,7 +38,8 @@ try:
         analyze_target_token_rankings,
         format_target_token_rankings,
         analysis_cache,
-        start_cache_cleanup
+        start_cache_cleanup,
+        get_analyzed_holders_count,
     )
 except ImportError:
     print("⚠️ 无法导入OKX分析模块")
@@ -48,6 +58,21 @@ class JupiterAnalysisHandler(BaseCommandHandler):
         
         # 启动全局缓存清理（只启动一次）
         start_cache_cleanup()
+
+        # 分析结果缓存（同一代币重复分析时直接复用）
+        self.result_cache = get_result_cache()
+
+        # 分析任务调度器（批量任务优先级最低，不阻塞交互请求）
+        self.scheduler = get_scheduler()
+
+        # 持久化任务队列：每个代币的分析交给worker进程执行，
+        # Bot重启后编排线程中断时，剩余结果由投递线程单独发送
+        self.job_queue_settings = get_job_queue_settings()
+        if self.job_queue_settings["enabled"]:
+            self.job_queue = get_job_queue()
+            self.job_dispatcher = get_job_dispatcher()
+            self.job_dispatcher.register("cajup", self._deliver_queued_result)
+            self.job_dispatcher.start()
     
     def handle_cajup(self, message: Message) -> None:
         """处理 /cajup 命令"""
@@ -81,7 +106,7 @@ class JupiterAnalysisHandler(BaseCommandHandler):
                 f"📊 <b>热门代币榜单分析进行中...</b>\n\n"
                 f"🔍 当前分析: <b>{current}/{total}</b>\n"
                 f"🕐 开始时间: {status.get('start_time', '未知')}\n"
-                f"⏳ 正在获取前100大户数据...\n\n"
+                f"⏳ 正在获取前{get_analyzed_holders_count(self.config.analysis.top_holders_count)}大户数据...\n\n"
                 f"请等待当前分析完成后再开始新的分析",
                 parse_mode='HTML'
             )
@@ -144,7 +169,8 @@ class JupiterAnalysisHandler(BaseCommandHandler):
                 'current': 0,
                 'total': token_count,
                 'analyzed': [],
-                'failed': []
+                'failed': [],
+                'queued': []
             }
             
             # 获取热门代币列表
@@ -192,32 +218,41 @@ class JupiterAnalysisHandler(BaseCommandHandler):
                         })
                         continue
                     
-                    # 更新进度
+                    # 更新进度（不等待发送结果，排队中的进度更新会合并）
                     self.bot.edit_message_text(
                         f"📊 <b>热门代币榜单分析进行中...</b>\n\n"
                         f"🔍 当前分析: <b>{i}/{actual_count}</b>\n"
                         f"📍 代币地址: <code>{token_address}</code>\n"
-                        f"⏳ 正在获取前100大户数据...",
+                        f"⏳ 正在获取前{get_analyzed_holders_count(self.config.analysis.top_holders_count)}大户数据...",
                         processing_msg.chat.id,
                         processing_msg.message_id,
-                        parse_mode='HTML'
+                        parse_mode='HTML',
+                        wait=False,
                     )
                     
-                    # 执行OKX大户分析
-                    success = self._analyze_single_token(
-                        chat_id, token_address, i, actual_count, thread_id
+                    # 执行OKX大户分析（提交到调度器，以批量优先级排队）
+                    job = self.scheduler.submit(
+                        self._analyze_single_token,
+                        args=(chat_id, token_address, i, actual_count, thread_id),
+                        chat_id=chat_id,
+                        priority=PRIORITY_BATCH,
+                        tag="cajup",
                     )
+                    success = bool(job and job.wait())
                     
                     if success:
                         self.analysis_status[chat_id]['analyzed'].append(token_address)
+                    elif token_address in self.analysis_status[chat_id]['queued']:
+                        # 仍在持久化任务队列中，完成后由结果投递器单独发送
+                        pass
                     else:
                         self.analysis_status[chat_id]['failed'].append({
                             'address': token_address,
                             'reason': '分析失败'
                         })
                     
-                    # 避免API限制
-                    if i < actual_count:
+                    # 避免API限制（命中结果缓存时没有请求上游，无需等待）
+                    if i < actual_count and not self.analysis_status[chat_id].get('last_from_cache'):
                         time.sleep(12)  # 每个代币间隔12秒
                 
                 except Exception as e:
@@ -351,15 +386,93 @@ class JupiterAnalysisHandler(BaseCommandHandler):
                             current: int, total: int, thread_id=None) -> bool:
         """分析单个代币"""
         try:
-            # 创建OKX爬虫
-            crawler = OKXCrawlerForBot()
-            
-            # 执行分析
-            result = crawler.analyze_token_holders(
-                token_address, 
-                top_holders_count=self.config.analysis.top_holders_count
+            analyze_fn = (
+                (lambda: self._analyze_via_job_queue(chat_id, token_address, current, total, thread_id))
+                if self.job_queue_settings["enabled"] else None
+            )
+
+            # 执行分析（优先使用结果缓存）
+            result, cache_info = self.result_cache.get_or_analyze(
+                token_address,
+                self.config.analysis.top_holders_count,
+                analyze_fn=analyze_fn,
+                freshness=self.config.jupiter.freshness_tier,
             )
+            self.analysis_status[chat_id]['last_from_cache'] = cache_info['state'] != 'miss'
+            return self._send_token_result(chat_id, token_address, result, cache_info, current, total, thread_id)
             
+        except Exception as e:
+            print(f"❌ 单个代币分析失败 {token_address}: {e}")
+            return False
+
+    def _analyze_via_job_queue(self, chat_id: str, token_address: str,
+                               current: int, total: int, thread_id=None) -> dict:
+        """
+        通过持久化任务队列分析单个代币，并等待worker完成
+
+        等待不超过所在调度任务的剩余时间，调度任务被取消或超时时停止等待；
+        停止等待后任务仍留在队列中，完成后由结果投递器通过 _deliver_queued_result 发送，
+        此时返回 None 并把代币记入 queued，不计为失败
+        """
+        top_holders_count = self.config.analysis.top_holders_count
+        job_id = self.job_queue.enqueue(
+            JOB_HOLDER_ANALYSIS,
+            {
+                "token_address": token_address,
+                "top_holders_count": top_holders_count,
+                "freshness": self.config.jupiter.freshness_tier,
+                "delivery": {
+                    "source": "cajup",
+                    "chat_id": chat_id,
+                    "thread_id": thread_id,
+                    "current": current,
+                    "total": total,
+                },
+            },
+            chat_id=chat_id,
+            priority=PRIORITY_BATCH,
+            max_attempts=self.job_queue_settings["max_attempts"],
+        )
+
+        # 最长等待：每次尝试一个租约时长，且不超过调度任务的截止时间
+        timeout = self.job_queue_settings["lease_seconds"] * self.job_queue_settings["max_attempts"]
+        scheduled_job = current_job()
+        should_stop = None
+        if scheduled_job is not None:
+            timeout = scheduled_job.remaining(timeout)
+            should_stop = scheduled_job.should_stop
+        job = self.job_dispatcher.wait_for_job(job_id, timeout=timeout, should_stop=should_stop)
+        if job is None:
+            print(f"⏳ 分析任务仍在队列中，完成后单独发送结果 job={job_id} token={token_address}")
+            status = self.analysis_status.get(chat_id)
+            if status is not None:
+                status.setdefault('queued', []).append(token_address)
+            return None
+        if job["status"] != STATUS_DONE:
+            raise RuntimeError(job.get("error") or f"分析任务失败 job={job_id}")
+        return job["result"]
+
+    def _deliver_queued_result(self, job: dict) -> None:
+        """投递编排线程已中断（如Bot重启）的批量分析结果"""
+        if job["status"] != STATUS_DONE:
+            return
+        payload = job["payload"]
+        delivery = payload["delivery"]
+        self.result_cache.put(payload["token_address"], payload["top_holders_count"], job["result"])
+        self._send_token_result(
+            delivery["chat_id"],
+            payload["token_address"],
+            job["result"],
+            {"state": "miss", "age": 0},
+            delivery["current"],
+            delivery["total"],
+            delivery.get("thread_id"),
+        )
+
+    def _send_token_result(self, chat_id: str, token_address: str, result: dict, cache_info: dict,
+                           current: int, total: int, thread_id=None) -> bool:
+        """发送单个代币的分析结果"""
+        try:
             if result and result.get("token_statistics"):
                 # 创建cache_key用于生成分析按钮 - 使用短格式避免Telegram按钮数据长度限制
                 # 使用代币地址前8位+后6位+时间戳后6位保证唯一性
@@ -398,8 +511,11 @@ class JupiterAnalysisHandler(BaseCommandHandler):
                         f"🔥 <b>Jupiter热门代币分析</b> ({current}/{total})\n"
                         f"📊 数据源: Jupiter DEX\n"
                         f"📍 代币地址: <code>{token_address}</code>\n"
-                        f"🕐 分析时间: {time.strftime('%H:%M:%S')}\n\n"
+                        f"🕐 分析时间: {time.strftime('%H:%M:%S')}\n"
                     )
+                    if cache_info['state'] != 'miss':
+                        jupiter_info += f"♻️ 缓存结果（{format_cache_age(cache_info['age'])}前）\n"
+                    jupiter_info += "\n"
                     
                     # 添加分析统计信息（与ca1一致）
                     analysis_info = f"\n📊 <b>{target_symbol} 分析统计</b>\n"
@@ -409,6 +525,15 @@ class JupiterAnalysisHandler(BaseCommandHandler):
                     if target_holders > 0:
                         analysis_info += f"🎯 实际持有 {target_symbol}: {target_holders} 人\n"
                     analysis_info += f"📈 统计范围: 每个地址的前10大持仓\n"
+                    missing_wallets = result.get("filtering_stats", {}).get("missing_wallets_count", 0)
+                    if missing_wallets:
+                        analysis_info += f"⏰ {missing_wallets} 个地址超时未返回，未计入统计\n"
+                    freshness = result.get("freshness") or {}
+                    if freshness.get("cached_wallets"):
+                        oldest_age = time.time() - freshness.get("oldest_data_at", time.time())
+                        analysis_info += f"📦 {freshness['cached_wallets']} 个地址使用缓存持仓，最旧数据 {format_cache_age(oldest_age)}前\n"
+                    if result.get("revalued"):
+                        analysis_info += f"💱 已按最新价格重估 {result['revalued']['tokens']} 个代币\n"
                     
                     final_msg = jupiter_info + table_msg + analysis_info
                     
@@ -462,7 +587,7 @@ class JupiterAnalysisHandler(BaseCommandHandler):
             return False
             
         except Exception as e:
-            print(f"❌ 单个代币分析失败 {token_address}: {e}")
+            print(f"❌ 发送代币分析结果失败 {token_address}: {e}")
             return False
 
     def _generate_worthy_tokens_message(self, chat_id: str, thread_id=None, page=1, page_size=10):
@@ -650,6 +775,7 @@ class JupiterAnalysisHandler(BaseCommandHandler):
             status = self.analysis_status.get(chat_id, {})
             analyzed = status.get('analyzed', [])
             failed = status.get('failed', [])
+            queued = status.get('queued', [])
             total = status.get('total', 0)
             start_time = status.get('start_time', '未知')
             end_time = time.strftime('%H:%M:%S')
@@ -660,7 +786,6 @@ class JupiterAnalysisHandler(BaseCommandHandler):
             # 先发送"值得关注的代币"消息
             if len(analyzed) > 0:  # 只有成功分析了代币才发送
                 self._generate_worthy_tokens_message(chat_id, thread_id)
-                time.sleep(1)  # 稍微延迟一下再发送总结
             
             summary_msg = (
                 f"✅ <b>Jupiter代币分析完成</b>\n\n"
@@ -668,7 +793,8 @@ class JupiterAnalysisHandler(BaseCommandHandler):
                 f"• 计划分析: {total} 个代币\n"
                 f"• 成功分析: {len(analyzed)} 个代币\n"
                 f"• 分析失败: {len(failed)} 个代币\n"
-                f"• 成功率: {len(analyzed)/total*100:.1f}%\n\n"
+                + (f"• 仍在队列中: {len(queued)} 个代币（完成后单独发送）\n" if queued else "")
+                + f"• 成功率: {len(analyzed)/total*100:.1f}%\n\n"
                 f"⏰ 时间统计:\n"
                 f"• 开始时间: {start_time}\n"
                 f"• 结束时间: {end_time}\n\n"
@@ -5,7 +5,6 @@ Jupiter热门代币监控处理器
 
 import threading
 import time
-import json
 import os
 from collections import defaultdict
 from typing import Dict, Set, List, Optional
@@ -19,6 +18,7 @@ from ..services.formatter import MessageFormatter
 from ..handlers.base import BaseCommandHandler
 from ..utils.data_manager import DataManager
 from ..utils.logger import get_logger
+from ..utils import json_codec
 
 
 class JupiterMonitorHandler(BaseCommandHandler):
@@ -102,8 +102,8 @@ class JupiterMonitorHandler(BaseCommandHandler):
         """加载监控状态"""
         try:
             if os.path.exists(self.status_file):
-                with open(self.status_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(self.status_file, 'rb') as f:
+                    data = json_codec.loads(f.read())
                     self.monitor_status = data.get('monitor_status', {})
                     # 重置之前的代币列表（重启后重新开始）
                     self.previous_tokens = {chat_id: set() for chat_id in self.monitor_status.keys()}
@@ -130,8 +130,7 @@ class JupiterMonitorHandler(BaseCommandHandler):
                 'last_updated': time.time()
             }
             
-            with open(self.status_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            json_codec.dump(data, self.status_file)
         except Exception as e:
             self.logger.error(f"❌ 保存Jupiter监控状态失败: {e}")
 
@@ -349,6 +348,13 @@ class JupiterMonitorHandler(BaseCommandHandler):
                     # 处理代币变化
                     self._process_token_changes(chat_id, current_tokens)
                     error_count = 0  # 重置错误计数
+                elif self.jupiter_crawler.upstream.is_open():
+                    # 上游熔断中：等待熔断器探测，不计入连续错误，避免上游短暂故障导致监控被停止
+                    retry_in = self.jupiter_crawler.upstream.breaker.retry_in()
+                    self.logger.warning(f"🔌 群组 {chat_id} Jupiter上游熔断中，{retry_in:.0f}秒后重试")
+                    if stop_flag.wait(timeout=max(30, retry_in)):
+                        break
+                    continue
                 else:
                     error_count += 1
                     self.logger.warning(f"⚠️ 群组 {chat_id} 获取代币数据失败，错误次数: {error_count}")
@@ -0,0 +1,299 @@
+"""
+分析结果存档
+storage 目录每次重启都会清空，且按文件名保存的分析结果无法按代币快速查找。存档把每次分析结果
+压缩后保存在 SQLite（config 目录下），按 代币地址 + 分析时间 建索引：
+- latest() 毫秒级取回某代币最近一次分析（结果缓存重启后可直接从存档恢复）
+- diff() 比较同一代币的两次分析（新增/消失的代币、持有人数和价值变化）
+- 按保存时长和总大小淘汰最旧的记录
+写入经产物写入队列在后台完成，不占用分析线程
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .artifact_store import (
+    get_artifact_store,
+    resolve_compression,
+    compress_bytes,
+    decompress_bytes,
+    encode_json,
+)
+from ..utils import json_codec
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("analysis_archive")
+
+
+# 存档数据库放在项目 config 目录下（storage 目录每次重启都会被清空）
+DEFAULT_ARCHIVE_PATH = "config/analysis_archive.db"
+# 每写入多少条记录执行一次淘汰
+PRUNE_EVERY = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    token_address TEXT NOT NULL,
+    top_holders_count INTEGER NOT NULL,
+    analyzed_at REAL NOT NULL,
+    codec TEXT NOT NULL,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_token ON analyses (token_address, analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_time ON analyses (analyzed_at);
+"""
+
+
+def _get_settings() -> Dict:
+    """读取存档配置"""
+    return read_settings("analysis", {
+        "enabled": ("archive_enabled", True),
+        "path": ("archive_path", DEFAULT_ARCHIVE_PATH),
+        "max_age_days": ("archive_max_age_days", 30),
+        "max_mb": ("archive_max_mb", 500),
+        "compression": ("artifact_compression", "gzip"),
+        "compression_level": ("artifact_compression_level", 6),
+    })
+
+
+def _summarize(result: Dict) -> Dict:
+    """存档索引中保存的摘要（列出历史时不需要解压完整结果）"""
+    statistics = result.get("token_statistics") or {}
+    return {
+        "total_holders_analyzed": result.get("total_holders_analyzed", 0),
+        "target_token_actual_holders": result.get("target_token_actual_holders", 0),
+        "total_unique_tokens": statistics.get("total_unique_tokens", 0),
+        "total_portfolio_value": statistics.get("total_portfolio_value", 0),
+    }
+
+
+def diff_analyses(old: Dict, new: Dict) -> Dict:
+    """
+    比较同一代币的两次分析
+
+    Returns:
+        {
+            "added": 新出现的代币, "removed": 不再出现的代币,
+            "changed": [{"address", "symbol", "holder_count_change", "total_value_change", ...}]（按价值变化绝对值排序）,
+            "summary": 汇总指标的变化,
+        }
+    """
+    old_tokens = {t.get("address"): t for t in (old.get("token_statistics") or {}).get("top_tokens_by_value", [])}
+    new_tokens = {t.get("address"): t for t in (new.get("token_statistics") or {}).get("top_tokens_by_value", [])}
+
+    def brief(token: Dict) -> Dict:
+        return {
+            "address": token.get("address"),
+            "symbol": token.get("symbol"),
+            "holder_count": token.get("holder_count", 0),
+            "total_value": token.get("total_value", 0),
+        }
+
+    changed = []
+    for address in old_tokens.keys() & new_tokens.keys():
+        before, after = old_tokens[address], new_tokens[address]
+        holder_change = after.get("holder_count", 0) - before.get("holder_count", 0)
+        value_change = after.get("total_value", 0) - before.get("total_value", 0)
+        if holder_change or value_change:
+            changed.append(dict(
+                brief(after),
+                holder_count_change=holder_change,
+                total_value_change=value_change,
+            ))
+    changed.sort(key=lambda item: abs(item["total_value_change"]), reverse=True)
+
+    old_summary, new_summary = _summarize(old), _summarize(new)
+    return {
+        "added": [brief(new_tokens[address]) for address in new_tokens.keys() - old_tokens.keys()],
+        "removed": [brief(old_tokens[address]) for address in old_tokens.keys() - new_tokens.keys()],
+        "changed": changed,
+        "summary": {key: new_summary[key] - old_summary[key] for key in new_summary},
+    }
+
+
+class AnalysisArchive:
+    """分析结果存档（SQLite 索引 + 压缩的结果数据）"""
+
+    def __init__(self, db_path: str = None):
+        settings = _get_settings()
+        self.db_path = db_path or settings["path"]
+        self.compression = resolve_compression(settings["compression"])
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._connect()
+        # 新建数据库时启用增量回收，淘汰记录后可归还磁盘空间（对已有数据库无效）
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def put(self, result: Dict, analyzed_at: float = None) -> Optional[int]:
+        """同步写入一条分析结果，返回记录ID（分析线程中应使用 submit）"""
+        token_address = result.get("token_address")
+        if not token_address or not result.get("token_statistics"):
+            return None
+        settings = _get_settings()
+        raw = encode_json(result)
+        data = compress_bytes(raw, self.compression, settings["compression_level"])
+        analyzed_at = analyzed_at or time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO analyses (token_address, top_holders_count, analyzed_at, codec, raw_size, stored_size, summary, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (token_address, result.get("top_holders_count", 0), analyzed_at, self.compression,
+             len(raw), len(data), json_codec.dumps(_summarize(result)), sqlite3.Binary(data)),
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 1:
+            self.prune()
+        return cursor.lastrowid
+
+    def submit(self, result: Dict) -> bool:
+        """提交到后台写入队列"""
+        if not _get_settings()["enabled"]:
+            return False
+        # 分析时间在提交时确定，排队不影响缓存时长的计算
+        return get_artifact_store().submit_call(self.put, result, time.time())
+
+    def _decode(self, row: sqlite3.Row) -> Dict:
+        return json_codec.loads(decompress_bytes(bytes(row["data"]), row["codec"]))
+
+    def get(self, record_id: int) -> Optional[Dict]:
+        """按记录ID读取完整分析结果"""
+        row = self._connect().execute("SELECT codec, data FROM analyses WHERE id = ?", (record_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def latest(self, token_address: str, top_holders_count: int = None,
+               max_age: float = None) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        读取某代币最近一次分析
+
+        Args:
+            token_address: 代币地址
+            top_holders_count: 只匹配该大户数量的分析（None 不限）
+            max_age: 只接受该秒数以内的分析
+
+        Returns:
+            (分析结果, 分析时间戳)，没有符合条件的记录时返回 (None, None)
+        """
+        query = "SELECT codec, data, analyzed_at FROM analyses WHERE token_address = ?"
+        params: list = [token_address]
+        if top_holders_count is not None:
+            query += " AND top_holders_count = ?"
+            params.append(top_holders_count)
+        if max_age is not None:
+            query += " AND analyzed_at >= ?"
+            params.append(time.time() - max_age)
+        row = self._connect().execute(query + " ORDER BY analyzed_at DESC LIMIT 1", params).fetchone()
+        if not row:
+            return None, None
+        return self._decode(row), row["analyzed_at"]
+
+    def history(self, token_address: str, limit: int = 20) -> List[Dict]:
+        """某代币的历史分析列表（只含摘要，最新的在前）"""
+        rows = self._connect().execute(
+            "SELECT id, top_holders_count, analyzed_at, stored_size, summary FROM analyses "
+            "WHERE token_address = ? ORDER BY analyzed_at DESC LIMIT ?",
+            (token_address, limit),
+        ).fetchall()
+        return [dict(row, summary=json_codec.loads(row["summary"])) for row in rows]
+
+    def diff(self, token_address: str, old_id: int = None, new_id: int = None) -> Optional[Dict]:
+        """
+        比较同一代币的两次分析，默认比较最近两次
+
+        Returns:
+            diff_analyses 的结果附加 old_id / new_id / 两次分析时间，记录不足两条时返回 None
+        """
+        if old_id is None or new_id is None:
+            records = self.history(token_address, limit=2)
+            if len(records) < 2:
+                return None
+            new_id, old_id = records[0]["id"], records[1]["id"]
+        rows = {
+            row["id"]: row for row in self._connect().execute(
+                "SELECT id, token_address, analyzed_at, codec, data FROM analyses WHERE id IN (?, ?)",
+                (old_id, new_id),
+            ).fetchall()
+        }
+        if old_id not in rows or new_id not in rows:
+            return None
+        if rows[old_id]["token_address"] != rows[new_id]["token_address"]:
+            raise ValueError("只能比较同一代币的两次分析")
+        changes = diff_analyses(self._decode(rows[old_id]), self._decode(rows[new_id]))
+        changes.update({
+            "old_id": old_id,
+            "new_id": new_id,
+            "old_analyzed_at": rows[old_id]["analyzed_at"],
+            "new_analyzed_at": rows[new_id]["analyzed_at"],
+        })
+        return changes
+
+    def prune(self) -> int:
+        """按保存时长和总大小淘汰最旧的记录，返回删除的条数"""
+        settings = _get_settings()
+        conn = self._connect()
+        deleted = conn.execute(
+            "DELETE FROM analyses WHERE analyzed_at < ?",
+            (time.time() - settings["max_age_days"] * 86400,),
+        ).rowcount
+
+        max_bytes = settings["max_mb"] * 1024 * 1024
+        total = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM analyses").fetchone()[0]
+        if total > max_bytes:
+            # 从最旧的记录开始累计，删除超出部分
+            cutoff_id = None
+            excess = total - max_bytes
+            for row in conn.execute("SELECT id, stored_size FROM analyses ORDER BY analyzed_at, id"):
+                excess -= row["stored_size"]
+                cutoff_id = row["id"]
+                if excess <= 0:
+                    break
+            cutoff_at = conn.execute("SELECT analyzed_at FROM analyses WHERE id = ?", (cutoff_id,)).fetchone()[0]
+            deleted += conn.execute(
+                "DELETE FROM analyses WHERE analyzed_at < ? OR (analyzed_at = ? AND id <= ?)",
+                (cutoff_at, cutoff_at, cutoff_id),
+            ).rowcount
+        if deleted:
+            conn.execute("PRAGMA incremental_vacuum")
+            logger.info(f"🗄️ 分析存档淘汰 {deleted} 条记录")
+        return deleted
+
+    def get_stats(self) -> Dict:
+        """获取存档统计"""
+        row = self._connect().execute(
+            "SELECT COUNT(*) AS records, COUNT(DISTINCT token_address) AS tokens, "
+            "COALESCE(SUM(raw_size), 0) AS raw_bytes, COALESCE(SUM(stored_size), 0) AS stored_bytes FROM analyses"
+        ).fetchone()
+        return dict(row)
+
+
+# 全局存档实例
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_analysis_archive() -> AnalysisArchive:
+    """获取分析存档实例（首次使用时创建数据库）"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = AnalysisArchive()
+    return _archive
@@ -0,0 +1,254 @@
+"""
+分析产物后台持久化
+原始持有者数据、分析结果、Jupiter 抓取结果等存档文件不再在请求路径上同步写盘：
+- 调用方只把 (路径, 数据) 或写入任务放入有界队列，由写入线程批量序列化、压缩（gzip / zstd）后写入
+- 序列化使用紧凑 JSON（不缩进），配合压缩显著减少存储占用
+- 队列写满时丢弃新提交的产物并计数（存档用于排查，不应拖慢分析），队列深度、丢弃数、
+  排队时间和写入耗时通过 /status 和 /metrics 暴露
+"""
+
+import atexit
+import gzip
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from ..utils import json_codec
+from ..utils.metrics import get_metrics_registry
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("artifact_store")
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_NONE = "none"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_SUFFIXES = {COMPRESSION_NONE: "", COMPRESSION_GZIP: ".gz", COMPRESSION_ZSTD: ".zst"}
+
+# 队列为空时写入线程的等待间隔（秒）
+IDLE_WAIT = 1.0
+
+ARTIFACT_QUEUE_SECONDS = get_metrics_registry().histogram(
+    "colana_bot_artifact_queue_seconds", "Time artifacts wait in the persistence queue",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30))
+ARTIFACT_WRITE_SECONDS = get_metrics_registry().histogram(
+    "colana_bot_artifact_write_seconds", "Serialize, compress and write time per artifact",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+ARTIFACT_SUBMISSIONS = get_metrics_registry().counter(
+    "colana_bot_artifact_submissions_total", "Artifacts submitted for persistence by result", ["result"])
+ARTIFACT_QUEUED = get_metrics_registry().gauge(
+    "colana_bot_artifact_queue_depth", "Artifacts waiting to be written")
+
+
+def _get_settings() -> Dict:
+    """读取产物持久化配置"""
+    return read_settings("analysis", {
+        "enabled": ("artifact_write_behind", True),
+        "compression": ("artifact_compression", COMPRESSION_GZIP),
+        "compression_level": ("artifact_compression_level", 6),
+        "queue_max": ("artifact_queue_max", 200),
+        "batch_size": ("artifact_batch_size", 20),
+    })
+
+
+def resolve_compression(compression: str) -> str:
+    """校验压缩方式，zstd 不可用或未知时改用 gzip"""
+    if compression == COMPRESSION_ZSTD and zstandard is None:
+        logger.warning("⚠️ 未安装 zstandard，改用 gzip 压缩")
+        return COMPRESSION_GZIP
+    if compression not in COMPRESSION_SUFFIXES:
+        logger.warning(f"⚠️ 未知的压缩方式: {compression}，改用 gzip")
+        return COMPRESSION_GZIP
+    return compression
+
+
+def compress_bytes(data: bytes, compression: str, level: int = 6) -> bytes:
+    if compression == COMPRESSION_GZIP:
+        return gzip.compress(data, compresslevel=level)
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return data
+
+
+def decompress_bytes(data: bytes, compression: str) -> bytes:
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("读取 zstd 压缩数据需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def encode_json(payload: Any) -> bytes:
+    """紧凑 JSON 编码"""
+    return json_codec.dumps_bytes(payload)
+
+
+class ArtifactStore:
+    """产物写入队列：调用方只入队，写入线程负责序列化、压缩和写盘"""
+
+    def __init__(self):
+        settings = _get_settings()
+        self.compression = resolve_compression(settings["compression"])
+        self.compression_level = settings["compression_level"]
+        self.batch_size = max(1, settings["batch_size"])
+        self._queue = queue.Queue(maxsize=max(1, settings["queue_max"]))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {
+            "submitted": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0,
+            "raw_bytes": 0, "stored_bytes": 0, "max_queue_depth": 0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ArtifactWriter", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def submit_json(self, path, payload: Any) -> Optional[str]:
+        """
+        提交一个 JSON 产物（提交后调用方不应再修改 payload）
+
+        Args:
+            path: 目标路径（不含压缩后缀）
+            payload: 可 JSON 序列化的数据
+
+        Returns:
+            最终写入的文件路径（含压缩后缀）；队列已满被丢弃时返回 None
+        """
+        final_path = str(path) + COMPRESSION_SUFFIXES[self.compression]
+        return final_path if self.submit_call(self._write, final_path, payload) else None
+
+    def submit_call(self, func: Callable, *args) -> bool:
+        """
+        提交一个后台写入任务（如写入分析存档），与文件产物共用队列和写入线程
+
+        Returns:
+            是否已入队（队列已满时丢弃并返回 False）；关闭后台写入时在调用线程中直接执行
+        """
+        if not _get_settings()["enabled"]:
+            func(*args)
+            return True
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((func, args, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            ARTIFACT_SUBMISSIONS.labels("dropped").inc()
+            logger.debug(f"产物队列已满，丢弃: {getattr(func, '__name__', func)}{args[:1]}")
+            return False
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+        ARTIFACT_SUBMISSIONS.labels("queued").inc()
+        return True
+
+    def submit_bytes(self, path, data: bytes) -> Optional[str]:
+        """提交已序列化的原始内容（如上游响应体原文），只压缩写入不再重新序列化"""
+        final_path = str(path) + COMPRESSION_SUFFIXES[self.compression]
+        return final_path if self.submit_call(self._write_bytes, final_path, data) else None
+
+    def _write(self, final_path: str, payload: Any) -> None:
+        try:
+            raw = encode_json(payload)
+        except Exception as e:
+            self._record_failure(final_path, e)
+            return
+        self._write_bytes(final_path, raw)
+
+    def _write_bytes(self, final_path: str, raw: bytes) -> None:
+        started = time.perf_counter()
+        try:
+            data = compress_bytes(raw, self.compression, self.compression_level)
+            os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
+            with open(final_path, "wb") as f:
+                f.write(data)
+        except Exception as e:
+            self._record_failure(final_path, e)
+            return
+        ARTIFACT_WRITE_SECONDS.labels().observe(time.perf_counter() - started)
+        with self._lock:
+            self._stats["written"] += 1
+            self._stats["raw_bytes"] += len(raw)
+            self._stats["stored_bytes"] += len(data)
+
+    def _record_failure(self, final_path: str, error: Exception) -> None:
+        with self._lock:
+            self._stats["failed"] += 1
+        ARTIFACT_SUBMISSIONS.labels("failed").inc()
+        logger.warning(f"⚠️ 写入产物失败 {final_path}: {error}")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=IDLE_WAIT)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for func, args, submitted_at in batch:
+                ARTIFACT_QUEUE_SECONDS.labels().observe(time.perf_counter() - submitted_at)
+                try:
+                    func(*args)
+                except Exception as e:
+                    with self._lock:
+                        self._stats["failed"] += 1
+                    ARTIFACT_SUBMISSIONS.labels("failed").inc()
+                    logger.warning(f"⚠️ 后台写入任务失败: {e}")
+                finally:
+                    self._queue.task_done()
+            with self._lock:
+                self._stats["batches"] += 1
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待队列中的产物写完（退出时调用），超时返回 False"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def get_stats(self) -> Dict:
+        """获取产物持久化统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["compression"] = self.compression
+        if stats["raw_bytes"]:
+            stats["compression_ratio"] = round(stats["stored_bytes"] / stats["raw_bytes"], 3)
+        return stats
+
+
+# 全局产物存储实例
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """获取产物存储实例"""
+    global _artifact_store
+    if _artifact_store is None:
+        with _artifact_store_lock:
+            if _artifact_store is None:
+                _artifact_store = ArtifactStore()
+                ARTIFACT_QUEUED.set_function(_artifact_store._queue.qsize)
+    return _artifact_store
@@ -0,0 +1,195 @@
+"""
+asyncio Telegram 前端
+用 AsyncTeleBot 在事件循环中接收更新（长轮询或本地端口 webhook），不再为轮询和每个处理器常驻线程：
+- 更新在事件循环中解析和分发，处理器在有界线程池中执行（现有处理器和业务逻辑保持同步代码）
+- 分析等耗时任务仍由调度器线程池执行，消息发送经出站队列
+- webhook 模式监听本地端口，由反向代理或隧道把 Telegram 的 HTTPS 请求转发进来
+- 处理中的更新数有上限（async_max_pending_updates）：长轮询达到上限时暂停拉取，
+  webhook 达到上限时返回 503 由 Telegram 稍后重发
+"""
+
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("async_frontend")
+
+
+FRONTEND_THREADED = "threaded"
+FRONTEND_ASYNC = "async"
+
+# 长轮询的服务端等待时间（秒）
+POLL_TIMEOUT = 30
+# 轮询出错后的重试间隔（秒）
+POLL_RETRY_DELAY = 5
+
+
+def _get_settings() -> Dict:
+    """读取前端配置"""
+    return read_settings("bot", {
+        "mode": ("frontend_mode", FRONTEND_THREADED),
+        "handler_workers": ("async_handler_workers", 8),
+        "max_pending": ("async_max_pending_updates", 100),
+        "webhook_enabled": ("webhook_enabled", False),
+        "webhook_host": ("webhook_listen_host", "127.0.0.1"),
+        "webhook_port": ("webhook_listen_port", 8443),
+        "webhook_path": ("webhook_path", "/telegram"),
+        "webhook_public_url": ("webhook_public_url", ""),
+        "webhook_secret_token": ("webhook_secret_token", ""),
+    })
+
+
+def is_async_mode() -> bool:
+    """是否使用 asyncio 前端"""
+    return _get_settings()["mode"] == FRONTEND_ASYNC
+
+
+class AsyncBotFrontend:
+    """asyncio 前端：接收更新并分发到同步处理器"""
+
+    def __init__(self, sync_bot, token: str, on_heartbeat=None):
+        """
+        Args:
+            sync_bot: 注册了处理器的 TeleBot（应以 threaded=False 创建，处理器在本前端的线程池中执行）
+            token: Bot Token
+            on_heartbeat: 每轮接收更新后调用（健康检查心跳）
+        """
+        from telebot.async_telebot import AsyncTeleBot
+
+        self.settings = _get_settings()
+        self.sync_bot = sync_bot
+        self.async_bot = AsyncTeleBot(token)
+        self.on_heartbeat = on_heartbeat
+        self._executor = ThreadPoolExecutor(max_workers=self.settings["handler_workers"],
+                                            thread_name_prefix="BotHandler")
+        self._tasks = set()
+        self._stats = {"updates": 0, "handler_errors": 0, "in_flight": 0, "max_in_flight": 0, "shed": 0}
+
+    def _capacity(self) -> int:
+        """还能接收的更新数（每条更新占用一个任务和一个线程池排队位置）"""
+        return max(0, self.settings["max_pending"] - len(self._tasks))
+
+    def _dispatch(self, update) -> bool:
+        """
+        在事件循环中为一条更新创建处理任务，不等待处理完成
+
+        Returns:
+            False 表示处理中的更新已达上限，本条更新被丢弃
+        """
+        if not self._capacity():
+            self._stats["shed"] += 1
+            logger.warning(f"⚠️ 处理中的更新已达上限 ({self.settings['max_pending']})，丢弃 update_id={update.update_id}")
+            return False
+        task = asyncio.get_running_loop().create_task(self._handle(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _wait_for_capacity(self) -> int:
+        """等待处理中的更新降到上限以下，返回可接收的数量"""
+        while not self._capacity():
+            await asyncio.wait(set(self._tasks), return_when=asyncio.FIRST_COMPLETED)
+        return self._capacity()
+
+    async def _handle(self, update) -> None:
+        """在线程池中执行同步处理器"""
+        self._stats["updates"] += 1
+        self._stats["in_flight"] += 1
+        self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.sync_bot.process_new_updates, [update]
+            )
+        except Exception as e:
+            self._stats["handler_errors"] += 1
+            logger.error(f"❌ 处理更新失败 (update_id={update.update_id}): {e}")
+        finally:
+            self._stats["in_flight"] -= 1
+
+    async def _poll_loop(self) -> None:
+        """长轮询接收更新"""
+        await self.async_bot.delete_webhook()
+        offset = None
+        logger.info("👂 asyncio 前端开始长轮询...")
+        while True:
+            # 处理中的更新达到上限时暂停拉取，每次最多拉取剩余容量条（Telegram 单次上限100条）
+            limit = min(await self._wait_for_capacity(), 100)
+            try:
+                updates = await self.async_bot.get_updates(offset=offset, limit=limit, timeout=POLL_TIMEOUT,
+                                                          request_timeout=POLL_TIMEOUT + 10)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ 获取更新失败: {e}，{POLL_RETRY_DELAY}秒后重试")
+                await asyncio.sleep(POLL_RETRY_DELAY)
+                continue
+            if self.on_heartbeat:
+                self.on_heartbeat()
+            for update in updates:
+                offset = update.update_id + 1
+                self._dispatch(update)
+
+    async def _run_webhook(self) -> None:
+        """在本地端口监听 webhook，并向 Telegram 注册公网地址"""
+        from aiohttp import web
+        from telebot.types import Update
+
+        settings = self.settings
+        # 只有由本进程注册 webhook 时才能随机生成密钥；自行注册时只校验配置的密钥
+        secret_token = settings["webhook_secret_token"]
+        if not secret_token and settings["webhook_public_url"]:
+            secret_token = secrets.token_urlsafe(32)
+
+        async def receive(request: "web.Request") -> "web.Response":
+            if secret_token and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != secret_token:
+                return web.Response(status=403)
+            update = Update.de_json(await request.text())
+            if update is not None and not self._dispatch(update):
+                # 返回非2xx时 Telegram 会稍后重发该更新
+                return web.Response(status=503)
+            if self.on_heartbeat:
+                self.on_heartbeat()
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(settings["webhook_path"], receive)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, settings["webhook_host"], settings["webhook_port"])
+        await site.start()
+        logger.info(f"🪝 webhook 监听 http://{settings['webhook_host']}:{settings['webhook_port']}{settings['webhook_path']}")
+
+        try:
+            if settings["webhook_public_url"]:
+                await self.async_bot.set_webhook(url=settings["webhook_public_url"], secret_token=secret_token)
+                logger.info(f"✅ 已注册 webhook: {settings['webhook_public_url']}")
+            else:
+                logger.warning("⚠️ 未配置 webhook_public_url，需自行向 Telegram 注册 webhook，并使用配置的 webhook_secret_token")
+                if not secret_token:
+                    logger.warning("⚠️ 未配置 webhook_secret_token，webhook 请求不做来源校验，请只在本机或可信网络监听")
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def _main(self) -> None:
+        try:
+            if self.settings["webhook_enabled"]:
+                await self._run_webhook()
+            else:
+                await self._poll_loop()
+        finally:
+            await self.async_bot.close_session()
+
+    def run(self) -> None:
+        """运行事件循环（阻塞）"""
+        try:
+            asyncio.run(self._main())
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict:
+        """获取前端统计"""
+        return dict(self._stats)
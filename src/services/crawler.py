@@ -5,7 +5,6 @@
 
 import requests
 import csv
-import json
 import time
 import os
 from typing import List, Dict, Optional, Any
@@ -14,15 +13,24 @@ from ..models import TokenInfo
 from ..utils import safe_float, safe_int, calculate_age_days
 from ..utils.data_manager import DataManager
 from ..utils.logger import get_logger
+from ..utils.json_codec import response_json
+from .http_client import get_http_client
+from .resilience import get_upstream, CircuitOpenError, UPSTREAM_PUMPFUN, UPSTREAM_OKX_MARKET
+from .artifact_store import get_artifact_store
 
 
 class BaseCrawler:
     """基础爬虫类"""
 
+    # 子类对应的上游名称（决定使用哪个熔断器）
+    upstream_name = "crawler"
+
     def __init__(self):
         self.logger = get_logger("crawler")
         self.tokens_data: List[Dict[str, Any]] = []
         self.data_manager = DataManager()
+        self.http_client = get_http_client()
+        self.upstream = get_upstream(self.upstream_name)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36"
         }
@@ -34,36 +42,35 @@ class BaseCrawler:
         if params:
             self.logger.debug(f"📋 请求参数: {params}")
             
-        for attempt in range(1, max_retries + 1):
-            try:
-                start_time = time.time()
-                response = requests.get(url, headers=self.headers, params=params, timeout=15)
-                request_time = time.time() - start_time
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                self.logger.info(f"✅ 请求成功: {url} (耗时: {request_time:.2f}s, 状态: {response.status_code})")
-                self.logger.debug(f"📊 响应数据大小: {len(response.content)} bytes")
-                
-                return data
-                
-            except requests.exceptions.Timeout:
-                self.logger.warning(f"⏰ 请求超时 ({attempt}/{max_retries}): {url}")
-            except requests.exceptions.ConnectionError:
-                self.logger.warning(f"🔌 连接错误 ({attempt}/{max_retries}): {url}")
-            except requests.exceptions.HTTPError as e:
-                self.logger.error(f"📡 HTTP错误 ({attempt}/{max_retries}): {e.response.status_code} - {url}")
-            except Exception as e:
-                self.logger.error(f"❌ 请求失败 ({attempt}/{max_retries}): {e}")
-                
-            if attempt < max_retries:
-                retry_delay = 2**attempt
-                self.logger.info(f"⏳ 等待 {retry_delay} 秒后重试...")
-                time.sleep(retry_delay)  # 指数退避
-            else:
-                self.logger.error(f"❌ 达到最大重试次数，请求失败: {url}")
-                return None
+        def send(timeout=15):
+            return self.http_client.get(url, headers=self.headers, params=params, timeout=timeout)
+
+        try:
+            # 退避、Retry-After 和熔断由重试策略统一处理
+            start_time = time.time()
+            response = self.upstream.call(send, max_attempts=max_retries, timeout=15)
+            request_time = time.time() - start_time
+
+            response.raise_for_status()
+            data = response_json(response)
+
+            self.logger.info(f"✅ 请求成功: {url} (耗时: {request_time:.2f}s, 状态: {response.status_code})")
+            self.logger.debug(f"📊 响应数据大小: {len(response.content)} bytes")
+
+            return data
+
+        except CircuitOpenError as e:
+            self.logger.warning(f"🔌 {e}")
+        except requests.exceptions.Timeout:
+            self.logger.warning(f"⏰ 请求超时: {url}")
+        except requests.exceptions.ConnectionError:
+            self.logger.warning(f"🔌 连接错误: {url}")
+        except requests.exceptions.HTTPError as e:
+            self.logger.error(f"📡 HTTP错误: {e.response.status_code} - {url}")
+        except Exception as e:
+            self.logger.error(f"❌ 请求失败: {url} - {e}")
+
+        return None
 
     def save_to_csv(self, filename: str = None) -> None:
         """保存数据到CSV文件"""
@@ -110,20 +117,14 @@ class BaseCrawler:
         if filename is None:
             filename = f"tokens_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
 
-        try:
-            filepath = self.data_manager.get_file_path("csv_data", filename)
-            self.logger.info(f"💾 开始保存数据到JSON: {filepath}")
-            
-            start_time = time.time()
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(self.tokens_data, f, ensure_ascii=False, indent=2)
-            
-            save_time = time.time() - start_time
-            file_size = os.path.getsize(filepath) / 1024  # KB
-            self.logger.info(f"✅ JSON保存成功: {filepath} (耗时: {save_time:.2f}s, 大小: {file_size:.1f}KB)")
-            
-        except Exception as e:
-            self.logger.exception(f"❌ 保存JSON失败: {e}")
+        # 提交后台压缩写入（传入列表副本，之后的去重等操作不影响待写入的数据）
+        filepath = get_artifact_store().submit_json(
+            self.data_manager.get_file_path("csv_data", filename), list(self.tokens_data)
+        )
+        if filepath:
+            self.logger.info(f"💾 JSON数据将保存到: {filepath}")
+        else:
+            self.logger.warning("⚠️ 产物队列已满，本次JSON数据未保存")
 
     def deduplicate_by_mint(self, keep: int = 1000) -> None:
         """根据mint地址去重"""
@@ -149,6 +150,8 @@ class BaseCrawler:
 class PumpFunCrawler(BaseCrawler):
     """Pump.Fun API爬虫"""
 
+    upstream_name = UPSTREAM_PUMPFUN
+
     def __init__(self):
         super().__init__()
         self.base_url = "https://frontend-api-v3.pump.fun/coins"
@@ -258,6 +261,8 @@ class PumpFunCrawler(BaseCrawler):
 class OKXCrawler(BaseCrawler):
     """OKX API爬虫"""
 
+    upstream_name = UPSTREAM_OKX_MARKET
+
     def __init__(self):
         super().__init__()
         self.base_url = "https://www.okx.com/api/v5"
@@ -0,0 +1,331 @@
+"""
+持有者/钱包资产数据源
+统一的数据源接口（get_token_holders / get_wallet_portfolio），返回值统一为 OKX Web 接口的数据结构：
+- okx_web: OKX Web3 页面接口（原有实现）
+- okx_v5: OKX v5 浏览器 API，结果转换为 OKX Web 结构
+- fixture: 本地 JSON 文件，离线测试和基准测试用
+多个数据源按配置顺序故障转移（failover），或同时请求取最先返回的有效结果（race）
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .resilience import Upstream, get_upstream, UPSTREAM_OKX_HOLDERS, UPSTREAM_OKX_WALLET, UPSTREAM_OKX_MARKET
+from ..utils.tracing import propagate
+from ..utils import json_codec
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("data_providers")
+
+
+PROVIDER_OKX_WEB = "okx_web"
+PROVIDER_OKX_V5 = "okx_v5"
+PROVIDER_FIXTURE = "fixture"
+
+MODE_FAILOVER = "failover"
+MODE_RACE = "race"
+
+
+def _get_settings() -> Dict:
+    """读取数据源配置"""
+    settings = read_settings("analysis", {
+        "providers": ("data_providers", None),
+        "mode": ("provider_mode", MODE_FAILOVER),
+        "race_count": ("provider_race_count", 2),
+        "fixture_dir": ("provider_fixture_dir", "config/fixtures"),
+        "okx_v5_api_key": ("provider_okx_v5_api_key", ""),
+        "threads": ("max_concurrent_threads", 5),
+        "workers": ("scheduler_max_workers", 3),
+    })
+    settings["providers"] = list(settings["providers"] or [PROVIDER_OKX_WEB])
+    settings["max_workers"] = settings.pop("threads") * settings.pop("workers")
+    return settings
+
+
+class HolderDataProvider(ABC):
+    """数据源基类（缺少接口方法的子类在实例化时即报错）"""
+
+    name = "base"
+    # 对应的熔断器名称，熔断打开时跳过该数据源；None 表示不依赖网络
+    holders_upstream: Optional[str] = None
+    portfolio_upstream: Optional[str] = None
+
+    @abstractmethod
+    def get_token_holders(self, token_address: str, chain_id: str = "501") -> List[Dict]:
+        """获取代币持有者排行（OKX Web 结构，至少包含 holderWalletAddress / holdAmount）"""
+
+    @abstractmethod
+    def get_wallet_portfolio(self, wallet_address: str, force_refresh: bool = True) -> Dict:
+        """
+        获取钱包资产（OKX Web 结构: {"tokens": {"tokenlist": [...]}}），失败返回空字典
+        force_refresh 为 False 时允许上游返回其缓存的结果（不支持的数据源忽略该参数）
+        """
+
+    def get_upstream(self, kind: str) -> Optional[Upstream]:
+        """数据源使用的上游（kind: holders / portfolio），不依赖网络时返回 None"""
+        upstream = self.holders_upstream if kind == "holders" else self.portfolio_upstream
+        return get_upstream(upstream) if upstream else None
+
+    def is_available(self, kind: str) -> bool:
+        """数据源当前是否可用（kind: holders / portfolio）"""
+        upstream = self.get_upstream(kind)
+        return upstream is None or not upstream.is_open()
+
+
+class OKXWebProvider(HolderDataProvider):
+    """OKX Web3 页面接口（委托给 OKXCrawlerForBot 的原有请求逻辑，开启深度扫描时获取多页）"""
+
+    name = PROVIDER_OKX_WEB
+    holders_upstream = UPSTREAM_OKX_HOLDERS
+    portfolio_upstream = UPSTREAM_OKX_WALLET
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    def get_token_holders(self, token_address: str, chain_id: str = "501") -> List[Dict]:
+        return self.crawler.fetch_token_holders(token_address, chain_id=chain_id)
+
+    def get_wallet_portfolio(self, wallet_address: str, force_refresh: bool = True) -> Dict:
+        return self.crawler.fetch_wallet_portfolio(wallet_address, force_refresh=force_refresh)
+
+
+class OKXV5Provider(HolderDataProvider):
+    """OKX v5 浏览器 API（需要 API Key），结果转换为 OKX Web 结构"""
+
+    name = PROVIDER_OKX_V5
+    holders_upstream = UPSTREAM_OKX_MARKET
+    portfolio_upstream = UPSTREAM_OKX_MARKET
+
+    def __init__(self, api_key: str = ""):
+        from .crawler import OKXCrawler
+
+        self.crawler = OKXCrawler()
+        if api_key:
+            self.crawler.headers["Ok-Access-Key"] = api_key
+
+    @staticmethod
+    def _flatten(entries: List[Dict], list_keys: tuple) -> List[Dict]:
+        """v5 接口把列表包在一层分页对象里，展开成条目列表"""
+        items = []
+        for entry in entries or []:
+            nested = next((entry[key] for key in list_keys if isinstance(entry.get(key), list)), None)
+            if nested is not None:
+                items.extend(nested)
+            else:
+                items.append(entry)
+        return items
+
+    def get_token_holders(self, token_address: str, chain_id: str = "501") -> List[Dict]:
+        holders = []
+        for item in self._flatten(self.crawler.get_token_holders(token_address), ("positionList", "holderList")):
+            address = item.get("holderAddress") or item.get("address")
+            if not address:
+                continue
+            holders.append({
+                "holderWalletAddress": address,
+                "holdAmount": str(item.get("amount", item.get("holdingAmount", "0"))),
+                "holdAmountPercentage": str(item.get("percentage", item.get("rate", "0"))),
+                "holdVolume": str(item.get("valueUsd", "0")),
+                "tagList": [],
+            })
+        return holders
+
+    def get_wallet_portfolio(self, wallet_address: str, force_refresh: bool = True) -> Dict:
+        token_list = []
+        for item in self._flatten(self.crawler.get_address_tokens(wallet_address), ("tokenList",)):
+            token_list.append({
+                "symbol": item.get("symbol", "Unknown"),
+                "name": item.get("tokenName", item.get("symbol", "Unknown")),
+                "chainName": "Solana",
+                "coinBalanceDetails": [{"address": item.get("tokenContractAddress", "")}],
+                "coinAmount": str(item.get("holdingAmount", "0")),
+                "coinUnitPrice": str(item.get("priceUsd", "0")),
+                "currencyAmount": str(item.get("valueUsd", "0")),
+            })
+        return {"tokens": {"tokenlist": token_list}} if token_list else {}
+
+
+class FixtureProvider(HolderDataProvider):
+    """
+    本地 JSON 数据源
+    目录下 holders_<代币地址>.json / wallet_<钱包地址>.json，内容可以是接口原始响应或 data 部分
+    """
+
+    name = PROVIDER_FIXTURE
+
+    def __init__(self, fixture_dir: str):
+        self.fixture_dir = Path(fixture_dir)
+
+    def _load(self, filename: str):
+        path = self.fixture_dir / filename
+        if not path.exists():
+            return None
+        try:
+            data = json_codec.load(path)
+        except (OSError, json_codec.JSONDecodeError) as e:
+            logger.warning(f"⚠️ 读取数据文件失败 {path}: {e}")
+            return None
+        # 接口原始响应 {"code": 0, "data": ...}
+        if isinstance(data, dict) and "code" in data and "data" in data:
+            return data["data"]
+        return data
+
+    def get_token_holders(self, token_address: str, chain_id: str = "501") -> List[Dict]:
+        data = self._load(f"holders_{token_address}.json")
+        if isinstance(data, dict):
+            data = data.get("holderRankingList", [])
+        return data if isinstance(data, list) else []
+
+    def get_wallet_portfolio(self, wallet_address: str, force_refresh: bool = True) -> Dict:
+        data = self._load(f"wallet_{wallet_address}.json")
+        return data if isinstance(data, dict) else {}
+
+
+class ProviderChain:
+    """按配置组合多个数据源：故障转移或竞速"""
+
+    def __init__(self, providers: List[HolderDataProvider], mode: str = MODE_FAILOVER, race_count: int = 2):
+        self.providers = providers
+        self.mode = mode
+        self.race_count = max(1, race_count)
+
+    def _candidates(self, kind: str) -> List[HolderDataProvider]:
+        available = [provider for provider in self.providers if provider.is_available(kind)]
+        # 全部熔断时仍按顺序尝试，由各自的熔断器决定是否放行
+        return available or list(self.providers)
+
+    def is_available(self, kind: str) -> bool:
+        """是否至少有一个数据源可用"""
+        return any(provider.is_available(kind) for provider in self.providers)
+
+    def active_upstream(self, kind: str) -> Optional[Upstream]:
+        """
+        当前会被优先使用的数据源的上游（对冲请求按它的耗时分布计算触发阈值）
+        首选数据源不依赖网络时返回 None
+        """
+        return self._candidates(kind)[0].get_upstream(kind) if self.providers else None
+
+    def uses_network(self, kind: str) -> bool:
+        """是否有数据源需要请求上游（纯本地数据源不需要限速）"""
+        return any((provider.holders_upstream if kind == "holders" else provider.portfolio_upstream) is not None
+                   for provider in self.providers)
+
+    def _call(self, provider: HolderDataProvider, method: str, *args):
+        start_time = time.time()
+        result = None
+        try:
+            result = getattr(provider, method)(*args)
+            return result
+        except Exception as e:
+            logger.warning(f"⚠️ 数据源 {provider.name}.{method} 失败: {e}")
+            return None
+        finally:
+            _record(provider.name, time.time() - start_time, result)
+
+    def _run(self, kind: str, method: str, empty, *args):
+        candidates = self._candidates(kind)
+
+        if self.mode == MODE_RACE and len(candidates) > 1:
+            racers = candidates[:self.race_count]
+            # 输掉的请求在后台完成，不阻塞调用方
+            call = propagate(self._call)
+            futures = {_get_executor().submit(call, provider, method, *args): provider for provider in racers}
+            for future in as_completed(futures):
+                result = future.result()
+                if result:
+                    _record_win(futures[future].name)
+                    return result
+            return empty
+
+        for provider in candidates:
+            result = self._call(provider, method, *args)
+            if result:
+                _record_win(provider.name)
+                return result
+        return empty
+
+    def get_token_holders(self, token_address: str, chain_id: str = "501") -> List[Dict]:
+        return self._run("holders", "get_token_holders", [], token_address, chain_id)
+
+    def get_wallet_portfolio(self, wallet_address: str, force_refresh: bool = True) -> Dict:
+        return self._run("portfolio", "get_wallet_portfolio", {}, wallet_address, force_refresh)
+
+
+# 数据源统计与竞速线程池（全局共享）
+_stats_lock = threading.Lock()
+_provider_stats: Dict[str, Dict] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+
+_PROVIDER_FACTORIES: Dict[str, Callable] = {
+    PROVIDER_OKX_WEB: lambda crawler, settings: OKXWebProvider(crawler),
+    PROVIDER_OKX_V5: lambda crawler, settings: OKXV5Provider(settings["okx_v5_api_key"]),
+    PROVIDER_FIXTURE: lambda crawler, settings: FixtureProvider(settings["fixture_dir"]),
+}
+
+
+def _stats_for(name: str) -> Dict:
+    return _provider_stats.setdefault(name, {"requests": 0, "empty": 0, "wins": 0, "latency_total": 0.0})
+
+
+def _record(name: str, latency: float, result) -> None:
+    with _stats_lock:
+        stats = _stats_for(name)
+        stats["requests"] += 1
+        stats["latency_total"] += latency
+        if not result:
+            stats["empty"] += 1
+
+
+def _record_win(name: str) -> None:
+    with _stats_lock:
+        _stats_for(name)["wins"] += 1
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _stats_lock:
+        if _executor is None:
+            settings = _get_settings()
+            _executor = ThreadPoolExecutor(
+                max_workers=max(4, settings["max_workers"] * settings["race_count"]),
+                thread_name_prefix="ProviderRace",
+            )
+    return _executor
+
+
+def build_provider_chain(crawler) -> ProviderChain:
+    """
+    按配置构建数据源链
+
+    Args:
+        crawler: OKXCrawlerForBot 实例（okx_web 数据源复用它的请求逻辑）
+    """
+    settings = _get_settings()
+    providers = []
+    for name in settings["providers"]:
+        factory = _PROVIDER_FACTORIES.get(name)
+        if factory is None:
+            logger.warning(f"⚠️ 未知数据源: {name}，已忽略")
+            continue
+        providers.append(factory(crawler, settings))
+    if not providers:
+        providers.append(OKXWebProvider(crawler))
+    return ProviderChain(providers, mode=settings["mode"], race_count=settings["race_count"])
+
+
+def get_provider_stats() -> Dict[str, Dict]:
+    """获取每个数据源的请求数、空结果数、胜出次数和平均延迟"""
+    with _stats_lock:
+        return {
+            name: {
+                "requests": stats["requests"],
+                "empty": stats["empty"],
+                "wins": stats["wins"],
+                "latency_avg": round(stats["latency_total"] / stats["requests"], 3) if stats["requests"] else 0.0,
+            }
+            for name, stats in _provider_stats.items()
+        }
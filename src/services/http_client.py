@@ -0,0 +1,296 @@
+"""
+共享HTTP客户端
+所有爬虫通过同一个注册表获取按主机划分的 requests.Session：
+- 每个主机一个连接池，大小按配置的并发数计算，连接保持 keep-alive 复用
+- 启动时预热连接，避免首个请求承担 TCP+TLS 握手
+- Accept-Encoding 只声明 urllib3 实际能解码的压缩格式（安装 brotli / zstandard 后自动启用 br / zstd）
+- 统一使用 ProxyConfig 的代理设置；配置代理出口池后，池内主机的请求按出口限速分摊
+- 记录每个主机的请求数、连接复用和延迟
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from ..utils.settings import config_section, get_module_logger, read_settings
+from .proxy_pool import get_proxy_pool
+from .resilience import EgressUnavailableError, parse_retry_after
+
+logger = get_module_logger("http_client")
+
+try:
+    # urllib3 根据已安装的解码库生成（gzip,deflate[,br][,zstd]）
+    from urllib3.util.request import ACCEPT_ENCODING
+except ImportError:
+    ACCEPT_ENCODING = "gzip,deflate"
+
+
+# 启动时预热的上游主机
+WARMUP_URLS = [
+    "https://web3.okx.com",
+    "https://www.okx.com",
+    "https://datapi.jup.ag",
+    "https://frontend-api-v3.pump.fun",
+]
+
+# 每个主机保留的延迟样本数量（用于计算分位数）
+LATENCY_SAMPLES = 200
+
+
+def get_accept_encoding() -> str:
+    """获取当前环境可以解码的 Accept-Encoding"""
+    return ACCEPT_ENCODING.replace(",", ", ")
+
+
+class _HostStats:
+    """单个主机的请求统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.status_429 = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, latency: float, status_code: Optional[int]) -> None:
+        self.requests += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latencies.append(latency)
+        if status_code is None:
+            self.errors += 1
+        elif status_code == 429:
+            self.status_429 += 1
+
+    def percentile(self, ratio: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class HTTPClientRegistry:
+    """按主机划分的共享 Session 注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, _HostStats] = {}
+        # 替换默认连接池的传输适配器（录制/回放用），None 表示使用 HTTPAdapter
+        self._transport: Optional[BaseAdapter] = None
+
+    def _get_settings(self) -> Dict:
+        """读取连接池配置"""
+        settings = read_settings("analysis", {
+            "pool_size": ("http_pool_maxsize", 0),
+            "threads": ("max_concurrent_threads", 5),
+            "workers": ("scheduler_max_workers", 3),
+            "timeout": ("http_timeout", 30),
+            "warmup_enabled": ("http_warmup_enabled", True),
+            "upstream_overrides": ("http_upstream_overrides", None),
+        })
+        # 每个分析任务内部还有多线程获取钱包资产，连接池默认按两者乘积计算
+        concurrency = settings.pop("threads") * settings.pop("workers")
+        settings["pool_size"] = max(settings["pool_size"] or concurrency, 4)
+        settings["upstream_overrides"] = settings["upstream_overrides"] or {}
+        settings["proxy"] = config_section("proxy")
+        return settings
+
+    @staticmethod
+    def _host_of(url: str) -> str:
+        parsed = urlparse(url if "://" in url else f"https://{url}")
+        return parsed.netloc
+
+    def _create_session(self, host: str) -> requests.Session:
+        """创建主机专用 Session"""
+        settings = self._get_settings()
+        session = requests.Session()
+        adapter = self._transport or HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings["pool_size"],
+            max_retries=0,  # 重试由各爬虫自行控制
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept-Encoding"] = get_accept_encoding()
+
+        proxy = settings["proxy"]
+        if proxy is not None and proxy.enabled:
+            session.proxies.update({"http": proxy.http_proxy, "https": proxy.https_proxy})
+
+        logger.debug(f"🔌 创建HTTP连接池: {host} (大小 {settings['pool_size']})")
+        return session
+
+    def get_session(self, url: str) -> requests.Session:
+        """获取主机对应的共享 Session（url 可以是完整地址或主机名）"""
+        host = self._host_of(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._create_session(host)
+                self._sessions[host] = session
+                self._stats[host] = _HostStats()
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        发送请求（与 requests.request 参数一致），异常原样抛出；
+        代理出口池等待超时抛出 EgressUnavailableError（requests 的 ConnectionError 子类）
+
+        Returns:
+            requests.Response
+        """
+        session = self.get_session(url)
+        host = self._host_of(url)
+        settings = self._get_settings()
+        kwargs.setdefault("timeout", settings["timeout"])
+
+        override = settings["upstream_overrides"].get(host)
+        if override:
+            # 替身上游：改写到替代地址，不走代理；连接池和统计仍按原主机区分
+            parsed = urlparse(url)
+            url = override.rstrip("/") + parsed.path + (f"?{parsed.query}" if parsed.query else "")
+            kwargs["proxies"] = {"http": None, "https": None}
+
+        headers = kwargs.get("headers")
+        if headers:
+            # 调用方写死的 br/zstd 在缺少解码库时会拿到无法解析的响应，统一替换
+            for key in list(headers):
+                if key.lower() == "accept-encoding":
+                    headers = dict(headers)
+                    headers[key] = get_accept_encoding()
+                    kwargs["headers"] = headers
+                    break
+
+        # 代理出口池：按出口令牌桶限速，逐请求指定代理（适配器为每个代理保留独立连接池）；
+        # 等不到出口时不能退回默认代理或直连，否则会绕过各出口的限速和429冷却
+        proxy_pool = get_proxy_pool()
+        egress = None
+        if "proxies" not in kwargs and proxy_pool.is_enabled_for(host):
+            wait_started = time.time()
+            egress = proxy_pool.acquire()
+            if egress is None:
+                raise EgressUnavailableError(host, time.time() - wait_started)
+            kwargs["proxies"] = egress.proxies
+
+        start_time = time.time()
+        status_code = None
+        response = None
+        try:
+            response = session.request(method, url, **kwargs)
+            status_code = response.status_code
+            return response
+        except requests.exceptions.RequestException as e:
+            proxy_pool.report(egress, error=e)
+            egress = None
+            raise
+        finally:
+            latency = time.time() - start_time
+            with self._lock:
+                self._stats.setdefault(host, _HostStats()).record(latency, status_code)
+            if egress is not None:
+                proxy_pool.report(egress, status_code=status_code, retry_after=parse_retry_after(response))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def warm_up(self, urls: Optional[List[str]] = None, background: bool = True) -> None:
+        """预热连接：对每个上游主机发起一次轻量请求，建立并保留 keep-alive 连接"""
+        if not self._get_settings()["warmup_enabled"]:
+            return
+
+        def _warm():
+            for url in urls or WARMUP_URLS:
+                try:
+                    self.request("HEAD", url, timeout=5, allow_redirects=False)
+                    logger.debug(f"🔥 连接预热完成: {url}")
+                except Exception as e:
+                    logger.debug(f"连接预热失败 {url}: {e}")
+            logger.info(f"🔥 HTTP连接预热完成 ({len(urls or WARMUP_URLS)} 个主机)")
+
+        if background:
+            threading.Thread(target=_warm, daemon=True, name="HTTPWarmup").start()
+        else:
+            _warm()
+
+    @staticmethod
+    def _pool_counters(session: requests.Session) -> Dict[str, int]:
+        """汇总 Session 下所有 urllib3 连接池的新建连接数和请求数"""
+        counters = {"connections": 0, "pool_requests": 0}
+        # http:// 和 https:// 挂载的是同一个适配器，去重后再统计
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            managers = [getattr(adapter, "poolmanager", None)] + list(getattr(adapter, "proxy_manager", {}).values())
+            for manager in managers:
+                if manager is None:
+                    continue
+                for key in list(manager.pools.keys()):
+                    pool = manager.pools.get(key)
+                    if pool is None:
+                        continue
+                    counters["connections"] += getattr(pool, "num_connections", 0)
+                    counters["pool_requests"] += getattr(pool, "num_requests", 0)
+        return counters
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """获取每个主机的请求、连接复用和延迟统计"""
+        with self._lock:
+            items = [(host, self._sessions[host], self._stats[host]) for host in self._sessions]
+
+        stats = {}
+        for host, session, host_stats in items:
+            counters = self._pool_counters(session)
+            reused = max(0, counters["pool_requests"] - counters["connections"])
+            stats[host] = {
+                "requests": host_stats.requests,
+                "errors": host_stats.errors,
+                "status_429": host_stats.status_429,
+                "connections_opened": counters["connections"],
+                "connections_reused": reused,
+                "reuse_ratio": round(reused / counters["pool_requests"], 3) if counters["pool_requests"] else 0.0,
+                "latency_avg": round(host_stats.latency_total / host_stats.requests, 3) if host_stats.requests else 0.0,
+                "latency_p50": round(host_stats.percentile(0.5), 3),
+                "latency_p90": round(host_stats.percentile(0.9), 3),
+                "latency_max": round(host_stats.latency_max, 3),
+            }
+        return stats
+
+    def install_transport(self, adapter: Optional[BaseAdapter]) -> None:
+        """
+        所有主机改用指定的传输适配器（如 replay_transport 的录制/回放适配器），传 None 恢复默认
+        已创建的 Session 会被关闭，之后的请求使用新的适配器
+        """
+        self.close_all()
+        with self._lock:
+            self._transport = adapter
+
+    def pool_size(self) -> int:
+        """按当前配置计算的每主机连接池大小"""
+        return self._get_settings()["pool_size"]
+
+    def close_all(self) -> None:
+        """关闭所有连接（代理配置变更后调用，下次请求时重新创建）"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._stats.clear()
+        for session in sessions:
+            session.close()
+
+
+# 全局HTTP客户端实例
+http_client = HTTPClientRegistry()
+
+
+def get_http_client() -> HTTPClientRegistry:
+    """获取共享HTTP客户端"""
+    return http_client
@@ -0,0 +1,405 @@
+"""
+基础设施地址学习服务
+自动识别路由、联合曲线金库、交易所热钱包等未被OKX标记的基础设施地址，
+在获取钱包资产之前直接排除，减少无效的上游请求
+
+学习到的地址与管理员手动添加的地址分开保存：学习条目带有效期，过期后重新参与分析，
+管理员可在审核列表中单独查看和移除
+"""
+
+import atexit
+import os
+import threading
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Set
+
+from ..utils import json_codec
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("infra_addresses")
+
+
+# 持久化文件放在项目 config 目录下（storage 目录每次重启都会被清空）
+DEFAULT_INDEX_FILE = "config/infra_addresses.json"
+
+# 出现次数统计最多保留的地址数量，超过后淘汰出现次数最少的地址
+MAX_TRACKED_ADDRESSES = 20000
+# 已计数代币最多保留的数量（避免同一代币重复分析时重复计数）
+MAX_COUNTED_TOKENS = 2000
+
+SOURCE_MANUAL = "manual"
+
+
+class InfraAddressIndex:
+    """基础设施地址索引（学习型排除集合 + 手动排除集合）"""
+
+    def __init__(self, index_file: str = None):
+        self.index_file = index_file or DEFAULT_INDEX_FILE
+        self._lock = Lock()
+        # 自动学习的地址: address -> {reason, source, count, added_at, expires_at}
+        self._learned: Dict[str, Dict] = {}
+        # 管理员手动添加的地址: address -> {reason, source, count, added_at}
+        self._manual: Dict[str, Dict] = {}
+        # 管理员确认的非基础设施地址，不再自动学习
+        self._ignored: Set[str] = set()
+        # 地址作为大户出现的代币数量（随样本增长按半衰衰减）
+        self._seen_counts: Dict[str, float] = {}
+        # 与 _seen_counts 同步衰减的有效样本数
+        self._tokens_analyzed: float = 0.0
+        # 已计数的代币: token_address -> timestamp
+        self._counted_tokens: Dict[str, float] = {}
+        # 后台保存状态
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self.load_index()
+
+    def load_index(self) -> None:
+        """加载索引"""
+        try:
+            if os.path.exists(self.index_file):
+                data = json_codec.load(self.index_file)
+                self._learned = data.get("learned", {})
+                self._manual = data.get("manual", {})
+                # 兼容旧格式：排除地址混在同一个 excluded 字典里
+                for address, info in data.get("excluded", {}).items():
+                    target = self._manual if info.get("source") == SOURCE_MANUAL else self._learned
+                    target.setdefault(address, info)
+                self._ignored = set(data.get("ignored", []))
+                self._seen_counts = data.get("seen_counts", {})
+                self._counted_tokens = data.get("counted_tokens", {})
+                self._tokens_analyzed = float(data.get("tokens_analyzed", len(self._counted_tokens)))
+                logger.info(
+                    f"📋 基础设施地址索引加载成功: 学习 {len(self._learned)} 个，手动 {len(self._manual)} 个"
+                )
+        except Exception as e:
+            logger.error(f"❌ 加载基础设施地址索引失败: {e}")
+            self._learned = {}
+            self._manual = {}
+            self._ignored = set()
+            self._seen_counts = {}
+            self._counted_tokens = {}
+            self._tokens_analyzed = 0.0
+
+    def _snapshot(self) -> Dict:
+        """复制一份待保存的数据（调用方需持有锁）"""
+        return {
+            "learned": dict(self._learned),
+            "manual": dict(self._manual),
+            "ignored": list(self._ignored),
+            "seen_counts": dict(self._seen_counts),
+            "tokens_analyzed": self._tokens_analyzed,
+            "counted_tokens": dict(self._counted_tokens),
+            "last_updated": time.time(),
+        }
+
+    def _write(self, data: Dict) -> None:
+        """写入索引文件（不持有锁）"""
+        try:
+            directory = os.path.dirname(self.index_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            json_codec.dump(data, self.index_file)
+        except Exception as e:
+            logger.error(f"❌ 保存基础设施地址索引失败: {e}")
+
+    def save_index(self) -> None:
+        """立即保存索引（锁内只复制数据，写文件在锁外进行）"""
+        with self._lock:
+            self._dirty = False
+            data = self._snapshot()
+        self._write(data)
+
+    def flush(self) -> None:
+        """如有未保存的修改则立即写入（退出时调用）"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+        self.save_index()
+
+    def _schedule_save(self, delay: float) -> None:
+        """标记有修改并安排一次延迟保存，窗口内的多次修改合并为一次写入（调用方需持有锁）"""
+        self._dirty = True
+        if self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(delay, self._save_in_background)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _save_in_background(self) -> None:
+        with self._lock:
+            self._save_timer = None
+            if not self._dirty:
+                return
+        self.save_index()
+
+    def _get_settings(self) -> Dict:
+        """读取学习阈值配置"""
+        settings = read_settings("analysis", {
+            "enabled": ("infra_learning_enabled", True),
+            "min_tokens": ("infra_min_tokens_analyzed", 200),
+            "min_count": ("infra_min_holder_count", 30),
+            "holder_ratio": ("infra_holder_ratio", 0.3),
+            "decay_tokens": ("infra_decay_tokens", 1000),
+            "learned_ttl": ("infra_learned_ttl_days", 7),
+            "max_portfolio_value": ("infra_max_portfolio_value", 5000000),
+            "save_interval": ("infra_save_interval_seconds", 60),
+        })
+        settings["learned_ttl"] *= 86400
+        return settings
+
+    def is_excluded(self, address: str) -> bool:
+        """
+        检查地址是否为基础设施地址（O(1)，过期的学习条目不再排除）
+
+        Args:
+            address: 钱包地址
+
+        Returns:
+            是否应排除
+        """
+        if address in self._manual:
+            return True
+        entry = self._learned.get(address)
+        if entry is None:
+            return False
+        expires_at = entry.get("expires_at")
+        return not expires_at or expires_at > time.time()
+
+    def _mark_learned(self, address: str, reason: str, source: str, ttl: float) -> bool:
+        """标记地址为学习到的基础设施地址（调用方需持有锁）"""
+        if address in self._manual or self.is_excluded(address):
+            return False
+        now = time.time()
+        self._learned[address] = {
+            "reason": reason,
+            "source": source,
+            "count": int(self._seen_counts.get(address, 0)),
+            "added_at": now,
+            "expires_at": now + ttl if ttl > 0 else None,
+        }
+        return True
+
+    def _expire_learned(self) -> None:
+        """移除已过期的学习条目，让地址重新参与分析和统计（调用方需持有锁）"""
+        now = time.time()
+        expired = [
+            address for address, info in self._learned.items()
+            if info.get("expires_at") and info["expires_at"] <= now
+        ]
+        for address in expired:
+            del self._learned[address]
+        if expired:
+            logger.info(f"🏗️ {len(expired)} 个学习到的基础设施地址已过期，恢复分析")
+
+    def _decay_counts(self, decay_tokens: int) -> None:
+        """有效样本数达到衰减窗口后，出现次数与样本数同时减半（调用方需持有锁）"""
+        if decay_tokens <= 0 or self._tokens_analyzed < decay_tokens:
+            return
+        self._tokens_analyzed /= 2
+        self._seen_counts = {
+            address: count / 2 for address, count in self._seen_counts.items() if count >= 2
+        }
+
+    def _prune_counts(self) -> None:
+        """淘汰出现次数最少的地址，限制内存和文件大小（调用方需持有锁）"""
+        if len(self._seen_counts) > MAX_TRACKED_ADDRESSES:
+            ranked = sorted(self._seen_counts.items(), key=lambda x: x[1], reverse=True)
+            self._seen_counts = dict(ranked[:MAX_TRACKED_ADDRESSES // 2])
+
+        if len(self._counted_tokens) > MAX_COUNTED_TOKENS:
+            ranked = sorted(self._counted_tokens.items(), key=lambda x: x[1], reverse=True)
+            self._counted_tokens = dict(ranked[:MAX_COUNTED_TOKENS // 2])
+
+    def record_token_holders(self, token_address: str, holder_addresses: List[str]) -> List[str]:
+        """
+        记录一次代币分析中的大户地址，并根据跨代币出现频率学习基础设施地址
+
+        只有在足够大的样本（infra_min_tokens_analyzed）上、出现次数同时超过
+        绝对下限（infra_min_holder_count）和比例（infra_holder_ratio）的地址才会被学习，
+        避免把只在少数代币中反复出现的老鼠仓/团伙钱包误判为基础设施
+
+        Args:
+            token_address: 被分析的代币地址
+            holder_addresses: 本次分析的大户钱包地址列表
+
+        Returns:
+            本次新学习到的基础设施地址列表
+        """
+        settings = self._get_settings()
+        if not settings["enabled"] or not token_address:
+            return []
+
+        newly_excluded = []
+        with self._lock:
+            # 同一代币只计数一次，避免重复分析放大出现频率
+            if token_address in self._counted_tokens:
+                return []
+            self._counted_tokens[token_address] = time.time()
+            self._tokens_analyzed += 1
+
+            for address in set(holder_addresses):
+                if address:
+                    self._seen_counts[address] = self._seen_counts.get(address, 0) + 1
+
+            tokens_analyzed = self._tokens_analyzed
+            if tokens_analyzed >= settings["min_tokens"]:
+                min_count = max(settings["min_count"], tokens_analyzed * settings["holder_ratio"])
+                for address in set(holder_addresses):
+                    if not address or address in self._ignored:
+                        continue
+                    count = self._seen_counts.get(address, 0)
+                    if count >= min_count and self._mark_learned(
+                        address,
+                        f"出现在 {count:.0f}/{tokens_analyzed:.0f} 个代币的大户中",
+                        "frequency",
+                        settings["learned_ttl"],
+                    ):
+                        newly_excluded.append(address)
+
+            self._expire_learned()
+            self._decay_counts(settings["decay_tokens"])
+            self._prune_counts()
+            self._schedule_save(settings["save_interval"])
+
+        for address in newly_excluded:
+            logger.info(f"🏗️ 学习到基础设施地址: {address[:8]}...{address[-6:]} (跨代币高频出现)")
+        return newly_excluded
+
+    def check_portfolio(self, address: str, assets_data: Dict) -> bool:
+        """
+        检查钱包资产是否符合基础设施特征（总价值极大）
+
+        钱包资产只获取第一页，持有代币种类数不可靠，因此只按总价值判断
+
+        Args:
+            address: 钱包地址
+            assets_data: get_wallet_assets 返回的资产数据
+
+        Returns:
+            是否被识别为基础设施地址
+        """
+        if not address or not assets_data:
+            return False
+
+        settings = self._get_settings()
+        if not settings["enabled"] or address in self._ignored:
+            return False
+
+        token_list = assets_data.get("tokens", {}).get("tokenlist", []) or []
+        total_value = 0.0
+        for token in token_list:
+            try:
+                total_value += float(token.get("currencyAmount", "0") or 0)
+            except (ValueError, TypeError):
+                continue
+
+        if total_value < settings["max_portfolio_value"]:
+            return False
+        reason = f"资产总价值 ${total_value:,.0f}"
+
+        with self._lock:
+            added = self._mark_learned(address, reason, "portfolio", settings["learned_ttl"])
+            if added:
+                self._schedule_save(settings["save_interval"])
+
+        if added:
+            logger.info(f"🏗️ 学习到基础设施地址: {address[:8]}...{address[-6:]} ({reason})")
+        return True
+
+    def add_address(self, address: str, reason: str = "管理员手动添加") -> bool:
+        """
+        手动添加基础设施地址（不会过期）
+
+        Args:
+            address: 钱包地址
+            reason: 添加原因
+
+        Returns:
+            是否添加成功
+        """
+        with self._lock:
+            if address in self._manual:
+                return False
+            self._ignored.discard(address)
+            self._learned.pop(address, None)
+            self._manual[address] = {
+                "reason": reason,
+                "source": SOURCE_MANUAL,
+                "count": int(self._seen_counts.get(address, 0)),
+                "added_at": time.time(),
+            }
+        self.save_index()
+        return True
+
+    def remove_address(self, address: str) -> bool:
+        """
+        移除基础设施地址，并加入忽略列表防止再次自动学习
+
+        Args:
+            address: 钱包地址
+
+        Returns:
+            是否移除成功
+        """
+        with self._lock:
+            removed = self._manual.pop(address, None) or self._learned.pop(address, None)
+            if removed is None:
+                return False
+            self._ignored.add(address)
+        self.save_index()
+        return True
+
+    def get_excluded_count(self) -> int:
+        """获取当前生效的排除地址数量"""
+        return len(self._manual) + sum(1 for address in list(self._learned) if self.is_excluded(address))
+
+    def get_review_list(self, source: str = "learned", limit: Optional[int] = None) -> List[Dict]:
+        """
+        获取待审核的基础设施地址列表（按出现次数降序，其次按加入时间）
+
+        Args:
+            source: "learned" 只返回自动学习的地址，"manual" 只返回手动添加的地址
+            limit: 返回数量限制
+
+        Returns:
+            [{address, reason, source, count, added_at, expires_at}, ...]
+        """
+        with self._lock:
+            store = self._manual if source == SOURCE_MANUAL else self._learned
+            entries = [
+                {
+                    "address": address,
+                    "reason": info.get("reason", ""),
+                    "source": info.get("source", ""),
+                    "count": int(self._seen_counts.get(address, info.get("count", 0))),
+                    "added_at": info.get("added_at", 0),
+                    "expires_at": info.get("expires_at"),
+                }
+                for address, info in store.items()
+            ]
+        entries.sort(key=lambda x: (x["count"], x["added_at"]), reverse=True)
+        return entries[:limit] if limit else entries
+
+    def get_stats(self) -> Dict:
+        """获取索引统计信息"""
+        return {
+            "learned": len(self._learned),
+            "manual": len(self._manual),
+            "ignored": len(self._ignored),
+            "tracked_addresses": len(self._seen_counts),
+            "tokens_analyzed": int(self._tokens_analyzed),
+        }
+
+
+# 全局基础设施地址索引实例
+infra_address_index = InfraAddressIndex()
+atexit.register(infra_address_index.flush)
+
+
+def get_infra_address_index() -> InfraAddressIndex:
+    """获取基础设施地址索引实例"""
+    return infra_address_index
@@ -0,0 +1,399 @@
+"""
+持久化分析任务队列
+基于 SQLite（WAL 模式）的本地任务队列，支持租约、失败重试和多进程 worker：
+- Bot 进程负责入队并把完成的结果投递回 Telegram
+- worker 进程（job_worker.py，可启动多个）负责领取任务并执行分析
+- 重启或部署不会丢失排队中的任务和未投递的结果
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from ..utils import json_codec
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("job_queue")
+
+
+# 队列数据库放在项目 config 目录下（storage 目录每次重启都会被清空）
+DEFAULT_DB_PATH = "config/job_queue.db"
+
+# 任务类型
+JOB_HOLDER_ANALYSIS = "holder_analysis"
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 2,
+    chat_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    delivered INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority, available_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_delivery ON jobs (delivered, status);
+"""
+
+
+class DurableJobQueue:
+    """SQLite 持久化任务队列"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接（每个线程/进程独立连接）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["payload"] = json_codec.loads(job["payload"]) if job.get("payload") else {}
+        job["result"] = json_codec.loads(job["result"]) if job.get("result") else None
+        return job
+
+    def enqueue(self, kind: str, payload: Dict, chat_id: str = None,
+                priority: int = 2, max_attempts: int = 3) -> int:
+        """
+        添加任务
+
+        Args:
+            kind: 任务类型
+            payload: 任务参数（需可JSON序列化）
+            chat_id: 发起任务的群组
+            priority: 优先级（数值越小越优先）
+            max_attempts: 最大尝试次数
+
+        Returns:
+            任务ID
+        """
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, payload, priority, chat_id, max_attempts, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (kind, json_codec.dumps(payload), priority,
+             str(chat_id) if chat_id is not None else None, max_attempts, now, now, now),
+        )
+        return cursor.lastrowid
+
+    def lease(self, worker_id: str, lease_seconds: int = 300, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        领取一个可执行的任务（包括租约已过期的任务）
+
+        租约过期说明上次执行的 worker 已崩溃，这同样计为一次尝试：
+        已达到最大尝试次数的过期任务直接标记为失败，不再重新领取
+
+        Args:
+            worker_id: worker标识
+            lease_seconds: 租约时长
+            kinds: 只领取指定类型的任务
+
+        Returns:
+            任务字典，没有可执行任务时返回 None
+        """
+        now = time.time()
+        conn = self._connect()
+        kind_filter = ""
+        params: list = [STATUS_PENDING, now, STATUS_LEASED, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exhausted = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (STATUS_FAILED, "worker租约过期且已达最大尝试次数", now, STATUS_LEASED, now),
+            ).rowcount
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE ((status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?))"
+                f"{kind_filter} ORDER BY priority, id LIMIT 1",
+                params,
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                self._log_exhausted(exhausted)
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (STATUS_LEASED, worker_id, now + lease_seconds, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._log_exhausted(exhausted)
+        job = self._row_to_job(row)
+        job["attempts"] += 1
+        job["status"] = STATUS_LEASED
+        job["lease_owner"] = worker_id
+        return job
+
+    @staticmethod
+    def _log_exhausted(count: int) -> None:
+        if count:
+            logger.warning(f"⚠️ {count} 个任务的worker租约过期且已达最大尝试次数，标记为失败")
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: int = 300) -> bool:
+        """续租，返回租约是否仍属于该worker"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+            (now + lease_seconds, now, job_id, worker_id, STATUS_LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict) -> bool:
+        """标记任务完成并保存结果"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+            "updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+            (STATUS_DONE, json_codec.dumps(result), now, job_id, worker_id, STATUS_LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry_delay: float = 30) -> bool:
+        """
+        标记任务失败；未超过最大尝试次数时按指数退避重新排队
+
+        Returns:
+            是否会重试
+        """
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return False
+
+        will_retry = row["attempts"] < row["max_attempts"]
+        if will_retry:
+            delay = retry_delay * (2 ** max(0, row["attempts"] - 1))
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "available_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (STATUS_PENDING, error[:500], now + delay, now, job_id, worker_id),
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (STATUS_FAILED, error[:500], now, job_id, worker_id),
+            )
+        return will_retry
+
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """查询任务"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_position(self, job_id: int) -> int:
+        """获取任务在待执行队列中的位置（从1开始），不在排队中返回 0"""
+        conn = self._connect()
+        row = conn.execute("SELECT status, priority FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["status"] != STATUS_PENDING:
+            return 0
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND (priority < ? OR (priority = ? AND id < ?))",
+            (STATUS_PENDING, row["priority"], row["priority"], job_id),
+        ).fetchone()[0]
+        return ahead + 1
+
+    def fetch_undelivered(self, limit: int = 20) -> List[Dict]:
+        """获取已完成或最终失败但尚未投递的任务"""
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE delivered = 0 AND status IN (?, ?) ORDER BY updated_at LIMIT ?",
+            (STATUS_DONE, STATUS_FAILED, limit),
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def claim_delivery(self, job_id: int) -> bool:
+        """认领结果投递权（多个投递方之间只有一个会成功）"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET delivered = 1, updated_at = ? WHERE id = ? AND delivered = 0 AND status IN (?, ?)",
+            (time.time(), job_id, STATUS_DONE, STATUS_FAILED),
+        )
+        return cursor.rowcount == 1
+
+    def purge(self, older_than_seconds: float) -> int:
+        """删除已投递且超过保留时间的任务"""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE delivered = 1 AND updated_at < ?",
+            (time.time() - older_than_seconds,),
+        )
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict:
+        """获取队列统计信息"""
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) AS count FROM jobs WHERE delivered = 0 GROUP BY status"
+        ).fetchall()
+        stats = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        stats.update({row["status"]: row["count"] for row in rows})
+        return stats
+
+
+class JobResultDispatcher:
+    """Bot 进程中的结果投递器：轮询已完成任务并按来源回调对应的处理器"""
+
+    def __init__(self, job_queue: DurableJobQueue, poll_interval: float = 2.0):
+        self.job_queue = job_queue
+        self.poll_interval = poll_interval
+        self._callbacks: Dict[str, Callable[[Dict], None]] = {}
+        # 由本进程线程同步等待的任务，投递器跳过
+        self._local_waiters = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_purge = 0.0
+
+    def register(self, source: str, callback: Callable[[Dict], None]) -> None:
+        """注册结果投递回调（source 对应 payload["delivery"]["source"]）"""
+        self._callbacks[source] = callback
+
+    def start(self) -> None:
+        """启动投递线程（只启动一次）"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="JobResultDispatcher")
+                self._thread.start()
+                logger.info("📬 任务结果投递线程已启动")
+
+    def wait_for_job(self, job_id: int, timeout: float = 600, should_stop: Callable[[], bool] = None) -> Optional[Dict]:
+        """
+        同步等待任务完成并认领结果（用于批量任务的编排线程）
+
+        Returns:
+            任务字典（含 status/result/error），超时或被中止时返回 None
+        """
+        with self._lock:
+            self._local_waiters.add(job_id)
+        try:
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                if should_stop and should_stop():
+                    return None
+                job = self.job_queue.get_job(job_id)
+                if job and job["status"] in (STATUS_DONE, STATUS_FAILED):
+                    self.job_queue.claim_delivery(job_id)
+                    return job
+                time.sleep(self.poll_interval)
+            return None
+        finally:
+            with self._lock:
+                self._local_waiters.discard(job_id)
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self._dispatch_once()
+                if time.time() - self._last_purge > 3600:
+                    self._last_purge = time.time()
+                    retention_hours = get_job_queue_settings()["retention_hours"]
+                    purged = self.job_queue.purge(retention_hours * 3600)
+                    if purged:
+                        logger.info(f"🧹 清理了 {purged} 个已投递的历史任务")
+            except Exception as e:
+                logger.error(f"❌ 任务结果投递失败: {e}")
+            time.sleep(self.poll_interval)
+
+    def _dispatch_once(self) -> None:
+        for job in self.job_queue.fetch_undelivered():
+            with self._lock:
+                if job["id"] in self._local_waiters:
+                    continue
+            source = (job["payload"].get("delivery") or {}).get("source")
+            callback = self._callbacks.get(source)
+            if callback is None:
+                # 没有对应的处理器，直接标记为已投递，避免反复扫描
+                self.job_queue.claim_delivery(job["id"])
+                continue
+            if not self.job_queue.claim_delivery(job["id"]):
+                continue
+            try:
+                callback(job)
+            except Exception as e:
+                logger.error(f"❌ 投递任务结果失败 job={job['id']} source={source}: {e}")
+
+
+def get_job_queue_settings() -> Dict:
+    """读取任务队列配置"""
+    return read_settings("analysis", {
+        "enabled": ("job_queue_enabled", False),
+        "db_path": ("job_queue_path", DEFAULT_DB_PATH),
+        "lease_seconds": ("job_queue_lease_seconds", 300),
+        "max_attempts": ("job_queue_max_attempts", 3),
+        "retention_hours": ("job_queue_retention_hours", 24),
+    })
+
+
+def is_job_queue_enabled() -> bool:
+    """是否启用持久化任务队列"""
+    return get_job_queue_settings()["enabled"]
+
+
+def new_worker_id() -> str:
+    """生成worker标识"""
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+_job_queue: Optional[DurableJobQueue] = None
+_dispatcher: Optional[JobResultDispatcher] = None
+_init_lock = threading.Lock()
+
+
+def get_job_queue() -> DurableJobQueue:
+    """获取持久化任务队列实例（首次使用时创建数据库）"""
+    global _job_queue
+    with _init_lock:
+        if _job_queue is None:
+            _job_queue = DurableJobQueue(get_job_queue_settings()["db_path"])
+    return _job_queue
+
+
+def get_job_dispatcher() -> JobResultDispatcher:
+    """获取结果投递器实例"""
+    global _dispatcher
+    queue = get_job_queue()
+    with _init_lock:
+        if _dispatcher is None:
+            _dispatcher = JobResultDispatcher(queue)
+    return _dispatcher
@@ -11,6 +11,12 @@ from typing import List, Dict, Optional
 from datetime import datetime
 from ..utils.data_manager import DataManager
 from ..core.config import get_config
+from .http_client import get_http_client
+from .resilience import get_upstream, CircuitOpenError, UPSTREAM_JUPITER
+from .price_table import get_price_table
+from .artifact_store import get_artifact_store
+from .payload_parsers import slim_jupiter_pools
+from ..utils.json_codec import response_json
 
 
 class JupiterCrawler:
@@ -18,10 +24,11 @@ class JupiterCrawler:
     
     def __init__(self):
         self.base_url = "https://datapi.jup.ag"
-        self.session = requests.Session()
+        self.http_client = get_http_client()
+        self.upstream = get_upstream(UPSTREAM_JUPITER)
         self.data_manager = DataManager()
         self.config = get_config()
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36',
             'Accept': 'application/json',
             'Accept-Language': 'en-US,en;q=0.9',
@@ -30,7 +37,7 @@ class JupiterCrawler:
             'Sec-Fetch-Dest': 'empty',
             'Sec-Fetch-Mode': 'cors',
             'Sec-Fetch-Site': 'same-site'
-        })
+        }
         
         # 从配置系统获取默认参数
         jupiter_config = self.config.jupiter
@@ -94,14 +101,19 @@ class JupiterCrawler:
             elif min_net_volume_24h:
                 print(f"📊 最小24h净交易量: ${min_net_volume_24h:,}")
             
-            response = self.session.get(url, params=params, timeout=30)
+            def send(timeout=30):
+                return self.http_client.get(url, params=params, headers=self.headers, timeout=timeout)
+
+            response = self.upstream.call(send, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
+            data = response_json(response)
             
             # 处理不同的返回格式
             if isinstance(data, list):
                 print(f"✅ 成功获取 {len(data)} 个代币")
+                data = slim_jupiter_pools(data)
+                get_price_table().update_from_jupiter(data)
                 return data
             elif isinstance(data, dict):
                 # 可能包含在某个字段中
@@ -118,12 +130,16 @@ class JupiterCrawler:
                     for key, value in data.items():
                         if isinstance(value, list):
                             print(f"✅ 在字段 '{key}' 中找到 {len(value)} 个项目")
+                            value = slim_jupiter_pools(value)
+                            get_price_table().update_from_jupiter(value)
                             return value
                     print(f"⚠️ 未找到代币列表，返回空")
                     return []
                 
                 if isinstance(tokens, list):
                     print(f"✅ 成功获取 {len(tokens)} 个代币")
+                    tokens = slim_jupiter_pools(tokens)
+                    get_price_table().update_from_jupiter(tokens)
                     return tokens
                 else:
                     print(f"⚠️ 代币数据格式异常: {type(tokens)}")
@@ -132,6 +148,9 @@ class JupiterCrawler:
                 print(f"⚠️ 返回数据格式异常: {type(data)}")
                 return []
                 
+        except CircuitOpenError as e:
+            print(f"🔌 {e}")
+            return []
         except requests.exceptions.RequestException as e:
             print(f"❌ 网络请求失败: {e}")
             return []
@@ -241,13 +260,13 @@ class JupiterCrawler:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"jupiter_tokens_{timestamp}.json"
             
-            # 使用统一存储管理器
-            filepath = self.data_manager.get_file_path("jupiter", filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(tokens, f, indent=2, ensure_ascii=False)
+            # 使用统一存储管理器，由后台队列压缩写入
+            filepath = get_artifact_store().submit_json(self.data_manager.get_file_path("jupiter", filename), tokens)
+            if not filepath:
+                print("⚠️ 产物队列已满，本次代币数据未保存")
+                return ""
             
-            print(f"💾 代币数据已保存到: {filepath}")
+            print(f"💾 代币数据将保存到: {filepath}")
             return filepath
             
         except Exception as e:
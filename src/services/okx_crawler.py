@@ -8,12 +8,32 @@ import requests
 import json
 import time
 import random
-import os
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from ..utils.data_manager import DataManager
+from .infra_addresses import get_infra_address_index
+from .http_client import get_http_client, get_accept_encoding
+from .proxy_pool import get_proxy_pool
+from .data_providers import build_provider_chain
+from .wallet_cache import (
+    get_wallet_cache, normalize_freshness, freshness_max_age, FRESHNESS_REALTIME,
+    PORTFOLIO_FIRST_PAGE, PORTFOLIO_FULL,
+)
+from .price_table import get_price_table
+from .artifact_store import get_artifact_store
+from .analysis_archive import get_analysis_archive
+from .payload_parsers import slim_holders, slim_portfolio
+from .scheduler import current_job
+from .resilience import get_upstream, CircuitOpenError, RetryBudget, UPSTREAM_OKX_HOLDERS, UPSTREAM_OKX_WALLET
+from ..utils.json_codec import response_json
+from ..utils.metrics import get_metrics_registry
+from ..utils.tracing import span, traced, propagate, record_span, current_timings
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("okx_crawler")
 
 # SOL原生代币的合约地址
 SOL_TOKEN_ADDRESS = "So11111111111111111111111111111111111111111"
@@ -25,6 +45,196 @@ analysis_cache = {}
 CACHE_TTL = 3600  # 缓存1小时
 _cache_cleanup_started = False
 
+# 结果中为排名分析保留的持有者字段
+RANKING_HOLDER_FIELDS = ("holderWalletAddress", "holdAmount", "holdAmountPercentage", "holdVolume")
+
+# 多线程获取钱包资产时检查取消标志的间隔（秒）
+STOP_POLL_INTERVAL = 1.0
+
+# 钱包资产对冲请求（慢请求超过p90耗时后再发一次，先返回者胜出）
+HEDGE_MIN_SAMPLES = 20  # 至少积累多少个耗时样本后才启用对冲
+_hedge_executor = None
+_hedge_budget = None
+_hedge_lock = threading.Lock()
+hedge_stats = {"requests": 0, "hedged": 0, "hedge_won": 0, "budget_exhausted": 0}
+
+WALLET_FETCHES_IN_FLIGHT = get_metrics_registry().gauge(
+    "colana_bot_wallet_fetches_in_flight", "Wallet portfolio fetches currently waiting on upstream")
+# 分析各阶段耗时：holders / wallets / aggregate / persist / total
+ANALYSIS_STAGE_SECONDS = get_metrics_registry().histogram(
+    "colana_bot_analysis_stage_seconds", "Token holder analysis duration per stage", ["stage"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+
+
+@contextmanager
+def _analysis_stage(name: str):
+    """分析阶段：记录为追踪 span，同时计入阶段耗时指标"""
+    with span(name) as stage:
+        try:
+            yield stage
+        finally:
+            ANALYSIS_STAGE_SECONDS.labels(name).observe(time.perf_counter() - stage.start)
+
+
+def _get_hedge_settings() -> Dict:
+    """读取对冲请求和分析截止时间配置"""
+    return read_settings("analysis", {
+        "enabled": ("wallet_hedging_enabled", False),
+        "min_delay": ("wallet_hedge_min_delay", 1.0),
+        "budget_ratio": ("wallet_hedge_budget_ratio", 0.1),
+        "deadline": ("analysis_deadline_seconds", 120),
+        "max_workers": ("max_concurrent_threads", 5),
+        "pool_size": ("wallet_hedge_pool_size", 10),
+    })
+
+
+def _get_deep_scan_settings() -> Dict:
+    """读取深度扫描配置"""
+    return read_settings("analysis", {
+        "enabled": ("deep_scan_enabled", False),
+        "max_holders": ("deep_scan_max_holders", 500),
+        "holder_page_size": ("deep_scan_holder_page_size", 100),
+        "wallet_page_size": ("deep_scan_wallet_page_size", 50),
+        "wallet_max_pages": ("deep_scan_wallet_max_pages", 10),
+        "page_workers": ("deep_scan_page_workers", 3),
+        "max_tracked_tokens": ("deep_scan_max_tracked_tokens", 20000),
+        "max_detail_entries": ("deep_scan_max_detail_entries", 200000),
+    })
+
+
+def get_analyzed_holders_count(top_holders_count: int) -> int:
+    """实际分析的大户数量（开启深度扫描时提升到 deep_scan_max_holders），用于提示文字"""
+    settings = _get_deep_scan_settings()
+    if settings["enabled"]:
+        return max(top_holders_count, settings["max_holders"])
+    return top_holders_count
+
+
+# 分析结果只保留 持有人数>=TOP_TOKEN_MIN_HOLDERS 且 总价值>=TOP_TOKEN_MIN_VALUE 的代币
+TOP_TOKEN_MIN_VALUE = 50
+TOP_TOKEN_MIN_HOLDERS = 5
+
+
+def _portfolio_scope() -> str:
+    """当前获取钱包资产的范围：深度扫描取全部分页，否则只取第一页"""
+    return PORTFOLIO_FULL if _get_deep_scan_settings()["enabled"] else PORTFOLIO_FIRST_PAGE
+
+
+class HolderTokenAggregator:
+    """
+    流式统计大户持仓：每个钱包的资产处理完立即合并，不保留完整资产数据
+    设置 max_tracked_tokens / max_detail_entries 后，跟踪的代币数或大户持有明细条数超过上限时，
+    按持有人数、价值从低到高淘汰非目标代币（近似统计，内存有上限）
+    """
+
+    def __init__(self, target_token_address: str, max_tracked_tokens: int = 0, max_detail_entries: int = 0):
+        self.target_token_address = target_token_address
+        self.max_tracked_tokens = max_tracked_tokens
+        self.max_detail_entries = max_detail_entries
+        self.tokens: Dict[str, Dict] = {}
+        self.target_token_holders = set()  # 记录持有目标代币的大户地址
+        self.holder_count = 0
+        self.detail_entries = 0  # 所有代币 holders_details 的总条数
+        self.evicted_tokens = 0
+
+    def add_holder(self, rank: int, holder_address: str, top_tokens: List[Dict]) -> None:
+        """合并一个大户的持仓，每个大户每个代币只计算一次"""
+        # 先收集该大户的所有唯一代币（使用address作为键，可以区分同名代币）
+        holder_unique_tokens = {}
+        for token in top_tokens:
+            token_address = token["address"]
+            is_target = token_address == self.target_token_address
+            if is_target:
+                self.target_token_holders.add(holder_address)
+
+            unique = holder_unique_tokens.get(token_address)
+            if unique is None:
+                holder_unique_tokens[token_address] = {
+                    "symbol": token["symbol"],
+                    "name": token["name"],
+                    "chain": token["chain"],
+                    "address": token_address,
+                    "price_usd": token["price_usd"],
+                    "total_balance": token["balance"],
+                    "total_value_usd": token["value_usd"],
+                    "is_target_token": is_target,
+                }
+            else:
+                # 如果已存在，累加数值
+                unique["total_balance"] += token["balance"]
+                unique["total_value_usd"] += token["value_usd"]
+
+        # 统计到全局代币记录中
+        for token_address, token_data in holder_unique_tokens.items():
+            aggregate = self.tokens.get(token_address)
+            if aggregate is None:
+                aggregate = self.tokens[token_address] = {
+                    "symbol": token_data["symbol"],
+                    "name": token_data["name"],
+                    "chain": token_data["chain"],
+                    "address": token_data["address"],
+                    "price_usd": token_data["price_usd"],
+                    "total_value": 0,
+                    "holder_count": 0,
+                    "holders_details": [],
+                    "is_target_token": token_data["is_target_token"],
+                }
+            elif token_data["is_target_token"]:
+                aggregate["is_target_token"] = True
+
+            aggregate["total_value"] += token_data["total_value_usd"]
+            aggregate["holder_count"] += 1
+            # 添加大户持有详情
+            aggregate["holders_details"].append({
+                "holder_rank": rank,
+                "holder_address": holder_address,
+                "balance": token_data["total_balance"],
+                "value_usd": token_data["total_value_usd"],
+            })
+            self.detail_entries += 1
+
+        self.holder_count += 1
+        if ((self.max_tracked_tokens and len(self.tokens) > self.max_tracked_tokens) or
+                (self.max_detail_entries and self.detail_entries > self.max_detail_entries)):
+            self._evict()
+
+    def _evict(self) -> None:
+        """按持有人数、价值从低到高淘汰非目标代币，直到代币数和明细条数都降到上限的80%"""
+        keep_tokens = int(self.max_tracked_tokens * 0.8) if self.max_tracked_tokens else None
+        keep_details = int(self.max_detail_entries * 0.8) if self.max_detail_entries else None
+        candidates = sorted(
+            (token for token in self.tokens.values() if not token["is_target_token"]),
+            key=lambda token: (token["holder_count"], token["total_value"]),
+        )
+        for token in candidates:
+            if ((keep_tokens is None or len(self.tokens) <= keep_tokens) and
+                    (keep_details is None or self.detail_entries <= keep_details)):
+                break
+            del self.tokens[token["address"]]
+            self.detail_entries -= len(token["holders_details"])
+            self.evicted_tokens += 1
+
+    def top_tokens(self, min_value: float = 50, min_holders: int = 5) -> List[Dict]:
+        """持有人数>=min_holders 且 总价值>=min_value 的代币，按总价值排序"""
+        filtered_tokens = [token for token in self.tokens.values()
+                           if token["total_value"] >= min_value and token["holder_count"] >= min_holders]
+        return sorted(filtered_tokens, key=lambda x: x["total_value"], reverse=True)
+
+
+def _get_hedge_pool(settings: Dict):
+    """
+    获取共享的对冲线程池和预算
+    多线程分析使用各自的对冲线程池，共享池只服务单线程模式等零散调用，大小独立配置（wallet_hedge_pool_size）
+    """
+    global _hedge_executor, _hedge_budget
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=max(2, settings["pool_size"]), thread_name_prefix="WalletHedge"
+            )
+            _hedge_budget = RetryBudget(ratio=settings["budget_ratio"], min_retries=2)
+    return _hedge_executor, _hedge_budget
+
 
 def start_cache_cleanup():
     """启动缓存清理线程（全局单例）"""
@@ -105,12 +315,16 @@ class OKXCrawlerForBot:
 
     def __init__(self):
         """初始化爬虫"""
-        self.session = requests.Session()
+        self.http_client = get_http_client()
+        self.last_missing_wallets = []
+        self.last_stopped = False  # 最近一次分析是否因任务取消而提前结束
+        self.holders_upstream = get_upstream(UPSTREAM_OKX_HOLDERS)
+        self.wallet_upstream = get_upstream(UPSTREAM_OKX_WALLET)
 
         # 基础请求头 - 模拟真实浏览器
         self.headers = {
             "accept": "application/json",
-            "accept-encoding": "gzip, deflate, br, zstd",
+            "accept-encoding": get_accept_encoding(),
             "accept-language": "en-US,en;q=0.9,zh-HK;q=0.8,zh-CN;q=0.7,zh;q=0.6,es-MX;q=0.5,es;q=0.4,ru-RU;q=0.3,ru;q=0.2",
             "app-type": "web",
             "cache-control": "no-cache",
@@ -127,24 +341,22 @@ class OKXCrawlerForBot:
             "x-cdn": "https://web3.okx.com",
         }
 
-        # 确保日志目录存在
         self.data_manager = DataManager()
-        self.log_dir = self.data_manager.get_file_path("logs", "okx_crawler.log").parent
 
-    def log_info(self, message):
-        """记录信息到日志文件"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
+        # 自动学习的基础设施地址索引
+        self.infra_index = get_infra_address_index()
 
-        # 写入到日志文件
-        log_file = os.path.join(
-            self.log_dir, f"okx_crawler_{datetime.now().strftime('%Y%m%d')}.log"
-        )
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(log_message)
+        # 本次分析用到的最旧数据时间和命中本地缓存的钱包数
+        self._freshness_lock = threading.Lock()
+        self.oldest_data_at = None
+        self.cached_wallet_count = 0
 
-        # 也打印到控制台
-        print(f"[OKX] {message}")
+        # 持有者/钱包资产数据源（默认只有 okx_web，即本类的请求逻辑）
+        self.data_source = build_provider_chain(self)
+
+    def log_info(self, message, *args):
+        """记录信息日志（经日志队列写入 okx_crawler 日志文件和控制台，不在调用线程中做文件 I/O）"""
+        logger.info(message, *args)
 
     def get_token_holders(
         self, token_address: str, chain_id: str = "501", max_retries: int = 3
@@ -154,19 +366,37 @@ class OKXCrawlerForBot:
         """
         self.log_info(f"开始获取代币持有者: {token_address}")
 
-        for attempt in range(1, max_retries + 1):
-            if attempt > 1:
-                self.log_info(f"重试获取持有者信息... (尝试 {attempt}/{max_retries})")
+        holders = self._fetch_holders_page(token_address, chain_id, max_retries)
+        if not holders:
+            return []
 
-            current_timestamp = str(int(time.time() * 1000))
+        # 使用配置文件中的数量设置
+        try:
+            from ..core.config import get_config
+
+            config = get_config()
+            return holders[: config.analysis.top_holders_count]
+        except ImportError:
+            return holders[:20]  # 回退到默认值
+
+    def _fetch_holders_page(
+        self, token_address: str, chain_id: str = "501", max_retries: int = 3,
+        offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """获取一页持有者排行（offset/limit 为空时使用接口默认的第一页）"""
+        url = "https://web3.okx.com/priapi/v1/dx/market/v2/holders/ranking-list"
 
-            url = "https://web3.okx.com/priapi/v1/dx/market/v2/holders/ranking-list"
+        def send(timeout=30):
+            # 每次尝试都刷新请求时间戳
+            current_timestamp = str(int(time.time() * 1000))
             params = {
                 "chainId": chain_id,
                 "tokenAddress": token_address,
                 "currentUserWalletAddress": "0xa6b67e6f61dba6363b36bbcef80d971a6d1f0ce5",
                 "t": current_timestamp,
             }
+            if limit:
+                params.update({"offset": offset, "limit": limit})
 
             # 合并真实请求头
             headers = self.headers.copy()
@@ -178,91 +408,151 @@ class OKXCrawlerForBot:
                     "referer": f"https://web3.okx.com/token/solana/{token_address}",
                 }
             )
+            return self.http_client.get(url, params=params, headers=headers, timeout=timeout)
+
+        try:
+            # 429/5xx 和网络异常由重试策略处理（退避、Retry-After、熔断）
+            response = self.holders_upstream.call(send, max_attempts=max_retries, timeout=30)
+        except CircuitOpenError as e:
+            self.log_info(str(e))
+            return []
+        except requests.exceptions.RequestException as e:
+            self.log_info(f"请求异常: {str(e)}")
+            self.log_info("获取持有者信息失败")
+            return []
 
+        if response.status_code == 200:
             try:
-                response = self.session.get(url, params=params, headers=headers, timeout=30)
+                data = response_json(response)
+
+                # 原始的holderRankingList响应原文提交后台保存（压缩写入，不阻塞请求，不重新序列化）
+                if data.get("code") == 0:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    page_suffix = f"_offset{offset}" if offset else ""
+                    raw_data_file = get_artifact_store().submit_bytes(self.data_manager.get_file_path(
+                        "holders", f"holders_raw_{token_address}_{timestamp}{page_suffix}.json"
+                    ), response.content)
+                    if raw_data_file:
+                        self.log_info(f"原始持有者数据将保存到: {raw_data_file}")
+
+                if data.get("code") == 0:
+                    holders_data = data.get("data", {})
+
+                    # 尝试不同的数据路径
+                    holders = []
+                    if isinstance(holders_data, dict):
+                        # 尝试多个可能的键名
+                        possible_keys = [
+                            "holderRankingList",
+                            "data",
+                            "holders",
+                            "list",
+                            "ranking",
+                        ]
+                        for key in possible_keys:
+                            if key in holders_data and isinstance(holders_data[key], list):
+                                holders = holders_data[key]
+                                break
+
+                    if holders:
+                        self.log_info(f"成功获取到 {len(holders)} 个持有者")
+                        # 只保留排除判断和排名分析用到的字段
+                        return slim_holders(holders)
+                    else:
+                        self.log_info("未找到持有者数据")
+                        return []
+                else:
+                    self.log_info(f"API返回错误: {data.get('msg', '未知错误')}")
 
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
+            except json.JSONDecodeError as e:
+                self.log_info(f"JSON解析失败: {str(e)}")
 
-                        # 保存原始的holderRankingList数据到日志文件
-                        if data.get("code") == 0:
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            raw_data_file = self.data_manager.get_file_path(
-                                "holders", f"holders_raw_{token_address}_{timestamp}.json"
-                            )
-                            with open(raw_data_file, "w", encoding="utf-8") as f:
-                                json.dump(data, f, ensure_ascii=False, indent=2)
-                            self.log_info(f"原始持有者数据已保存到: {raw_data_file}")
-
-                        if data.get("code") == 0:
-                            holders_data = data.get("data", {})
-
-                            # 尝试不同的数据路径
-                            holders = []
-                            if isinstance(holders_data, dict):
-                                # 尝试多个可能的键名
-                                possible_keys = [
-                                    "holderRankingList",
-                                    "data",
-                                    "holders",
-                                    "list",
-                                    "ranking",
-                                ]
-                                for key in possible_keys:
-                                    if key in holders_data and isinstance(holders_data[key], list):
-                                        holders = holders_data[key]
-                                        break
-
-                            if holders:
-                                self.log_info(f"成功获取到 {len(holders)} 个持有者")
-                                # 使用配置文件中的数量设置
-                                try:
-                                    from ..core.config import get_config
-
-                                    config = get_config()
-                                    return holders[: config.analysis.top_holders_count]
-                                except ImportError:
-                                    return holders[:20]  # 回退到默认值
-                            else:
-                                self.log_info("未找到持有者数据")
-                                return []
-                        else:
-                            self.log_info(f"API返回错误: {data.get('msg', '未知错误')}")
-
-                    except json.JSONDecodeError as e:
-                        self.log_info(f"JSON解析失败: {str(e)}")
+        else:
+            self.log_info(f"HTTP错误 {response.status_code}")
 
-                else:
-                    self.log_info(f"HTTP错误 {response.status_code}")
-
-                # 根据状态码决定是否重试
-                if response.status_code in [429, 500, 502, 503, 504]:
-                    if attempt < max_retries:
-                        delay = random.uniform(2, 5)
-                        self.log_info(f"等待 {delay:.1f} 秒后重试...")
-                        time.sleep(delay)
-                        continue
+        self.log_info("获取持有者信息失败")
+        return []
 
+    def get_token_holders_deep(self, token_address: str, chain_id: str = "501",
+                               max_holders: int = 500) -> List[Dict]:
+        """
+        深度扫描：第一页之后的持有者分页并行获取（受上游限速和代理出口令牌桶约束），按排名顺序合并去重
+        某一页不足一页或没有新地址（接口忽略分页参数）时停止合并
+        """
+        settings = _get_deep_scan_settings()
+        page_size = settings["holder_page_size"]
+        self.log_info(f"开始深度获取代币持有者: {token_address} (最多 {max_holders} 个)")
+
+        holders = self._fetch_holders_page(token_address, chain_id, offset=0, limit=page_size)
+        seen = {holder.get("holderWalletAddress", "") for holder in holders}
+        offsets = list(range(page_size, max_holders, page_size))
+        if len(holders) < page_size or not offsets:
+            return holders[:max_holders]
+
+        with ThreadPoolExecutor(max_workers=min(len(offsets), settings["page_workers"])) as executor:
+            pages = list(executor.map(
+                lambda page_offset: self._fetch_holders_page(token_address, chain_id, offset=page_offset, limit=page_size),
+                offsets,
+            ))
+
+        for page in pages:
+            new_holders = [holder for holder in page if holder.get("holderWalletAddress", "") not in seen]
+            if not new_holders:
+                break
+            seen.update(holder.get("holderWalletAddress", "") for holder in new_holders)
+            holders.extend(new_holders)
+            if len(page) < page_size:
                 break
 
-            except requests.exceptions.RequestException as e:
-                self.log_info(f"请求异常: {str(e)}")
-                if attempt < max_retries:
-                    delay = random.uniform(2, 5)
-                    self.log_info(f"等待 {delay:.1f} 秒后重试...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    break
+        self.log_info(f"深度扫描获取到 {len(holders)} 个持有者 ({len(pages) + 1} 页)")
+        return holders[:max_holders]
 
-        self.log_info("获取持有者信息失败")
-        return []
+    def fetch_token_holders(self, token_address: str, chain_id: str = "501") -> List[Dict]:
+        """获取持有者排行，开启深度扫描时获取多页"""
+        settings = _get_deep_scan_settings()
+        if settings["enabled"]:
+            return self.get_token_holders_deep(token_address, chain_id, max_holders=settings["max_holders"])
+        return self.get_token_holders(token_address, chain_id=chain_id)
 
-    def get_wallet_assets(self, wallet_address: str) -> Dict:
+    def get_wallet_portfolio_deep(self, wallet_address: str, force_refresh: bool = True) -> Dict:
         """
-        获取钱包资产组合信息
+        深度扫描：获取钱包完整持仓，第一页满页时并行获取后续分页并合并 tokenlist
+        """
+        settings = _get_deep_scan_settings()
+        page_size = settings["wallet_page_size"]
+        assets_data = self.get_wallet_assets(wallet_address, page=1, limit=page_size, force_refresh=force_refresh)
+        token_list = assets_data.get("tokens", {}).get("tokenlist", []) if assets_data else []
+        if len(token_list) < page_size:
+            return assets_data
+
+        next_page = 2
+        while next_page <= settings["wallet_max_pages"]:
+            batch = list(range(next_page, min(next_page + settings["page_workers"], settings["wallet_max_pages"] + 1)))
+            with ThreadPoolExecutor(max_workers=len(batch)) as executor:
+                pages = list(executor.map(
+                    lambda page: self.get_wallet_assets(wallet_address, page=page, limit=page_size,
+                                                        force_refresh=force_refresh),
+                    batch,
+                ))
+            for page_data in pages:
+                page_tokens = page_data.get("tokens", {}).get("tokenlist", []) if page_data else []
+                token_list.extend(page_tokens)
+                if len(page_tokens) < page_size:
+                    return assets_data
+            next_page += len(batch)
+        return assets_data
+
+    def fetch_wallet_portfolio(self, wallet_address: str, force_refresh: bool = True) -> Dict:
+        """获取钱包资产，开启深度扫描时获取全部分页"""
+        if _get_deep_scan_settings()["enabled"]:
+            return self.get_wallet_portfolio_deep(wallet_address, force_refresh=force_refresh)
+        return self.get_wallet_assets(wallet_address, force_refresh=force_refresh)
+
+    def get_wallet_assets(self, wallet_address: str, page: int = 1, limit: int = 10,
+                          force_refresh: bool = True) -> Dict:
+        """
+        获取钱包资产组合信息（默认只取第一页10个代币）
+        force_refresh 为 True 时要求OKX重新计算持仓（较慢），否则接受OKX的缓存结果
         """
         self.log_info(f"获取钱包资产: {wallet_address[:8]}...{wallet_address[-6:]}")
 
@@ -276,9 +566,9 @@ class OKXCrawlerForBot:
             "userUniqueId": "",
             "hideValueless": False,
             "address": wallet_address,
-            "forceRefresh": True,
-            "page": 1,
-            "limit": 10,
+            "forceRefresh": force_refresh,
+            "page": page,
+            "limit": limit,
             "chainIndexes": [],
         }
 
@@ -304,92 +594,209 @@ class OKXCrawlerForBot:
         cookie_str = "devId=01980a38-038a-44d9-8da3-a8276bbcb5b9; locale=en_US"
         headers["cookie"] = cookie_str
 
-        try:
-            response = self.session.post(
-                url, params=params, json=payload, headers=headers, timeout=30
+        def send(timeout=30):
+            # 重试时刷新请求时间戳
+            current_timestamp = str(int(time.time() * 1000))
+            params["t"] = current_timestamp
+            headers["x-request-timestamp"] = current_timestamp
+            return self.http_client.post(
+                url, params=params, json=payload, headers=headers, timeout=timeout
             )
 
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-
-                    if data.get("code") == 0:
-                        assets_data = data.get("data", {})
-                        tokens_info = assets_data.get("tokens", {})
-                        token_list = tokens_info.get("tokenlist", [])
-
-                        if token_list:
-                            # 计算总价值
-                            total_value = 0
-                            for token in token_list:
-                                try:
-                                    value = float(token.get("currencyAmount", 0) or 0)
-                                    total_value += value
-                                except (ValueError, TypeError):
-                                    continue
-
-                            self.log_info(
-                                f"获取到资产信息: ${total_value:,.2f} (包含 {len(token_list)} 个代币)"
-                            )
-                        else:
-                            self.log_info("未找到代币列表")
+        parsed = {}
 
-                        return assets_data
+        def body_error(response) -> Optional[str]:
+            """HTTP 200 但内容无效（解析失败、code 非0、缺少 data）时要求重试，解析结果留给下面复用"""
+            if response.status_code != 200:
+                return None
+            try:
+                parsed["data"] = response_json(response)
+            except ValueError as e:
+                return f"JSON解析失败: {e}"
+            if parsed["data"].get("code") != 0:
+                return f"API返回错误: {parsed['data'].get('msg', '未知错误')}"
+            if not parsed["data"].get("data"):
+                return "返回数据为空"
+            return None
+
+        try:
+            # 429/5xx、网络异常和无效响应内容由重试策略处理（退避、Retry-After、熔断）
+            response = self.wallet_upstream.call(send, timeout=30, retry_if=body_error)
+
+            if response.status_code == 200:
+                data = parsed.get("data")
+                if data is None:
+                    self.log_info("JSON解析失败")
+                elif data.get("code") == 0:
+                    # 只保留代币提取和价格表用到的字段
+                    assets_data = slim_portfolio(data.get("data", {}))
+                    tokens_info = assets_data.get("tokens", {})
+                    token_list = tokens_info.get("tokenlist", [])
+
+                    if token_list:
+                        # 计算总价值
+                        total_value = 0
+                        for token in token_list:
+                            try:
+                                value = float(token.get("currencyAmount", 0) or 0)
+                                total_value += value
+                            except (ValueError, TypeError):
+                                continue
+
+                        self.log_info(
+                            f"获取到资产信息: ${total_value:,.2f} (包含 {len(token_list)} 个代币)"
+                        )
                     else:
-                        self.log_info(f"API返回错误: {data.get('msg', '未知错误')}")
+                        self.log_info("未找到代币列表")
 
-                except json.JSONDecodeError as e:
-                    self.log_info(f"JSON解析失败: {str(e)}")
+                    return assets_data
+                else:
+                    self.log_info(f"API返回错误: {data.get('msg', '未知错误')}")
             else:
                 self.log_info(f"HTTP错误 {response.status_code}")
 
+        except CircuitOpenError as e:
+            self.log_info(str(e))
         except requests.exceptions.RequestException as e:
             self.log_info(f"请求异常: {str(e)}")
 
         return {}
 
-    def get_wallet_assets_threaded(self, wallet_addresses: List[str], max_workers: int = 10) -> Dict[str, Dict]:
+    def get_wallet_assets_hedged(self, wallet_address: str, force_refresh: bool = True,
+                                 executor: Optional[ThreadPoolExecutor] = None) -> Dict:
+        """
+        获取钱包资产，请求耗时超过近期p90时发起一次对冲请求，先返回有效数据者胜出
+        对冲次数受预算限制（默认不超过请求数的10%），未开启或样本不足时等同于 get_wallet_assets
+
+        Args:
+            executor: 执行主请求和对冲请求的线程池（多线程分析传入各自的线程池），默认使用共享池
+        """
+        settings = _get_hedge_settings()
+        # 按当前首选数据源自己的上游耗时计算阈值；本地数据源（fixture）不对冲
+        upstream = self.data_source.active_upstream("portfolio")
+        if not settings["enabled"] or upstream is None or upstream.latency.count() < HEDGE_MIN_SAMPLES:
+            return self.data_source.get_wallet_portfolio(wallet_address, force_refresh)
+        latency = upstream.latency
+
+        shared_executor, budget = _get_hedge_pool(settings)
+        executor = executor or shared_executor
+        budget.record_request()
+        hedge_stats["requests"] += 1
+        hedge_delay = max(settings["min_delay"], latency.percentile(0.9))
+
+        fetch = propagate(self.data_source.get_wallet_portfolio)
+        primary_started = threading.Event()
+
+        def run_primary():
+            primary_started.set()
+            return fetch(wallet_address, force_refresh)
+
+        primary = executor.submit(run_primary)
+        # 对冲计时从主请求真正开始执行时算起，线程池排队时间不计入（排队慢不代表上游慢）
+        primary_started.wait()
+        try:
+            return primary.result(timeout=hedge_delay)
+        except FuturesTimeoutError:
+            pass
+
+        if upstream.is_open() or not budget.try_acquire():
+            hedge_stats["budget_exhausted"] += 1
+            return primary.result()
+
+        hedge_stats["hedged"] += 1
+        self.log_info(f"钱包 {wallet_address[:8]}...{wallet_address[-6:]} 超过p90耗时 {hedge_delay:.1f}s，发起对冲请求")
+        hedge = executor.submit(fetch, wallet_address, force_refresh)
+        for future in as_completed([primary, hedge]):
+            assets_data = future.result()
+            if assets_data:
+                if future is hedge:
+                    hedge_stats["hedge_won"] += 1
+                return assets_data
+        return {}
+
+    def _record_data_time(self, fetched_at: float, from_cache: bool) -> None:
+        """记录本次分析用到的最旧数据时间"""
+        with self._freshness_lock:
+            if self.oldest_data_at is None or fetched_at < self.oldest_data_at:
+                self.oldest_data_at = fetched_at
+            if from_cache:
+                self.cached_wallet_count += 1
+
+    def get_cached_wallet_portfolio(self, wallet_address: str, freshness: str) -> Dict:
+        """按新鲜度等级读取本地钱包缓存（按共享价格表重估价值），不可用时返回空字典"""
+        assets_data, fetched_at = get_wallet_cache().get(
+            wallet_address, freshness_max_age(freshness), scope=_portfolio_scope()
+        )
+        if not assets_data:
+            return {}
+        self._record_data_time(fetched_at, from_cache=True)
+        return get_price_table().revalue_portfolio(assets_data)
+
+    def fetch_wallet_portfolio_for(self, wallet_address: str, freshness: str,
+                                   hedge_executor: Optional[ThreadPoolExecutor] = None) -> Dict:
+        """按新鲜度等级向上游获取钱包资产（realtime 强制刷新），成功后写入本地缓存"""
+        with span("wallet_fetch"), WALLET_FETCHES_IN_FLIGHT.track_inprogress():
+            assets_data = self.get_wallet_assets_hedged(
+                wallet_address, force_refresh=freshness == FRESHNESS_REALTIME, executor=hedge_executor
+            )
+        if assets_data:
+            fetched_at = time.time()
+            get_wallet_cache().put(wallet_address, assets_data, fetched_at, scope=_portfolio_scope())
+            get_price_table().update_from_portfolio(assets_data)
+            self._record_data_time(fetched_at, from_cache=False)
+        return assets_data
+
+    def get_wallet_assets_threaded(self, wallet_addresses: List[str], max_workers: int = 10,
+                                   deadline: Optional[float] = None,
+                                   on_result: Optional[Callable[[str, Dict], None]] = None,
+                                   freshness: str = FRESHNESS_REALTIME,
+                                   should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Dict]:
         """
         使用多线程并发获取多个钱包的资产组合信息
         
         Args:
             wallet_addresses: 钱包地址列表
             max_workers: 最大线程数，默认10个
+            deadline: 截止时间（time.time() 时间戳），到期仍未返回的钱包记入 self.last_missing_wallets
+            on_result: 每个钱包返回时在调用线程中回调 (wallet_address, assets_data)，
+                       传入后结果不再汇总到返回值中（流式处理，内存不随钱包数增长）
+            freshness: 数据新鲜度等级（realtime / recent / archival），命中本地缓存的钱包不发请求
+            should_stop: 返回 True 时放弃尚未完成的钱包（调度任务被取消），每批结果之间检查一次
             
         Returns:
-            Dict: {wallet_address: assets_data} 格式的结果字典
+            Dict: {wallet_address: assets_data} 格式的结果字典（传入 on_result 时为空）
         """
+        self.last_missing_wallets = []
+        self.last_stopped = False
         results = {}
+        successful_count = 0
         results_lock = threading.Lock()
-        request_semaphore = threading.Semaphore(max_workers)  # 控制并发请求数
+        # 配置代理出口池时由各出口的令牌桶限速，线程数随可用出口数扩展
+        egress_count = get_proxy_pool().healthy_count() if get_proxy_pool().is_enabled_for("web3.okx.com") else 0
+        request_semaphore = threading.Semaphore(max(max_workers, 5 * egress_count))  # 控制并发请求数
         
-        def fetch_single_wallet(wallet_address: str) -> tuple:
-            """获取单个钱包资产的线程函数"""
-            max_retries = 3
-            for attempt in range(max_retries):
-                with request_semaphore:  # 限制并发数
-                    try:
-                        # 添加随机延迟避免过于频繁的请求
-                        time.sleep(random.uniform(0.5, 1.5))
-                        assets_data = self.get_wallet_assets(wallet_address)
-                        
-                        # 如果成功获取数据，直接返回
-                        if assets_data:
-                            return wallet_address, assets_data
-                        elif attempt < max_retries - 1:
-                            # 如果失败但还有重试机会，等待更长时间
-                            time.sleep(random.uniform(2, 5))
-                            
-                    except Exception as e:
-                        if "429" in str(e) and attempt < max_retries - 1:
-                            # 遇到429错误，等待更长时间后重试
-                            wait_time = (attempt + 1) * 5 + random.uniform(0, 5)
-                            self.log_info(f"钱包 {wallet_address[:8]}...{wallet_address[-6:]} 遇到频率限制，等待 {wait_time:.1f}s 后重试")
-                            time.sleep(wait_time)
-                            continue
-                        else:
-                            self.log_info(f"线程获取钱包 {wallet_address[:8]}...{wallet_address[-6:]} 资产失败: {str(e)}")
-                            break
+        def fetch_single_wallet(wallet_address: str, submitted_at: float) -> tuple:
+            """获取单个钱包资产的线程函数（重试由 wallet_upstream 的策略处理）"""
+            record_span("wallet_queue", submitted_at)
+            if should_stop is not None and should_stop():
+                return wallet_address, {}
+            cached = self.get_cached_wallet_portfolio(wallet_address, freshness)
+            if cached:
+                return wallet_address, cached
+
+            # 所有数据源都在熔断中直接跳过，不占用线程等待
+            if not self.data_source.is_available("portfolio"):
+                return wallet_address, {}
+
+            with request_semaphore:  # 限制并发数
+                try:
+                    if not egress_count and self.data_source.uses_network("portfolio"):
+                        # 单一出口：添加随机延迟避免过于频繁的请求
+                        with span("pacing_sleep"):
+                            time.sleep(random.uniform(0.5, 1.5))
+                    return wallet_address, self.fetch_wallet_portfolio_for(wallet_address, freshness, hedge_executor)
+                except Exception as e:
+                    self.log_info(f"线程获取钱包 {wallet_address[:8]}...{wallet_address[-6:]} 资产失败: {str(e)}")
             
             return wallet_address, {}
         
@@ -397,39 +804,75 @@ class OKXCrawlerForBot:
         start_time = time.time()
         
         # 调整线程数：如果钱包数量少于设定的线程数，减少线程数避免过度并发
-        actual_workers = min(max_workers, len(wallet_addresses), 5)  # 最多5个线程避免频率限制
-        self.log_info(f"实际使用 {actual_workers} 个线程（避免频率限制）")
+        if egress_count:
+            actual_workers = min(max(max_workers, 5 * egress_count), len(wallet_addresses))
+            self.log_info(f"实际使用 {actual_workers} 个线程（{egress_count} 个代理出口分摊请求）")
+        else:
+            actual_workers = min(max_workers, len(wallet_addresses), 5)  # 最多5个线程避免频率限制
+            self.log_info(f"实际使用 {actual_workers} 个线程（避免频率限制）")
         
-        # 使用线程池执行器
-        with ThreadPoolExecutor(max_workers=actual_workers) as executor:
+        # 使用线程池执行器（不使用 with，截止时间到达后不等待剩余的慢请求）
+        executor = ThreadPoolExecutor(max_workers=actual_workers)
+        # 本次分析专用的对冲线程池：每个钱包线程同时最多一个主请求和一个对冲请求，
+        # 主请求不会因其他分析占满线程池而排队，分析间的并发互不限制
+        hedge_executor = None
+        if _get_hedge_settings()["enabled"]:
+            hedge_executor = ThreadPoolExecutor(max_workers=actual_workers * 2, thread_name_prefix="WalletHedge")
+        try:
             # 提交所有任务
+            fetch = propagate(fetch_single_wallet)
             future_to_address = {
-                executor.submit(fetch_single_wallet, addr): addr 
+                executor.submit(fetch, addr, time.perf_counter()): addr
                 for addr in wallet_addresses
             }
             
-            # 收集结果
+            # 收集结果：按批等待，批次之间检查截止时间和取消标志
             completed_count = 0
-            for future in as_completed(future_to_address):
-                try:
-                    wallet_address, assets_data = future.result(timeout=120)  # 120秒超时
-                    
-                    with results_lock:
-                        results[wallet_address] = assets_data
+            pending = set(future_to_address)
+            while pending:
+                if should_stop is not None and should_stop():
+                    self.last_stopped = True
+                    self.last_missing_wallets = [future_to_address[future] for future in pending]
+                    self.log_info(f"🛑 分析任务已取消，放弃 {len(pending)} 个未返回的钱包")
+                    break
+                remaining_time = deadline - time.time() if deadline else None
+                if remaining_time is not None and remaining_time <= 0:
+                    self.last_missing_wallets = [future_to_address[future] for future in pending]
+                    self.log_info(f"⏰ 已到分析截止时间，{len(self.last_missing_wallets)} 个钱包未返回，按缺失处理")
+                    break
+                wait_time = STOP_POLL_INTERVAL if remaining_time is None else min(STOP_POLL_INTERVAL, remaining_time)
+                done, pending = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        # 处理完即释放 Future，避免所有钱包的资产数据同时驻留内存
+                        future_to_address.pop(future, None)
+                        wallet_address, assets_data = future.result()
+                        if assets_data:
+                            successful_count += 1
+
+                        if on_result is not None:
+                            on_result(wallet_address, assets_data)
+                        else:
+                            with results_lock:
+                                results[wallet_address] = assets_data
                         completed_count += 1
-                        
-                    if completed_count % 10 == 0:  # 每完成10个打印一次进度
-                        elapsed = time.time() - start_time
-                        rate = completed_count / elapsed if elapsed > 0 else 0
-                        remaining = len(wallet_addresses) - completed_count
-                        eta = remaining / rate if rate > 0 else 0
-                        self.log_info(f"已完成 {completed_count}/{len(wallet_addresses)} 个钱包 (速度: {rate:.1f}/s, 预计剩余: {eta:.0f}s)")
-                        
-                except Exception as e:
-                    self.log_info(f"获取钱包资产时出现异常: {str(e)}")
+                            
+                        if completed_count % 10 == 0:  # 每完成10个打印一次进度
+                            elapsed = time.time() - start_time
+                            rate = completed_count / elapsed if elapsed > 0 else 0
+                            remaining = len(wallet_addresses) - completed_count
+                            eta = remaining / rate if rate > 0 else 0
+                            self.log_info(f"已完成 {completed_count}/{len(wallet_addresses)} 个钱包 (速度: {rate:.1f}/s, 预计剩余: {eta:.0f}s)")
+                            
+                    except Exception as e:
+                        self.log_info(f"获取钱包资产时出现异常: {str(e)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if hedge_executor is not None:
+                # 输掉的对冲请求在后台完成，不阻塞分析
+                hedge_executor.shutdown(wait=False)
         
         elapsed_time = time.time() - start_time
-        successful_count = len([data for data in results.values() if data])
         average_rate = len(wallet_addresses) / elapsed_time if elapsed_time > 0 else 0
         
         self.log_info(f"多线程资产获取完成: 成功 {successful_count}/{len(wallet_addresses)} 个钱包")
@@ -492,27 +935,39 @@ class OKXCrawlerForBot:
         all_tokens.sort(key=lambda x: x["value_usd"], reverse=True)
         return all_tokens
 
-    def is_excluded_holder(self, holder: Dict) -> bool:
-        """
-        判断持有者是否应该被排除（流动性池、交易所等）
-        """
-        # 获取钱包地址
-        wallet_address = holder.get("holderWalletAddress", "")
-        
-        # 检查是否为已知的池子地址（即使OKX没有标记也要排除）
+    def _get_known_pools(self) -> set:
+        """获取已知池子地址集合（每次分析只读取一次配置）"""
         try:
             from ..core.config import get_config
             config = get_config()
-            known_pools = getattr(config.analysis, 'known_pool_addresses', [])
-            if wallet_address in known_pools:
-                self.log_info(f"识别到已知池子地址: {wallet_address[:8]}...{wallet_address[-6:]}")
-                return True
+            return set(getattr(config.analysis, 'known_pool_addresses', None) or [])
         except (ImportError, AttributeError):
             # 回退到硬编码的已知池子地址
-            known_pools = ["5Q544fKrFoe6tsEbD7S8EmxGTJYAKtTVhAW5Q5pge4j1"]
-            if wallet_address in known_pools:
-                self.log_info(f"识别到已知池子地址: {wallet_address[:8]}...{wallet_address[-6:]}")
-                return True
+            return {"5Q544fKrFoe6tsEbD7S8EmxGTJYAKtTVhAW5Q5pge4j1"}
+
+    def is_excluded_holder(self, holder: Dict, known_pools: Optional[set] = None) -> bool:
+        """
+        判断持有者是否应该被排除（流动性池、交易所、已学习的基础设施地址等）
+
+        Args:
+            holder: 持有者数据
+            known_pools: 预先构建的已知池子地址集合，不传则现场读取配置
+        """
+        # 获取钱包地址
+        wallet_address = holder.get("holderWalletAddress", "")
+
+        if known_pools is None:
+            known_pools = self._get_known_pools()
+
+        # 检查是否为已知的池子地址（即使OKX没有标记也要排除）
+        if wallet_address in known_pools:
+            self.log_info(f"识别到已知池子地址: {wallet_address[:8]}...{wallet_address[-6:]}")
+            return True
+
+        # 检查是否为自动学习到的基础设施地址
+        if self.infra_index.is_excluded(wallet_address):
+            self.log_info(f"识别到基础设施地址: {wallet_address[:8]}...{wallet_address[-6:]}")
+            return True
         
         # 检查 holderTagVO
         holder_tag_vo = holder.get("holderTagVO", {})
@@ -537,7 +992,9 @@ class OKXCrawlerForBot:
         
         return False
 
-    def analyze_token_holders(self, token_address: str, top_holders_count: int = None, use_threading: bool = True) -> Dict:
+    @traced("analyze_token_holders")
+    def analyze_token_holders(self, token_address: str, top_holders_count: int = None, use_threading: bool = True,
+                              freshness: Optional[str] = None) -> Dict:
         """
         分析代币大户并返回代币统计信息
         专门为Bot优化，只返回必要的信息
@@ -546,6 +1003,7 @@ class OKXCrawlerForBot:
             token_address: 代币合约地址
             top_holders_count: 分析的前N名大户数量
             use_threading: 是否使用多线程加速资产获取，默认True
+            freshness: 钱包数据新鲜度等级（realtime / recent / archival），默认读取 analysis.freshness_tier
         """
         # 如果没有提供参数，从配置文件获取
         if top_holders_count is None:
@@ -558,8 +1016,38 @@ class OKXCrawlerForBot:
                 top_holders_count = 20  # 回退到默认值
         self.log_info(f"开始分析代币: {token_address}")
 
+        if freshness is None:
+            try:
+                from ..core.config import get_config
+                freshness = getattr(get_config().analysis, "freshness_tier", FRESHNESS_REALTIME)
+            except ImportError:
+                freshness = FRESHNESS_REALTIME
+        freshness = normalize_freshness(freshness)
+        self.oldest_data_at = None
+        self.cached_wallet_count = 0
+        holders_fetched_at = time.time()
+        analysis_started = time.perf_counter()
+
+        # 深度扫描时分析更多大户；基础设施地址学习仍只记录常规排名范围，避免长尾地址干扰
+        deep_settings = _get_deep_scan_settings()
+        learn_count = top_holders_count
+        if deep_settings["enabled"]:
+            top_holders_count = max(top_holders_count, deep_settings["max_holders"])
+
+        # 整个分析的截止时间，到期仍未返回的钱包按缺失处理，避免个别慢请求拖住整次分析；
+        # 在调度任务中运行时同时受任务截止时间约束，任务被取消时放弃剩余钱包
+        deadline_seconds = _get_hedge_settings()["deadline"]
+        deadline = time.time() + deadline_seconds if deadline_seconds else None
+        job = current_job()
+        if job is not None and job.deadline is not None:
+            deadline = min(deadline, job.deadline) if deadline else job.deadline
+        should_stop = (lambda: job.cancelled) if job is not None else None
+        self.last_missing_wallets = []
+        self.last_stopped = False
+
         # 1. 获取持有者排行榜
-        holders = self.get_token_holders(token_address)
+        with _analysis_stage("holders"):
+            holders = self.data_source.get_token_holders(token_address)
 
         if not holders:
             self.log_info("无法获取持有者信息")
@@ -568,9 +1056,10 @@ class OKXCrawlerForBot:
         # 过滤掉流动性池和交易所地址
         filtered_holders = []
         excluded_count = 0
+        known_pools = self._get_known_pools()
         
         for holder in holders:
-            if self.is_excluded_holder(holder):
+            if self.is_excluded_holder(holder, known_pools):
                 excluded_count += 1
                 # 记录被排除的地址信息
                 wallet_address = holder.get("holderWalletAddress", "")
@@ -580,234 +1069,178 @@ class OKXCrawlerForBot:
             else:
                 filtered_holders.append(holder)
         
-        self.log_info(f"原始持有者: {len(holders)} 个，排除 {excluded_count} 个流动性池/交易所地址，剩余 {len(filtered_holders)} 个")
+        # 记录本次大户地址，学习跨代币高频出现的基础设施地址，新学到的地址本次也直接跳过
+        learned = set(self.infra_index.record_token_holders(
+            token_address,
+            [holder.get("holderWalletAddress", "") for holder in filtered_holders[:learn_count]],
+        ))
+        if learned:
+            filtered_holders = [h for h in filtered_holders if h.get("holderWalletAddress", "") not in learned]
+            excluded_count += len(learned)
+
+        self.log_info(f"原始持有者: {len(holders)} 个，排除 {excluded_count} 个流动性池/交易所/基础设施地址，剩余 {len(filtered_holders)} 个")
 
         if not filtered_holders:
             self.log_info("过滤后没有可分析的持有者")
             return {}
 
-        # 2. 分析每个大户的资产 - 根据参数选择单线程或多线程
-        holder_analysis = []
+        # 2. 分析每个大户的资产，处理完一个钱包立即合并统计（流式，不保留完整资产数据）
+        aggregator = HolderTokenAggregator(
+            token_address,
+            max_tracked_tokens=deep_settings["max_tracked_tokens"] if deep_settings["enabled"] else 0,
+            max_detail_entries=deep_settings["max_detail_entries"] if deep_settings["enabled"] else 0,
+        )
 
-        if use_threading:
-            # 多线程模式：准备钱包地址列表
-            wallet_addresses = []
-            wallet_to_holder_info = {}  # 保存钱包地址到持有者信息的映射
-            
-            # 使用过滤后的持有者列表，取前N名
-            for i, holder in enumerate(filtered_holders[:top_holders_count], 1):
-                # 从explorerUrl中提取钱包地址，或直接使用holderWalletAddress
-                explorer_url = holder.get("explorerUrl", "")
-                if "solscan.io/account/" in explorer_url:
-                    wallet_address = explorer_url.split("solscan.io/account/")[-1]
+        def record_holder(rank: int, wallet_address: str, assets_data: Dict) -> None:
+            if assets_data and self.infra_index.check_portfolio(wallet_address, assets_data):
+                self.log_info(f"大户 #{rank} 资产特征符合基础设施地址，跳过")
+            elif assets_data:
+                # 提取所有有价值的代币
+                top_tokens = self.extract_top_tokens(assets_data)
+
+                # 只有当成功提取到代币时才计入统计
+                if top_tokens:
+                    aggregator.add_holder(rank, wallet_address, top_tokens)
+                    self.log_info(f"大户 #{rank} 分析完成，发现 {len(top_tokens)} 个有价值代币")
                 else:
-                    wallet_address = holder.get("holderWalletAddress", "") or holder.get("holderAddress", "")
-
-                if not wallet_address:
-                    self.log_info(f"大户 #{i} 无法获取钱包地址")
-                    continue
-
-                wallet_addresses.append(wallet_address)
-                wallet_to_holder_info[wallet_address] = {
-                    "rank": i,
-                    "holder_data": holder
-                }
-
-            if not wallet_addresses:
-                self.log_info("没有可分析的钱包地址")
-                return {}
-
-            # 使用多线程获取所有钱包资产
-            try:
-                from ..core.config import get_config
-                config = get_config()
-                max_workers = getattr(config.analysis, 'max_concurrent_threads', 10)
-            except (ImportError, AttributeError):
-                max_workers = 10
-                
-            assets_results = self.get_wallet_assets_threaded(wallet_addresses, max_workers)
+                    self.log_info(f"大户 #{rank} 没有发现有价值的代币")
+            else:
+                self.log_info(f"大户 #{rank} 获取资产失败")
+
+        # 使用过滤后的持有者列表，取前N名
+        wallet_ranks = {}  # 钱包地址到排名的映射
+        for i, holder in enumerate(filtered_holders[:top_holders_count], 1):
+            # 从explorerUrl中提取钱包地址，或直接使用holderWalletAddress
+            explorer_url = holder.get("explorerUrl", "")
+            if "solscan.io/account/" in explorer_url:
+                wallet_address = explorer_url.split("solscan.io/account/")[-1]
+            else:
+                wallet_address = holder.get("holderWalletAddress", "") or holder.get("holderAddress", "")
 
-            # 处理获取到的资产数据
-            for wallet_address, assets_data in assets_results.items():
-                if wallet_address not in wallet_to_holder_info:
-                    continue
-                    
-                holder_info_map = wallet_to_holder_info[wallet_address]
-                rank = holder_info_map["rank"]
-                holder = holder_info_map["holder_data"]
-                
-                if assets_data:
-                    # 提取所有有价值的代币
-                    top_tokens = self.extract_top_tokens(assets_data)
-
-                    # 只有当成功提取到代币时才添加到分析结果
-                    if top_tokens:
-                        holder_info = {
-                            "rank": rank,
-                            "address": wallet_address,
-                            "hold_amount": holder.get("holdAmount", "0"),
-                            "hold_percentage": holder.get("holdAmountPercentage", "0"),
-                            "top_tokens": top_tokens,
-                        }
+            if not wallet_address:
+                self.log_info(f"大户 #{i} 无法获取钱包地址")
+                continue
 
-                        holder_analysis.append(holder_info)
-                        self.log_info(f"大户 #{rank} 分析完成，发现 {len(top_tokens)} 个有价值代币")
-                    else:
-                        self.log_info(f"大户 #{rank} 没有发现有价值的代币")
-                else:
-                    self.log_info(f"大户 #{rank} 获取资产失败")
-        else:
-            # 单线程模式：保持原来的逻辑
-            for i, holder in enumerate(filtered_holders[:top_holders_count], 1):
-                # 从explorerUrl中提取钱包地址，或直接使用holderWalletAddress
-                explorer_url = holder.get("explorerUrl", "")
-                if "solscan.io/account/" in explorer_url:
-                    wallet_address = explorer_url.split("solscan.io/account/")[-1]
-                else:
-                    wallet_address = holder.get("holderWalletAddress", "") or holder.get("holderAddress", "")
+            wallet_ranks[wallet_address] = i
 
-                if not wallet_address:
-                    self.log_info(f"大户 #{i} 无法获取钱包地址")
-                    continue
+        if not wallet_ranks:
+            self.log_info("没有可分析的钱包地址")
+            return {}
 
-                self.log_info(f"分析大户 #{i}: {wallet_address[:8]}...{wallet_address[-6:]}")
+        # 排名分析只需要被分析大户的持有量字段；原始排行榜在获取资产前释放，不随大户数量驻留整个分析过程
+        original_holders_count = len(holders)
+        filtered_holders_count = len(filtered_holders)
+        original_holders_data = [
+            {field: holder.get(field) for field in RANKING_HOLDER_FIELDS}
+            for holder in filtered_holders[:top_holders_count]
+            if holder.get("holderWalletAddress") in wallet_ranks
+        ]
+        del holders, filtered_holders
+
+        with _analysis_stage("wallets"):
+            if use_threading:
+                # 多线程模式：获取资产的同时逐个合并
+                try:
+                    from ..core.config import get_config
+                    config = get_config()
+                    max_workers = getattr(config.analysis, 'max_concurrent_threads', 10)
+                except (ImportError, AttributeError):
+                    max_workers = 10
+
+                self.get_wallet_assets_threaded(
+                    list(wallet_ranks), max_workers, deadline=deadline,
+                    on_result=lambda wallet_address, assets_data: record_holder(
+                        wallet_ranks[wallet_address], wallet_address, assets_data
+                    ),
+                    freshness=freshness,
+                    should_stop=should_stop,
+                )
+            else:
+                # 单线程模式：保持原来的逻辑
+                for wallet_address, rank in wallet_ranks.items():
+                    if should_stop is not None and should_stop():
+                        self.last_stopped = True
+                        break
+                    if deadline and time.time() > deadline:
+                        self.last_missing_wallets.append(wallet_address)
+                        continue
 
-                # 获取钱包资产
-                assets_data = self.get_wallet_assets(wallet_address)
+                    self.log_info(f"分析大户 #{rank}: {wallet_address[:8]}...{wallet_address[-6:]}")
 
-                if assets_data:
-                    # 提取所有有价值的代币
-                    top_tokens = self.extract_top_tokens(assets_data)
+                    # 获取钱包资产（优先使用符合新鲜度要求的本地缓存）
+                    assets_data = self.get_cached_wallet_portfolio(wallet_address, freshness)
+                    if assets_data:
+                        record_holder(rank, wallet_address, assets_data)
+                        continue
+                    record_holder(rank, wallet_address, self.fetch_wallet_portfolio_for(wallet_address, freshness))
 
-                    # 只有当成功提取到代币时才添加到分析结果
-                    if top_tokens:
-                        holder_info = {
-                            "rank": i,
-                            "address": wallet_address,
-                            "hold_amount": holder.get("holdAmount", "0"),
-                            "hold_percentage": holder.get("holdAmountPercentage", "0"),
-                            "top_tokens": top_tokens,
-                        }
+                    # 添加延迟避免频率限制
+                    time.sleep(1)
 
-                        holder_analysis.append(holder_info)
-                        self.log_info(f"大户 #{i} 分析完成，发现 {len(top_tokens)} 个有价值代币")
-                    else:
-                        self.log_info(f"大户 #{i} 没有发现有价值的代币")
-                else:
-                    self.log_info(f"大户 #{i} 获取资产失败")
-
-                # 添加延迟避免频率限制
-                time.sleep(1)
-
-        # 3. 统计所有大户持有的代币，每个大户每个代币只计算一次
-        all_tokens = {}
-        target_token_holders = set()  # 记录持有目标代币的大户地址
-
-        for holder in holder_analysis:
-            # 对于每个大户，记录他持有的唯一代币（避免重复计算）
-            holder_unique_tokens = {}
-
-            # 先收集该大户的所有唯一代币
-            for token in holder["top_tokens"]:
-                symbol = token["symbol"]
-                token_address_current = token["address"]
-
-                # 检查是否是目标代币
-                if token_address_current == token_address:
-                    target_token_holders.add(holder["address"])
-
-                # 使用address作为键，这样可以区分不同的代币（即使名字相同）
-                if token_address_current not in holder_unique_tokens:
-                    holder_unique_tokens[token_address_current] = {
-                        "symbol": symbol,
-                        "name": token["name"],
-                        "chain": token["chain"],
-                        "address": token_address_current,
-                        "price_usd": token["price_usd"],
-                        "total_balance": token["balance"],
-                        "total_value_usd": token["value_usd"],
-                        "is_target_token": token_address_current == token_address,
-                    }
-                else:
-                    # 如果已存在，累加数值
-                    holder_unique_tokens[token_address_current]["total_balance"] += token["balance"]
-                    holder_unique_tokens[token_address_current]["total_value_usd"] += token[
-                        "value_usd"
-                    ]
-                    # 如果是目标代币，标记它
-                    if token_address_current == token_address:
-                        holder_unique_tokens[token_address_current]["is_target_token"] = True
-
-            # 现在统计到全局代币记录中，每个大户每个代币只计算一次
-            for token_addr, token_data in holder_unique_tokens.items():
-                if token_addr not in all_tokens:
-                    all_tokens[token_addr] = {
-                        "symbol": token_data["symbol"],
-                        "name": token_data["name"],
-                        "chain": token_data["chain"],
-                        "address": token_data["address"],
-                        "price_usd": token_data["price_usd"],
-                        "total_value": 0,
-                        "holder_count": 0,
-                        "holders_details": [],
-                        "is_target_token": token_data["is_target_token"],
-                    }
-                else:
-                    # 如果是目标代币，确保标记正确
-                    if token_data["is_target_token"]:
-                        all_tokens[token_addr]["is_target_token"] = True
-
-                # 每个大户每个代币只计算一次
-                all_tokens[token_addr]["total_value"] += token_data["total_value_usd"]
-                all_tokens[token_addr]["holder_count"] += 1
-
-                # 添加大户持有详情
-                holder_detail = {
-                    "holder_rank": holder["rank"],
-                    "holder_address": holder["address"],
-                    "balance": token_data["total_balance"],
-                    "value_usd": token_data["total_value_usd"],
-                }
-                all_tokens[token_addr]["holders_details"].append(holder_detail)
+        if self.last_stopped:
+            # 任务已取消，不产出部分结果（也不会写入结果缓存）
+            self.log_info(f"🛑 分析已取消: {token_address}")
+            return {}
 
-        # 过滤：持有人数>=5 且 总价值>=50U 的代币，然后按总价值排序
-        filtered_tokens = [token for token in all_tokens.values() if token["total_value"] >= 50 and token["holder_count"] >= 5]
-        sorted_tokens = sorted(filtered_tokens, key=lambda x: x["total_value"], reverse=True)
+        # 3. 过滤：持有人数>=5 且 总价值>=50U 的代币，按总价值排序
+        with _analysis_stage("aggregate"):
+            sorted_tokens = aggregator.top_tokens(min_value=TOP_TOKEN_MIN_VALUE, min_holders=TOP_TOKEN_MIN_HOLDERS)
+        tracked_token_count = len(aggregator.tokens)
+        # 未进入结果的代币及其持有明细不再需要，立即释放
+        aggregator.tokens = {}
+        if aggregator.evicted_tokens:
+            self.log_info(f"代币跟踪数或持有明细超过上限，淘汰 {aggregator.evicted_tokens} 个持有人数最少的低价值代币")
 
         analysis_result = {
             "token_address": token_address,
+            "top_holders_count": learn_count,  # 请求的大户数量（结果缓存和存档按此区分）
             "analysis_time": datetime.now().isoformat(),
+            "deep_scan": deep_settings["enabled"],
+            # 数据新鲜度：使用的等级、最旧数据的获取时间、命中本地缓存的钱包数
+            "freshness": {
+                "tier": freshness,
+                "oldest_data_at": min(self.oldest_data_at or holders_fetched_at, holders_fetched_at),
+                "cached_wallets": self.cached_wallet_count,
+            },
             "filtering_stats": {
-                "original_holders_count": len(holders),
+                "original_holders_count": original_holders_count,
                 "excluded_holders_count": excluded_count,
-                "filtered_holders_count": len(filtered_holders),
-                "analyzed_holders_count": len(holder_analysis)
+                "filtered_holders_count": filtered_holders_count,
+                "analyzed_holders_count": aggregator.holder_count,
+                "missing_wallets_count": len(self.last_missing_wallets),  # 截止时间内未返回的钱包
             },
-            "total_holders_analyzed": len(holder_analysis),
-            "target_token_actual_holders": len(target_token_holders),  # 添加实际持有目标代币的人数
-            "original_holders_data": holders,  # 保存原始持有者数据用于排名分析
+            "total_holders_analyzed": aggregator.holder_count,
+            "target_token_actual_holders": len(aggregator.target_token_holders),  # 添加实际持有目标代币的人数
+            "original_holders_data": original_holders_data,  # 被分析大户的持有量，用于排名分析
             "token_statistics": {
-                "total_unique_tokens": len(filtered_tokens),
+                "total_unique_tokens": len(sorted_tokens),
                 "total_portfolio_value": sum(token["total_value"] for token in sorted_tokens),
                 "top_tokens_by_value": sorted_tokens,
+                "min_token_value": TOP_TOKEN_MIN_VALUE,  # 按最新价格重估后据此重新过滤
             },
         }
 
-        # 保存详细日志到文件
+        # 各阶段耗时（由处理器发起时为整条追踪截至目前的汇总）
+        analysis_result["timings"] = current_timings()
+
+        # 详细结果提交后台保存（分析不等待写盘）
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = self.data_manager.get_file_path("analysis", f"analysis_{token_address}_{timestamp}.json")
-        with open(log_file, "w", encoding="utf-8") as f:
-            json.dump(analysis_result, f, ensure_ascii=False, indent=2)
+        with _analysis_stage("persist"):
+            log_file = get_artifact_store().submit_json(log_file, analysis_result) or "（队列已满，未保存）"
+            get_analysis_archive().submit(analysis_result)
+        ANALYSIS_STAGE_SECONDS.labels("total").observe(time.perf_counter() - analysis_started)
 
-        self.log_info(f"分析完成，结果已保存到: {log_file}")
-        self.log_info(f"过滤统计: 原始 {len(holders)} 个持有者，排除 {excluded_count} 个流动性池/交易所，分析 {len(holder_analysis)} 个真实投资者")
+        self.log_info(f"分析完成，结果将保存到: {log_file}")
+        self.log_info(f"过滤统计: 原始 {original_holders_count} 个持有者，排除 {excluded_count} 个流动性池/交易所，分析 {aggregator.holder_count} 个真实投资者")
         self.log_info(
-            f"发现 {len(all_tokens)} 种代币，过滤后 {len(filtered_tokens)} 种代币(≥5人持有且≥$50价值)，总价值 ${sum(token['total_value'] for token in sorted_tokens):,.2f}"
+            f"发现 {tracked_token_count} 种代币，过滤后 {len(sorted_tokens)} 种代币(≥5人持有且≥$50价值)，总价值 ${sum(token['total_value'] for token in sorted_tokens):,.2f}"
         )
 
         return analysis_result
 
 
+@traced("analyze_target_token_rankings")
 def analyze_target_token_rankings(analysis_result: Dict, original_holders: List[Dict] = None) -> Dict:
     """
     分析目标代币在各个地址内的价值排名
@@ -1204,6 +1637,7 @@ def _evaluate_holder_confidence(avg_rank: float, metrics: Dict) -> str:
         return "偏弱"
 
 
+@traced("analyze_address_clusters")
 def analyze_address_clusters(analysis_result: Dict) -> Dict:
     """
     分析地址集群：找出共同持有相同代币的地址群体
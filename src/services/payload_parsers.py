@@ -0,0 +1,101 @@
+"""
+上游响应精简解析
+OKX 持有者排行、钱包持仓和 Jupiter 热门代币的响应中大部分字段分析用不到（标签详情、多链余额明细、
+统计快照等）。解析后立即只保留下游实际读取的字段：
+- 持有者：钱包地址（含浏览器链接）、is_excluded_holder 判断和排名分析所需字段
+- 钱包代币：extract_top_tokens、价格表和基础设施地址识别所需字段
+- Jupiter 池子：parse_token_data、监控过滤和价格表所需字段
+完整响应树在解析后即可释放，钱包缓存、分析结果、存档和后续拷贝处理的数据量随之变小
+"""
+
+from typing import Dict, List
+
+
+# 持有者字段
+# explorerUrl / holderAddress：analyze_token_holders 优先从浏览器链接取钱包地址，其次回退到 holderAddress
+HOLDER_FIELDS = (
+    "holderWalletAddress", "holderAddress", "explorerUrl", "holdAmount", "holdAmountPercentage", "holdVolume",
+)
+# 钱包代币字段（coinBalanceDetails 单独处理，只保留第一条的地址）
+WALLET_TOKEN_FIELDS = ("symbol", "name", "chainName", "coinAmount", "coinUnitPrice", "currencyAmount")
+# 排除判断使用的标签键
+EXCLUDE_TAGS = ("liquidityPool", "exchange")
+# Jupiter 池子字段
+JUPITER_POOL_FIELDS = ("id", "dex", "volume24h", "liquidity", "createdAt")
+JUPITER_ASSET_FIELDS = (
+    "id", "symbol", "name", "decimals", "totalSupply", "mcap", "fdv", "usdPrice", "holderCount",
+    "twitter", "website", "launchpad", "organicScore", "audit",
+)
+JUPITER_STATS_FIELDS = ("priceChange", "holderChange", "buyVolume", "sellVolume")
+
+
+def _pick(source: Dict, fields) -> Dict:
+    return {field: source[field] for field in fields if field in source}
+
+
+def slim_holder(holder: Dict) -> Dict:
+    """只保留持有者的地址、持仓和排除判断所需的标签"""
+    if not isinstance(holder, dict):
+        return holder
+    slim = _pick(holder, HOLDER_FIELDS)
+
+    tag_list = holder.get("tagList")
+    if tag_list:
+        # 只保留排除判断会检查的标签（标签格式为 [名称, ...]）
+        tags = [tag[:1] for tag in tag_list if isinstance(tag, list) and tag and tag[0] in EXCLUDE_TAGS]
+        if tags:
+            slim["tagList"] = tags
+
+    holder_tag_vo = holder.get("holderTagVO")
+    if isinstance(holder_tag_vo, dict) and "liquidityPool" in holder_tag_vo:
+        slim["holderTagVO"] = {"liquidityPool": holder_tag_vo["liquidityPool"]}
+
+    user_tag_vo = holder.get("userAddressTagVO")
+    if isinstance(user_tag_vo, dict):
+        user_tags = {tag: user_tag_vo[tag] for tag in EXCLUDE_TAGS if tag in user_tag_vo}
+        if user_tags:
+            slim["userAddressTagVO"] = user_tags
+    return slim
+
+
+def slim_holders(holders: List[Dict]) -> List[Dict]:
+    return [slim_holder(holder) for holder in holders]
+
+
+def slim_wallet_token(token: Dict) -> Dict:
+    """只保留代币的名称、链、首个合约地址和数量/价格/价值"""
+    if not isinstance(token, dict):
+        return token
+    slim = _pick(token, WALLET_TOKEN_FIELDS)
+    balance_details = token.get("coinBalanceDetails")
+    if balance_details and isinstance(balance_details[0], dict):
+        slim["coinBalanceDetails"] = [{"address": balance_details[0].get("address", "")}]
+    return slim
+
+
+def slim_portfolio(assets_data: Dict) -> Dict:
+    """钱包持仓响应的 data 部分只保留 tokens.tokenlist"""
+    if not isinstance(assets_data, dict) or not assets_data:
+        return assets_data
+    tokens_info = assets_data.get("tokens")
+    token_list = (tokens_info.get("tokenlist") if isinstance(tokens_info, dict) else None) or []
+    return {"tokens": {"tokenlist": [slim_wallet_token(token) for token in token_list]}}
+
+
+def slim_jupiter_pool(pool: Dict) -> Dict:
+    """只保留 Jupiter 池子的基础信息、市值/价格、社交链接和 24h 统计"""
+    if not isinstance(pool, dict):
+        return pool
+    slim = _pick(pool, JUPITER_POOL_FIELDS)
+    base_asset = pool.get("baseAsset")
+    if isinstance(base_asset, dict):
+        slim_asset = _pick(base_asset, JUPITER_ASSET_FIELDS)
+        stats_24h = base_asset.get("stats24h")
+        if isinstance(stats_24h, dict):
+            slim_asset["stats24h"] = _pick(stats_24h, JUPITER_STATS_FIELDS)
+        slim["baseAsset"] = slim_asset
+    return slim
+
+
+def slim_jupiter_pools(pools: List[Dict]) -> List[Dict]:
+    return [slim_jupiter_pool(pool) for pool in pools]
@@ -0,0 +1,179 @@
+"""
+涨幅代币预取服务
+Pump警报发出后，用户通常会在一分钟内对涨幅靠前的代币执行 /ca1。
+预取器在 compare_and_filter 返回后，以批量优先级提前分析前N个代币并写入结果缓存，
+使随后的 /ca1 可以直接命中缓存（或合并到进行中的分析）。
+"""
+
+import math
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+from .result_cache import get_result_cache
+from .scheduler import get_scheduler, PRIORITY_BATCH
+
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("prefetcher")
+
+
+# 上游繁忙时，每次检查的间隔（秒）
+BUSY_POLL_INTERVAL = 2
+
+
+class AnalysisPrefetcher:
+    """分析结果预取器（单线程、低优先级、有预算限制）"""
+
+    def __init__(self):
+        self.result_cache = get_result_cache()
+        self.scheduler = get_scheduler()
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._recent_runs = deque()  # 最近一小时内的预取时间戳
+        self._worker = None
+        self._stats = {"submitted": 0, "completed": 0, "skipped_cached": 0,
+                       "dropped_budget": 0, "dropped_expired": 0, "failed": 0}
+
+    def _get_settings(self) -> Dict:
+        """读取预取配置"""
+        return read_settings("analysis", {
+            "enabled": ("prefetch_enabled", False),
+            "top_n": ("prefetch_top_n", 3),
+            "max_per_hour": ("prefetch_max_per_hour", 30),
+            "max_inflight": ("prefetch_max_inflight", 1),
+            "job_ttl": ("prefetch_job_ttl", 120),
+            "top_holders_count": ("top_holders_count", 100),
+            "fresh_ttl": ("result_cache_fresh_seconds", 300),
+            "freshness": ("prefetch_freshness_tier", "recent"),
+        })
+
+    @staticmethod
+    def _score(result) -> float:
+        """按涨幅和市值综合排序（市值取对数，避免大市值代币压过涨幅）"""
+        market_cap = max(float(getattr(result, "new_price", 0) or 0), 1.0)
+        return float(getattr(result, "change_percent", 0) or 0) * math.log10(market_cap + 10)
+
+    def submit_alerts(self, results: List) -> int:
+        """
+        提交警报结果，挑选前N个代币加入预取队列
+
+        Args:
+            results: compare_and_filter 返回的 PriceChangeResult 列表
+
+        Returns:
+            新加入队列的代币数量
+        """
+        settings = self._get_settings()
+        if not settings["enabled"] or not results:
+            return 0
+
+        ranked = sorted(results, key=self._score, reverse=True)[:settings["top_n"]]
+        submitted = 0
+        for result in ranked:
+            token_address = result.token.mint
+            cached, age = self.result_cache.peek(token_address, settings["top_holders_count"], settings["freshness"])
+            if cached is not None and age <= settings["fresh_ttl"]:
+                self._stats["skipped_cached"] += 1
+                continue
+
+            with self._lock:
+                if token_address in self._pending:
+                    continue
+                self._pending.add(token_address)
+                self._stats["submitted"] += 1
+
+            self._queue.put({"token_address": token_address, "symbol": result.token.symbol,
+                             "submitted_at": time.time()})
+            submitted += 1
+
+        if submitted:
+            self._ensure_worker()
+            logger.info(f"🔮 已加入 {submitted} 个代币到预取队列")
+        return submitted
+
+    def _ensure_worker(self) -> None:
+        """启动预取工作线程（只启动一次）"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._worker_loop, daemon=True, name="AnalysisPrefetcher")
+                self._worker.start()
+
+    def _within_budget(self, max_per_hour: int) -> bool:
+        """检查每小时预取预算"""
+        now = time.time()
+        while self._recent_runs and now - self._recent_runs[0] > 3600:
+            self._recent_runs.popleft()
+        return len(self._recent_runs) < max_per_hour
+
+    def _wait_for_idle(self, max_inflight: int, deadline: float) -> bool:
+        """等待调度器空闲（无排队的交互/自动任务且运行中任务低于阈值），保证不抢占交互请求"""
+        while time.time() < deadline:
+            stats = self.scheduler.get_stats()
+            if (stats["running"] < max_inflight and
+                    not stats["queued"]["interactive"] and not stats["queued"]["auto_pump"]):
+                return True
+            time.sleep(BUSY_POLL_INTERVAL)
+        return False
+
+    def _worker_loop(self) -> None:
+        """预取工作循环"""
+        while True:
+            job = self._queue.get()
+            token_address = job["token_address"]
+            try:
+                settings = self._get_settings()
+                deadline = job["submitted_at"] + settings["job_ttl"]
+
+                if not settings["enabled"]:
+                    continue
+                if not self._within_budget(settings["max_per_hour"]):
+                    self._stats["dropped_budget"] += 1
+                    logger.info(f"💸 预取预算已用完，跳过: {job['symbol']}")
+                    continue
+                if not self._wait_for_idle(settings["max_inflight"], deadline):
+                    self._stats["dropped_expired"] += 1
+                    logger.info(f"⌛ 上游繁忙，预取任务过期: {job['symbol']}")
+                    continue
+
+                self._recent_runs.append(time.time())
+                start_time = time.time()
+                scheduled_job = self.scheduler.submit(
+                    self.result_cache.get_or_analyze,
+                    args=(token_address, settings["top_holders_count"]),
+                    kwargs={"freshness": settings["freshness"]},
+                    priority=PRIORITY_BATCH,
+                    tag="prefetch",
+                )
+                result, _ = (scheduled_job.wait() if scheduled_job else None) or (None, None)
+                if result:
+                    self._stats["completed"] += 1
+                    logger.info(f"🔮 预取完成: {job['symbol']} ({token_address[:8]}...), 耗时 {time.time() - start_time:.1f}s")
+                else:
+                    self._stats["failed"] += 1
+            except Exception as e:
+                self._stats["failed"] += 1
+                logger.error(f"❌ 预取失败 {token_address}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(token_address)
+                self._queue.task_done()
+
+    def get_stats(self) -> Dict:
+        """获取预取统计信息"""
+        stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["runs_last_hour"] = len(self._recent_runs)
+        return stats
+
+
+# 全局预取器实例
+analysis_prefetcher = AnalysisPrefetcher()
+
+
+def get_prefetcher() -> AnalysisPrefetcher:
+    """获取预取器实例"""
+    return analysis_prefetcher
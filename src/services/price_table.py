@@ -0,0 +1,283 @@
+"""
+共享代币价格表
+持仓数量变化远慢于价格，缓存的钱包持仓和分析结果可以按最新价格重估，而不必重新抓取钱包：
+- 价格来源：每次实时获取的钱包资产（OKX单价）、Jupiter热门代币数据，以及后台定时批量请求 Jupiter 价格接口
+  （每次只刷新近期用于重估、最久未更新的一批代币）
+- 重估：缓存命中的钱包持仓按最新价格重算价值；缓存的分析结果重算每个代币的总价值、排序和目标代币持仓价值，
+  并重新应用总价值过滤（重估后低于阈值的代币不再显示）
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from .http_client import get_http_client
+from ..utils.json_codec import response_json
+from ..utils.settings import get_module_logger, read_settings
+from .resilience import get_upstream, CircuitOpenError, UPSTREAM_JUPITER
+
+logger = get_module_logger("price_table")
+
+
+JUPITER_PRICE_URL = "https://lite-api.jup.ag/price/v3"
+
+# 分析结果未记录过滤阈值时使用的代币总价值下限（与分析时的过滤一致）
+DEFAULT_MIN_TOKEN_VALUE = 50
+
+# OKX 的 SOL 原生代币地址在 Jupiter 中对应 wSOL
+JUPITER_MINT_ALIASES = {
+    "So11111111111111111111111111111111111111111": "So11111111111111111111111111111111111111112",
+}
+
+
+def _get_settings() -> Dict:
+    """读取价格表配置"""
+    return read_settings("analysis", {
+        "enabled": ("price_table_enabled", True),
+        "refresh_seconds": ("price_table_refresh_seconds", 30),
+        "max_age": ("price_table_max_age_seconds", 300),
+        "batch_size": ("price_table_batch_size", 50),
+        "max_entries": ("price_table_max_entries", 20000),
+        "track_seconds": ("price_table_track_seconds", 3600),
+    })
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class PriceTable:
+    """代币价格表（按代币地址）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # token_address -> (price_usd, updated_at)
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        # token_address -> 最近一次用于重估的时间，后台只刷新近期用到的代币
+        self._last_used: Dict[str, float] = {}
+        self._thread = None
+        self._stats = {"updates": 0, "bulk_refreshes": 0, "bulk_errors": 0,
+                       "revalued_portfolios": 0, "revalued_results": 0}
+
+    def update(self, prices: Dict[str, float], source: str = "") -> None:
+        """写入一批价格（忽略非正数价格）"""
+        now = time.time()
+        settings = _get_settings()
+        with self._lock:
+            for address, price in prices.items():
+                if address and price > 0:
+                    self._prices[address] = (price, now)
+            self._stats["updates"] += 1
+            overflow = len(self._prices) - settings["max_entries"]
+            if overflow > 0:
+                oldest = sorted(self._prices.items(), key=lambda item: item[1][1])[:overflow]
+                for address, _ in oldest:
+                    del self._prices[address]
+                    self._last_used.pop(address, None)
+        logger.debug(f"💱 更新 {len(prices)} 个代币价格 ({source})")
+
+    def update_from_portfolio(self, assets_data: Dict) -> None:
+        """从实时获取的钱包资产中记录代币单价"""
+        prices = {}
+        for token in (assets_data or {}).get("tokens", {}).get("tokenlist", []) or []:
+            details = token.get("coinBalanceDetails") or [{}]
+            address = details[0].get("address", "")
+            price = _to_float(token.get("coinUnitPrice"))
+            if address and price > 0:
+                prices[address] = price
+        if prices:
+            self.update(prices, source="wallet")
+
+    def update_from_jupiter(self, pools: Iterable[Dict]) -> None:
+        """从 Jupiter 热门代币数据中记录价格（baseAsset.id / usdPrice）"""
+        prices = {}
+        for pool in pools or []:
+            base_asset = pool.get("baseAsset", {}) if isinstance(pool, dict) else {}
+            price = _to_float(base_asset.get("usdPrice"))
+            if base_asset.get("id") and price > 0:
+                prices[base_asset["id"]] = price
+        if prices:
+            self.update(prices, source="jupiter")
+
+    def get_price(self, address: str, max_age: Optional[float] = None) -> Optional[float]:
+        """获取价格，超过 max_age（默认配置值）的价格视为不可用"""
+        max_age = _get_settings()["max_age"] if max_age is None else max_age
+        with self._lock:
+            entry = self._prices.get(address)
+            if entry is not None:
+                self._last_used[address] = time.time()
+        if entry is None or time.time() - entry[1] > max_age:
+            return None
+        return entry[0]
+
+    def revalue_portfolio(self, assets_data: Dict) -> Dict:
+        """按最新价格重估缓存的钱包持仓，返回新的资产数据（不修改缓存中的原对象）"""
+        settings = _get_settings()
+        token_list = (assets_data or {}).get("tokens", {}).get("tokenlist", []) or []
+        if not settings["enabled"] or not token_list:
+            return assets_data
+
+        revalued_list = []
+        revalued = 0
+        for token in token_list:
+            details = token.get("coinBalanceDetails") or [{}]
+            price = self.get_price(details[0].get("address", ""), settings["max_age"])
+            if price is None:
+                revalued_list.append(token)
+                continue
+            balance = _to_float(token.get("coinAmount"))
+            revalued_list.append(dict(token, coinUnitPrice=str(price), currencyAmount=str(balance * price)))
+            revalued += 1
+
+        if not revalued:
+            return assets_data
+        with self._lock:
+            self._stats["revalued_portfolios"] += 1
+        return dict(assets_data, tokens=dict(assets_data["tokens"], tokenlist=revalued_list))
+
+    def revalue_analysis_result(self, result: Dict) -> Dict:
+        """
+        按最新价格重估缓存的分析结果：重算每个代币的大户持仓价值、总价值和排序，
+        以及原始持有者数据中目标代币的持仓价值（排名和阴谋钱包占比据此重新计算）；
+        重估后总价值低于分析时过滤阈值（min_token_value）的代币被移除
+        """
+        settings = _get_settings()
+        token_statistics = (result or {}).get("token_statistics") or {}
+        tokens = token_statistics.get("top_tokens_by_value") or []
+        if not settings["enabled"] or not tokens:
+            return result
+
+        revalued_tokens = []
+        revalued = 0
+        target_ratio = None
+        for token in tokens:
+            price = self.get_price(token.get("address", ""), settings["max_age"])
+            old_price = _to_float(token.get("price_usd"))
+            if price is None:
+                revalued_tokens.append(token)
+                continue
+
+            def _value(detail: Dict) -> float:
+                # 优先按价格比例缩放，避免持仓数量单位和价值口径不一致
+                if old_price > 0:
+                    return detail.get("value_usd", 0) * price / old_price
+                return detail.get("balance", 0) * price
+
+            details = [dict(detail, value_usd=_value(detail)) for detail in token.get("holders_details", [])]
+            revalued_tokens.append(dict(
+                token,
+                price_usd=price,
+                holders_details=details,
+                total_value=sum(detail["value_usd"] for detail in details),
+            ))
+            if token.get("is_target_token") and old_price > 0:
+                target_ratio = price / old_price
+            revalued += 1
+
+        if not revalued:
+            return result
+
+        min_value = token_statistics.get("min_token_value", DEFAULT_MIN_TOKEN_VALUE)
+        revalued_tokens = [token for token in revalued_tokens if token["total_value"] >= min_value]
+        revalued_tokens.sort(key=lambda x: x["total_value"], reverse=True)
+        revalued_result = dict(result)
+        revalued_result["token_statistics"] = dict(
+            token_statistics,
+            top_tokens_by_value=revalued_tokens,
+            total_unique_tokens=len(revalued_tokens),
+            total_portfolio_value=sum(token["total_value"] for token in revalued_tokens),
+        )
+        if target_ratio is not None and result.get("original_holders_data"):
+            revalued_result["original_holders_data"] = [
+                dict(holder, holdVolume=str(_to_float(holder.get("holdVolume")) * target_ratio))
+                for holder in result["original_holders_data"]
+            ]
+        revalued_result["revalued"] = {"tokens": revalued, "revalued_at": time.time()}
+        with self._lock:
+            self._stats["revalued_results"] += 1
+        return revalued_result
+
+    def _stale_addresses(self, limit: int, refresh_seconds: float, track_seconds: float) -> List[str]:
+        """近期用到、最久未更新且已超过刷新间隔的代币地址"""
+        now = time.time()
+        with self._lock:
+            stale = [(self._prices[address][1], address) for address, used_at in self._last_used.items()
+                     if now - used_at <= track_seconds and now - self._prices[address][1] >= refresh_seconds]
+        stale.sort()
+        return [address for _, address in stale[:limit]]
+
+    def refresh(self) -> int:
+        """批量刷新一次最久未更新的代币价格（一次 Jupiter 价格请求），返回更新数量"""
+        settings = _get_settings()
+        addresses = self._stale_addresses(settings["batch_size"], settings["refresh_seconds"], settings["track_seconds"])
+        if not addresses:
+            return 0
+
+        mints = {JUPITER_MINT_ALIASES.get(address, address): address for address in addresses}
+        upstream = get_upstream(UPSTREAM_JUPITER)
+        http_client = get_http_client()
+
+        def send(timeout=15):
+            return http_client.get(JUPITER_PRICE_URL, params={"ids": ",".join(mints)}, timeout=timeout)
+
+        try:
+            response = upstream.call(send, timeout=15)
+            response.raise_for_status()
+            data = response_json(response)
+        except (CircuitOpenError, requests.exceptions.RequestException, ValueError) as e:
+            with self._lock:
+                self._stats["bulk_errors"] += 1
+            logger.debug(f"批量刷新价格失败: {e}")
+            return 0
+
+        prices = {}
+        for mint, info in (data or {}).items():
+            if mint in mints and isinstance(info, dict):
+                prices[mints[mint]] = _to_float(info.get("usdPrice"))
+        self.update(prices, source="bulk")
+        with self._lock:
+            self._stats["bulk_refreshes"] += 1
+        return len(prices)
+
+    def start(self) -> None:
+        """启动后台定时刷新线程（只启动一次）"""
+        if not _get_settings()["enabled"]:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, daemon=True, name="PriceTable")
+            self._thread.start()
+        logger.info("💱 价格表后台刷新已启动")
+
+    def _refresh_loop(self) -> None:
+        while True:
+            settings = _get_settings()
+            time.sleep(settings["refresh_seconds"])
+            if not settings["enabled"]:
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"❌ 价格表刷新错误: {e}")
+
+    def get_stats(self) -> Dict:
+        """获取价格表统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._prices)
+        return stats
+
+
+# 全局价格表实例
+price_table = PriceTable()
+
+
+def get_price_table() -> PriceTable:
+    """获取共享价格表"""
+    return price_table
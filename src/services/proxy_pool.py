@@ -0,0 +1,244 @@
+"""
+代理出口池
+配置多个代理出口，每个出口独立限速（令牌桶）、健康检查和429冷却：
+- 请求从健康且有令牌的出口中选取，整体吞吐随出口数量线性增长
+- 收到429时该出口进入冷却（遵守 Retry-After），其他出口继续工作
+- 连续连接失败的出口标记为不健康，由后台线程定期探测恢复
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("proxy_pool")
+
+
+# 连续失败多少次后标记出口不健康
+MAX_CONSECUTIVE_FAILURES = 3
+# 等待令牌时的最长单次睡眠（秒）
+MAX_WAIT_STEP = 0.5
+
+
+def mask_proxy_url(url: str) -> str:
+    """隐藏代理地址中的账号密码，用于日志和指标"""
+    parsed = urlparse(url)
+    host = parsed.hostname or url
+    return f"{host}:{parsed.port}" if parsed.port else host
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> bool:
+        """尝试取一个令牌（调用方需持有锁）"""
+        self._refill(time.monotonic())
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """距离下一个令牌可用的秒数（调用方需持有锁）"""
+        self._refill(time.monotonic())
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate if self.rate > 0 else MAX_WAIT_STEP
+
+
+class Egress:
+    """单个代理出口"""
+
+    def __init__(self, url: str, rate: float, burst: int):
+        self.url = url
+        self.name = mask_proxy_url(url)
+        self.bucket = TokenBucket(rate, burst)
+        self.healthy = True
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.stats = {"requests": 0, "status_429": 0, "failures": 0, "cooldowns": 0}
+
+    @property
+    def proxies(self) -> Dict[str, str]:
+        return {"http": self.url, "https": self.url}
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.cooldown_until
+
+
+class ProxyPool:
+    """代理出口池"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._egresses: List[Egress] = []
+        self._signature = None
+        self._health_thread = None
+        self._cursor = 0
+
+    def _get_settings(self) -> Dict:
+        """读取代理池配置"""
+        settings = read_settings("proxy", {
+            "pool": ("pool", None),
+            "hosts": ("pool_hosts", None),
+            "rate": ("pool_rate_per_second", 2.0),
+            "burst": ("pool_burst", 5),
+            "cooldown": ("pool_cooldown_seconds", 60),
+            "health_url": ("pool_health_check_url", "https://web3.okx.com"),
+            "health_interval": ("pool_health_check_interval", 60),
+            "max_wait": ("pool_max_wait_seconds", 30),
+        })
+        settings["pool"] = list(settings["pool"] or [])
+        settings["hosts"] = list(settings["hosts"] or [])
+        return settings
+
+    def _sync(self, settings: Dict) -> None:
+        """配置变化时重建出口列表（调用方需持有锁）"""
+        signature = (tuple(settings["pool"]), settings["rate"], settings["burst"])
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._egresses = [Egress(url, settings["rate"], settings["burst"]) for url in settings["pool"]]
+        if self._egresses:
+            logger.info(f"🌐 代理出口池: {len(self._egresses)} 个出口，每个 {settings['rate']}/s (突发 {settings['burst']})")
+
+    def is_enabled_for(self, host: str) -> bool:
+        """该主机的请求是否走代理池"""
+        settings = self._get_settings()
+        if not settings["pool"]:
+            return False
+        return not settings["hosts"] or host in settings["hosts"]
+
+    def healthy_count(self) -> int:
+        """当前可用出口数量（未配置代理池时返回 0）"""
+        settings = self._get_settings()
+        with self._lock:
+            self._sync(settings)
+            now = time.time()
+            return len([egress for egress in self._egresses if egress.available(now)])
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[Egress]:
+        """
+        获取一个可用出口（会等待令牌），轮询选择以均匀分摊请求
+
+        Returns:
+            Egress；未配置代理池或等待超时时返回 None
+        """
+        settings = self._get_settings()
+        timeout = settings["max_wait"] if timeout is None else timeout
+        deadline = time.time() + timeout
+        self._ensure_health_thread(settings)
+
+        while True:
+            with self._lock:
+                self._sync(settings)
+                if not self._egresses:
+                    return None
+                now = time.time()
+                count = len(self._egresses)
+                wait_times = []
+                for offset in range(count):
+                    egress = self._egresses[(self._cursor + offset) % count]
+                    if not egress.available(now):
+                        continue
+                    if egress.bucket.try_take():
+                        self._cursor = (self._cursor + offset + 1) % count
+                        egress.stats["requests"] += 1
+                        return egress
+                    wait_times.append(egress.bucket.wait_time())
+                if not wait_times:
+                    # 所有出口都在冷却或不健康，等待最早结束冷却的出口
+                    cooling = [egress.cooldown_until - now for egress in self._egresses if egress.healthy]
+                    wait_times.append(min(cooling) if cooling else MAX_WAIT_STEP)
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                logger.warning("⏳ 代理出口池无可用出口，等待超时")
+                return None
+            time.sleep(max(0.01, min(min(wait_times), MAX_WAIT_STEP, remaining)))
+
+    def report(self, egress: Egress, status_code: Optional[int] = None,
+               error: Optional[Exception] = None, retry_after: Optional[float] = None) -> None:
+        """上报请求结果：429进入冷却，连续连接失败标记不健康"""
+        if egress is None:
+            return
+        settings = self._get_settings()
+        with self._lock:
+            if error is not None:
+                egress.stats["failures"] += 1
+                egress.consecutive_failures += 1
+                if egress.consecutive_failures >= MAX_CONSECUTIVE_FAILURES and egress.healthy:
+                    egress.healthy = False
+                    logger.warning(f"🚫 代理出口 {egress.name} 连续失败 {egress.consecutive_failures} 次，暂停使用: {error}")
+                return
+
+            egress.consecutive_failures = 0
+            if status_code == 429:
+                egress.stats["status_429"] += 1
+                egress.stats["cooldowns"] += 1
+                cooldown = retry_after if retry_after else settings["cooldown"]
+                egress.cooldown_until = max(egress.cooldown_until, time.time() + cooldown)
+                logger.info(f"🧊 代理出口 {egress.name} 触发频率限制，冷却 {cooldown:.0f} 秒")
+
+    def _ensure_health_thread(self, settings: Dict) -> None:
+        """启动健康检查线程（只启动一次）"""
+        if not settings["pool"]:
+            return
+        with self._lock:
+            if self._health_thread is None or not self._health_thread.is_alive():
+                self._health_thread = threading.Thread(target=self._health_loop, daemon=True, name="ProxyPoolHealth")
+                self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        """定期探测不健康的出口"""
+        import requests
+
+        while True:
+            settings = self._get_settings()
+            time.sleep(settings["health_interval"])
+            with self._lock:
+                unhealthy = [egress for egress in self._egresses if not egress.healthy]
+            for egress in unhealthy:
+                try:
+                    requests.head(settings["health_url"], proxies=egress.proxies, timeout=10, allow_redirects=False)
+                except requests.exceptions.RequestException as e:
+                    logger.debug(f"代理出口 {egress.name} 仍不可用: {e}")
+                    continue
+                with self._lock:
+                    egress.healthy = True
+                    egress.consecutive_failures = 0
+                logger.info(f"✅ 代理出口 {egress.name} 已恢复")
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """获取每个出口的统计"""
+        with self._lock:
+            now = time.time()
+            return {
+                egress.name: {
+                    **egress.stats,
+                    "healthy": int(egress.healthy),
+                    "cooling_down": int(now < egress.cooldown_until),
+                }
+                for egress in self._egresses
+            }
+
+
+# 全局代理池实例
+proxy_pool = ProxyPool()
+
+
+def get_proxy_pool() -> ProxyPool:
+    """获取代理池实例"""
+    return proxy_pool
@@ -0,0 +1,253 @@
+"""
+上游录制/回放传输层
+在不访问线上 OKX 的情况下测量分析性能：
+- RecordingAdapter：正常发送请求，同时记录每个响应（状态码、响应头、响应体、耗时）
+- ReplayAdapter：按录制内容在本地返回响应，延迟可按录制耗时、固定值、均匀分布或对数正态分布模拟，
+  可按概率或每秒请求数注入 429
+- 通过 HTTPClientRegistry.install_transport() 挂到共享 Session 上，爬虫代码无需任何改动
+
+请求按 方法 + 主机路径 + 查询参数 + JSON 请求体 匹配，忽略时间戳等每次都变的字段
+"""
+
+import gzip
+import math
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from ..utils import json_codec
+
+
+# 匹配请求时忽略的参数（请求时间戳、强制刷新标记等）
+IGNORED_PARAMS = {"t", "_", "forceRefresh"}
+# 回放时不返回的响应头（录制的响应体已经解压）
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+DEFAULT_CASSETTE_DIR = "config/cassettes"
+
+
+def request_key(method: str, url: str, body=None) -> str:
+    """请求的匹配键"""
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    key = f"{method.upper()} {parts.netloc}{parts.path}"
+    if params:
+        key += "?" + "&".join(f"{k}={v}" for k, v in params)
+    if body:
+        try:
+            payload = json_codec.loads(body)
+        except (ValueError, TypeError):
+            payload = None
+        if isinstance(payload, dict):
+            key += " " + json_codec.dumps({k: v for k, v in sorted(payload.items()) if k not in IGNORED_PARAMS})
+    return key
+
+
+class Cassette:
+    """录制内容：匹配键 -> 按录制顺序的响应列表"""
+
+    def __init__(self, entries: Optional[Dict[str, List[Dict]]] = None, meta: Optional[Dict] = None):
+        self.entries: Dict[str, List[Dict]] = entries or {}
+        self.meta: Dict = meta or {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, status: int, headers: Dict, body: bytes, elapsed: float) -> None:
+        entry = {
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+            "body": body.decode("utf-8", errors="replace"),
+            "elapsed": round(elapsed, 4),
+        }
+        with self._lock:
+            self.entries.setdefault(key, []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self.entries.values())
+
+    def save(self, path: str) -> None:
+        """保存录制内容（.gz 结尾时压缩）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            data = json_codec.dumps_bytes({"meta": self.meta, "entries": self.entries})
+        if path.endswith(".gz"):
+            data = gzip.compress(data)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.endswith(".gz"):
+            data = gzip.decompress(data)
+        payload = json_codec.loads(data)
+        return cls(payload.get("entries", {}), payload.get("meta", {}))
+
+
+class RecordingAdapter(HTTPAdapter):
+    """正常发送请求并录制响应"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # 读取响应体（Session 随后使用已缓存的内容）
+        body = response.content
+        self.cassette.add(
+            request_key(request.method, request.url, request.body),
+            response.status_code, dict(response.headers), body, time.perf_counter() - started,
+        )
+        return response
+
+
+def parse_latency(spec: str) -> Callable[[float], float]:
+    """
+    解析延迟分布，返回 (录制耗时) -> 模拟延迟 的函数
+
+    支持:
+        recorded            使用录制时的耗时
+        recorded:0.5        录制耗时乘以系数
+        fixed:0.2           固定 0.2 秒
+        uniform:0.1,0.5     0.1~0.5 秒均匀分布
+        lognormal:0.3,0.6   中位数 0.3 秒、sigma 0.6 的对数正态分布（长尾）
+        none                不加延迟
+    """
+    kind, _, args = (spec or "recorded").partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    if kind == "recorded":
+        scale = values[0] if values else 1.0
+        return lambda recorded: recorded * scale
+    if kind == "fixed":
+        return lambda recorded: values[0]
+    if kind == "uniform":
+        return lambda recorded: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda recorded: random.lognormvariate(mu, sigma)
+    if kind == "none":
+        return lambda recorded: 0.0
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+
+class _HostRateLimiter:
+    """每个主机每秒请求数限制（滑动一秒窗口）"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._hits: Dict[str, List[float]] = {}
+
+    def allow(self, host: str) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.time()
+        with self._lock:
+            hits = [hit for hit in self._hits.get(host, []) if now - hit < 1.0]
+            allowed = len(hits) < self.rate
+            if allowed:
+                hits.append(now)
+            self._hits[host] = hits
+        return allowed
+
+
+class ReplayAdapter(BaseAdapter):
+    """按录制内容在本地返回响应"""
+
+    def __init__(self, cassette: Cassette, latency: str = "recorded", error_rate: float = 0.0,
+                 rate_limit: float = 0.0, retry_after: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            cassette: 录制内容
+            latency: 延迟分布（见 parse_latency）
+            error_rate: 随机返回 429 的概率
+            rate_limit: 每个主机每秒最多返回的正常响应数，超出返回 429（0 表示不限）
+            retry_after: 429 响应的 Retry-After 秒数
+            seed: 随机种子（固定后延迟和 429 注入可复现）
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._limiter = _HostRateLimiter(rate_limit)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # 同一匹配键多次请求时依次返回录制的响应，用完后重复最后一个
+        self._cursors: Dict[str, int] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"requests": 0, "served": 0, "injected_429": 0, "rate_limited": 0,
+                          "misses": 0, "timeouts": 0, "by_path": {}}
+
+    def _next_entry(self, key: str) -> Optional[Dict]:
+        responses = self.cassette.entries.get(key)
+        if not responses:
+            return None
+        with self._lock:
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+        return responses[min(index, len(responses) - 1)]
+
+    def _build_response(self, request, status: int, headers: Dict, body: bytes, elapsed: float):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "Too Many Requests" if status == 429 else "OK" if status == 200 else ""
+        response.elapsed = timedelta(seconds=elapsed)
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        parts = urlsplit(request.url)
+        with self._lock:
+            self.stats["requests"] += 1
+            by_path = self.stats["by_path"]
+            by_path[parts.path] = by_path.get(parts.path, 0) + 1
+
+        with self._lock:
+            inject = self.error_rate > 0 and self._random.random() < self.error_rate
+        if inject or not self._limiter.allow(parts.netloc):
+            with self._lock:
+                self.stats["injected_429" if inject else "rate_limited"] += 1
+            return self._build_response(request, 429, {"Retry-After": str(self.retry_after)}, b"", 0.0)
+
+        entry = self._next_entry(request_key(request.method, request.url, request.body))
+        if entry is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return self._build_response(request, 404, {"Content-Type": "application/json"},
+                                        b'{"code":-1,"msg":"not recorded"}', 0.0)
+
+        delay = max(0.0, self.latency(entry["elapsed"]))
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout and delay > read_timeout:
+            time.sleep(read_timeout)
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise requests.exceptions.ReadTimeout(f"回放延迟 {delay:.2f}s 超过超时 {read_timeout}s", request=request)
+        time.sleep(delay)
+        with self._lock:
+            self.stats["served"] += 1
+        return self._build_response(request, entry["status"], entry["headers"], entry["body"].encode("utf-8"), delay)
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, by_path=dict(self.stats["by_path"]))
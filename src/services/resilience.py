@@ -0,0 +1,433 @@
+"""
+上游请求容错层
+统一的重试策略与熔断器，替代各爬虫中分散的重试逻辑：
+- 指数退避 + 去相关抖动（decorrelated jitter），遵守 Retry-After
+- 重试预算：重试次数不超过近期请求量的一定比例，避免故障时放大流量
+- 每个上游一个熔断器（关闭 → 打开 → 半开探测），打开期间直接快速失败
+- 带 Retry-After 的 429 只是限流，不计入熔断失败，只消耗重试预算并按要求等待
+- 熔断器状态同步到 HealthStatus.services_status
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import requests
+
+from ..utils.metrics import get_metrics_registry
+from ..utils.tracing import span
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("resilience")
+
+
+# 上游名称
+UPSTREAM_OKX_HOLDERS = "okx_holders"
+UPSTREAM_OKX_WALLET = "okx_wallet"
+UPSTREAM_JUPITER = "jupiter"
+UPSTREAM_PUMPFUN = "pumpfun"
+UPSTREAM_OKX_MARKET = "okx_market"
+
+# 每次尝试的耗时和结果（状态码 / error / circuit_open），上游名称是固定集合
+UPSTREAM_REQUEST_SECONDS = get_metrics_registry().histogram(
+    "colana_bot_upstream_request_seconds", "Upstream request latency per attempt", ["upstream"])
+UPSTREAM_RESPONSES = get_metrics_registry().counter(
+    "colana_bot_upstream_responses_total", "Upstream responses by status code", ["upstream", "code"])
+
+# 熔断器状态
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# 熔断器状态 -> 健康检查服务状态
+_SERVICE_STATUS = {
+    STATE_CLOSED: "healthy",
+    STATE_HALF_OPEN: "degraded",
+    STATE_OPEN: "error",
+}
+
+# 需要重试的HTTP状态码
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 建立连接的超时上限（秒），上游不可达时尽快失败，不占用线程等待完整的读取超时
+CONNECT_TIMEOUT = 5
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求被直接拒绝"""
+
+    def __init__(self, upstream: str, retry_in: float):
+        self.upstream = upstream
+        self.retry_in = retry_in
+        super().__init__(f"上游 {upstream} 熔断中，{retry_in:.0f}秒后重新探测")
+
+
+class EgressUnavailableError(requests.exceptions.ConnectionError):
+    """代理出口池在等待时间内没有可用出口（全部冷却、不健康或令牌耗尽），请求未发出"""
+
+    def __init__(self, host: str, waited: float):
+        self.host = host
+        self.waited = waited
+        super().__init__(f"代理出口池 {waited:.0f}秒内没有可用出口，未发送请求: {host}")
+
+
+def parse_retry_after(response: Optional[requests.Response]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），无法解析时返回 None"""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """指数退避 + 去相关抖动"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 retry_statuses: tuple = RETRY_STATUSES):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+
+    def next_delay(self, previous_delay: float) -> float:
+        """下一次重试的等待时间：random(base, previous × 3)，不超过上限"""
+        upper = max(self.base_delay, previous_delay * 3)
+        return min(self.max_delay, random.uniform(self.base_delay, upper))
+
+
+class RetryBudget:
+    """重试预算：滑动窗口内重试次数 ≤ 最少重试数 + 请求数 × 比例"""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 5, window: float = 60.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = time.time()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """申请一次重试额度"""
+        with self._lock:
+            now = time.time()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + len(self._requests) * self.ratio:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class LatencyTracker:
+    """记录最近请求的耗时，用于计算分位数（如对冲请求的触发阈值）"""
+
+    def __init__(self, maxlen: int = 200):
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, ratio: float) -> float:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，冷却后进入半开状态放行少量探测请求"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def retry_in(self) -> float:
+        """距离下一次探测的秒数"""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.recovery_timeout - time.time())
+
+    def allow_request(self) -> bool:
+        """是否放行请求"""
+        changed = False
+        with self._lock:
+            if self.state == STATE_OPEN:
+                if time.time() - self._opened_at < self.recovery_timeout:
+                    self._stats["rejected"] += 1
+                    return False
+                self.state = STATE_HALF_OPEN
+                self._half_open_calls = 0
+                changed = True
+            if self.state == STATE_HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self._stats["rejected"] += 1
+                    allowed = False
+                else:
+                    self._half_open_calls += 1
+                    allowed = True
+            else:
+                allowed = True
+        if changed:
+            self._on_state_change()
+        return allowed
+
+    def release_probe(self) -> None:
+        """归还半开探测名额（请求没有得出上游是否恢复的结论，如被限流或被中断）"""
+        with self._lock:
+            if self.state == STATE_HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            changed = self.state != STATE_CLOSED
+            self.state = STATE_CLOSED
+            self._failures = 0
+        if changed:
+            logger.info(f"✅ 上游 {self.name} 已恢复，熔断器关闭")
+            self._on_state_change()
+
+    def record_failure(self, error: str = None) -> None:
+        with self._lock:
+            self._failures += 1
+            should_open = (self.state == STATE_HALF_OPEN or
+                           (self.state == STATE_CLOSED and self._failures >= self.failure_threshold))
+            if should_open:
+                self.state = STATE_OPEN
+                self._opened_at = time.time()
+                self._stats["opened"] += 1
+        if should_open:
+            logger.warning(f"🔌 上游 {self.name} 熔断器打开（连续失败 {self._failures} 次），"
+                           f"{self.recovery_timeout:.0f}秒后探测: {error or ''}")
+            self._on_state_change(error)
+
+    def _on_state_change(self, error: str = None) -> None:
+        """同步熔断器状态到健康检查"""
+        try:
+            from ..utils.health_check import update_service_status
+            update_service_status(self.name, _SERVICE_STATUS[self.state], error, circuit=self.state)
+        except ImportError:
+            pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self._failures
+        stats["retry_in"] = round(self.retry_in(), 1)
+        return stats
+
+
+class Upstream:
+    """单个上游：重试策略 + 重试预算 + 熔断器"""
+
+    def __init__(self, name: str, policy: RetryPolicy, budget: RetryBudget, breaker: CircuitBreaker):
+        self.name = name
+        self.policy = policy
+        self.budget = budget
+        self.breaker = breaker
+        # 成功请求的单次耗时
+        self.latency = LatencyTracker()
+        self._stats = {"calls": 0, "retries": 0, "budget_exhausted": 0, "failures": 0, "rate_limited": 0,
+                       "egress_unavailable": 0}
+
+    def is_open(self) -> bool:
+        """熔断器是否处于打开状态（调用方可据此提前跳过工作）"""
+        return self.breaker.state == STATE_OPEN and self.breaker.retry_in() > 0
+
+    def call(self, send: Callable[..., requests.Response], max_attempts: Optional[int] = None,
+             timeout: Optional[float] = None,
+             retry_if: Optional[Callable[[requests.Response], Optional[str]]] = None) -> requests.Response:
+        """
+        按策略执行请求
+
+        Args:
+            send: 发送请求的函数，每次尝试都会重新调用（可刷新时间戳等参数），接收 timeout 参数
+            max_attempts: 最大尝试次数，默认使用策略配置
+            timeout: 读取超时（秒），连接超时不超过 CONNECT_TIMEOUT
+            retry_if: 检查非重试状态码的响应内容，返回失败原因时按策略重试
+                      （如 HTTP 200 但业务 code 非0），上游已正常响应，不计入熔断失败
+
+        Returns:
+            最后一次的响应（可能是非2xx状态）
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            requests.exceptions.RequestException: 所有尝试都发生网络异常
+            其他异常: send 抛出的非网络异常计为一次失败后原样抛出，不重试
+        """
+        max_attempts = max_attempts or self.policy.max_attempts
+        request_timeout = (min(CONNECT_TIMEOUT, timeout), timeout) if timeout else None
+        delay = self.policy.base_delay
+        self._stats["calls"] += 1
+
+        for attempt in range(1, max_attempts + 1):
+            if not self.breaker.allow_request():
+                UPSTREAM_RESPONSES.labels(self.name, "circuit_open").inc()
+                raise CircuitOpenError(self.name, self.breaker.retry_in())
+
+            self.budget.record_request()
+            response = None
+            error = None
+            start_time = time.time()
+            try:
+                with span("upstream_request", upstream=self.name, attempt=attempt):
+                    response = send(timeout=request_timeout) if request_timeout else send()
+            except EgressUnavailableError as e:
+                # 本地出口限速饱和，请求没有到达上游：不计入熔断，按策略退避后重试
+                error = e
+            except requests.exceptions.RequestException as e:
+                error = e
+            except Exception as e:
+                # 非网络异常（如回调中的解析错误）也记为失败，半开探测时重新打开熔断器，不会一直占用探测名额
+                UPSTREAM_RESPONSES.labels(self.name, "error").inc()
+                self.breaker.record_failure(f"{type(e).__name__}: {e}")
+                self._stats["failures"] += 1
+                raise
+            except BaseException:
+                # 线程被中断等情况没有结论，归还探测名额
+                self.breaker.release_probe()
+                raise
+            UPSTREAM_REQUEST_SECONDS.labels(self.name).observe(time.time() - start_time)
+            UPSTREAM_RESPONSES.labels(self.name, "error" if error else response.status_code).inc()
+            retry_after = parse_retry_after(response)
+
+            if error is None and response.status_code not in self.policy.retry_statuses:
+                self.latency.record(time.time() - start_time)
+                self.breaker.record_success()
+                failure = retry_if(response) if retry_if else None
+                if failure is None:
+                    return response
+            elif error is None and response.status_code == 429 and retry_after is not None:
+                # 明确的限流：上游是健康的，只需按 Retry-After 等待，不计入熔断失败
+                failure = "HTTP 429"
+                self.breaker.release_probe()
+                self._stats["rate_limited"] += 1
+            elif isinstance(error, EgressUnavailableError):
+                failure = str(error)
+                self.breaker.release_probe()
+                self._stats["egress_unavailable"] += 1
+            else:
+                failure = str(error) if error else f"HTTP {response.status_code}"
+                self.breaker.record_failure(failure)
+                self._stats["failures"] += 1
+
+            if attempt >= max_attempts:
+                break
+            if not self.budget.try_acquire():
+                self._stats["budget_exhausted"] += 1
+                logger.warning(f"💸 上游 {self.name} 重试预算已用完，放弃重试: {failure}")
+                break
+
+            delay = self.policy.next_delay(delay)
+            wait_time = min(self.policy.max_delay, max(delay, retry_after or 0))
+            self._stats["retries"] += 1
+            logger.debug(f"⏳ 上游 {self.name} 第{attempt}次失败（{failure}），{wait_time:.1f}秒后重试")
+            with span("retry_wait", upstream=self.name):
+                time.sleep(wait_time)
+
+        if error is not None:
+            raise error
+        return response
+
+    def get_stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats.update(self.breaker.get_stats())
+        stats["latency_p50"] = round(self.latency.percentile(0.5), 3)
+        stats["latency_p90"] = round(self.latency.percentile(0.9), 3)
+        return stats
+
+
+class UpstreamRegistry:
+    """上游注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._upstreams: Dict[str, Upstream] = {}
+
+    def _get_settings(self) -> Dict:
+        """读取容错配置"""
+        return read_settings("analysis", {
+            "max_attempts": ("retry_max_attempts", 3),
+            "base_delay": ("retry_base_delay", 1.0),
+            "max_delay": ("retry_max_delay", 30.0),
+            "budget_ratio": ("retry_budget_ratio", 0.2),
+            "failure_threshold": ("circuit_failure_threshold", 5),
+            "recovery_timeout": ("circuit_recovery_timeout", 30),
+        })
+
+    def get(self, name: str) -> Upstream:
+        """获取上游（首次使用时按配置创建）"""
+        with self._lock:
+            upstream = self._upstreams.get(name)
+            if upstream is None:
+                settings = self._get_settings()
+                upstream = Upstream(
+                    name,
+                    RetryPolicy(settings["max_attempts"], settings["base_delay"], settings["max_delay"]),
+                    RetryBudget(ratio=settings["budget_ratio"]),
+                    CircuitBreaker(name, settings["failure_threshold"], settings["recovery_timeout"]),
+                )
+                self._upstreams[name] = upstream
+        return upstream
+
+    def reset(self) -> None:
+        """丢弃所有上游的重试预算、熔断和延迟状态（基准测试在不同模式之间调用），之后按配置重新创建"""
+        with self._lock:
+            self._upstreams.clear()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """获取所有上游的重试和熔断统计"""
+        with self._lock:
+            upstreams = list(self._upstreams.values())
+        return {upstream.name: upstream.get_stats() for upstream in upstreams}
+
+
+# 全局上游注册表
+upstream_registry = UpstreamRegistry()
+
+
+def get_upstream(name: str) -> Upstream:
+    """获取上游实例"""
+    return upstream_registry.get(name)
+
+
+def get_upstream_registry() -> UpstreamRegistry:
+    """获取上游注册表"""
+    return upstream_registry
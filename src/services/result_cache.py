@@ -0,0 +1,306 @@
+"""
+代币分析结果缓存服务
+按 代币地址 + 大户数量 缓存完整的分析结果，采用 stale-while-revalidate 策略：
+- 每个结果记录分析时使用的数据新鲜度等级，低于请求等级的结果不返回（realtime 请求不会拿到预取等按 recent 构建的结果）
+- 新鲜窗口内直接返回缓存
+- 过期窗口内先返回旧结果（标注缓存时长），同时后台刷新，刷新完成后回调通知
+- 超出过期窗口则重新分析（同一代币并发请求只会触发一次分析）
+- 内存未命中时从分析存档读取过期窗口内的最近一次分析（重启后缓存不必重新预热）
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .okx_crawler import OKXCrawlerForBot
+from .analysis_archive import get_analysis_archive
+from .price_table import get_price_table
+from .scheduler import get_scheduler, current_job, PRIORITY_BATCH
+from .wallet_cache import CACHE_REQUESTS, normalize_freshness, freshness_satisfies
+
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("result_cache")
+
+
+# 等待其他线程完成同一代币分析的最长时间（秒）
+INFLIGHT_WAIT_TIMEOUT = 300
+
+
+def format_cache_age(seconds: float) -> str:
+    """将缓存时长格式化为易读文本"""
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return f"{seconds}秒"
+    if seconds < 3600:
+        return f"{seconds // 60}分钟"
+    return f"{seconds // 3600}小时{(seconds % 3600) // 60}分钟"
+
+
+class AnalysisResultCache:
+    """分析结果缓存（stale-while-revalidate）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> {"result": dict, "timestamp": float}
+        self._entries: Dict[str, Dict] = {}
+        # 正在进行分析的key -> 完成事件
+        self._inflight: Dict[str, threading.Event] = {}
+        # 等待后台刷新结果的回调
+        self._refresh_callbacks: Dict[str, List[Callable[[Dict], None]]] = {}
+        # 已提交但尚未开始执行的刷新任务
+        self._refresh_pending = set()
+        # 代币地址 -> 手动失效时间，早于该时间的存档结果不再加载
+        self._invalidated_at: Dict[str, float] = {}
+        self._stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "archive_loads": 0}
+
+    def _get_settings(self) -> Dict:
+        """读取缓存窗口配置"""
+        return read_settings("analysis", {
+            "enabled": ("result_cache_enabled", True),
+            "fresh_ttl": ("result_cache_fresh_seconds", 300),
+            "stale_ttl": ("result_cache_stale_seconds", 1800),
+            "max_entries": ("result_cache_max_entries", 200),
+            "archive_enabled": ("archive_enabled", True),
+        })
+
+    @staticmethod
+    def _make_key(token_address: str, top_holders_count: int) -> str:
+        return f"{token_address}:{top_holders_count}"
+
+    @staticmethod
+    def _result_tier(result: Dict) -> Optional[str]:
+        """分析结果构建时使用的数据新鲜度等级"""
+        return (result.get("freshness") or {}).get("tier")
+
+    def peek(self, token_address: str, top_holders_count: int,
+             freshness: Optional[str] = None) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        查看缓存（不触发分析）
+
+        Args:
+            freshness: 要求的数据新鲜度等级，结果构建时的等级低于该等级时视为未命中；None 表示不限
+
+        Returns:
+            (分析结果, 缓存时长秒数)，未命中或已超出过期窗口时返回 (None, None)
+        """
+        settings = self._get_settings()
+        key = self._make_key(token_address, top_holders_count)
+        with self._lock:
+            entry = self._entries.get(key)
+        if not entry and settings["archive_enabled"]:
+            entry = self._load_from_archive(key, token_address, top_holders_count, settings)
+        if not entry:
+            return None, None
+        age = time.time() - entry["timestamp"]
+        if age > settings["stale_ttl"]:
+            return None, None
+        if freshness is not None and not freshness_satisfies(self._result_tier(entry["result"]), freshness):
+            return None, None
+        # 缓存中保留原始结果，每次读取时按最新价格重估
+        return get_price_table().revalue_analysis_result(entry["result"]), age
+
+    def _evict_overflow(self, settings: Dict) -> None:
+        """超出容量时淘汰最旧的条目（调用方需持有锁）"""
+        overflow = len(self._entries) - settings["max_entries"]
+        if overflow > 0:
+            oldest = sorted(self._entries.items(), key=lambda x: x[1]["timestamp"])[:overflow]
+            for old_key, _ in oldest:
+                del self._entries[old_key]
+
+    def _load_from_archive(self, key: str, token_address: str, top_holders_count: int,
+                           settings: Dict) -> Optional[Dict]:
+        """从分析存档读取过期窗口内的最近一次分析并放入内存"""
+        try:
+            result, analyzed_at = get_analysis_archive().latest(
+                token_address, top_holders_count, max_age=settings["stale_ttl"]
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 读取分析存档失败 {token_address}: {e}")
+            return None
+        if result is None:
+            return None
+        with self._lock:
+            if analyzed_at <= self._invalidated_at.get(token_address, 0):
+                return None
+            # 读取存档期间可能已有新结果写入
+            entry = self._entries.get(key)
+            if entry is None or entry["timestamp"] < analyzed_at:
+                entry = self._entries[key] = {"result": result, "timestamp": analyzed_at}
+                self._evict_overflow(settings)
+            self._stats["archive_loads"] += 1
+        logger.debug(f"从分析存档加载: {token_address}")
+        return entry
+
+    def put(self, token_address: str, top_holders_count: int, result: Dict) -> None:
+        """写入缓存，只缓存有效的分析结果"""
+        if not result or not result.get("token_statistics"):
+            return
+        settings = self._get_settings()
+        key = self._make_key(token_address, top_holders_count)
+        now = time.time()
+        with self._lock:
+            current = self._entries.get(key)
+            if (current is not None and now - current["timestamp"] <= settings["fresh_ttl"] and
+                    not freshness_satisfies(self._result_tier(result), self._result_tier(current["result"]))):
+                # 不用较低新鲜度等级的结果覆盖仍新鲜的高等级结果
+                return
+            self._entries[key] = {"result": result, "timestamp": now}
+            self._evict_overflow(settings)
+
+    def invalidate(self, token_address: str) -> int:
+        """删除某个代币的所有缓存，返回删除数量"""
+        prefix = f"{token_address}:"
+        with self._lock:
+            self._invalidated_at[token_address] = time.time()
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def _run_analysis(self, key: str, analyze_fn: Callable[[], Dict],
+                      token_address: str, top_holders_count: int) -> Optional[Dict]:
+        """执行分析并唤醒等待者（调用前需已登记 inflight）"""
+        result = None
+        try:
+            result = analyze_fn()
+            self.put(token_address, top_holders_count, result)
+        except Exception as e:
+            logger.error(f"❌ 分析结果刷新失败 {token_address}: {e}")
+        finally:
+            with self._lock:
+                event = self._inflight.pop(key, None)
+                callbacks = self._refresh_callbacks.pop(key, [])
+            if event:
+                event.set()
+
+        if result and result.get("token_statistics"):
+            for callback in callbacks:
+                try:
+                    callback(result)
+                except Exception as e:
+                    logger.error(f"❌ 缓存刷新回调失败 {token_address}: {e}")
+        return result
+
+    def _refresh(self, key: str, analyze_fn: Callable[[], Dict],
+                 token_address: str, top_holders_count: int) -> Optional[Dict]:
+        """后台刷新任务：开始执行时才登记 inflight，排队期间不阻塞其他请求"""
+        with self._lock:
+            self._refresh_pending.discard(key)
+            if key in self._inflight:
+                # 已有分析在进行，回调会在其完成时一并触发
+                return None
+            self._inflight[key] = threading.Event()
+        return self._run_analysis(key, analyze_fn, token_address, top_holders_count)
+
+    def _start_background_refresh(self, key: str, analyze_fn: Callable[[], Dict],
+                                  token_address: str, top_holders_count: int,
+                                  on_refresh: Optional[Callable[[Dict], None]]) -> None:
+        """登记刷新回调，若当前没有进行中或排队中的刷新则提交后台刷新任务"""
+        with self._lock:
+            if on_refresh:
+                self._refresh_callbacks.setdefault(key, []).append(on_refresh)
+            if key in self._inflight or key in self._refresh_pending:
+                return
+            self._refresh_pending.add(key)
+            self._stats["refreshes"] += 1
+
+        logger.info(f"♻️ 后台刷新分析结果: {token_address}")
+        job = get_scheduler().submit(
+            self._refresh,
+            args=(key, analyze_fn, token_address, top_holders_count),
+            priority=PRIORITY_BATCH,
+            tag="refresh",
+        )
+        if job is None:
+            # 调度队列已满，放弃本次刷新
+            with self._lock:
+                self._refresh_pending.discard(key)
+                self._refresh_callbacks.pop(key, None)
+
+    def get_or_analyze(self, token_address: str, top_holders_count: int,
+                       on_refresh: Optional[Callable[[Dict], None]] = None,
+                       analyze_fn: Optional[Callable[[], Dict]] = None,
+                       freshness: Optional[str] = None) -> Tuple[Optional[Dict], Dict]:
+        """
+        获取分析结果，优先使用缓存
+
+        Args:
+            token_address: 代币地址
+            top_holders_count: 分析的大户数量
+            on_refresh: 返回过期结果时，后台刷新完成后的回调（参数为新结果）
+            analyze_fn: 自定义分析函数，默认使用 OKXCrawlerForBot.analyze_token_holders
+            freshness: 要求的数据新鲜度等级（realtime / recent / archival），
+                       同时用于重新分析；按更低等级构建的缓存结果不返回
+
+        Returns:
+            (分析结果, 缓存信息 {"state": fresh/stale/miss, "age": 秒})
+        """
+        if analyze_fn is None:
+            def analyze_fn():
+                return OKXCrawlerForBot().analyze_token_holders(
+                    token_address, top_holders_count=top_holders_count, freshness=freshness
+                )
+
+        settings = self._get_settings()
+        if not settings["enabled"]:
+            return analyze_fn(), {"state": "miss", "age": 0}
+
+        freshness = normalize_freshness(freshness)
+        # 进行中的分析按新鲜度等级区分，realtime 请求不等待 recent 等级的分析
+        key = f"{self._make_key(token_address, top_holders_count)}:{freshness}"
+        result, age = self.peek(token_address, top_holders_count, freshness)
+
+        if result is not None and age <= settings["fresh_ttl"]:
+            with self._lock:
+                self._stats["fresh_hits"] += 1
+            CACHE_REQUESTS.labels("analysis", "fresh").inc()
+            logger.info(f"⚡ 命中新鲜缓存: {token_address} ({format_cache_age(age)}前)")
+            return result, {"state": "fresh", "age": age}
+
+        if result is not None:
+            with self._lock:
+                self._stats["stale_hits"] += 1
+            CACHE_REQUESTS.labels("analysis", "stale").inc()
+            logger.info(f"♻️ 命中过期缓存: {token_address} ({format_cache_age(age)}前)")
+            self._start_background_refresh(key, analyze_fn, token_address, top_holders_count, on_refresh)
+            return result, {"state": "stale", "age": age}
+
+        CACHE_REQUESTS.labels("analysis", "miss").inc()
+        with self._lock:
+            self._stats["misses"] += 1
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+
+        if event is not None:
+            # 其他请求正在分析同一代币，等待其完成后复用结果
+            # 在调度任务中等待时不超过任务的剩余时间，避免长期占住工作线程
+            logger.info(f"⏳ 等待进行中的分析: {token_address}")
+            job = current_job()
+            event.wait(job.remaining(INFLIGHT_WAIT_TIMEOUT) if job else INFLIGHT_WAIT_TIMEOUT)
+            result, age = self.peek(token_address, top_holders_count, freshness)
+            if result is not None:
+                return result, {"state": "fresh", "age": age}
+            if job is not None and job.should_stop():
+                return None, {"state": "miss", "age": 0}
+            return analyze_fn(), {"state": "miss", "age": 0}
+
+        return self._run_analysis(key, analyze_fn, token_address, top_holders_count), {"state": "miss", "age": 0}
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["inflight"] = len(self._inflight)
+        return stats
+
+
+# 全局分析结果缓存实例
+result_cache = AnalysisResultCache()
+
+
+def get_result_cache() -> AnalysisResultCache:
+    """获取分析结果缓存实例"""
+    return result_cache
@@ -0,0 +1,367 @@
+"""
+分析任务调度服务
+所有分析任务统一提交到有界工作线程池，按优先级调度：
+交互请求（/ca1） > 自动pump分析 > 批量任务（/cajup、预取、后台刷新）。
+同一优先级内按群组轮询，避免单个群组的大批量任务饿死其他群组。
+
+运行中的任务通过 current_job() 取得自身的取消标志和截止时间，
+分析流程在钱包批次之间检查，取消或超时后尽快结束。
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.metrics import get_metrics_registry
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("scheduler")
+
+
+# 优先级（数值越小越优先）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_AUTO_PUMP = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_AUTO_PUMP: "auto_pump",
+    PRIORITY_BATCH: "batch",
+}
+
+# 非群组发起的系统任务使用的chat_id
+SYSTEM_CHAT_ID = "system"
+
+# 工作线程当前执行的任务
+_local = threading.local()
+
+SCHEDULER_QUEUE_WAIT_SECONDS = get_metrics_registry().histogram(
+    "colana_bot_scheduler_queue_wait_seconds", "Time analysis jobs spend queued", ["priority"])
+SCHEDULER_QUEUED_JOBS = get_metrics_registry().gauge(
+    "colana_bot_scheduler_queued_jobs", "Queued analysis jobs", ["priority"])
+SCHEDULER_RUNNING_JOBS = get_metrics_registry().gauge(
+    "colana_bot_scheduler_running_jobs", "Running analysis jobs")
+
+
+class ScheduledJob:
+    """调度任务"""
+
+    def __init__(self, job_id: int, chat_id: str, priority: int, tag: str,
+                 fn: Callable, args: tuple, kwargs: dict,
+                 on_position: Optional[Callable[[int], None]] = None):
+        self.job_id = job_id
+        self.chat_id = str(chat_id)
+        self.priority = priority
+        self.tag = tag
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_position = on_position
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.state = "queued"  # queued / running / done / failed / cancelled
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.last_position: Optional[int] = None
+        self.deadline: Optional[float] = None  # 开始执行时按 scheduler_job_timeout_seconds 设置
+        self.cancel_event = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """任务是否已被取消（运行中的任务可轮询此属性提前退出）"""
+        return self.cancel_event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        """任务是否已超过截止时间"""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def should_stop(self) -> bool:
+        """任务被取消或已超时，运行中的任务应尽快结束"""
+        return self.cancelled or self.expired
+
+    def remaining(self, default: Optional[float] = None) -> Optional[float]:
+        """距截止时间的剩余秒数，不超过 default；没有截止时间时返回 default"""
+        if self.deadline is None:
+            return default
+        remaining = max(0.0, self.deadline - time.time())
+        return remaining if default is None else min(default, remaining)
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        等待任务完成
+
+        Returns:
+            任务返回值；任务取消、失败或超时时返回 None
+        """
+        self._done.wait(timeout)
+        return self.result
+
+
+class AnalysisScheduler:
+    """优先级 + 群组公平调度器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        # priority -> OrderedDict(chat_id -> deque[ScheduledJob])，OrderedDict的顺序即轮询顺序
+        self._queues: Dict[int, "OrderedDict[str, deque]"] = {
+            priority: OrderedDict() for priority in PRIORITY_NAMES
+        }
+        self._running: Dict[int, ScheduledJob] = {}
+        self._workers: List[threading.Thread] = []
+        self._id_counter = itertools.count(1)
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def _get_settings(self) -> Dict:
+        """读取调度配置"""
+        return read_settings("analysis", {
+            "max_workers": ("scheduler_max_workers", 3),
+            "max_queue": ("scheduler_max_queue", 100),
+            "max_queue_per_chat": ("scheduler_max_queue_per_chat", 20),
+            "job_timeout": ("scheduler_job_timeout_seconds", 180),
+        })
+
+    def _ensure_workers(self, max_workers: int) -> None:
+        """按需启动工作线程（调用方需持有锁）"""
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                daemon=True,
+                name=f"AnalysisWorker-{len(self._workers) + 1}",
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _queued_count(self, chat_id: Optional[str] = None) -> int:
+        """排队任务数量（调用方需持有锁）"""
+        total = 0
+        for chat_queues in self._queues.values():
+            if chat_id is None:
+                total += sum(len(jobs) for jobs in chat_queues.values())
+            else:
+                total += len(chat_queues.get(chat_id, ()))
+        return total
+
+    def submit(self, fn: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+               chat_id: str = SYSTEM_CHAT_ID, priority: int = PRIORITY_BATCH, tag: str = "",
+               on_position: Optional[Callable[[int], None]] = None) -> Optional[ScheduledJob]:
+        """
+        提交任务
+
+        Args:
+            fn: 任务函数
+            args/kwargs: 任务参数
+            chat_id: 发起任务的群组（用于公平调度和取消）
+            priority: 优先级
+            tag: 任务类型标签（用于按功能取消）
+            on_position: 排队位置变化回调，参数为排队位置（从1开始），0 表示开始执行
+
+        Returns:
+            ScheduledJob；队列已满被拒绝时返回 None
+        """
+        settings = self._get_settings()
+        chat_id = str(chat_id)
+
+        with self._lock:
+            if (self._queued_count() >= settings["max_queue"] or
+                    self._queued_count(chat_id) >= settings["max_queue_per_chat"]):
+                self._stats["rejected"] += 1
+                logger.warning(f"⛔ 任务队列已满，拒绝任务: chat={chat_id}, tag={tag}")
+                return None
+
+            job = ScheduledJob(next(self._id_counter), chat_id, priority, tag,
+                               fn, args, kwargs or {}, on_position)
+            self._queues[priority].setdefault(chat_id, deque()).append(job)
+            self._stats["submitted"] += 1
+            self._ensure_workers(settings["max_workers"])
+            self._not_empty.notify()
+
+        self._notify_positions()
+        return job
+
+    def _simulated_order(self) -> List[ScheduledJob]:
+        """模拟后续出队顺序（调用方需持有锁）"""
+        order = []
+        for priority in sorted(self._queues):
+            chat_queues = [list(jobs) for jobs in self._queues[priority].values() if jobs]
+            index = 0
+            while chat_queues:
+                index %= len(chat_queues)
+                order.append(chat_queues[index].pop(0))
+                if not chat_queues[index]:
+                    chat_queues.pop(index)
+                else:
+                    index += 1
+        return order
+
+    def get_position(self, job: ScheduledJob) -> int:
+        """获取任务排队位置（从1开始），未在排队中返回 0"""
+        with self._lock:
+            for position, queued in enumerate(self._simulated_order(), 1):
+                if queued is job:
+                    return position
+        return 0
+
+    def _notify_positions(self) -> None:
+        """向关心排队位置的任务推送位置变化"""
+        with self._lock:
+            # 空闲工作线程马上会取走的任务不算排队
+            idle_workers = len([worker for worker in self._workers if worker.is_alive()]) - len(self._running)
+            updates = []
+            for position, job in enumerate(self._simulated_order(), 1):
+                if position <= idle_workers:
+                    continue
+                if job.on_position and job.last_position != position:
+                    job.last_position = position
+                    updates.append((job, position))
+
+        for job, position in updates:
+            try:
+                job.on_position(position)
+            except Exception as e:
+                logger.debug(f"排队位置回调失败 job={job.job_id}: {e}")
+
+    def _next_job(self) -> ScheduledJob:
+        """按优先级和群组轮询取出下一个任务（调用方需持有锁）"""
+        for priority in sorted(self._queues):
+            chat_queues = self._queues[priority]
+            while chat_queues:
+                chat_id, jobs = next(iter(chat_queues.items()))
+                if not jobs:
+                    del chat_queues[chat_id]
+                    continue
+                job = jobs.popleft()
+                # 轮询：当前群组移到队尾
+                if jobs:
+                    chat_queues.move_to_end(chat_id)
+                else:
+                    del chat_queues[chat_id]
+                return job
+        return None
+
+    def _worker_loop(self) -> None:
+        """工作线程主循环"""
+        while True:
+            job_timeout = self._get_settings()["job_timeout"]
+            with self._not_empty:
+                job = self._next_job()
+                while job is None:
+                    self._not_empty.wait()
+                    job = self._next_job()
+                job.state = "running"
+                job.started_at = time.time()
+                if job_timeout:
+                    job.deadline = job.started_at + job_timeout
+                self._running[job.job_id] = job
+            SCHEDULER_QUEUE_WAIT_SECONDS.labels(PRIORITY_NAMES[job.priority]).observe(
+                job.started_at - job.submitted_at)
+
+            self._notify_positions()
+            # 只有提示过排队位置的任务才需要通知开始执行
+            if job.on_position and job.last_position is not None:
+                try:
+                    job.on_position(0)
+                except Exception as e:
+                    logger.debug(f"排队位置回调失败 job={job.job_id}: {e}")
+
+            _local.job = job
+            try:
+                job.result = job.fn(*job.args, **job.kwargs)
+                job.state = "cancelled" if job.cancelled else "done"
+                if job.expired:
+                    logger.warning(f"⏰ 调度任务超过截止时间 job={job.job_id} tag={job.tag}")
+            except Exception as e:
+                job.error = e
+                job.state = "failed"
+                logger.error(f"❌ 调度任务执行失败 job={job.job_id} tag={job.tag}: {e}")
+            finally:
+                _local.job = None
+                job.finished_at = time.time()
+                with self._lock:
+                    self._running.pop(job.job_id, None)
+                    if job.state == "done":
+                        self._stats["completed"] += 1
+                    elif job.state == "failed":
+                        self._stats["failed"] += 1
+                    else:
+                        self._stats["cancelled"] += 1
+                job._done.set()
+
+    def cancel_jobs(self, chat_id: Optional[str] = None, tag: Optional[str] = None) -> int:
+        """
+        取消匹配的任务：排队中的任务直接移除，运行中的任务设置取消标志，
+        分析流程在下一批钱包之前检查到标志后放弃剩余钱包并返回空结果
+
+        Args:
+            chat_id: 群组ID，None 表示所有群组
+            tag: 任务标签，None 表示所有标签
+
+        Returns:
+            取消的任务数量
+        """
+        def matches(job: ScheduledJob) -> bool:
+            return ((chat_id is None or job.chat_id == str(chat_id)) and
+                    (tag is None or job.tag == tag))
+
+        removed = []
+        with self._lock:
+            for chat_queues in self._queues.values():
+                for queue_chat_id in list(chat_queues):
+                    jobs = chat_queues[queue_chat_id]
+                    kept = deque(job for job in jobs if not matches(job))
+                    removed.extend(job for job in jobs if matches(job))
+                    if kept:
+                        chat_queues[queue_chat_id] = kept
+                    else:
+                        del chat_queues[queue_chat_id]
+            running = [job for job in self._running.values() if matches(job)]
+            self._stats["cancelled"] += len(removed)
+
+        for job in removed:
+            job.state = "cancelled"
+            job.cancel_event.set()
+            job._done.set()
+        for job in running:
+            job.cancel_event.set()
+
+        if removed or running:
+            logger.info(f"🛑 已取消任务: chat={chat_id}, tag={tag}, 排队 {len(removed)} 个, 运行中 {len(running)} 个")
+            self._notify_positions()
+        return len(removed) + len(running)
+
+    def get_stats(self) -> Dict:
+        """获取调度统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = len(self._running)
+            stats["workers"] = len([worker for worker in self._workers if worker.is_alive()])
+            stats["queued"] = {
+                PRIORITY_NAMES[priority]: sum(len(jobs) for jobs in chat_queues.values())
+                for priority, chat_queues in self._queues.items()
+            }
+        return stats
+
+
+def current_job() -> Optional[ScheduledJob]:
+    """当前线程正在执行的调度任务，不在调度工作线程中时返回 None"""
+    return getattr(_local, "job", None)
+
+
+# 全局调度器实例
+analysis_scheduler = AnalysisScheduler()
+
+for _priority_name in PRIORITY_NAMES.values():
+    SCHEDULER_QUEUED_JOBS.labels(_priority_name).set_function(
+        lambda name=_priority_name: analysis_scheduler.get_stats()["queued"][name])
+SCHEDULER_RUNNING_JOBS.set_function(lambda: analysis_scheduler.get_stats()["running"])
+
+
+def get_scheduler() -> AnalysisScheduler:
+    """获取调度器实例"""
+    return analysis_scheduler
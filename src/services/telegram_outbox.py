@@ -0,0 +1,347 @@
+"""
+Telegram 出站消息队列
+所有发送、编辑、删除集中到专用线程按限速发出，分析线程不再为 Telegram 限速而 sleep：
+- 全局令牌桶 + 每个会话的令牌桶（私聊约 1条/秒，群组约 20条/分钟）
+- 收到 429 时按 retry_after 暂停该会话并重试，其他会话继续发送
+- 同一条消息排队中的多次 edit_message_text 合并为最新内容，只发送一次
+- 同一会话内按提交顺序发送；调用默认等待发送完成，Telegram 错误（如 Markdown 解析失败）照常抛给调用方，
+  便于原有的 try/except 降级处理；只有不关心结果的进度更新传 wait=False
+- 等待超时时撤回仍在排队的请求（调用方重试不会重复发送），已在发送中的请求等待其完成
+"""
+
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple
+
+from .proxy_pool import TokenBucket
+from ..utils.metrics import get_metrics_registry
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("telegram_outbox")
+
+
+# 网络错误重试的基础退避（秒）
+NETWORK_RETRY_BACKOFF = 1.0
+
+TELEGRAM_SEND_SECONDS = get_metrics_registry().histogram(
+    "colana_bot_telegram_send_seconds", "Telegram API call latency", ["method"])
+TELEGRAM_QUEUE_WAIT_SECONDS = get_metrics_registry().histogram(
+    "colana_bot_telegram_queue_wait_seconds", "Time Telegram calls wait in the outbox")
+# result: ok / not_modified / 429 / error
+TELEGRAM_RESPONSES = get_metrics_registry().counter(
+    "colana_bot_telegram_responses_total", "Telegram API results", ["method", "result"])
+TELEGRAM_QUEUED = get_metrics_registry().gauge(
+    "colana_bot_telegram_queued", "Telegram calls waiting in the outbox")
+
+
+def _get_settings() -> Dict:
+    """读取出站队列配置"""
+    return read_settings("bot", {
+        "enabled": ("outbox_enabled", True),
+        "global_rate": ("outbox_global_rate_per_second", 25),
+        "chat_rate": ("outbox_chat_rate_per_second", 1.0),
+        "group_rate_per_minute": ("outbox_group_rate_per_minute", 20),
+        "chat_burst": ("outbox_chat_burst", 3),
+        "max_retries": ("outbox_max_retries", 3),
+        "send_timeout": ("outbox_send_timeout_seconds", 120),
+    })
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """从 Telegram 429 错误中读取 retry_after，不是 429 时返回 None"""
+    if getattr(error, "error_code", None) != 429:
+        return None
+    result_json = getattr(error, "result_json", None) or {}
+    parameters = result_json.get("parameters") or {}
+    return float(parameters.get("retry_after") or 1)
+
+
+def _is_not_modified(error: Exception) -> bool:
+    """编辑内容未变化（合并后常见），视为成功"""
+    return getattr(error, "error_code", None) == 400 and "message is not modified" in str(error)
+
+
+class OutboundItem:
+    """一条待发送的请求"""
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, chat_key: str,
+                 coalesce_key: Optional[Tuple[str, int]] = None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.chat_key = chat_key
+        self.coalesce_key = coalesce_key
+        self.future: Future = Future()
+        self.attempts = 0
+        self.not_before = 0.0
+        self.enqueued_at = time.time()
+
+
+class TelegramOutbox:
+    """Telegram 出站队列（单个发送线程）"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # chat_key -> 待发送队列，OrderedDict 的顺序用于会话间轮询
+        self._chats: "OrderedDict[str, deque]" = OrderedDict()
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._pending_edits: Dict[Tuple[str, int], OutboundItem] = {}
+        self._global_bucket = None
+        self._thread = None
+        self._stats = {"sent": 0, "edits_coalesced": 0, "retries_429": 0, "retries_network": 0,
+                       "failures": 0, "withdrawn": 0, "max_queue_wait_ms": 0}
+
+    def _bucket_for(self, chat_key: str, settings: Dict) -> TokenBucket:
+        """会话的令牌桶，群组（负数 chat_id）按每分钟限额（调用方需持有锁）"""
+        bucket = self._chat_buckets.get(chat_key)
+        if bucket is None:
+            if chat_key.startswith("-"):
+                bucket = TokenBucket(settings["group_rate_per_minute"] / 60.0, settings["chat_burst"])
+            else:
+                bucket = TokenBucket(settings["chat_rate"], settings["chat_burst"])
+            self._chat_buckets[chat_key] = bucket
+        return bucket
+
+    def submit(self, func: Callable, chat_id, args: tuple = (), kwargs: Optional[dict] = None,
+               coalesce_key: Optional[Tuple[str, int]] = None) -> Future:
+        """
+        提交一次 Telegram 调用
+
+        Args:
+            func: TeleBot 的方法
+            chat_id: 目标会话，用于限速和保序
+            coalesce_key: (chat_id, message_id)，相同键的排队中请求合并为最新一次
+
+        Returns:
+            Future，结果为 TeleBot 方法的返回值
+        """
+        settings = _get_settings()
+        chat_key = str(chat_id)
+        with self._cond:
+            if coalesce_key is not None:
+                pending = self._pending_edits.get(coalesce_key)
+                if pending is not None:
+                    # 仍在排队，直接替换为最新内容，沿用原位置和 Future
+                    pending.args = args
+                    pending.kwargs = kwargs or {}
+                    self._stats["edits_coalesced"] += 1
+                    return pending.future
+
+            item = OutboundItem(func, args, kwargs or {}, chat_key, coalesce_key)
+            if coalesce_key is not None:
+                self._pending_edits[coalesce_key] = item
+            self._chats.setdefault(chat_key, deque()).append(item)
+            if self._global_bucket is None:
+                self._global_bucket = TokenBucket(settings["global_rate"], settings["global_rate"])
+            self._ensure_thread()
+            self._cond.notify()
+        return item.future
+
+    def wait(self, future: Future):
+        """
+        等待发送结果
+        超时时撤回仍在排队的请求并抛出 TimeoutError（请求不会再发出）；
+        请求已在发送中时继续等待其完成，避免调用方重试导致重复发送
+        """
+        try:
+            return future.result(timeout=_get_settings()["send_timeout"])
+        except FutureTimeoutError:
+            if self.withdraw(future):
+                raise
+            return future.result()
+
+    def withdraw(self, future: Future) -> bool:
+        """
+        从队列中撤回尚未发出的请求，等待同一 Future 的调用方收到 TimeoutError
+
+        Returns:
+            False 表示请求已在发送中或已完成
+        """
+        with self._cond:
+            for queue in self._chats.values():
+                item = next((queued for queued in queue if queued.future is future), None)
+                if item is not None:
+                    queue.remove(item)
+                    if item.coalesce_key is not None:
+                        self._pending_edits.pop(item.coalesce_key, None)
+                    self._stats["withdrawn"] += 1
+                    break
+            else:
+                return False
+        if not future.done():
+            future.set_exception(FutureTimeoutError("Telegram 请求排队超时，已撤回"))
+        logger.warning(f"⚠️ Telegram 请求排队超时，已撤回 ({getattr(item.func, '__name__', 'call')})")
+        return True
+
+    def _ensure_thread(self) -> None:
+        """启动发送线程（调用方需持有锁）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, daemon=True, name="TelegramOutbox")
+            self._thread.start()
+
+    def _next_item(self, settings: Dict) -> Tuple[Optional[OutboundItem], float]:
+        """
+        轮询各会话，取出一条可以发送的请求（调用方需持有锁）
+
+        Returns:
+            (请求, 0) 或 (None, 需要等待的秒数)
+        """
+        now = time.time()
+        wait_times = []
+        for chat_key in list(self._chats):
+            queue = self._chats[chat_key]
+            if not queue:
+                del self._chats[chat_key]
+                continue
+            item = queue[0]
+            ready_at = max(item.not_before, self._paused_until.get(chat_key, 0))
+            if ready_at > now:
+                wait_times.append(ready_at - now)
+                continue
+            chat_wait = self._bucket_for(chat_key, settings).wait_time()
+            global_wait = self._global_bucket.wait_time()
+            if chat_wait or global_wait:
+                wait_times.append(max(chat_wait, global_wait))
+                continue
+
+            self._bucket_for(chat_key, settings).try_take()
+            self._global_bucket.try_take()
+            queue.popleft()
+            if item.coalesce_key is not None:
+                self._pending_edits.pop(item.coalesce_key, None)
+            # 轮到的会话移到末尾，避免单个会话占满发送线程
+            self._chats.move_to_end(chat_key)
+            return item, 0
+        return None, (min(wait_times) if wait_times else None)
+
+    def _requeue(self, item: OutboundItem) -> bool:
+        """
+        放回会话队首重试（调用方需持有锁）
+
+        Returns:
+            False 表示同一消息已有更新的编辑在排队，旧内容无需重试
+        """
+        if item.coalesce_key is not None:
+            if item.coalesce_key in self._pending_edits:
+                return False
+            self._pending_edits[item.coalesce_key] = item
+        self._chats.setdefault(item.chat_key, deque()).appendleft(item)
+        return True
+
+    def _worker(self) -> None:
+        while True:
+            settings = _get_settings()
+            with self._cond:
+                item, wait_time = self._next_item(settings)
+                if item is None:
+                    self._cond.wait(timeout=wait_time)
+                    continue
+                wait_seconds = time.time() - item.enqueued_at
+                self._stats["max_queue_wait_ms"] = max(self._stats["max_queue_wait_ms"], round(wait_seconds * 1000))
+            TELEGRAM_QUEUE_WAIT_SECONDS.labels().observe(wait_seconds)
+
+            method = getattr(item.func, "__name__", "call")
+            started = time.perf_counter()
+            try:
+                result = item.func(*item.args, **item.kwargs)
+            except Exception as e:
+                TELEGRAM_SEND_SECONDS.labels(method).observe(time.perf_counter() - started)
+                self._handle_error(item, e, settings)
+                continue
+            TELEGRAM_SEND_SECONDS.labels(method).observe(time.perf_counter() - started)
+            TELEGRAM_RESPONSES.labels(method, "ok").inc()
+
+            with self._cond:
+                self._stats["sent"] += 1
+            item.future.set_result(result)
+
+    def _handle_error(self, item: OutboundItem, error: Exception, settings: Dict) -> None:
+        """429 按 retry_after 暂停会话后重试；网络错误退避重试；其他错误直接失败"""
+        method = getattr(item.func, "__name__", "call")
+        if _is_not_modified(error):
+            TELEGRAM_RESPONSES.labels(method, "not_modified").inc()
+            item.future.set_result(None)
+            return
+
+        retry_after = _retry_after(error)
+        TELEGRAM_RESPONSES.labels(method, "429" if retry_after is not None else "error").inc()
+        is_api_error = hasattr(error, "error_code")
+        item.attempts += 1
+        if (retry_after is not None or not is_api_error) and item.attempts <= settings["max_retries"]:
+            with self._cond:
+                if retry_after is not None:
+                    self._stats["retries_429"] += 1
+                    self._paused_until[item.chat_key] = time.time() + retry_after
+                    logger.warning(f"🧊 Telegram 会话 {item.chat_key} 触发频率限制，暂停 {retry_after:.0f} 秒")
+                else:
+                    self._stats["retries_network"] += 1
+                    item.not_before = time.time() + NETWORK_RETRY_BACKOFF * item.attempts
+                    logger.warning(f"⚠️ Telegram 请求失败，稍后重试 ({item.attempts}/{settings['max_retries']}): {error}")
+                requeued = self._requeue(item)
+                self._cond.notify()
+            if not requeued:
+                item.future.set_result(None)
+            return
+
+        with self._cond:
+            self._stats["failures"] += 1
+        logger.error(f"❌ Telegram 请求失败 ({getattr(item.func, '__name__', 'call')}): {error}")
+        item.future.set_exception(error)
+
+    def get_stats(self) -> Dict:
+        """获取出站队列统计"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = sum(len(queue) for queue in self._chats.values())
+            stats["paused_chats"] = len([until for until in self._paused_until.values() if until > time.time()])
+        return stats
+
+
+class QueuedTeleBot:
+    """
+    TeleBot 包装：发送类方法经出站队列发出，其余属性（处理器注册、轮询等）直接转发
+
+    所有发送类方法默认等待发送完成并返回结果，Telegram 错误照常抛出；
+    传 wait=False 立即返回 Future（错误只记录日志，适用于没有降级处理的进度更新）
+    """
+
+    def __init__(self, bot, outbox: Optional[TelegramOutbox] = None):
+        self._bot = bot
+        self._outbox = outbox or get_telegram_outbox()
+
+    def __getattr__(self, name):
+        return getattr(self._bot, name)
+
+    def _call(self, func: Callable, chat_id, args: tuple, kwargs: dict, wait: bool,
+              coalesce_key: Optional[Tuple[str, int]] = None):
+        if not _get_settings()["enabled"]:
+            return func(*args, **kwargs)
+        future = self._outbox.submit(func, chat_id, args, kwargs, coalesce_key)
+        return self._outbox.wait(future) if wait else future
+
+    def send_message(self, chat_id, text, *args, wait: bool = True, **kwargs):
+        return self._call(self._bot.send_message, chat_id, (chat_id, text) + args, kwargs, wait)
+
+    def reply_to(self, message, text, *args, wait: bool = True, **kwargs):
+        return self._call(self._bot.reply_to, message.chat.id, (message, text) + args, kwargs, wait)
+
+    def edit_message_text(self, text, chat_id=None, message_id=None, *args, wait: bool = True, **kwargs):
+        coalesce_key = (str(chat_id), message_id) if chat_id is not None and message_id is not None else None
+        return self._call(self._bot.edit_message_text, chat_id, (text, chat_id, message_id) + args, kwargs,
+                          wait, coalesce_key)
+
+    def delete_message(self, chat_id, message_id, *args, wait: bool = True, **kwargs):
+        return self._call(self._bot.delete_message, chat_id, (chat_id, message_id) + args, kwargs, wait)
+
+
+# 全局出站队列实例
+telegram_outbox = TelegramOutbox()
+TELEGRAM_QUEUED.set_function(lambda: telegram_outbox.get_stats()["queued"])
+
+
+def get_telegram_outbox() -> TelegramOutbox:
+    """获取 Telegram 出站队列"""
+    return telegram_outbox
@@ -0,0 +1,125 @@
+"""
+钱包资产缓存与数据新鲜度分级
+每次获取的钱包资产都会缓存，分析时按新鲜度等级决定能否复用：
+- realtime: 强制上游重新计算（forceRefresh），不使用任何缓存，交互式 /ca1 默认
+- recent: 接受 wallet_cache_recent_minutes 分钟内的本地缓存，未命中时使用上游缓存（不强制刷新）；
+  启用价格表时缓存持仓会按最新价格重估
+- archival: 接受本地任何时间的缓存，未命中时同 recent
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from ..utils.metrics import get_metrics_registry
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("wallet_cache")
+
+
+FRESHNESS_REALTIME = "realtime"
+FRESHNESS_RECENT = "recent"
+FRESHNESS_ARCHIVAL = "archival"
+FRESHNESS_TIERS = (FRESHNESS_REALTIME, FRESHNESS_RECENT, FRESHNESS_ARCHIVAL)
+
+# 钱包资产的获取范围：常规分析只取第一页，深度扫描取全部分页，两者分开缓存
+PORTFOLIO_FIRST_PAGE = "first_page"
+PORTFOLIO_FULL = "full"
+
+CACHE_REQUESTS = get_metrics_registry().counter(
+    "colana_bot_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+
+
+def _get_settings() -> Dict:
+    """读取钱包缓存配置"""
+    return read_settings("analysis", {
+        "recent_minutes": ("wallet_cache_recent_minutes", 30),
+        "max_entries": ("wallet_cache_max_entries", 5000),
+    })
+
+
+def normalize_freshness(tier: Optional[str]) -> str:
+    """校验新鲜度等级，未知等级按 realtime 处理"""
+    if tier in FRESHNESS_TIERS:
+        return tier
+    if tier:
+        logger.warning(f"⚠️ 未知的数据新鲜度等级: {tier}，按 realtime 处理")
+    return FRESHNESS_REALTIME
+
+
+def freshness_satisfies(data_tier: Optional[str], required_tier: Optional[str]) -> bool:
+    """按 data_tier 等级获取的数据能否满足 required_tier 的新鲜度要求（未标注等级的数据按 archival 处理）"""
+    data_rank = FRESHNESS_TIERS.index(data_tier) if data_tier in FRESHNESS_TIERS else len(FRESHNESS_TIERS) - 1
+    return data_rank <= FRESHNESS_TIERS.index(normalize_freshness(required_tier))
+
+
+def freshness_max_age(tier: str) -> float:
+    """该等级可接受的本地缓存最大时长（秒），0 表示不使用缓存"""
+    if tier == FRESHNESS_RECENT:
+        return _get_settings()["recent_minutes"] * 60
+    if tier == FRESHNESS_ARCHIVAL:
+        return float("inf")
+    return 0
+
+
+class WalletPortfolioCache:
+    """钱包资产缓存（LRU，超出容量淘汰最久未使用的钱包），按 钱包地址 + 获取范围 区分"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (wallet_address, scope) -> (assets_data, fetched_at)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Dict, float]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, wallet_address: str, max_age: float,
+            scope: str = PORTFOLIO_FIRST_PAGE) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        读取缓存，scope 为获取范围（first_page / full）
+
+        Returns:
+            (资产数据, 获取时间戳)，未命中或超过 max_age 时返回 (None, None)
+        """
+        if max_age <= 0:
+            return None, None
+        key = (wallet_address, scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] > max_age:
+                self._stats["misses"] += 1
+                CACHE_REQUESTS.labels("wallet", "miss").inc()
+                return None, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            CACHE_REQUESTS.labels("wallet", "hit").inc()
+            return entry
+
+    def put(self, wallet_address: str, assets_data: Dict, fetched_at: Optional[float] = None,
+            scope: str = PORTFOLIO_FIRST_PAGE) -> None:
+        """写入缓存，只缓存有效的资产数据"""
+        if not assets_data:
+            return
+        max_entries = _get_settings()["max_entries"]
+        key = (wallet_address, scope)
+        with self._lock:
+            self._entries[key] = (assets_data, fetched_at or time.time())
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+# 全局钱包缓存实例
+wallet_cache = WalletPortfolioCache()
+
+
+def get_wallet_cache() -> WalletPortfolioCache:
+    """获取钱包资产缓存实例"""
+    return wallet_cache
@@ -0,0 +1,143 @@
+"""
+运行时诊断工具
+供健康检查服务器的 /debug 端点使用，在运行中的进程上查看各线程在做什么、内存分配在哪里：
+- 采样分析：定时读取所有线程的调用栈，输出折叠格式（可直接生成火焰图）
+- 线程栈转储、tracemalloc 内存分配排行
+- 采样在独立线程中只读取帧对象，不暂停业务线程；同一时间只允许一个采样
+"""
+
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+
+
+# 采样间隔下限（秒），避免采样线程占满 GIL
+MIN_SAMPLE_INTERVAL = 0.005
+# 单次采样时长上限（秒），调用方传入更大的值时按此截断
+MAX_PROFILE_SECONDS = 300
+# tracemalloc 记录的栈深度（越深开销越大）
+TRACEMALLOC_FRAMES = 1
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有采样在进行"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename.replace("\\", "/")
+    # 只保留最后两级路径，折叠栈更短
+    short_name = "/".join(filename.rsplit("/", 2)[-2:])
+    return f"{code.co_name} ({short_name}:{frame.f_lineno})"
+
+
+def _collapse(frame) -> list:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def sample_profile(seconds: float, interval: float = 0.01) -> Dict:
+    """
+    对所有线程采样调用栈
+
+    Args:
+        seconds: 采样时长（不超过 MAX_PROFILE_SECONDS）
+        interval: 采样间隔（不小于 MIN_SAMPLE_INTERVAL，不大于采样时长）
+
+    Returns:
+        {"samples": 采样轮数, "duration": 实际时长, "collapsed": 折叠栈文本（"线程;帧;帧 次数" 每行一条）}
+
+    Raises:
+        ProfilerBusyError: 已有采样在进行
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("已有采样分析在进行，请稍后再试")
+    try:
+        seconds = min(max(seconds, 0), MAX_PROFILE_SECONDS)
+        interval = min(max(MIN_SAMPLE_INTERVAL, interval), max(seconds, MIN_SAMPLE_INTERVAL))
+        own_ident = threading.get_ident()
+        stacks = Counter()
+        rounds = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                thread_name = names.get(ident, f"thread-{ident}")
+                stacks[";".join([thread_name] + _collapse(frame))] += 1
+            rounds += 1
+            # 最后一轮只睡到截止时间，采样锁的持有时间不超过采样时长
+            time.sleep(max(0.0, min(interval, deadline - time.perf_counter())))
+        collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        return {
+            "samples": rounds,
+            "duration": round(time.perf_counter() - started, 3),
+            "collapsed": collapsed,
+        }
+    finally:
+        _profile_lock.release()
+
+
+def thread_dump() -> str:
+    """所有线程的当前调用栈"""
+    frames = sys._current_frames()
+    parts = []
+    for thread in threading.enumerate():
+        frame = frames.get(thread.ident)
+        header = f'Thread "{thread.name}" (ident={thread.ident}, daemon={thread.daemon})'
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "  <no frame>\n"
+        parts.append(f"{header}\n{stack}")
+    return "\n".join(parts)
+
+
+def memory_snapshot(top_n: int = 20, action: Optional[str] = None) -> Dict:
+    """
+    tracemalloc 内存分配排行
+
+    首次调用时开始跟踪（之后的分配才会被记录），再次调用返回按代码行汇总的前 top_n 项
+
+    Args:
+        top_n: 返回的条数
+        action: "stop" 停止跟踪并释放跟踪数据
+    """
+    if action == "stop":
+        was_tracing = tracemalloc.is_tracing()
+        tracemalloc.stop()
+        return {"tracing": False, "stopped": was_tracing}
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        return {"tracing": True, "started": True, "message": "已开始跟踪内存分配，稍后再次请求查看排行"}
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    stats = snapshot.statistics("lineno")
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "traced_current_mb": round(current / 1024 / 1024, 2),
+        "traced_peak_mb": round(peak / 1024 / 1024, 2),
+        "overhead_mb": round(tracemalloc.get_tracemalloc_memory() / 1024 / 1024, 2),
+        "top": [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in stats[:top_n]
+        ],
+    }
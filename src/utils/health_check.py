@@ -6,10 +6,25 @@
 import time
 import threading
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import hmac
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics_registry
+from ..utils import debug_tools
+from ..utils.settings import read_settings
+
+
+def _get_debug_settings():
+    """读取诊断端点配置（未设置 debug_token 时端点不可用）"""
+    return read_settings("bot", {
+        "enabled": ("debug_endpoints_enabled", False),
+        "token": ("debug_token", ""),
+        "profile_max_seconds": ("debug_profile_max_seconds", 30),
+        "host": ("debug_listen_host", "127.0.0.1"),
+        "port": ("debug_listen_port", 8081),
+    })
 
 
 class HealthStatus:
@@ -19,6 +34,7 @@ class HealthStatus:
         self.logger = get_logger("health")
         self.start_time = time.time()
         self.last_heartbeat = time.time()
+        self._stats_lock = threading.Lock()
         self.stats = {
             "requests_total": 0,
             "errors_total": 0,
@@ -32,26 +48,73 @@ class HealthStatus:
             "okx_api": {"status": "unknown", "last_check": None, "error": None},
             "jupiter_api": {"status": "unknown", "last_check": None, "error": None},
             "crawler": {"status": "unknown", "last_check": None, "error": None},
+            # 各上游熔断器状态
+            "okx_holders": {"status": "unknown", "last_check": None, "error": None},
+            "okx_wallet": {"status": "unknown", "last_check": None, "error": None},
+            "jupiter": {"status": "unknown", "last_check": None, "error": None},
+            "pumpfun": {"status": "unknown", "last_check": None, "error": None},
+            "okx_market": {"status": "unknown", "last_check": None, "error": None},
         }
+        # 组件统计提供者: name -> (获取统计的函数, 标签名)
+        self.stats_providers = {}
+        # 内存中的注册表（缓存、会话、线程表等）: name -> 返回条目数的函数
+        self.registries = {}
         
     def update_heartbeat(self):
         """更新心跳时间"""
         self.last_heartbeat = time.time()
         
     def increment_stat(self, stat_name: str, value: int = 1):
-        """增加统计计数"""
+        """增加统计计数（多线程调用，加锁保证计数准确）"""
         if stat_name in self.stats:
-            self.stats[stat_name] += value
+            with self._stats_lock:
+                self.stats[stat_name] += value
             
-    def update_service_status(self, service: str, status: str, error: str = None):
-        """更新服务状态"""
+    def update_service_status(self, service: str, status: str, error: str = None, **details):
+        """更新服务状态（details 为附加信息，如熔断器状态）"""
         if service in self.services_status:
             self.services_status[service] = {
                 "status": status,
                 "last_check": datetime.now().isoformat(),
-                "error": error
+                "error": error,
+                **details,
             }
             
+    def register_stats_provider(self, name: str, provider, label: str = None):
+        """
+        注册组件统计
+
+        Args:
+            name: 组件名称
+            provider: 返回统计字典的函数
+            label: 不为空时，provider 返回 {标签值: {指标: 数值}}，指标按该标签区分
+        """
+        self.stats_providers[name] = (provider, label)
+
+    def register_registry(self, name: str, size_fn):
+        """注册需要在诊断端点中报告大小的注册表"""
+        self.registries[name] = size_fn
+
+    def get_registry_sizes(self):
+        """获取所有已注册注册表的条目数"""
+        sizes = {}
+        for name, size_fn in list(self.registries.items()):
+            try:
+                sizes[name] = size_fn()
+            except Exception as e:
+                sizes[name] = f"error: {e}"
+        return sizes
+
+    def get_component_stats(self):
+        """获取所有已注册组件的统计"""
+        components = {}
+        for name, (provider, _) in self.stats_providers.items():
+            try:
+                components[name] = provider()
+            except Exception as e:
+                components[name] = {"error": str(e)}
+        return components
+
     def get_health_data(self):
         """获取健康状态数据"""
         uptime = time.time() - self.start_time
@@ -71,14 +134,19 @@ class HealthStatus:
             "uptime_human": self._format_uptime(uptime),
             "last_heartbeat": datetime.fromtimestamp(self.last_heartbeat).isoformat(),
             "time_since_heartbeat": int(time_since_heartbeat),
-            "stats": self.stats.copy(),
+            "stats": self._copy_stats(),
             "services": self.services_status.copy(),
+            "components": self.get_component_stats(),
             "system_info": {
                 "active_threads": threading.active_count(),
                 "python_version": self._get_python_version(),
             }
         }
         
+    def _copy_stats(self):
+        with self._stats_lock:
+            return self.stats.copy()
+
     def _format_uptime(self, uptime_seconds):
         """格式化运行时间"""
         days = int(uptime_seconds // 86400)
@@ -104,8 +172,10 @@ class HealthStatus:
 class HealthCheckHandler(BaseHTTPRequestHandler):
     """健康检查HTTP处理器"""
     
-    def __init__(self, *args, health_status=None, **kwargs):
+    def __init__(self, *args, health_status=None, serve_debug=False, **kwargs):
         self.health_status = health_status
+        # /debug 端点只在单独监听的诊断服务器（默认 127.0.0.1）上提供
+        self.serve_debug = serve_debug
         super().__init__(*args, **kwargs)
         
     def do_GET(self):
@@ -120,6 +190,8 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
                 self._handle_metrics()
             elif path == "/status":
                 self._handle_detailed_status()
+            elif path.startswith("/debug/"):
+                self._handle_debug(path, parse_qs(parsed_path.query))
             elif path == "/":
                 self._handle_root()
             else:
@@ -152,10 +224,25 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
             if isinstance(value, (int, float)):
                 metrics.append(f"colana_bot_{key} {value}")
                 
+        for name, component_stats in health_data["components"].items():
+            label = self.health_status.stats_providers[name][1]
+            if label:
+                for label_value, values in component_stats.items():
+                    if not isinstance(values, dict):
+                        continue
+                    for key, value in values.items():
+                        if isinstance(value, (int, float)):
+                            metrics.append(f'colana_bot_{name}_{key}{{{label}="{label_value}"}} {value}')
+            else:
+                for key, value in component_stats.items():
+                    if isinstance(value, (int, float)):
+                        metrics.append(f"colana_bot_{name}_{key} {value}")
+
         metrics.append(f"colana_bot_uptime_seconds {health_data['uptime_seconds']}")
         metrics.append(f"colana_bot_active_threads {health_data['system_info']['active_threads']}")
         
-        response = "\n".join(metrics) + "\n"
+        # 直方图、按状态码的计数器、队列深度等带类型的指标
+        response = "\n".join(metrics) + "\n" + get_metrics_registry().render()
         self._send_response(response, "text/plain")
         
     def _handle_detailed_status(self):
@@ -163,6 +250,48 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
         health_data = self.health_status.get_health_data()
         self._send_json_response(health_data)
         
+    def _handle_debug(self, path, query):
+        """诊断端点（需要 Authorization: Bearer <debug_token>，未开启时按不存在处理）"""
+        settings = _get_debug_settings()
+        if not self.serve_debug or not settings["enabled"] or not settings["token"]:
+            self._send_error(404, "Not Found")
+            return
+        auth = self.headers.get("Authorization", "")
+        supplied = auth[len("Bearer "):] if auth.startswith("Bearer ") else ""
+        if not hmac.compare_digest(supplied.encode(), settings["token"].encode()):
+            self._send_error(401, "Unauthorized")
+            return
+
+        def number(name, default, cast=float):
+            try:
+                return cast(query.get(name, [default])[0])
+            except (TypeError, ValueError):
+                return default
+
+        if path == "/debug/profile":
+            max_seconds = min(settings["profile_max_seconds"], debug_tools.MAX_PROFILE_SECONDS)
+            seconds = min(max(number("seconds", 5), 0.1), max_seconds)
+            interval = min(max(number("interval", 0.01), debug_tools.MIN_SAMPLE_INTERVAL), seconds)
+            try:
+                profile = debug_tools.sample_profile(seconds, interval)
+            except debug_tools.ProfilerBusyError as e:
+                self._send_error(409, str(e))
+                return
+            self.health_status.logger.info(f"🔬 诊断采样 {profile['duration']}s，{profile['samples']} 轮")
+            self._send_response(profile["collapsed"] + "\n", "text/plain")
+        elif path == "/debug/threads":
+            self._send_response(debug_tools.thread_dump(), "text/plain")
+        elif path == "/debug/memory":
+            top_n = min(max(number("top", 20, int), 1), 200)
+            self._send_json_response(debug_tools.memory_snapshot(top_n, query.get("action", [None])[0]))
+        elif path == "/debug/registries":
+            self._send_json_response({
+                "registries": self.health_status.get_registry_sizes(),
+                "active_threads": threading.active_count(),
+            })
+        else:
+            self._send_error(404, "Not Found")
+
     def _handle_root(self):
         """处理根路径"""
         html = """
@@ -222,11 +351,15 @@ def start_health_server(port: int = 8080, host: str = "0.0.0.0"):
         def handler(*args, **kwargs):
             return HealthCheckHandler(*args, health_status=_health_status, **kwargs)
             
-        server = HTTPServer((host, port), handler)
+        # 每个请求一个线程：诊断采样期间 /health 仍能及时响应
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
         logger.info(f"🏥 健康检查服务器启动在 http://{host}:{port}")
         logger.info(f"   - 健康检查: http://{host}:{port}/health")
         logger.info(f"   - 详细状态: http://{host}:{port}/status")
         logger.info(f"   - 指标: http://{host}:{port}/metrics")
+        if _get_debug_settings()["enabled"]:
+            start_debug_server()
         
         # 启动心跳
         def heartbeat_worker():
@@ -248,9 +381,34 @@ def start_health_server(port: int = 8080, host: str = "0.0.0.0"):
         raise
 
 
-def update_service_status(service: str, status: str, error: str = None):
+def start_debug_server():
+    """
+    在单独的地址上启动诊断服务器（后台线程）
+    诊断端点的 Bearer token 走明文 HTTP，默认只监听 127.0.0.1，远程访问请通过 SSH 隧道
+    """
+    logger = get_logger("health")
+    settings = _get_debug_settings()
+    host, port = settings["host"], settings["port"]
+
+    def handler(*args, **kwargs):
+        return HealthCheckHandler(*args, health_status=_health_status, serve_debug=True, **kwargs)
+
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        logger.error(f"❌ 诊断服务器启动失败 {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="DebugServer").start()
+    logger.info(f"   - 诊断: http://{host}:{port}/debug/{{profile,threads,memory,registries}}")
+    if host not in ("127.0.0.1", "localhost", "::1"):
+        logger.warning(f"⚠️ 诊断端点监听在 {host}，debug_token 以明文 HTTP 传输")
+    return server
+
+
+def update_service_status(service: str, status: str, error: str = None, **details):
     """更新服务状态的便捷函数"""
-    _health_status.update_service_status(service, status, error)
+    _health_status.update_service_status(service, status, error, **details)
 
 
 def increment_stat(stat_name: str, value: int = 1):
@@ -258,6 +416,16 @@ def increment_stat(stat_name: str, value: int = 1):
     _health_status.increment_stat(stat_name, value)
 
 
+def register_stats_provider(name: str, provider, label: str = None):
+    """注册组件统计的便捷函数"""
+    _health_status.register_stats_provider(name, provider, label)
+
+
+def register_registry(name: str, size_fn):
+    """注册诊断端点报告大小的注册表的便捷函数"""
+    _health_status.register_registry(name, size_fn)
+
+
 # 装饰器：自动统计API调用
 def track_api_call(service_name: str):
     """装饰器：跟踪API调用"""
@@ -0,0 +1,67 @@
+"""
+JSON 编解码
+上游响应解析、产物/存档序列化、状态文件读写统一经过这里：
+- 安装了 orjson 时使用 orjson（C 实现，解析和序列化都明显快于标准库，且持有 GIL 的时间更短），
+  未安装或遇到 orjson 不支持的数据（超过 64 位的整数等）时回退到标准库
+- 输出统一为 UTF-8（不转义中文），紧凑格式或 2 空格缩进
+- 解析失败抛出 json.JSONDecodeError（orjson 的解析异常是其子类），调用方无需区分实现
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    _ORJSON_INDENT_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+
+
+def loads(data) -> Any:
+    """解析 JSON（bytes / str）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(payload: Any, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 字节；无法直接序列化的对象按 str() 处理"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, default=str, option=_ORJSON_INDENT_OPTIONS if indent else _ORJSON_OPTIONS)
+        except TypeError:
+            pass
+    if indent:
+        return json.dumps(payload, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def dumps(payload: Any, indent: bool = False) -> str:
+    """序列化为字符串"""
+    return dumps_bytes(payload, indent).decode("utf-8")
+
+
+def load(path) -> Any:
+    """读取 JSON 文件"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump(payload: Any, path, indent: bool = True) -> None:
+    """写入 JSON 文件（默认缩进，便于人工查看的状态/配置文件）"""
+    data = dumps_bytes(payload, indent)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def response_json(response) -> Any:
+    """解析 HTTP 响应体（直接解析原始字节，不经过 requests 的文本解码）"""
+    return loads(response.content)
@@ -2,17 +2,195 @@
 代币大户分析Bot - 增强日志管理模块
 统一管理项目的日志输出，支持文件和控制台双输出
 包含详细的错误分类和解决方案提示
+
+所有模块的日志记录只放入内存队列，由单个写入线程批量格式化、写文件和刷新，
+业务线程（分析、钱包请求等）不再直接做文件 I/O
 """
 
 import os
+import atexit
 import logging
+import queue
 import sys
+import threading
 import traceback
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler
+
+
+# 日志队列上限，写入线程跟不上时丢弃新记录，不阻塞业务线程
+LOG_QUEUE_MAX_SIZE = 100000
+# 写入线程每批最多处理的记录数
+LOG_BATCH_SIZE = 512
+# 队列为空时写入线程的等待间隔（秒）
+LOG_IDLE_WAIT = 0.5
+# 逐条处理的调试日志默认每多少条记录一次
+DEFAULT_SAMPLE_EVERY = 100
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_STOP = object()
+
+
+class _BatchFlushMixin:
+    """单条记录写入后不刷新，由写入线程每批写完后统一刷新"""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class _BatchedStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class _BatchedRotatingFileHandler(_BatchFlushMixin, RotatingFileHandler):
+    pass
+
+
+class _LazyQueueHandler(QueueHandler):
+    """只把日志记录放入队列：消息格式化（msg % args、异常堆栈）在写入线程中进行"""
+
+    def __init__(self, pipeline: "LogPipeline"):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.record_dropped()
+
+
+class LogPipeline:
+    """日志写入管道：各模块日志经同一个队列，由写入线程按日志器名称分发到各自的文件"""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+        self.queue_handler = _LazyQueueHandler(self)
+        self.formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+        # 所有模块共用一个控制台输出
+        self.console_handler = _BatchedStreamHandler(sys.stdout)
+        self.console_handler.setLevel(logging.INFO)
+        self.console_handler.setFormatter(self.formatter)
+        self.sample_every = DEFAULT_SAMPLE_EVERY
+        self._module_levels: Dict[str, int] = {}
+        self._default_level = logging.DEBUG
+        self._routes: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "batches": 0, "max_batch": 0, "dropped": 0, "write_errors": 0}
+        self._thread = None
+
+    def add_route(self, logger_name: str, handlers: list) -> None:
+        """登记日志器对应的文件处理器"""
+        with self._lock:
+            self._routes[logger_name] = tuple(handlers)
+
+    def level_for(self, logger_name: str) -> int:
+        return self._module_levels.get(logger_name, self._default_level)
+
+    def configure(self, console_level: str = None, default_level: str = None,
+                  module_levels: Dict[str, str] = None, sample_every: int = None) -> None:
+        """调整控制台级别、各模块级别和调试日志采样间隔（已创建的日志器立即生效）"""
+        if console_level:
+            self.console_handler.setLevel(console_level.upper())
+        if default_level:
+            self._default_level = logging.getLevelName(default_level.upper())
+        if module_levels is not None:
+            self._module_levels = {name: logging.getLevelName(level.upper()) for name, level in module_levels.items()}
+        if sample_every:
+            self.sample_every = max(1, int(sample_every))
+        for name in list(self._routes):
+            logging.getLogger(name).setLevel(self.level_for(name))
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """写完队列中剩余的日志后停止写入线程"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def record_dropped(self) -> None:
+        with self._lock:
+            self._stats["dropped"] += 1
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self.queue.get(timeout=LOG_IDLE_WAIT)]
+            except queue.Empty:
+                continue
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._write_batch(batch):
+                return
+
+    def _write_batch(self, batch: list) -> bool:
+        """写出一批记录并刷新涉及的处理器，遇到停止标记时返回 False"""
+        running = True
+        written = 0
+        touched = set()
+        for record in batch:
+            if record is _STOP:
+                running = False
+                continue
+            handlers = self._routes.get(record.name, ()) + (self.console_handler,)
+            for handler in handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+                    touched.add(handler)
+            # 模块日志器不再向上传播，根日志器上的处理器（如生产启动脚本配置的）在这里调用
+            root = logging.getLogger()
+            if root.handlers and record.levelno >= root.level:
+                for handler in root.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            written += 1
+        for handler in touched:
+            try:
+                handler.flush_batch()
+            except Exception:
+                with self._lock:
+                    self._stats["write_errors"] += 1
+        with self._lock:
+            self._stats["written"] += written
+            self._stats["batches"] += 1
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+        return running
+
+    def get_stats(self) -> Dict:
+        """获取日志管道统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self.queue.qsize()
+        return stats
+
+
+# 全局日志管道
+_pipeline = LogPipeline()
 
 
 class ErrorClassifier:
@@ -243,29 +421,20 @@ class BotLogger:
         
         # 创建日志器
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(_pipeline.level_for(name))
+        self._sample_counts: Dict[str, int] = {}
         
         # 避免重复添加处理器
         if not self.logger.handlers:
             self._setup_handlers()
     
     def _setup_handlers(self):
-        """设置日志处理器"""
-        # 创建格式器
-        formatter = logging.Formatter(
-            fmt='%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # 控制台处理器
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
+        """设置日志处理器：日志器只挂队列处理器，文件处理器登记到日志管道由写入线程调用"""
+        formatter = _pipeline.formatter
         
         # 主日志文件处理器（所有级别）
         main_log_file = self.log_dir / f"{self.name}_{datetime.now().strftime('%Y%m%d')}.log"
-        main_handler = RotatingFileHandler(
+        main_handler = _BatchedRotatingFileHandler(
             filename=str(main_log_file),
             maxBytes=10*1024*1024,  # 10MB
             backupCount=5,
@@ -273,11 +442,10 @@ class BotLogger:
         )
         main_handler.setLevel(logging.DEBUG)
         main_handler.setFormatter(formatter)
-        self.logger.addHandler(main_handler)
         
         # 错误日志文件处理器（仅错误和严重错误）
         error_log_file = self.log_dir / f"{self.name}_error_{datetime.now().strftime('%Y%m%d')}.log"
-        error_handler = RotatingFileHandler(
+        error_handler = _BatchedRotatingFileHandler(
             filename=str(error_log_file),
             maxBytes=5*1024*1024,  # 5MB
             backupCount=3,
@@ -285,11 +453,10 @@ class BotLogger:
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(formatter)
-        self.logger.addHandler(error_handler)
         
         # 解决方案日志处理器（用于记录错误解决方案）
         solution_log_file = self.log_dir / f"{self.name}_solutions_{datetime.now().strftime('%Y%m%d')}.log"
-        solution_handler = RotatingFileHandler(
+        solution_handler = _BatchedRotatingFileHandler(
             filename=str(solution_log_file),
             maxBytes=5*1024*1024,  # 5MB
             backupCount=3,
@@ -304,31 +471,53 @@ class BotLogger:
         )
         solution_handler.setFormatter(solution_formatter)
         solution_handler.addFilter(lambda record: hasattr(record, 'is_solution'))
-        self.logger.addHandler(solution_handler)
+
+        _pipeline.add_route(self.name, [main_handler, error_handler, solution_handler])
+        self.logger.addHandler(_pipeline.queue_handler)
+        self.logger.propagate = False
+        _pipeline.start()
     
-    def debug(self, message: str, **kwargs):
+    # 以下方法支持 %-格式参数（logger.debug("代币 %s", mint)），级别未开启时不做任何格式化
+    def debug(self, message: str, *args, **kwargs):
         """调试日志"""
-        self.logger.debug(message, **kwargs)
+        self.logger.debug(message, *args, **kwargs)
     
-    def info(self, message: str, **kwargs):
+    def debug_sampled(self, message: str, *args, every: int = None):
+        """
+        采样的调试日志，用于逐条处理的循环：同一消息模板每 every 次只记录一次
+
+        Args:
+            message: %-格式的消息模板（按模板计数，不要传入 f-string）
+            every: 采样间隔，默认使用日志管道配置
+        """
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        every = every or _pipeline.sample_every
+        # 计数不加锁，多线程下采样间隔是近似的
+        count = self._sample_counts.get(message, 0)
+        self._sample_counts[message] = count + 1
+        if count % every == 0:
+            self.logger.debug(message, *args)
+
+    def info(self, message: str, *args, **kwargs):
         """信息日志"""
-        self.logger.info(message, **kwargs)
+        self.logger.info(message, *args, **kwargs)
     
-    def warning(self, message: str, **kwargs):
+    def warning(self, message: str, *args, **kwargs):
         """警告日志"""
-        self.logger.warning(message, **kwargs)
+        self.logger.warning(message, *args, **kwargs)
     
-    def error(self, message: str, **kwargs):
+    def error(self, message: str, *args, **kwargs):
         """错误日志"""
-        self.logger.error(message, **kwargs)
+        self.logger.error(message, *args, **kwargs)
     
-    def critical(self, message: str, **kwargs):
+    def critical(self, message: str, *args, **kwargs):
         """严重错误日志"""
-        self.logger.critical(message, **kwargs)
+        self.logger.critical(message, *args, **kwargs)
     
-    def exception(self, message: str, **kwargs):
+    def exception(self, message: str, *args, **kwargs):
         """异常日志（包含堆栈信息）"""
-        self.logger.exception(message, **kwargs)
+        self.logger.exception(message, *args, **kwargs)
     
     def error_with_solution(self, error: Exception, context: str = "", **kwargs):
         """
@@ -490,6 +679,21 @@ def get_logger(module_name: str = None) -> BotLogger:
     return ModuleLogger.get_logger(module_name)
 
 
+def configure_logging(bot_config) -> None:
+    """按配置调整日志级别和采样（在配置加载后调用）"""
+    _pipeline.configure(
+        console_level=getattr(bot_config, "log_console_level", None),
+        default_level=getattr(bot_config, "log_level", None),
+        module_levels=getattr(bot_config, "log_module_levels", None) or {},
+        sample_every=getattr(bot_config, "log_debug_sample_every", None),
+    )
+
+
+def get_log_pipeline() -> LogPipeline:
+    """获取日志管道"""
+    return _pipeline
+
+
 # 为向后兼容保留的实例
 main_logger = get_logger("main")
 crawler_logger = get_logger("crawler")
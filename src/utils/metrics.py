@@ -0,0 +1,271 @@
+"""
+指标模块
+线程安全的 Counter / Gauge / Histogram，在健康检查的 /metrics 端点以 Prometheus 文本格式导出：
+- 每个指标的标签组合数有上限，超出的组合合并到 "other"，避免标签基数失控
+- 热路径只做一次字典查找和一次加锁自增，可以放在每个请求上
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# 每个指标默认最多保留的标签组合数
+DEFAULT_MAX_SERIES = 50
+# 超出上限的标签组合合并到该标签值
+OVERFLOW_LABEL = "other"
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """导出时调用 function 取值（用于队列长度等已有状态）"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return 0.0
+        return self.value
+
+    @contextmanager
+    def track_inprogress(self):
+        """进入时 +1，退出时 -1"""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """记录代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric:
+    """指标基类：按标签值管理子序列"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 max_series: int = DEFAULT_MAX_SERIES):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """获取标签值对应的子序列（标签组合数超过上限时合并到 other）"""
+        key = tuple(str(value) for value in values)
+        child = self._series.get(key)
+        if child is not None:
+            return child
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {key}")
+        with self._lock:
+            child = self._series.get(key)
+            if child is None:
+                if len(self._series) >= self.max_series:
+                    key = (OVERFLOW_LABEL,) * len(self.labelnames)
+                    child = self._series.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._series[key] = child
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._series.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+                for key, child in self._items()]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.labels().set_function(function)
+
+    def track_inprogress(self):
+        return self.labels().track_inprogress()
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"
+                for key, child in self._items()]
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, max_series: int = DEFAULT_MAX_SERIES):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for key, child in self._items():
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表（同名指标只创建一次）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                max_series: int = DEFAULT_MAX_SERIES) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames, max_series)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              max_series: int = DEFAULT_MAX_SERIES) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames, max_series)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS, max_series: int = DEFAULT_MAX_SERIES) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets, max_series)
+
+    def render(self) -> str:
+        """导出 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+# 全局指标注册表
+metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取指标注册表"""
+    return metrics_registry
@@ -0,0 +1,53 @@
+"""
+服务模块公共辅助
+- get_module_logger: 获取模块日志器，日志模块不可用时退回 print
+- read_settings: 按 {设置键: (配置项名, 默认值)} 读取某个配置分段，配置不可用时（单独运行脚本、单元测试）使用默认值
+"""
+
+from typing import Any, Dict, Tuple
+
+
+class PrintLogger:
+    """日志模块不可用时的后备日志器"""
+
+    def _print(self, level: str, msg, args) -> None:
+        print(f"{level}: {msg % args if args else msg}")
+
+    def info(self, msg, *args): self._print("INFO", msg, args)
+    def warning(self, msg, *args): self._print("WARNING", msg, args)
+    def error(self, msg, *args): self._print("ERROR", msg, args)
+    def exception(self, msg, *args): self._print("ERROR", msg, args)
+    def debug(self, msg, *args): pass
+
+
+def get_module_logger(name: str):
+    """获取模块日志器"""
+    try:
+        from .logger import get_logger
+        return get_logger(name)
+    except ImportError:
+        return PrintLogger()
+
+
+def config_section(section: str):
+    """获取配置分段（analysis / bot / proxy 等），配置不可用时返回 None"""
+    try:
+        from ..core.config import get_config
+        return getattr(get_config(), section)
+    except (ImportError, AttributeError):
+        return None
+
+
+def read_settings(section: str, fields: Dict[str, Tuple[str, Any]]) -> Dict[str, Any]:
+    """
+    读取配置分段中的若干配置项
+
+    Args:
+        section: 配置分段名
+        fields: {设置键: (配置项名, 默认值)}，配置项缺失或配置不可用时取默认值
+
+    Returns:
+        {设置键: 值}
+    """
+    section_config = config_section(section)
+    return {key: getattr(section_config, attr, default) for key, (attr, default) in fields.items()}
@@ -0,0 +1,308 @@
+"""
+分析追踪模块
+轻量级 span 计时，定位一次分析的时间花在哪里（持有者获取、钱包并发等待、重试、聚合、集群、渲染发送）：
+- trace() 开启一条追踪（已有追踪时作为子 span），span() 记录其中的一个阶段，traced 为装饰器形式
+- 线程池中的任务用 propagate() 包装后继承提交者的追踪上下文
+- 每条追踪按 span 名称汇总耗时（附加到分析结果的 timings），结束后计入全局汇总（/status），
+  可选逐 span 写入 JSONL 文件，按 stack 字段聚合即可生成火焰图
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from ..utils import json_codec
+from ..utils.settings import get_module_logger, read_settings
+
+logger = get_module_logger("tracing")
+
+# 全局汇总最多保留的 (追踪名, span名) 组合数
+MAX_AGGREGATE_KEYS = 200
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("colana_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("colana_span", default=None)
+
+
+def _get_settings() -> Dict:
+    """读取追踪配置"""
+    return read_settings("analysis", {
+        "enabled": ("trace_enabled", True),
+        "max_spans": ("trace_max_spans", 5000),
+        "export_enabled": ("trace_export_enabled", False),
+        "export_path": ("trace_export_path", "config/traces/analysis_traces.jsonl"),
+        "export_max_mb": ("trace_export_max_mb", 50),
+    })
+
+
+class Span:
+    """一个计时阶段"""
+
+    __slots__ = ("name", "parent", "trace", "attrs", "start", "duration", "thread", "_token")
+
+    def __init__(self, name: str, parent: Optional["Span"], trace: Optional["Trace"], attrs: Dict):
+        self.name = name
+        self.parent = parent
+        self.trace = trace
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.thread = threading.current_thread().name
+        self._token = None
+
+    @property
+    def stack(self) -> str:
+        """从根到当前 span 的路径（分号分隔，火焰图折叠格式）"""
+        names = []
+        span = self
+        while span is not None:
+            names.append(span.name)
+            span = span.parent
+        return ";".join(reversed(names))
+
+    def end(self) -> None:
+        self.duration = time.perf_counter() - self.start
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        if self.trace is not None:
+            self.trace.record(self)
+
+
+class Trace:
+    """一条追踪：按 span 名称汇总耗时，并保留有限数量的 span 明细用于导出"""
+
+    def __init__(self, name: str, attrs: Dict, max_spans: int):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.max_spans = max_spans
+        self.finished = False
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+        self._stages: Dict[str, Dict] = {}
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            if self.finished:
+                # 截止时间后才返回的慢请求，不计入已结束的追踪
+                return
+            stage = self._stages.setdefault(span.name, {"count": 0, "total": 0.0, "max": 0.0})
+            stage["count"] += 1
+            stage["total"] += span.duration
+            stage["max"] = max(stage["max"], span.duration)
+            if len(self._spans) < self.max_spans:
+                self._spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+    def stage_totals(self) -> Dict[str, Dict]:
+        """未取整的各阶段汇总 {名称: {"count", "total", "max"}}"""
+        with self._lock:
+            return {name: dict(stage) for name, stage in self._stages.items()}
+
+    def timings(self) -> Dict:
+        """
+        按 span 名称汇总的耗时
+
+        Returns:
+            {"trace_id", "total_seconds", "stages": {名称: {"count", "total_seconds", "max_seconds"}}}
+            并发阶段（如 wallet_fetch）的 total_seconds 是各次耗时之和，可能大于整体耗时
+        """
+        stages = {
+            name: {
+                "count": stage["count"],
+                "total_seconds": round(stage["total"], 3),
+                "max_seconds": round(stage["max"], 3),
+            }
+            for name, stage in self.stage_totals().items()
+        }
+        return {
+            "trace_id": self.trace_id,
+            "total_seconds": round(time.perf_counter() - self.start, 3),
+            "stages": stages,
+        }
+
+    def finish(self) -> List[Span]:
+        with self._lock:
+            self.finished = True
+            return list(self._spans)
+
+
+class TraceAggregator:
+    """全局汇总：每个 (追踪名, span名) 的次数和耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict] = {}
+        self._traces = 0
+
+    def add(self, trace: Trace) -> None:
+        stages = trace.stage_totals()
+        with self._lock:
+            self._traces += 1
+            for name, stage in stages.items():
+                key = f"{trace.name}/{name}"
+                entry = self._stages.get(key)
+                if entry is None:
+                    if len(self._stages) >= MAX_AGGREGATE_KEYS:
+                        continue
+                    entry = self._stages[key] = {"traces": 0, "spans": 0, "total": 0.0, "max": 0.0}
+                entry["traces"] += 1
+                entry["spans"] += stage["count"]
+                entry["total"] += stage["total"]
+                entry["max"] = max(entry["max"], stage["max"])
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """{追踪名/span名: {traces, spans, total_seconds, avg_per_trace_ms, max_ms}}"""
+        with self._lock:
+            return {
+                key: {
+                    "traces": entry["traces"],
+                    "spans": entry["spans"],
+                    "total_seconds": round(entry["total"], 3),
+                    "avg_per_trace_ms": round(entry["total"] / entry["traces"] * 1000, 1),
+                    "max_ms": round(entry["max"] * 1000, 1),
+                }
+                for key, entry in self._stages.items()
+            }
+
+
+class TraceExporter:
+    """把结束的追踪逐 span 追加写入 JSONL 文件（超过大小上限时轮转为 .1）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace, spans: List[Span], settings: Dict) -> None:
+        path = settings["export_path"]
+        lines = []
+        for span in spans:
+            lines.append(json_codec.dumps({
+                "trace_id": trace.trace_id,
+                "trace": trace.name,
+                "trace_started_at": trace.started_at,
+                "name": span.name,
+                "stack": span.stack,
+                "start_ms": round((span.start - trace.start) * 1000, 3),
+                "duration_ms": round(span.duration * 1000, 3),
+                "thread": span.thread,
+                "attrs": span.attrs,
+            }))
+        if not lines:
+            return
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                if os.path.exists(path) and os.path.getsize(path) > settings["export_max_mb"] * 1024 * 1024:
+                    os.replace(path, path + ".1")
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ 写入追踪文件失败: {e}")
+
+
+trace_aggregator = TraceAggregator()
+trace_exporter = TraceExporter()
+
+
+def current_trace() -> Optional[Trace]:
+    """当前上下文中的追踪"""
+    return _current_trace.get()
+
+
+def current_timings() -> Optional[Dict]:
+    """当前追踪截至目前的耗时汇总，未在追踪中时返回 None"""
+    trace = _current_trace.get()
+    return trace.timings() if trace is not None else None
+
+
+def start_span(name: str, **attrs) -> Span:
+    """开始一个 span（需调用 end()），不在追踪中时只计时不记录"""
+    trace = _current_trace.get()
+    span = Span(name, _current_span.get() if trace is not None else None, trace, attrs)
+    if trace is not None:
+        span._token = _current_span.set(span)
+    return span
+
+
+def record_span(name: str, started_at: float, **attrs) -> None:
+    """记录一个已经结束的 span（started_at 为 time.perf_counter() 时间，用于线程池排队等跨线程的等待）"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    finished = Span(name, _current_span.get(), trace, attrs)
+    finished.start = started_at
+    finished.duration = time.perf_counter() - started_at
+    trace.record(finished)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """记录代码块为当前追踪的一个 span，yield 的 Span 在退出后带有 duration"""
+    current = start_span(name, **attrs)
+    try:
+        yield current
+    finally:
+        current.end()
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """开启一条追踪；已在追踪中时等同于 span()"""
+    settings = _get_settings()
+    if _current_trace.get() is not None or not settings["enabled"]:
+        with span(name, **attrs) as current:
+            yield current
+        return
+
+    new_trace = Trace(name, attrs, settings["max_spans"])
+    trace_token = _current_trace.set(new_trace)
+    root = start_span(name, **attrs)
+    try:
+        yield root
+    finally:
+        root.end()
+        _current_trace.reset(trace_token)
+        spans = new_trace.finish()
+        trace_aggregator.add(new_trace)
+        if settings["export_enabled"]:
+            trace_exporter.export(new_trace, spans, settings)
+
+
+def traced(name: Optional[str] = None):
+    """装饰器：函数执行期间开启追踪（已在追踪中时记录为 span）"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """包装提交到线程池的函数，使其在提交者的追踪上下文中执行"""
+    if _current_trace.get() is None:
+        return func
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # 每次执行使用上下文副本，同一个包装函数可以在多个线程中并发执行
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def get_trace_stats() -> Dict[str, Dict]:
+    """获取全局追踪汇总"""
+    return trace_aggregator.get_stats()
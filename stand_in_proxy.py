@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+本地替身代理
+用于在本机测试代理出口池：启动多个实例模拟多个出口，每个实例可单独设置限速
+- 普通 HTTP 请求（绝对地址）直接转发，超过 --rate 时返回 429 + Retry-After，模拟出口IP被限流
+- HTTPS 通过 CONNECT 建立隧道转发（隧道内容加密，无法限速）
+
+用法:
+    python stand_in_proxy.py --port 18081 --rate 5
+    python stand_in_proxy.py --port 18082 --rate 5
+    # config.json: "proxy": {"pool": ["http://127.0.0.1:18081", "http://127.0.0.1:18082"]}
+"""
+
+import argparse
+import select
+import socket
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "proxy-authorization", "transfer-encoding", "upgrade"}
+
+
+class RateLimiter:
+    """每秒请求数限制（滑动一秒窗口）"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._hits = []
+
+    def allow(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.time()
+        with self._lock:
+            self._hits = [hit for hit in self._hits if now - hit < 1.0]
+            if len(self._hits) >= self.rate:
+                return False
+            self._hits.append(now)
+            return True
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    limiter = RateLimiter(0)
+    stats = {"forwarded": 0, "rejected": 0, "tunnels": 0}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _forward(self):
+        if not self.limiter.allow():
+            self.stats["rejected"] += 1
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+        request = urllib.request.Request(self.path, data=body, headers=headers, method=self.command)
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        try:
+            response = opener.open(request, timeout=30)
+            status, payload, response_headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            status, payload, response_headers = e.code, e.read(), e.headers
+        except OSError as e:
+            self.send_error(502, str(e))
+            return
+
+        self.stats["forwarded"] += 1
+        self.send_response(status)
+        for key, value in response_headers.items():
+            if key.lower() not in HOP_HEADERS and key.lower() != "content-length":
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_HEAD = do_PUT = do_DELETE = _forward
+
+    def do_CONNECT(self):
+        host, _, port = self.path.partition(":")
+        try:
+            upstream = socket.create_connection((host, int(port or 443)), timeout=30)
+        except OSError as e:
+            self.send_error(502, str(e))
+            return
+
+        self.stats["tunnels"] += 1
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        self.close_connection = True
+
+        sockets = [self.connection, upstream]
+        try:
+            while True:
+                readable, _, errored = select.select(sockets, [], sockets, 60)
+                if errored or not readable:
+                    break
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is self.connection else self.connection).sendall(data)
+        finally:
+            upstream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地替身代理（测试代理出口池用）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--rate", type=float, default=0, help="每秒最多转发的HTTP请求数，0表示不限")
+    args = parser.parse_args()
+
+    ProxyHandler.limiter = RateLimiter(args.rate)
+    server = ThreadingHTTPServer((args.host, args.port), ProxyHandler)
+    print(f"🌐 替身代理已启动: http://{args.host}:{args.port} (限速 {args.rate or '无'}/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 转发 {ProxyHandler.stats['forwarded']}，拒绝 {ProxyHandler.stats['rejected']}，隧道 {ProxyHandler.stats['tunnels']}")
+
+
+if __name__ == "__main__":
+    main()
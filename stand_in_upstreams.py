@@ -0,0 +1,799 @@
+#!/usr/bin/env python3
+"""
+本地替身上游
+在本机模拟 Bot 依赖的外部 HTTP 服务，数据由 bench/synthetic_data.py 按固定种子合成，用于压测和离线联调：
+    okx       持有者排行 (ranking-list) 和钱包持仓 (asset/profile/all/explorer)，任意代币地址都生成一个可复现的市场
+    jupiter   热门代币 (v1/pools/toptraded/<周期>) 和价格 (price/v3)
+    pumpfun   代币列表 (coins)，市值随时间缓慢波动，用于触发涨幅警报
+    telegram  Bot API：getUpdates 长轮询下发注入的消息和按钮点击，记录 sendMessage/editMessageText 等调用，
+              按群组每分钟条数和全局每秒条数限速（超出返回 429 + retry_after）
+每个服务可单独设置延迟分布、每秒请求上限（超出返回 429 + Retry-After）、随机 429 和随机 502
+
+用法:
+    python stand_in_upstreams.py --port 18090
+    python stand_in_upstreams.py --latency okx=lognormal:0.5,0.6 --rate-limit okx=20 --error-rate jupiter=0.05
+    # 按输出提示写入 config.json 的 analysis.http_upstream_overrides 和 bot.telegram_api_url 后启动 main.py，
+    # 再向替身 Telegram 注入消息:
+    curl -X POST http://127.0.0.1:18093/_stand_in/message -d '{"chat_id": -1001, "text": "/ca1 <代币地址>"}'
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# 添加项目目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stand_in_proxy import RateLimiter
+from src.services.replay_transport import parse_latency
+from bench.synthetic_data import BASE58_ALPHABET, SyntheticMarket
+from src.utils import json_codec
+
+SERVICES = ("okx", "jupiter", "pumpfun", "telegram")
+# 每个替身服务代替的线上主机（写入 analysis.http_upstream_overrides）
+SERVICE_HOSTS = {
+    "okx": ["web3.okx.com", "www.okx.com"],
+    "jupiter": ["datapi.jup.ag", "lite-api.jup.ag"],
+    "pumpfun": ["frontend-api-v3.pump.fun"],
+}
+# 默认延迟接近线上实测量级
+DEFAULT_LATENCY = {
+    "okx": "lognormal:0.3,0.5",
+    "jupiter": "lognormal:0.2,0.4",
+    "pumpfun": "lognormal:0.2,0.4",
+    "telegram": "lognormal:0.05,0.3",
+}
+# Telegram 公开的发送限制：全局每秒 30 条，单个群组每分钟 20 条
+DEFAULT_RATE_LIMIT = {"telegram": 30.0}
+TELEGRAM_GROUP_RATE_PER_MINUTE = 20
+CONTROL_PREFIX = "/_stand_in/"
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class Faults:
+    """一个服务的延迟、限速和错误注入设置"""
+
+    def __init__(self, latency: str = "none", rate_limit: float = 0.0, error_rate: float = 0.0,
+                 fail_rate: float = 0.0, retry_after: float = 1.0):
+        """
+        Args:
+            latency: 延迟分布（见 replay_transport.parse_latency）
+            rate_limit: 每秒最多正常响应数，超出返回 429（0 表示不限）
+            error_rate: 随机返回 429 的概率
+            fail_rate: 随机返回 502 的概率
+            retry_after: 429 响应的 Retry-After 秒数
+        """
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.fail_rate = fail_rate
+        self.retry_after = retry_after
+
+    def describe(self) -> str:
+        return (f"延迟 {self.latency}，限速 {self.rate_limit or '无'}/s，"
+                f"429 概率 {self.error_rate}，502 概率 {self.fail_rate}")
+
+
+class TokenCatalog:
+    """Jupiter、PumpFun 和压测共用的代币列表（地址、符号、价格、市值、创建时间）"""
+
+    def __init__(self, size: int = 1000, seed: int = 0):
+        rng = random.Random(seed)
+        now = time.time()
+        self.tokens: List[Dict] = []
+        for index in range(size):
+            address = "".join(rng.choice(BASE58_ALPHABET) for _ in range(40)) + "pump"
+            market_cap = rng.lognormvariate(math.log(300_000), 1.5)
+            supply = 1_000_000_000
+            self.tokens.append({
+                "address": address,
+                "symbol": f"SIM{index}",
+                "name": f"Stand-in Token {index}",
+                "price": market_cap / supply,
+                "supply": supply,
+                "market_cap": market_cap,
+                "liquidity": market_cap * rng.uniform(0.05, 0.3),
+                "volume24h": market_cap * rng.lognormvariate(0, 1.0),
+                "holder_count": int(rng.lognormvariate(math.log(3000), 1.0)),
+                "created_at": now - rng.uniform(1, 60) * 86400,
+                "phase": rng.uniform(0, 2 * math.pi),
+            })
+        self._by_address = {token["address"]: token for token in self.tokens}
+
+    def get(self, address: str) -> Optional[Dict]:
+        return self._by_address.get(address)
+
+    def addresses(self, count: Optional[int] = None) -> List[str]:
+        return [token["address"] for token in self.tokens[:count]]
+
+
+class StandInService:
+    """一个替身服务：按路径前缀分发请求，统一注入延迟和错误并统计"""
+
+    name = ""
+
+    def __init__(self, faults: Faults, seed: Optional[int] = None):
+        self.faults = faults
+        self.latency = parse_latency(faults.latency)
+        self._limiter = RateLimiter(faults.rate_limit)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # (方法, 路径前缀, 处理函数, 是否注入故障)
+        self._routes: List[Tuple[str, str, Callable, bool]] = []
+        self.reset_stats()
+
+    def route(self, method: str, prefix: str, handler: Callable, faulty: bool = True) -> None:
+        self._routes.append((method, prefix, handler, faulty))
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"requests": 0, "served": 0, "injected_429": 0, "rate_limited": 0,
+                          "failed": 0, "not_found": 0, "by_path": {}}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, by_path=dict(self.stats["by_path"]))
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def error_payload(self, status: int, retry_after: float) -> Dict:
+        return {"code": status, "msg": "Too Many Requests" if status == 429 else "Bad Gateway", "data": None}
+
+    def inject_fault(self) -> Optional[Tuple[int, Dict, Dict]]:
+        """按设置返回注入的错误响应 (状态码, 响应体, 响应头)，不注入时返回 None"""
+        with self._lock:
+            roll = self._random.random()
+        faults = self.faults
+        if roll < faults.fail_rate:
+            self._count("failed")
+            return 502, self.error_payload(502, 0), {}
+        if roll < faults.fail_rate + faults.error_rate or not self._limiter.allow():
+            self._count("injected_429" if roll < faults.fail_rate + faults.error_rate else "rate_limited")
+            return 429, self.error_payload(429, faults.retry_after), {"Retry-After": f"{faults.retry_after:g}"}
+        return None
+
+    def delay(self) -> None:
+        time.sleep(max(0.0, self.latency(0.0)))
+
+    def respond(self, method: str, path: str, query: Dict, body: bytes, content_type: str) -> Tuple[int, Dict, bytes]:
+        """处理一个请求，返回 (状态码, 响应头, 响应体)"""
+        if method == "HEAD":
+            # 连接预热
+            return 200, {}, b""
+        if path.startswith(CONTROL_PREFIX):
+            status, payload = self.control(method, path[len(CONTROL_PREFIX):], query, body)
+            return status, JSON_HEADERS, json_codec.dumps_bytes(payload)
+
+        handler, faulty = None, False
+        for route_method, prefix, route_handler, route_faulty in self._routes:
+            if route_method == method and path.startswith(prefix):
+                handler, faulty = route_handler, route_faulty
+                break
+        with self._lock:
+            self.stats["requests"] += 1
+            by_path = self.stats["by_path"]
+            key = f"{method} {path}" if handler is None else f"{method} {prefix}"
+            by_path[key] = by_path.get(key, 0) + 1
+        if handler is None:
+            self._count("not_found")
+            return 404, JSON_HEADERS, json_codec.dumps_bytes({"code": 404, "msg": "not found", "data": None})
+
+        if faulty:
+            fault = self.inject_fault()
+            if fault is not None:
+                status, payload, headers = fault
+                return status, dict(JSON_HEADERS, **headers), json_codec.dumps_bytes(payload)
+            self.delay()
+        status, payload = handler(path, query, _parse_body(body, content_type))
+        if status == 200:
+            self._count("served")
+        return status, JSON_HEADERS, json_codec.dumps_bytes(payload)
+
+    def control(self, method: str, action: str, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        if action == "stats":
+            return 200, self.get_stats()
+        if action == "reset" and method == "POST":
+            self.reset_stats()
+            return 200, {"ok": True}
+        return 404, {"error": f"unknown control action: {action}"}
+
+
+def _parse_body(body: bytes, content_type: str) -> Dict:
+    """解析 JSON 或表单请求体（其他格式返回空字典）"""
+    if not body:
+        return {}
+    if "json" in content_type:
+        try:
+            payload = json_codec.loads(body)
+        except ValueError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+    if "x-www-form-urlencoded" in content_type:
+        return dict(parse_qsl(body.decode("utf-8", errors="replace"), keep_blank_values=True))
+    return {}
+
+
+def _int(value, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class OKXService(StandInService):
+    """OKX 持有者排行和钱包持仓"""
+
+    name = "okx"
+
+    def __init__(self, faults: Faults, holders: int = 100, market_tokens: int = 300, seed: int = 0):
+        super().__init__(faults, seed)
+        self.holders = holders
+        self.market_tokens = market_tokens
+        self.seed = seed
+        self._markets: Dict[str, SyntheticMarket] = {}
+        # 钱包地址 -> 所属市场（钱包持仓请求只带地址）
+        self._wallets: Dict[str, SyntheticMarket] = {}
+        self._market_lock = threading.Lock()
+        self.route("GET", "/priapi/v1/dx/market/v2/holders/ranking-list", self.ranking_list)
+        self.route("POST", "/priapi/v2/wallet/asset/profile/all/explorer", self.asset_profile)
+
+    def market(self, token_address: str) -> SyntheticMarket:
+        """代币地址对应的合成市场（同一地址总是生成相同的数据）"""
+        with self._market_lock:
+            market = self._markets.get(token_address)
+            if market is None:
+                seed = zlib.crc32(token_address.encode()) ^ self.seed
+                market = SyntheticMarket(holders=self.holders, tokens=self.market_tokens, seed=seed,
+                                         target_address=token_address)
+                self._markets[token_address] = market
+                for wallet in market.wallets:
+                    self._wallets[wallet] = market
+        return market
+
+    def ranking_list(self, path: str, query: Dict, body: Dict) -> Tuple[int, Dict]:
+        token_address = query.get("tokenAddress")
+        if not token_address:
+            return 200, {"code": 51000, "msg": "Parameter tokenAddress error", "data": None}
+        rows = self.market(token_address).holder_rows()
+        # 第一名是流动性池，分析时应被排除
+        rows[0] = dict(rows[0], tagList=[["liquidityPool"]])
+        if "limit" in query:
+            offset = _int(query.get("offset"))
+            rows = rows[offset:offset + _int(query.get("limit"), 100)]
+        else:
+            rows = rows[:100]
+        return 200, {"code": 0, "msg": "", "data": {"holderRankingList": rows}}
+
+    def asset_profile(self, path: str, query: Dict, body: Dict) -> Tuple[int, Dict]:
+        address = body.get("address")
+        market = self._wallets.get(address)
+        token_list = market.portfolio(address)["tokens"]["tokenlist"] if market else []
+        page, limit = max(1, _int(body.get("page"), 1)), max(1, _int(body.get("limit"), 10))
+        page_tokens = token_list[(page - 1) * limit:page * limit]
+        return 200, {"code": 0, "msg": "", "data": {"tokens": {"tokenlist": page_tokens}}}
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats["markets"] = len(self._markets)
+        return stats
+
+
+class JupiterService(StandInService):
+    """Jupiter 热门代币池和价格"""
+
+    name = "jupiter"
+
+    def __init__(self, faults: Faults, catalog: TokenCatalog, pools: int = 100, seed: Optional[int] = None):
+        super().__init__(faults, seed)
+        self.catalog = catalog
+        self.pools = pools
+        self.route("GET", "/v1/pools/toptraded/", self.toptraded)
+        self.route("GET", "/price/v3", self.price)
+
+    def toptraded(self, path: str, query: Dict, body: Dict) -> Tuple[int, List]:
+        tokens = sorted(self.catalog.tokens[:self.pools], key=lambda token: token["volume24h"], reverse=True)
+        return 200, [self._pool(token) for token in tokens]
+
+    @staticmethod
+    def _pool(token: Dict) -> Dict:
+        volume = token["volume24h"]
+        return {
+            "id": token["address"][::-1],
+            "dex": "pump.fun",
+            "volume24h": volume,
+            "liquidity": token["liquidity"],
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(token["created_at"])),
+            "baseAsset": {
+                "id": token["address"],
+                "symbol": token["symbol"],
+                "name": token["name"],
+                "decimals": 6,
+                "totalSupply": token["supply"],
+                "mcap": token["market_cap"],
+                "fdv": token["market_cap"],
+                "usdPrice": token["price"],
+                "holderCount": token["holder_count"],
+                "launchpad": "pump.fun",
+                "organicScore": 50.0,
+                "audit": {"mintAuthorityDisabled": True, "freezeAuthorityDisabled": True},
+                "stats24h": {
+                    "priceChange": math.sin(token["phase"]) * 30,
+                    "holderChange": math.cos(token["phase"]) * 5,
+                    "buyVolume": volume * 0.52,
+                    "sellVolume": volume * 0.48,
+                },
+            },
+        }
+
+    def price(self, path: str, query: Dict, body: Dict) -> Tuple[int, Dict]:
+        prices = {}
+        for mint in filter(None, (query.get("ids") or "").split(",")):
+            token = self.catalog.get(mint)
+            # 目录外的代币（如合成市场中的持仓）按地址生成一个固定价格
+            price = token["price"] if token else (zlib.crc32(mint.encode()) % 100000 + 1) / 10000
+            prices[mint] = {"usdPrice": price, "decimals": 6}
+        return 200, prices
+
+
+class PumpFunService(StandInService):
+    """PumpFun 代币列表，市值围绕基准值周期波动"""
+
+    name = "pumpfun"
+
+    def __init__(self, faults: Faults, catalog: TokenCatalog, period: float = 600.0, amplitude: float = 0.15,
+                 seed: Optional[int] = None):
+        super().__init__(faults, seed)
+        self.catalog = catalog
+        self.period = period
+        self.amplitude = amplitude
+        self.route("GET", "/coins", self.coins)
+
+    def coins(self, path: str, query: Dict, body: Dict) -> Tuple[int, List]:
+        now = time.time()
+        coins = []
+        for token in self.catalog.tokens:
+            drift = 1 + self.amplitude * math.sin(2 * math.pi * now / self.period + token["phase"])
+            coins.append({
+                "mint": token["address"],
+                "name": token["name"],
+                "symbol": token["symbol"],
+                "usd_market_cap": token["market_cap"] * drift,
+                "created_timestamp": int(token["created_at"] * 1000),
+            })
+        coins.sort(key=lambda coin: coin["usd_market_cap"], reverse=(query.get("order", "DESC").upper() == "DESC"))
+        offset, limit = _int(query.get("offset")), _int(query.get("limit"), 50)
+        return 200, coins[offset:offset + limit]
+
+
+class FakeTelegramAPI(StandInService):
+    """
+    替身 Telegram Bot API
+
+    push_message/push_callback 注入用户消息和按钮点击，Bot 通过 getUpdates 长轮询收到；
+    Bot 的每次 API 调用都会记录并通知监听者（压测据此计算响应耗时）
+    """
+
+    name = "telegram"
+    # 计入发送限速的方法前缀（都需要 chat_id）
+    LIMITED_PREFIXES = ("send", "editMessage", "deleteMessage")
+
+    def __init__(self, faults: Faults, group_rate_per_minute: float = TELEGRAM_GROUP_RATE_PER_MINUTE,
+                 seed: Optional[int] = None):
+        super().__init__(faults, seed)
+        self.group_rate_per_minute = group_rate_per_minute
+        self._cond = threading.Condition()
+        self._updates: List[Dict] = []
+        self._next_update_id = 1
+        self._next_callback_id = 1
+        self._message_ids: Dict[int, int] = defaultdict(int)
+        self._messages: Dict[Tuple[int, int], Dict] = {}
+        self._chat_hits: Dict[int, deque] = defaultdict(deque)
+        self._listeners: List[Callable[[Dict], None]] = []
+        self.bot_user = {"id": 123456789, "is_bot": True, "first_name": "Stand-in", "username": "stand_in_bot"}
+        self.route("POST", "/bot", self.dispatch, faulty=False)
+        self.route("GET", "/bot", self.dispatch, faulty=False)
+
+    def reset_stats(self) -> None:
+        super().reset_stats()
+        with self._lock:
+            self.stats.update({"chat_rate_limited": 0, "updates_delivered": 0, "by_method": {}})
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, by_path=dict(self.stats["by_path"]), by_method=dict(self.stats["by_method"]))
+
+    def error_payload(self, status: int, retry_after: float) -> Dict:
+        if status == 429:
+            seconds = max(1, math.ceil(retry_after))
+            return {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {seconds}",
+                    "parameters": {"retry_after": seconds}}
+        return {"ok": False, "error_code": status, "description": "Bad Gateway"}
+
+    def add_listener(self, listener: Callable[[Dict], None]) -> None:
+        """注册 API 调用监听者，参数为调用记录（method、status、chat_id、message_id、text、buttons 等）"""
+        self._listeners.append(listener)
+
+    @staticmethod
+    def _chat(chat_id: int) -> Dict:
+        if chat_id < 0:
+            return {"id": chat_id, "type": "supergroup", "title": f"Stand-in group {chat_id}"}
+        return {"id": chat_id, "type": "private", "first_name": "Stand-in"}
+
+    def _new_message_id(self, chat_id: int) -> int:
+        with self._lock:
+            self._message_ids[chat_id] += 1
+            return self._message_ids[chat_id]
+
+    def _enqueue(self, update: Dict) -> int:
+        with self._cond:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+            self._updates.append(dict(update, update_id=update_id))
+            self._cond.notify_all()
+        return update_id
+
+    def push_message(self, chat_id: int, text: str, user_id: int = 1000) -> Dict:
+        """注入一条用户消息，返回消息内容"""
+        message = {
+            "message_id": self._new_message_id(chat_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "chat": self._chat(chat_id),
+            "date": int(time.time()),
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        self._enqueue({"message": message})
+        return message
+
+    def push_callback(self, chat_id: int, message_id: int, data: str, user_id: int = 1000) -> Optional[str]:
+        """注入一次按钮点击，返回 callback_query_id（消息不存在时返回 None）"""
+        with self._lock:
+            message = self._messages.get((chat_id, message_id))
+            callback_id = str(self._next_callback_id)
+            self._next_callback_id += 1
+        if message is None:
+            return None
+        self._enqueue({"callback_query": {
+            "id": callback_id,
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "message": message,
+            "chat_instance": str(chat_id),
+            "data": data,
+        }})
+        return callback_id
+
+    def _chat_allows(self, chat_id: Optional[int]) -> Optional[float]:
+        """群组每分钟发送上限，超出时返回需要等待的秒数"""
+        if chat_id is None or chat_id >= 0 or self.group_rate_per_minute <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            hits = self._chat_hits[chat_id]
+            while hits and now - hits[0] >= 60:
+                hits.popleft()
+            if len(hits) >= self.group_rate_per_minute:
+                return 60 - (now - hits[0])
+            hits.append(now)
+        return None
+
+    def dispatch(self, path: str, query: Dict, body: Dict) -> Tuple[int, Dict]:
+        method = path.rsplit("/", 1)[-1]
+        params = dict(query, **body)
+        with self._lock:
+            by_method = self.stats["by_method"]
+            by_method[method] = by_method.get(method, 0) + 1
+
+        if method == "getUpdates":
+            return 200, {"ok": True, "result": self._get_updates(params)}
+
+        chat_id = _int(params.get("chat_id"), None) if "chat_id" in params else None
+        record = {"at": time.time(), "method": method, "chat_id": chat_id,
+                  "message_id": _int(params.get("message_id"), None) if "message_id" in params else None,
+                  "text": params.get("text"), "buttons": [],
+                  "callback_query_id": params.get("callback_query_id")}
+
+        status, payload = 200, None
+        if method.startswith(self.LIMITED_PREFIXES):
+            fault = self.inject_fault()
+            wait = None if fault else self._chat_allows(chat_id)
+            if fault is not None:
+                status, payload = fault[0], fault[1]
+            elif wait is not None:
+                self._count("chat_rate_limited")
+                status, payload = 429, self.error_payload(429, wait)
+        if payload is None:
+            self.delay()
+            status, payload = self._call(method, params, record)
+        record["status"] = status
+        for listener in self._listeners:
+            listener(record)
+        return status, payload
+
+    def _get_updates(self, params: Dict) -> List[Dict]:
+        offset = _int(params.get("offset"))
+        timeout = min(_int(params.get("timeout"), 0), 30)
+        limit = _int(params.get("limit"), 100) or 100
+        deadline = time.time() + timeout
+        with self._cond:
+            # offset 之前的更新视为已确认
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+            while not self._updates and time.time() < deadline:
+                self._cond.wait(deadline - time.time())
+            updates = self._updates[:limit]
+        with self._lock:
+            self.stats["updates_delivered"] += len(updates)
+        return updates
+
+    @staticmethod
+    def _markup(raw) -> Optional[Dict]:
+        if not raw:
+            return None
+        if isinstance(raw, str):
+            try:
+                raw = json_codec.loads(raw)
+            except ValueError:
+                return None
+        return raw if isinstance(raw, dict) else None
+
+    @staticmethod
+    def _buttons(markup: Optional[Dict]) -> List[str]:
+        rows = (markup or {}).get("inline_keyboard") or []
+        return [button["callback_data"] for row in rows for button in row if button.get("callback_data")]
+
+    def _call(self, method: str, params: Dict, record: Dict) -> Tuple[int, Dict]:
+        chat_id = record["chat_id"]
+        markup = self._markup(params.get("reply_markup"))
+        record["buttons"] = self._buttons(markup)
+
+        if method in ("getMe", "logOut", "close"):
+            return 200, {"ok": True, "result": self.bot_user if method == "getMe" else True}
+        if method.startswith(self.LIMITED_PREFIXES) and chat_id is None:
+            return 400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"}
+        if method.startswith("send") and method != "sendChatAction":
+            message = {
+                "message_id": self._new_message_id(chat_id),
+                "from": self.bot_user,
+                "chat": self._chat(chat_id),
+                "date": int(time.time()),
+                "text": params.get("text") or params.get("caption") or "",
+            }
+            if markup:
+                message["reply_markup"] = markup
+            if params.get("message_thread_id"):
+                message["message_thread_id"] = _int(params["message_thread_id"])
+            with self._lock:
+                self._messages[(chat_id, message["message_id"])] = message
+            record["message_id"] = message["message_id"]
+            return 200, {"ok": True, "result": message}
+        if method in ("editMessageText", "editMessageReplyMarkup", "editMessageCaption"):
+            key = (chat_id, record["message_id"])
+            with self._lock:
+                message = self._messages.get(key)
+                if message is None:
+                    return 400, {"ok": False, "error_code": 400,
+                                 "description": "Bad Request: message to edit not found"}
+                updated = dict(message, edit_date=int(time.time()))
+                if method != "editMessageReplyMarkup":
+                    updated["text"] = params.get("text") or params.get("caption") or ""
+                updated.pop("reply_markup", None)
+                if markup:
+                    updated["reply_markup"] = markup
+                if updated.get("text") == message.get("text") and updated.get("reply_markup") == message.get("reply_markup"):
+                    return 400, {"ok": False, "error_code": 400, "description":
+                                 "Bad Request: message is not modified: specified new message content and reply "
+                                 "markup are exactly the same as a current content and reply markup of the message"}
+                self._messages[key] = updated
+            return 200, {"ok": True, "result": updated}
+        if method == "deleteMessage":
+            with self._lock:
+                removed = self._messages.pop((chat_id, record["message_id"]), None)
+            if removed is None:
+                return 400, {"ok": False, "error_code": 400, "description": "Bad Request: message to delete not found"}
+            return 200, {"ok": True, "result": True}
+        # answerCallbackQuery、sendChatAction、setMyCommands、deleteWebhook 等
+        return 200, {"ok": True, "result": True}
+
+    def control(self, method: str, action: str, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        payload = _parse_body(body, "json")
+        if action == "message" and method == "POST":
+            message = self.push_message(_int(payload.get("chat_id"), -1001), payload.get("text", ""))
+            return 200, {"ok": True, "message": message}
+        if action == "callback" and method == "POST":
+            callback_id = self.push_callback(_int(payload.get("chat_id"), -1001), _int(payload.get("message_id")),
+                                             payload.get("data", ""))
+            return (200, {"ok": True, "callback_query_id": callback_id}) if callback_id else \
+                (404, {"ok": False, "error": "message not found"})
+        if action == "messages":
+            chat_id = _int(query.get("chat_id"), None)
+            with self._lock:
+                messages = [message for (chat, _), message in self._messages.items() if chat_id in (None, chat)]
+            return 200, {"ok": True, "messages": messages[-50:]}
+        return super().control(method, action, query, body)
+
+
+def make_handler(service: StandInService):
+    """为替身服务生成 HTTP 请求处理类（HTTP/1.1 keep-alive）"""
+
+    class ServiceHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _handle(self):
+            parts = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            query = dict(parse_qsl(parts.query, keep_blank_values=True))
+            status, headers, payload = service.respond(
+                self.command, parts.path, query, body, self.headers.get("Content-Type", "")
+            )
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(payload)
+
+        do_GET = do_POST = do_HEAD = _handle
+
+    return ServiceHandler
+
+
+class StandInUpstreams:
+    """启动全部替身服务，每个服务一个端口"""
+
+    def __init__(self, faults: Dict[str, Faults], host: str = "127.0.0.1", port: int = 0, holders: int = 100,
+                 market_tokens: int = 300, catalog_size: int = 1000, seed: int = 0,
+                 group_rate_per_minute: float = TELEGRAM_GROUP_RATE_PER_MINUTE):
+        """
+        Args:
+            faults: 服务名 -> 故障设置
+            host: 监听地址
+            port: 起始端口，各服务依次使用 port、port+1...（0 表示由系统分配）
+            holders: 每个代币的持有者排行人数
+            market_tokens: 每个合成市场的代币总数
+            catalog_size: Jupiter/PumpFun 代币目录大小
+            seed: 随机种子
+            group_rate_per_minute: 替身 Telegram 单个群组每分钟发送上限
+        """
+        self.host = host
+        self.catalog = TokenCatalog(catalog_size, seed)
+        self.services: Dict[str, StandInService] = {
+            "okx": OKXService(faults["okx"], holders=holders, market_tokens=market_tokens, seed=seed),
+            "jupiter": JupiterService(faults["jupiter"], self.catalog, seed=seed),
+            "pumpfun": PumpFunService(faults["pumpfun"], self.catalog, seed=seed),
+            "telegram": FakeTelegramAPI(faults["telegram"], group_rate_per_minute=group_rate_per_minute, seed=seed),
+        }
+        self._servers: Dict[str, ThreadingHTTPServer] = {}
+        for offset, (name, service) in enumerate(self.services.items()):
+            server = ThreadingHTTPServer((host, port + offset if port else 0), make_handler(service))
+            server.daemon_threads = True
+            self._servers[name] = server
+
+    @property
+    def telegram(self) -> FakeTelegramAPI:
+        return self.services["telegram"]
+
+    def url(self, name: str) -> str:
+        return f"http://{self.host}:{self._servers[name].server_address[1]}"
+
+    def upstream_overrides(self) -> Dict[str, str]:
+        """analysis.http_upstream_overrides 配置值"""
+        return {host: self.url(name) for name, hosts in SERVICE_HOSTS.items() for host in hosts}
+
+    def start(self) -> "StandInUpstreams":
+        for name, server in self._servers.items():
+            threading.Thread(target=server.serve_forever, daemon=True, name=f"StandIn-{name}").start()
+        return self
+
+    def stop(self) -> None:
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {name: service.get_stats() for name, service in self.services.items()}
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    """添加故障注入参数（替身服务命令行和压测共用）"""
+    services = "/".join(SERVICES)
+    parser.add_argument("--latency", action="append", metavar="[SERVICE=]SPEC",
+                        help=f"延迟分布 fixed:秒 / uniform:最小,最大 / lognormal:中位数,sigma / none，"
+                             f"SERVICE 为 {services}，省略时作用于全部上游（不含 telegram），可重复")
+    parser.add_argument("--rate-limit", action="append", metavar="[SERVICE=]N",
+                        help="每秒最多正常响应数，超出返回 429（telegram 默认 30，其余不限），可重复")
+    parser.add_argument("--error-rate", action="append", metavar="[SERVICE=]P", help="随机返回 429 的概率，可重复")
+    parser.add_argument("--fail-rate", action="append", metavar="[SERVICE=]P", help="随机返回 502 的概率，可重复")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="注入的 429 的 Retry-After 秒数")
+
+
+def _service_values(options, convert) -> Dict[str, object]:
+    values = {}
+    for option in options or []:
+        name, sep, raw = option.partition("=")
+        if not sep:
+            name, raw = "", option
+        if name and name not in SERVICES:
+            raise SystemExit(f"❌ 未知服务: {name}（可选 {', '.join(SERVICES)}）")
+        try:
+            value = convert(raw)
+        except ValueError as e:
+            raise SystemExit(f"❌ 参数无效 {option}: {e}")
+        for service in ([name] if name else [service for service in SERVICES if service != "telegram"]):
+            values[service] = value
+    return values
+
+
+def faults_from_args(args) -> Dict[str, Faults]:
+    """把故障注入参数转换为 服务名 -> Faults"""
+
+    def latency_spec(raw: str) -> str:
+        parse_latency(raw)
+        return raw
+
+    latency = dict(DEFAULT_LATENCY, **_service_values(args.latency, latency_spec))
+    rate_limit = dict(DEFAULT_RATE_LIMIT, **_service_values(args.rate_limit, float))
+    error_rate = _service_values(args.error_rate, float)
+    fail_rate = _service_values(args.fail_rate, float)
+    return {
+        name: Faults(latency=latency[name], rate_limit=rate_limit.get(name, 0.0),
+                     error_rate=error_rate.get(name, 0.0), fail_rate=fail_rate.get(name, 0.0),
+                     retry_after=args.retry_after)
+        for name in SERVICES
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地替身上游（OKX / Jupiter / PumpFun / Telegram Bot API）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18090, help="起始端口，依次分配给 okx、jupiter、pumpfun、telegram")
+    parser.add_argument("--holders", type=int, default=100, help="每个代币的持有者排行人数")
+    parser.add_argument("--market-tokens", type=int, default=300, help="每个合成市场的代币总数")
+    parser.add_argument("--catalog", type=int, default=1000, help="Jupiter/PumpFun 代币目录大小")
+    parser.add_argument("--group-rate", type=float, default=TELEGRAM_GROUP_RATE_PER_MINUTE,
+                        help="替身 Telegram 单个群组每分钟发送上限，0 表示不限")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    faults = faults_from_args(args)
+    upstreams = StandInUpstreams(faults, host=args.host, port=args.port, holders=args.holders,
+                                 market_tokens=args.market_tokens, catalog_size=args.catalog, seed=args.seed,
+                                 group_rate_per_minute=args.group_rate).start()
+    for name in SERVICES:
+        print(f"🌐 {name:<9} {upstreams.url(name)}  ({faults[name].describe()})")
+    print("\n📋 config.json 配置:")
+    print(json_codec.dumps({"bot": {"telegram_api_url": upstreams.url("telegram")},
+                            "analysis": {"http_upstream_overrides": upstreams.upstream_overrides()}}, indent=True))
+    print(f"\n💡 示例代币地址: {', '.join(upstreams.catalog.addresses(3))}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        upstreams.stop()
+        for name, stats in upstreams.get_stats().items():
+            print(f"📊 {name}: 请求 {stats['requests']}，正常 {stats['served']}，"
+                  f"429 {stats['injected_429'] + stats['rate_limited'] + stats.get('chat_rate_limited', 0)}，"
+                  f"502 {stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+单元测试公共配置
+在仓库根目录运行: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
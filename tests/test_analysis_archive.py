@@ -0,0 +1,131 @@
+"""分析存档：按时长/大小淘汰的边界、最近一次分析的查询和两次分析的比较"""
+
+import time
+
+import pytest
+
+from src.services import analysis_archive as archive_module
+from src.services.analysis_archive import AnalysisArchive, diff_analyses
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = {"enabled": True, "path": "", "max_age_days": 30, "max_mb": 500,
+                "compression": "gzip", "compression_level": 6}
+    monkeypatch.setattr(archive_module, "_get_settings", lambda: settings)
+    return settings
+
+
+@pytest.fixture
+def archive(settings, tmp_path):
+    return AnalysisArchive(str(tmp_path / "archive.db"))
+
+
+def make_result(token="TOKEN", holders=10, tokens=None):
+    tokens = tokens or []
+    return {
+        "token_address": token,
+        "top_holders_count": 100,
+        "total_holders_analyzed": holders,
+        "target_token_actual_holders": holders,
+        "token_statistics": {
+            "total_unique_tokens": len(tokens),
+            "total_portfolio_value": sum(t["total_value"] for t in tokens),
+            "top_tokens_by_value": tokens,
+        },
+    }
+
+
+def make_token(address, holder_count, total_value):
+    return {"address": address, "symbol": address.upper(), "holder_count": holder_count, "total_value": total_value}
+
+
+def record_ids(archive, token="TOKEN"):
+    return sorted(record["id"] for record in archive.history(token, limit=100))
+
+
+def test_results_without_statistics_are_not_archived(archive):
+    assert archive.put({"token_address": "TOKEN"}) is None
+    assert archive.put({"token_statistics": {"total_unique_tokens": 1}}) is None
+    assert archive.get_stats()["records"] == 0
+
+
+def test_prune_by_age_keeps_records_inside_the_window(archive, settings):
+    now = time.time()
+    # 首次写入会顺带淘汰一次，过期记录放在后面写入
+    fresh = archive.put(make_result(), analyzed_at=now)
+    inside = archive.put(make_result(), analyzed_at=now - 29 * 86400)
+    expired = archive.put(make_result(), analyzed_at=now - 31 * 86400)
+
+    assert archive.prune() == 1
+    assert record_ids(archive) == [fresh, inside]
+    assert archive.get(expired) is None
+
+
+def test_prune_by_size_deletes_oldest_until_under_limit(archive, settings):
+    now = time.time()
+    ids = [archive.put(make_result(holders=i), analyzed_at=now - 100 + i) for i in range(4)]
+    sizes = {record["id"]: record["stored_size"] for record in archive.history("TOKEN", limit=10)}
+    # 限额恰好容纳最新的两条：删掉最旧的两条后不能再多删
+    settings["max_mb"] = (sizes[ids[2]] + sizes[ids[3]]) / (1024 * 1024)
+
+    assert archive.prune() == 2
+    assert record_ids(archive) == ids[2:]
+
+
+def test_prune_by_size_breaks_timestamp_ties_by_id(archive, settings):
+    same_time = time.time()
+    ids = [archive.put(make_result(holders=i), analyzed_at=same_time) for i in range(3)]
+    sizes = {record["id"]: record["stored_size"] for record in archive.history("TOKEN", limit=10)}
+    settings["max_mb"] = (sizes[ids[1]] + sizes[ids[2]]) / (1024 * 1024)
+
+    assert archive.prune() == 1
+    assert record_ids(archive) == ids[1:]
+
+
+def test_latest_respects_holder_count_and_max_age(archive):
+    now = time.time()
+    archive.put(make_result(holders=1), analyzed_at=now - 600)
+    other_count = dict(make_result(holders=2), top_holders_count=50)
+    archive.put(other_count, analyzed_at=now - 10)
+
+    result, analyzed_at = archive.latest("TOKEN", top_holders_count=100)
+    assert result["total_holders_analyzed"] == 1
+    assert analyzed_at == pytest.approx(now - 600)
+    assert archive.latest("TOKEN", top_holders_count=100, max_age=300) == (None, None)
+    assert archive.latest("TOKEN")[0]["total_holders_analyzed"] == 2
+    assert archive.latest("OTHER") == (None, None)
+
+
+def test_diff_compares_two_most_recent_analyses(archive):
+    now = time.time()
+    archive.put(make_result(holders=5, tokens=[make_token("a", 1, 100)]), analyzed_at=now - 300)
+    old_id = archive.put(make_result(holders=5, tokens=[
+        make_token("a", 2, 100), make_token("b", 1, 50), make_token("c", 3, 10),
+    ]), analyzed_at=now - 200)
+    new_id = archive.put(make_result(holders=8, tokens=[
+        make_token("a", 4, 300), make_token("c", 3, 10), make_token("d", 1, 20),
+    ]), analyzed_at=now - 100)
+
+    changes = archive.diff("TOKEN")
+    assert (changes["old_id"], changes["new_id"]) == (old_id, new_id)
+    assert [t["address"] for t in changes["added"]] == ["d"]
+    assert [t["address"] for t in changes["removed"]] == ["b"]
+    # 价值和持有人数都没变的代币不算变化
+    assert changes["changed"] == [dict(make_token("a", 4, 300), holder_count_change=2, total_value_change=200)]
+    assert changes["summary"]["total_holders_analyzed"] == 3
+    assert changes["summary"]["total_portfolio_value"] == 330 - 160
+
+
+def test_diff_needs_two_records_of_the_same_token(archive):
+    first = archive.put(make_result())
+    assert archive.diff("TOKEN") is None
+    other = archive.put(make_result(token="OTHER"))
+    with pytest.raises(ValueError):
+        archive.diff("TOKEN", old_id=first, new_id=other)
+
+
+def test_changed_tokens_sorted_by_absolute_value_change():
+    old = make_result(tokens=[make_token("a", 1, 100), make_token("b", 1, 100)])
+    new = make_result(tokens=[make_token("a", 1, 150), make_token("b", 1, 0)])
+    assert [t["address"] for t in diff_analyses(old, new)["changed"]] == ["b", "a"]
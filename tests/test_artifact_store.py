@@ -0,0 +1,96 @@
+"""产物写入队列：压缩写盘、队列满时丢弃、关闭后台写入时同步执行"""
+
+import threading
+
+import pytest
+
+from src.services import artifact_store as artifact_store_module
+from src.services.artifact_store import (
+    ArtifactStore, COMPRESSION_GZIP, COMPRESSION_NONE, decompress_bytes, resolve_compression,
+)
+from src.utils import json_codec
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = {"enabled": True, "compression": COMPRESSION_GZIP, "compression_level": 6,
+                "queue_max": 2, "batch_size": 20}
+    monkeypatch.setattr(artifact_store_module, "_get_settings", lambda: settings)
+    return settings
+
+
+def read_json(path: str, compression: str):
+    with open(path, "rb") as f:
+        return json_codec.loads(decompress_bytes(f.read(), compression))
+
+
+def test_json_artifact_is_compressed_and_written(settings, tmp_path):
+    store = ArtifactStore()
+    path = store.submit_json(tmp_path / "nested" / "result.json", {"token": "abc", "values": [1, 2]})
+
+    assert path == str(tmp_path / "nested" / "result.json") + ".gz"
+    assert store.flush(5)
+    assert read_json(path, COMPRESSION_GZIP) == {"token": "abc", "values": [1, 2]}
+    stats = store.get_stats()
+    assert stats["written"] == 1
+    assert stats["stored_bytes"] > 0
+
+
+def test_full_queue_drops_instead_of_blocking(settings, tmp_path):
+    store = ArtifactStore()
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    assert store.submit_call(blocker)
+    assert started.wait(5)
+    # 写入线程被占住，队列容量为 2
+    assert store.submit_json(tmp_path / "a.json", {"n": 1}) is not None
+    assert store.submit_json(tmp_path / "b.json", {"n": 2}) is not None
+    assert store.submit_json(tmp_path / "c.json", {"n": 3}) is None
+    assert not store.submit_call(lambda: None)
+
+    release.set()
+    assert store.flush(5)
+    stats = store.get_stats()
+    assert stats["dropped"] == 2
+    assert stats["written"] == 2
+    assert not (tmp_path / "c.json.gz").exists()
+
+
+def test_disabled_write_behind_runs_in_caller_thread(settings, tmp_path):
+    settings["enabled"] = False
+    settings["compression"] = COMPRESSION_NONE
+    store = ArtifactStore()
+    threads = []
+
+    assert store.submit_call(lambda: threads.append(threading.current_thread()))
+    assert threads == [threading.current_thread()]
+    path = store.submit_json(tmp_path / "plain.json", {"n": 1})
+    assert path == str(tmp_path / "plain.json")
+    assert read_json(path, COMPRESSION_NONE) == {"n": 1}
+
+
+def test_failed_writes_are_counted_and_do_not_stop_the_writer(settings, tmp_path):
+    settings["queue_max"] = 10
+    store = ArtifactStore()
+
+    def fail():
+        raise OSError("disk full")
+
+    store.submit_call(fail)
+    (tmp_path / "not_a_dir").write_text("")
+    store.submit_json(tmp_path / "not_a_dir" / "result.json", {"n": 0})
+    path = store.submit_json(tmp_path / "ok.json", {"n": 1})
+
+    assert store.flush(5)
+    assert store.get_stats()["failed"] == 2
+    assert read_json(path, COMPRESSION_GZIP) == {"n": 1}
+
+
+def test_unknown_compression_falls_back_to_gzip():
+    assert resolve_compression("lz4") == COMPRESSION_GZIP
+    assert resolve_compression(COMPRESSION_NONE) == COMPRESSION_NONE
@@ -0,0 +1,107 @@
+"""深度扫描的流式聚合：每个大户每个代币只计一次，超出上限时淘汰非目标代币"""
+
+import pytest
+
+from src.services import okx_crawler
+from src.services.okx_crawler import HolderTokenAggregator, get_analyzed_holders_count
+
+TARGET = "target-mint"
+
+
+def token(address: str, value: float = 10.0, balance: float = 1.0):
+    return {"address": address, "symbol": address.upper(), "name": address, "chain": "Solana",
+            "price_usd": value / balance if balance else 0, "balance": balance, "value_usd": value}
+
+
+def detail_count(aggregator: HolderTokenAggregator) -> int:
+    return sum(len(entry["holders_details"]) for entry in aggregator.tokens.values())
+
+
+def test_holder_counted_once_per_token():
+    aggregator = HolderTokenAggregator(TARGET)
+    aggregator.add_holder(1, "wallet1", [token("a", 10), token("a", 5), token(TARGET, 100)])
+    aggregator.add_holder(2, "wallet2", [token("a", 1)])
+
+    entry = aggregator.tokens["a"]
+    assert entry["holder_count"] == 2
+    assert entry["total_value"] == 16
+    assert entry["holders_details"][0] == {"holder_rank": 1, "holder_address": "wallet1",
+                                           "balance": 2.0, "value_usd": 15}
+    assert aggregator.tokens[TARGET]["is_target_token"]
+    assert aggregator.target_token_holders == {"wallet1"}
+    assert aggregator.holder_count == 2
+    assert aggregator.detail_entries == detail_count(aggregator) == 3
+
+
+def test_top_tokens_filters_by_value_and_holders():
+    aggregator = HolderTokenAggregator(TARGET)
+    for rank in range(1, 6):
+        aggregator.add_holder(rank, f"wallet{rank}", [token("popular", 20), token("rich", 1000 if rank == 1 else 0)])
+    aggregator.add_holder(6, "wallet6", [token("rich", 1000)])
+
+    assert [entry["address"] for entry in aggregator.top_tokens(min_value=50, min_holders=5)] == ["rich", "popular"]
+    assert [entry["address"] for entry in aggregator.top_tokens(min_value=150, min_holders=5)] == ["rich"]
+    assert aggregator.top_tokens(min_value=50, min_holders=7) == []
+
+
+def test_token_limit_evicts_least_held_tokens_first():
+    aggregator = HolderTokenAggregator(TARGET, max_tracked_tokens=10)
+    # 常见代币每个钱包都持有，长尾代币各只有一个持有人
+    for rank in range(1, 12):
+        aggregator.add_holder(rank, f"wallet{rank}", [token("common"), token(f"tail{rank}")])
+
+    assert len(aggregator.tokens) <= 10
+    assert aggregator.evicted_tokens > 0
+    assert aggregator.tokens["common"]["holder_count"] == 11
+    assert aggregator.detail_entries == detail_count(aggregator)
+
+
+def test_eviction_prefers_lower_value_on_equal_holder_count():
+    aggregator = HolderTokenAggregator(TARGET, max_tracked_tokens=5)
+    aggregator.add_holder(1, "wallet1", [token(f"t{i}", value=i) for i in range(1, 7)])
+
+    # 超出上限后淘汰到 80%（4 个），价值最低的先被淘汰
+    assert sorted(aggregator.tokens) == ["t3", "t4", "t5", "t6"]
+    assert aggregator.evicted_tokens == 2
+
+
+def test_target_token_is_never_evicted():
+    aggregator = HolderTokenAggregator(TARGET, max_tracked_tokens=2)
+    aggregator.add_holder(1, "wallet1", [token(TARGET, value=0.01)])
+    for rank in range(2, 8):
+        aggregator.add_holder(rank, f"wallet{rank}", [token(f"t{rank}", 1000), token(f"u{rank}", 1000)])
+
+    assert TARGET in aggregator.tokens
+    assert aggregator.tokens[TARGET]["holder_count"] == 1
+    assert aggregator.target_token_holders == {"wallet1"}
+
+
+def test_detail_limit_bounds_holder_details():
+    aggregator = HolderTokenAggregator(TARGET, max_detail_entries=20)
+    aggregator.add_holder(1, "wallet1", [token(TARGET), token("common")])
+    for rank in range(2, 16):
+        aggregator.add_holder(rank, f"wallet{rank}", [token("common"), token(f"tail{rank}")])
+
+    assert aggregator.detail_entries <= 20
+    assert aggregator.detail_entries == detail_count(aggregator)
+    # 被淘汰的是只有一个持有人的长尾代币，目标代币和常见代币的明细完整保留
+    assert aggregator.tokens[TARGET]["holder_count"] == 1
+    assert aggregator.tokens["common"]["holder_count"] == 15
+    assert len(aggregator.tokens["common"]["holders_details"]) == 15
+
+
+def test_eviction_stops_when_only_target_remains():
+    aggregator = HolderTokenAggregator(TARGET, max_detail_entries=5)
+    for rank in range(1, 11):
+        aggregator.add_holder(rank, f"wallet{rank}", [token(TARGET)])
+
+    # 目标代币本身超过上限时不会被淘汰，也不会陷入死循环
+    assert list(aggregator.tokens) == [TARGET]
+    assert aggregator.detail_entries == 10
+
+
+@pytest.mark.parametrize("enabled, expected", [(False, 100), (True, 500)])
+def test_analyzed_holders_count_follows_deep_scan(monkeypatch, enabled, expected):
+    monkeypatch.setattr(okx_crawler, "_get_deep_scan_settings", lambda: {"enabled": enabled, "max_holders": 500})
+    assert get_analyzed_holders_count(100) == expected
+    assert get_analyzed_holders_count(800) == 800
@@ -0,0 +1,167 @@
+"""数据新鲜度分级：钱包资产缓存的获取范围与分析结果缓存的等级"""
+
+import time
+
+import pytest
+
+from src.services import result_cache as result_cache_module
+from src.services import wallet_cache as wallet_cache_module
+from src.services.result_cache import AnalysisResultCache
+from src.services.wallet_cache import (
+    FRESHNESS_ARCHIVAL, FRESHNESS_REALTIME, FRESHNESS_RECENT, PORTFOLIO_FIRST_PAGE, PORTFOLIO_FULL,
+    WalletPortfolioCache, freshness_max_age, freshness_satisfies, normalize_freshness,
+)
+
+
+class IdentityPriceTable:
+    """不做重估的价格表"""
+
+    def revalue_analysis_result(self, result):
+        return result
+
+
+def make_result(tier=None, marker=""):
+    result = {"token_statistics": {"top_tokens_by_value": [], "marker": marker}}
+    if tier is not None:
+        result["freshness"] = {"tier": tier}
+    return result
+
+
+@pytest.fixture
+def wallet_settings(monkeypatch):
+    settings = {"recent_minutes": 30, "max_entries": 3}
+    monkeypatch.setattr(wallet_cache_module, "_get_settings", lambda: settings)
+    return settings
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    cache = AnalysisResultCache()
+    settings = {"enabled": True, "fresh_ttl": 300, "stale_ttl": 1800, "max_entries": 10, "archive_enabled": False}
+    monkeypatch.setattr(cache, "_get_settings", lambda: settings)
+    monkeypatch.setattr(result_cache_module, "get_price_table", lambda: IdentityPriceTable())
+    return cache
+
+
+def test_freshness_ordering():
+    assert freshness_satisfies(FRESHNESS_REALTIME, FRESHNESS_RECENT)
+    assert freshness_satisfies(FRESHNESS_RECENT, FRESHNESS_RECENT)
+    assert not freshness_satisfies(FRESHNESS_RECENT, FRESHNESS_REALTIME)
+    assert not freshness_satisfies(FRESHNESS_ARCHIVAL, FRESHNESS_RECENT)
+    # 未标注等级的数据按 archival 处理，未知的要求按 realtime 处理
+    assert not freshness_satisfies(None, FRESHNESS_RECENT)
+    assert freshness_satisfies(None, FRESHNESS_ARCHIVAL)
+    assert normalize_freshness("bogus") == FRESHNESS_REALTIME
+
+
+def test_freshness_max_age(wallet_settings):
+    assert freshness_max_age(FRESHNESS_REALTIME) == 0
+    assert freshness_max_age(FRESHNESS_RECENT) == 30 * 60
+    assert freshness_max_age(FRESHNESS_ARCHIVAL) == float("inf")
+
+
+def test_wallet_cache_keys_by_scope(wallet_settings):
+    cache = WalletPortfolioCache()
+    cache.put("wallet", {"tokens": ["first"]}, scope=PORTFOLIO_FIRST_PAGE)
+
+    assert cache.get("wallet", 60, scope=PORTFOLIO_FULL) == (None, None)
+    data, _ = cache.get("wallet", 60)
+    assert data == {"tokens": ["first"]}
+
+    cache.put("wallet", {"tokens": ["first", "second"]}, scope=PORTFOLIO_FULL)
+    assert cache.get("wallet", 60, scope=PORTFOLIO_FULL)[0] == {"tokens": ["first", "second"]}
+    assert cache.get("wallet", 60, scope=PORTFOLIO_FIRST_PAGE)[0] == {"tokens": ["first"]}
+
+
+def test_wallet_cache_respects_max_age(wallet_settings):
+    cache = WalletPortfolioCache()
+    cache.put("wallet", {}, fetched_at=time.time() - 120)
+    # 空数据不缓存
+    assert cache.get("wallet", float("inf")) == (None, None)
+
+    cache.put("wallet", {"tokens": ["a"]}, fetched_at=time.time() - 120)
+    assert cache.get("wallet", 60) == (None, None)
+    assert cache.get("wallet", 0) == (None, None)
+    assert cache.get("wallet", 300)[0] == {"tokens": ["a"]}
+
+
+def test_wallet_cache_evicts_least_recently_used(wallet_settings):
+    cache = WalletPortfolioCache()
+    for name in ("a", "b", "c"):
+        cache.put(name, {"wallet": name})
+    cache.get("a", 60)
+    cache.put("d", {"wallet": "d"})
+
+    assert cache.get("b", 60) == (None, None)
+    assert cache.get("a", 60)[0] == {"wallet": "a"}
+    assert cache.get_stats()["entries"] == 3
+
+
+def test_result_cache_keys_by_holder_count(result_cache):
+    result_cache.put("token", 100, make_result(FRESHNESS_REALTIME, "100"))
+
+    assert result_cache.peek("token", 50) == (None, None)
+    result, age = result_cache.peek("token", 100)
+    assert result["token_statistics"]["marker"] == "100"
+    assert age < 1
+
+
+def test_result_cache_peek_rejects_lower_tier(result_cache):
+    result_cache.put("token", 100, make_result(FRESHNESS_RECENT))
+
+    assert result_cache.peek("token", 100, FRESHNESS_REALTIME) == (None, None)
+    assert result_cache.peek("token", 100, FRESHNESS_RECENT)[0] is not None
+    assert result_cache.peek("token", 100, FRESHNESS_ARCHIVAL)[0] is not None
+    assert result_cache.peek("token", 100)[0] is not None
+
+
+def test_result_cache_untagged_result_is_archival(result_cache):
+    result_cache.put("token", 100, make_result())
+    assert result_cache.peek("token", 100, FRESHNESS_RECENT) == (None, None)
+    assert result_cache.peek("token", 100, FRESHNESS_ARCHIVAL)[0] is not None
+
+
+def test_result_cache_keeps_fresh_higher_tier(result_cache):
+    result_cache.put("token", 100, make_result(FRESHNESS_REALTIME, "realtime"))
+    result_cache.put("token", 100, make_result(FRESHNESS_RECENT, "recent"))
+    assert result_cache.peek("token", 100)[0]["token_statistics"]["marker"] == "realtime"
+
+    # 高等级结果过了新鲜窗口后可以被覆盖
+    result_cache._entries["token:100"]["timestamp"] -= result_cache._get_settings()["fresh_ttl"] + 1
+    result_cache.put("token", 100, make_result(FRESHNESS_RECENT, "recent"))
+    assert result_cache.peek("token", 100)[0]["token_statistics"]["marker"] == "recent"
+
+
+def test_result_cache_ignores_results_without_statistics(result_cache):
+    result_cache.put("token", 100, {"error": "failed"})
+    assert result_cache.peek("token", 100) == (None, None)
+
+
+def test_result_cache_invalidate_removes_all_holder_counts(result_cache):
+    result_cache.put("token", 50, make_result(FRESHNESS_REALTIME))
+    result_cache.put("token", 100, make_result(FRESHNESS_REALTIME))
+    result_cache.put("other", 100, make_result(FRESHNESS_REALTIME))
+
+    assert result_cache.invalidate("token") == 2
+    assert result_cache.peek("token", 100) == (None, None)
+    assert result_cache.peek("other", 100)[0] is not None
+
+
+def test_get_or_analyze_reanalyzes_when_cached_tier_is_too_low(result_cache):
+    result_cache.put("token", 100, make_result(FRESHNESS_RECENT, "cached"))
+    calls = []
+
+    def analyze_fn():
+        calls.append(1)
+        return make_result(FRESHNESS_REALTIME, "fresh")
+
+    result, info = result_cache.get_or_analyze("token", 100, analyze_fn=analyze_fn, freshness=FRESHNESS_RECENT)
+    assert info["state"] == "fresh"
+    assert result["token_statistics"]["marker"] == "cached"
+    assert calls == []
+
+    result, info = result_cache.get_or_analyze("token", 100, analyze_fn=analyze_fn, freshness=FRESHNESS_REALTIME)
+    assert info["state"] == "miss"
+    assert result["token_statistics"]["marker"] == "fresh"
+    assert calls == [1]
+    assert result_cache.peek("token", 100, FRESHNESS_REALTIME)[0]["token_statistics"]["marker"] == "fresh"
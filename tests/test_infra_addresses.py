@@ -0,0 +1,132 @@
+"""基础设施地址学习：样本阈值、学习条目过期、手动/忽略优先级"""
+
+import time
+
+import pytest
+
+from src.services.infra_addresses import InfraAddressIndex, SOURCE_MANUAL
+
+
+@pytest.fixture
+def settings():
+    return {"enabled": True, "min_tokens": 4, "min_count": 3, "holder_ratio": 0.5, "decay_tokens": 0,
+            "learned_ttl": 3600, "max_portfolio_value": 1000, "save_interval": 3600}
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch, settings):
+    index = InfraAddressIndex(str(tmp_path / "infra.json"))
+    monkeypatch.setattr(index, "_get_settings", lambda: dict(settings))
+    yield index
+    index.flush()
+
+
+def analyze(index, count, holders, prefix="token"):
+    learned = []
+    for i in range(count):
+        learned.extend(index.record_token_holders(f"{prefix}{i}", holders + [f"{prefix}-wallet{i}"]))
+    return learned
+
+
+def test_nothing_is_learned_below_min_tokens(index):
+    assert analyze(index, 3, ["router"]) == []
+    assert not index.is_excluded("router")
+
+
+def test_frequent_holder_is_learned_once_sample_is_large_enough(index):
+    assert analyze(index, 4, ["router"]) == ["router"]
+    assert index.is_excluded("router")
+    # 只出现在一个代币中的钱包不会被学习
+    assert not index.is_excluded("token0-wallet0")
+    entry = index.get_review_list()[0]
+    assert entry["address"] == "router"
+    assert entry["count"] == 4
+    assert entry["expires_at"] > time.time()
+
+
+def test_holder_ratio_raises_threshold_with_sample_size(index):
+    analyze(index, 6, [], prefix="other")
+    # 出现 3 次达到绝对下限，但 3/9 低于 0.5 的比例
+    assert analyze(index, 3, ["wallet"]) == []
+    assert not index.is_excluded("wallet")
+
+
+def test_repeated_token_is_counted_once(index):
+    for _ in range(5):
+        index.record_token_holders("same-token", ["router"])
+    assert index.get_stats()["tokens_analyzed"] == 1
+    assert not index.is_excluded("router")
+
+
+def test_learned_address_expires(index, settings):
+    settings["learned_ttl"] = 0.05
+    analyze(index, 4, ["router"])
+    assert index.is_excluded("router")
+
+    time.sleep(0.1)
+    assert not index.is_excluded("router")
+    assert index.get_excluded_count() == 0
+    # 下一次记录时清理过期条目，地址重新参与统计
+    index.record_token_holders("another", [])
+    assert index.get_stats()["learned"] == 0
+
+
+def test_removed_address_is_ignored_and_not_relearned(index):
+    analyze(index, 4, ["router"])
+    assert index.remove_address("router")
+    assert not index.is_excluded("router")
+
+    assert analyze(index, 4, ["router"], prefix="more") == []
+    assert not index.is_excluded("router")
+    assert not index.check_portfolio("router", {"tokens": {"tokenlist": [{"currencyAmount": "5000"}]}})
+
+
+def test_manual_address_takes_precedence_over_learned(index, settings):
+    settings["learned_ttl"] = 0.05
+    analyze(index, 4, ["router"])
+    assert index.add_address("router", "exchange hot wallet")
+
+    time.sleep(0.1)
+    # 手动条目不会过期，也不会被学习条目覆盖
+    assert index.is_excluded("router")
+    assert index.get_review_list() == []
+    manual = index.get_review_list(source=SOURCE_MANUAL)
+    assert [entry["address"] for entry in manual] == ["router"]
+    assert not index.add_address("router")
+
+
+def test_manual_add_clears_ignored(index):
+    analyze(index, 4, ["router"])
+    index.remove_address("router")
+    assert index.add_address("router")
+    assert index.is_excluded("router")
+    assert index.get_stats()["ignored"] == 0
+
+
+def test_portfolio_value_threshold(index):
+    small = {"tokens": {"tokenlist": [{"currencyAmount": "999"}]}}
+    large = {"tokens": {"tokenlist": [{"currencyAmount": "600"}, {"currencyAmount": "600"}, {"currencyAmount": "x"}]}}
+    assert not index.check_portfolio("wallet", small)
+    assert index.check_portfolio("vault", large)
+    assert index.is_excluded("vault")
+    assert index.get_review_list()[0]["source"] == "portfolio"
+
+
+def test_disabled_learning_records_nothing(index, settings):
+    settings["enabled"] = False
+    assert analyze(index, 10, ["router"]) == []
+    assert index.get_stats()["tokens_analyzed"] == 0
+
+
+def test_index_round_trips_through_file(index, tmp_path, settings, monkeypatch):
+    analyze(index, 4, ["router"])
+    index.add_address("manual-wallet")
+    index.remove_address("router")
+    index.save_index()
+
+    reloaded = InfraAddressIndex(index.index_file)
+    monkeypatch.setattr(reloaded, "_get_settings", lambda: dict(settings))
+    assert reloaded.is_excluded("manual-wallet")
+    assert not reloaded.is_excluded("router")
+    assert reloaded.get_stats()["ignored"] == 1
+    assert reloaded.get_stats()["tokens_analyzed"] == 4
@@ -0,0 +1,120 @@
+"""持久化任务队列：租约过期与最大尝试次数"""
+
+import pytest
+
+from src.services.job_queue import DurableJobQueue, STATUS_DONE, STATUS_FAILED, STATUS_LEASED, STATUS_PENDING
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return DurableJobQueue(str(tmp_path / "jobs.db"))
+
+
+def test_lease_returns_highest_priority_first(queue):
+    low = queue.enqueue("kind", {"n": 1}, priority=3)
+    high = queue.enqueue("kind", {"n": 2}, priority=1)
+
+    job = queue.lease("worker-a")
+    assert job["id"] == high
+    assert job["payload"] == {"n": 2}
+    assert job["attempts"] == 1
+    assert job["status"] == STATUS_LEASED
+    assert queue.lease("worker-a")["id"] == low
+    assert queue.lease("worker-a") is None
+
+
+def test_active_lease_is_not_handed_out_again(queue):
+    queue.enqueue("kind", {})
+    assert queue.lease("worker-a", lease_seconds=300) is not None
+    assert queue.lease("worker-b") is None
+
+
+def test_expired_lease_is_retaken_and_counts_as_attempt(queue):
+    job_id = queue.enqueue("kind", {}, max_attempts=3)
+    queue.lease("worker-a", lease_seconds=-1)
+
+    job = queue.lease("worker-b")
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    assert job["lease_owner"] == "worker-b"
+    # 原 worker 已失去租约，不能再提交结果
+    assert not queue.complete(job_id, "worker-a", {"ok": True})
+    assert queue.complete(job_id, "worker-b", {"ok": True})
+    assert queue.get_job(job_id)["status"] == STATUS_DONE
+
+
+def test_expired_lease_with_attempts_exhausted_is_failed(queue):
+    job_id = queue.enqueue("kind", {}, max_attempts=1)
+    queue.lease("worker-a", lease_seconds=-1)
+
+    assert queue.lease("worker-b") is None
+    job = queue.get_job(job_id)
+    assert job["status"] == STATUS_FAILED
+    assert job["lease_owner"] is None
+    assert job["error"]
+
+
+def test_fail_requeues_until_max_attempts(queue):
+    job_id = queue.enqueue("kind", {}, max_attempts=2)
+
+    queue.lease("worker-a")
+    assert queue.fail(job_id, "worker-a", "boom", retry_delay=0)
+    assert queue.get_job(job_id)["status"] == STATUS_PENDING
+
+    assert queue.lease("worker-a")["attempts"] == 2
+    assert not queue.fail(job_id, "worker-a", "boom again", retry_delay=0)
+    job = queue.get_job(job_id)
+    assert job["status"] == STATUS_FAILED
+    assert job["error"] == "boom again"
+
+
+def test_heartbeat_only_extends_own_lease(queue):
+    job_id = queue.enqueue("kind", {})
+    queue.lease("worker-a", lease_seconds=-1)
+
+    assert not queue.heartbeat(job_id, "worker-b")
+    assert queue.heartbeat(job_id, "worker-a", lease_seconds=300)
+    # 续租后不再视为过期
+    assert queue.lease("worker-b") is None
+
+
+def test_lease_filters_by_kind(queue):
+    queue.enqueue("other", {})
+    wanted = queue.enqueue("wanted", {})
+    assert queue.lease("worker-a", kinds=["wanted"])["id"] == wanted
+    assert queue.lease("worker-a", kinds=["wanted"]) is None
+
+
+def test_cajup_wait_is_bounded_by_scheduler_deadline_and_result_is_delivered_later(queue, monkeypatch):
+    from types import SimpleNamespace
+
+    from src.handlers.jupiter_analysis import JupiterAnalysisHandler
+    from src.services.job_queue import JobResultDispatcher
+    from src.services.scheduler import AnalysisScheduler
+
+    scheduler = AnalysisScheduler()
+    monkeypatch.setattr(scheduler, "_get_settings", lambda: {
+        "max_workers": 1, "max_queue": 10, "max_queue_per_chat": 10, "job_timeout": 0.2})
+    dispatcher = JobResultDispatcher(queue, poll_interval=0.01)
+    delivered = []
+    dispatcher.register("cajup", delivered.append)
+    handler = SimpleNamespace(
+        job_queue=queue,
+        job_dispatcher=dispatcher,
+        job_queue_settings={"lease_seconds": 300, "max_attempts": 3},
+        config=SimpleNamespace(analysis=SimpleNamespace(top_holders_count=100),
+                               jupiter=SimpleNamespace(freshness_tier="recent")),
+        analysis_status={"chat": {"queued": []}},
+    )
+
+    job = scheduler.submit(JupiterAnalysisHandler._analyze_via_job_queue,
+                           args=(handler, "chat", "token", 1, 1), priority=2)
+    assert job.wait(5) is None
+    # 不超过调度任务的截止时间，而不是租约时长 × 尝试次数
+    assert job.finished_at - job.started_at < 2
+    assert handler.analysis_status["chat"]["queued"] == ["token"]
+
+    leased = queue.lease("worker")
+    queue.complete(leased["id"], "worker", {"token_statistics": {}})
+    dispatcher._dispatch_once()
+    assert [item["id"] for item in delivered] == [leased["id"]]
@@ -0,0 +1,57 @@
+"""上游响应精简：保留下游实际读取的字段"""
+
+from src.services.payload_parsers import slim_holder, slim_holders, slim_wallet_token
+
+
+def test_slim_holder_keeps_address_fields():
+    holder = {
+        "holderWalletAddress": "wallet",
+        "holderAddress": "address",
+        "explorerUrl": "https://www.oklink.com/sol/address/wallet",
+        "holdAmount": "10",
+        "holdAmountPercentage": "1.5",
+        "holdVolume": "100",
+        "chainBalanceDetails": [{"chain": "sol", "amount": "10"}],
+        "statisticSnapshot": {"pnl": 1},
+    }
+    slim = slim_holder(holder)
+
+    assert slim == {key: holder[key] for key in (
+        "holderWalletAddress", "holderAddress", "explorerUrl", "holdAmount", "holdAmountPercentage", "holdVolume",
+    )}
+
+
+def test_slim_holder_keeps_only_exclusion_tags():
+    holder = {
+        "holderWalletAddress": "pool",
+        "tagList": [["liquidityPool", "Raydium"], ["smartMoney"], ["exchange", "Binance"]],
+        "holderTagVO": {"liquidityPool": True, "whale": True},
+        "userAddressTagVO": {"exchange": "Binance", "kol": "someone"},
+    }
+    slim = slim_holder(holder)
+
+    assert slim["tagList"] == [["liquidityPool"], ["exchange"]]
+    assert slim["holderTagVO"] == {"liquidityPool": True}
+    assert slim["userAddressTagVO"] == {"exchange": "Binance"}
+
+
+def test_slim_holder_drops_empty_tag_containers():
+    slim = slim_holder({"holderWalletAddress": "w", "tagList": [["smartMoney"]], "userAddressTagVO": {"kol": "x"}})
+    assert slim == {"holderWalletAddress": "w"}
+
+
+def test_slim_holders_passes_through_non_dict_entries():
+    assert slim_holders([None, {"holdAmount": "1", "extra": 2}]) == [None, {"holdAmount": "1"}]
+
+
+def test_slim_wallet_token_keeps_first_contract_address():
+    token = {
+        "symbol": "ABC", "name": "Token", "chainName": "Solana", "coinAmount": "5",
+        "coinUnitPrice": "0.1", "currencyAmount": "0.5", "logoUrl": "https://example.com/logo.png",
+        "coinBalanceDetails": [{"address": "mint", "amount": "5"}, {"address": "other"}],
+    }
+    slim = slim_wallet_token(token)
+
+    assert slim["coinBalanceDetails"] == [{"address": "mint"}]
+    assert "logoUrl" not in slim
+    assert slim["currencyAmount"] == "0.5"
@@ -0,0 +1,155 @@
+"""熔断器半开恢复与上游调用的失败计数"""
+
+import time
+
+import pytest
+import requests
+
+from src.services.resilience import (
+    CircuitBreaker, CircuitOpenError, EgressUnavailableError, RetryBudget, RetryPolicy, Upstream,
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN,
+)
+
+RECOVERY = 0.05
+
+
+def make_response(status_code: int, headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+def make_upstream(max_attempts: int = 1, failure_threshold: int = 2) -> Upstream:
+    breaker = CircuitBreaker("test_upstream", failure_threshold=failure_threshold, recovery_timeout=RECOVERY)
+    policy = RetryPolicy(max_attempts=max_attempts, base_delay=0.001, max_delay=0.001)
+    return Upstream("test_upstream", policy, RetryBudget(), breaker)
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure("boom")
+    assert breaker.state == STATE_OPEN
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("b", failure_threshold=3, recovery_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_in() > 0
+
+
+def test_half_open_allows_single_probe_then_closes_on_success():
+    breaker = CircuitBreaker("b", failure_threshold=1, recovery_timeout=RECOVERY)
+    open_breaker(breaker)
+    time.sleep(RECOVERY * 2)
+
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker("b", failure_threshold=3, recovery_timeout=RECOVERY)
+    open_breaker(breaker)
+    time.sleep(RECOVERY * 2)
+
+    assert breaker.allow_request()
+    breaker.record_failure("still down")
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+
+
+def test_released_probe_can_be_taken_again():
+    breaker = CircuitBreaker("b", failure_threshold=1, recovery_timeout=RECOVERY)
+    open_breaker(breaker)
+    time.sleep(RECOVERY * 2)
+
+    assert breaker.allow_request()
+    breaker.release_probe()
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_upstream_call_recovers_after_half_open_probe():
+    upstream = make_upstream()
+    for _ in range(2):
+        upstream.call(lambda: make_response(503))
+    assert upstream.is_open()
+    with pytest.raises(CircuitOpenError):
+        upstream.call(lambda: make_response(200))
+
+    time.sleep(RECOVERY * 2)
+    assert upstream.call(lambda: make_response(200)).status_code == 200
+    assert upstream.breaker.state == STATE_CLOSED
+
+
+def test_rate_limit_with_retry_after_is_not_a_failure():
+    upstream = make_upstream(failure_threshold=1)
+    response = upstream.call(lambda: make_response(429, {"Retry-After": "0"}))
+
+    assert response.status_code == 429
+    assert upstream.breaker.state == STATE_CLOSED
+    stats = upstream.get_stats()
+    assert stats["rate_limited"] == 1
+    assert stats["failures"] == 0
+
+
+def test_rate_limited_probe_releases_half_open_slot():
+    upstream = make_upstream(failure_threshold=1)
+    open_breaker(upstream.breaker)
+    time.sleep(RECOVERY * 2)
+
+    upstream.call(lambda: make_response(429, {"Retry-After": "0"}))
+    assert upstream.breaker.state == STATE_HALF_OPEN
+    # 探测名额已归还，下一次请求仍可作为探测
+    assert upstream.call(lambda: make_response(200)).status_code == 200
+    assert upstream.breaker.state == STATE_CLOSED
+
+
+def test_egress_unavailable_does_not_count_as_failure():
+    upstream = make_upstream(failure_threshold=1)
+
+    def send():
+        raise EgressUnavailableError("example.com", 1.0)
+
+    with pytest.raises(EgressUnavailableError):
+        upstream.call(send)
+    assert upstream.breaker.state == STATE_CLOSED
+    assert upstream.get_stats()["egress_unavailable"] == 1
+
+
+def test_non_network_error_during_probe_reopens_breaker():
+    upstream = make_upstream(failure_threshold=1)
+    open_breaker(upstream.breaker)
+    time.sleep(RECOVERY * 2)
+
+    def send():
+        raise KeyError("data")
+
+    with pytest.raises(KeyError):
+        upstream.call(send)
+    # 解析错误计为失败：熔断器重新打开，探测名额不会一直被占用
+    assert upstream.breaker.state == STATE_OPEN
+
+
+def test_network_errors_are_retried_then_raised():
+    upstream = make_upstream(max_attempts=3, failure_threshold=10)
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise requests.exceptions.ConnectionError("down")
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        upstream.call(send)
+    assert len(calls) == 3
+    assert upstream.get_stats()["failures"] == 3
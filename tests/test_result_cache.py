@@ -0,0 +1,156 @@
+"""分析结果缓存：新鲜命中、过期命中后台刷新与进行中分析去重"""
+
+import threading
+import time
+
+import pytest
+
+from src.services import result_cache as result_cache_module
+from src.services.result_cache import AnalysisResultCache
+from src.services.scheduler import AnalysisScheduler
+
+SETTINGS = {"enabled": True, "fresh_ttl": 300, "stale_ttl": 1800, "max_entries": 10, "archive_enabled": False}
+
+
+class IdentityPriceTable:
+    """不做重估的价格表"""
+
+    def revalue_analysis_result(self, result):
+        return result
+
+
+def make_result(marker: str):
+    return {"token_statistics": {"top_tokens_by_value": [], "marker": marker}, "freshness": {"tier": "realtime"}}
+
+
+def marker(result):
+    return result["token_statistics"]["marker"]
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = AnalysisScheduler()
+    monkeypatch.setattr(scheduler, "_get_settings", lambda: {
+        "max_workers": 2, "max_queue": 10, "max_queue_per_chat": 10, "job_timeout": 30})
+    return scheduler
+
+
+@pytest.fixture
+def cache(monkeypatch, scheduler):
+    cache = AnalysisResultCache()
+    monkeypatch.setattr(cache, "_get_settings", lambda: dict(SETTINGS))
+    monkeypatch.setattr(result_cache_module, "get_price_table", lambda: IdentityPriceTable())
+    monkeypatch.setattr(result_cache_module, "get_scheduler", lambda: scheduler)
+    return cache
+
+
+def age_entry(cache, key: str, seconds: float) -> None:
+    cache._entries[key]["timestamp"] -= seconds
+
+
+def test_miss_runs_analysis_and_caches(cache):
+    result, info = cache.get_or_analyze("token", 100, analyze_fn=lambda: make_result("first"))
+    assert info["state"] == "miss"
+    assert marker(result) == "first"
+
+    result, info = cache.get_or_analyze("token", 100, analyze_fn=lambda: pytest.fail("should hit cache"))
+    assert info["state"] == "fresh"
+    assert marker(result) == "first"
+
+
+def test_stale_hit_returns_old_result_and_refreshes_in_background(cache):
+    cache.put("token", 100, make_result("old"))
+    age_entry(cache, "token:100", SETTINGS["fresh_ttl"] + 1)
+    refreshed = []
+    done = threading.Event()
+
+    def on_refresh(result):
+        refreshed.append(marker(result))
+        done.set()
+
+    result, info = cache.get_or_analyze("token", 100, on_refresh=on_refresh,
+                                        analyze_fn=lambda: make_result("new"))
+    assert info["state"] == "stale"
+    assert info["age"] > SETTINGS["fresh_ttl"]
+    assert marker(result) == "old"
+
+    # 后台刷新完成后回调收到新结果（处理器据此编辑原消息），缓存随之更新
+    assert done.wait(5)
+    assert refreshed == ["new"]
+    assert marker(cache.peek("token", 100)[0]) == "new"
+    assert cache.get_stats()["refreshes"] == 1
+
+
+def test_concurrent_stale_hits_share_one_refresh(cache):
+    cache.put("token", 100, make_result("old"))
+    age_entry(cache, "token:100", SETTINGS["fresh_ttl"] + 1)
+    release = threading.Event()
+    calls = []
+    callbacks = []
+    all_done = threading.Semaphore(0)
+
+    def analyze_fn():
+        calls.append(1)
+        release.wait(5)
+        return make_result("new")
+
+    def on_refresh(result):
+        callbacks.append(marker(result))
+        all_done.release()
+
+    for _ in range(3):
+        assert cache.get_or_analyze("token", 100, on_refresh=on_refresh, analyze_fn=analyze_fn)[1]["state"] == "stale"
+    release.set()
+
+    for _ in range(3):
+        assert all_done.acquire(timeout=5)
+    assert calls == [1]
+    assert callbacks == ["new", "new", "new"]
+
+
+def test_failed_refresh_keeps_stale_result(cache):
+    cache.put("token", 100, make_result("old"))
+    age_entry(cache, "token:100", SETTINGS["fresh_ttl"] + 1)
+
+    def analyze_fn():
+        raise RuntimeError("upstream down")
+
+    cache.get_or_analyze("token", 100, on_refresh=lambda result: pytest.fail("no callback on failure"),
+                         analyze_fn=analyze_fn)
+    # 等待后台刷新结束
+    for _ in range(100):
+        if not cache._inflight and not cache._refresh_pending:
+            break
+        time.sleep(0.02)
+    assert marker(cache.peek("token", 100)[0]) == "old"
+
+
+def test_result_past_stale_window_is_a_miss(cache):
+    cache.put("token", 100, make_result("old"))
+    age_entry(cache, "token:100", SETTINGS["stale_ttl"] + 1)
+    result, info = cache.get_or_analyze("token", 100, analyze_fn=lambda: make_result("new"))
+    assert info["state"] == "miss"
+    assert marker(result) == "new"
+
+
+def test_concurrent_misses_wait_for_inflight_analysis(cache):
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def analyze_fn():
+        calls.append(1)
+        release.wait(5)
+        return make_result("shared")
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_analyze("token", 100, analyze_fn=analyze_fn)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert [marker(result) for result, _ in results] == ["shared"] * 3
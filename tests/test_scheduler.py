@@ -0,0 +1,149 @@
+"""分析任务调度：优先级、群组公平轮询、取消与截止时间"""
+
+import threading
+import time
+
+import pytest
+
+from src.services.scheduler import (
+    AnalysisScheduler, PRIORITY_AUTO_PUMP, PRIORITY_BATCH, PRIORITY_INTERACTIVE, current_job,
+)
+
+
+@pytest.fixture
+def settings():
+    return {"max_workers": 1, "max_queue": 20, "max_queue_per_chat": 10, "job_timeout": 30}
+
+
+@pytest.fixture
+def scheduler(monkeypatch, settings):
+    scheduler = AnalysisScheduler()
+    monkeypatch.setattr(scheduler, "_get_settings", lambda: dict(settings))
+    return scheduler
+
+
+def block_worker(scheduler):
+    """占住唯一的工作线程，之后提交的任务都在排队"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    job = scheduler.submit(blocker, chat_id="blocker")
+    assert started.wait(5)
+    return job, release
+
+
+def test_priority_then_round_robin_between_chats(scheduler):
+    blocker, release = block_worker(scheduler)
+    order = []
+    jobs = [
+        scheduler.submit(order.append, args=("a1",), chat_id="a", priority=PRIORITY_BATCH),
+        scheduler.submit(order.append, args=("a2",), chat_id="a", priority=PRIORITY_BATCH),
+        scheduler.submit(order.append, args=("a3",), chat_id="a", priority=PRIORITY_BATCH),
+        scheduler.submit(order.append, args=("b1",), chat_id="b", priority=PRIORITY_BATCH),
+        scheduler.submit(order.append, args=("pump",), chat_id="b", priority=PRIORITY_AUTO_PUMP),
+        scheduler.submit(order.append, args=("ca",), chat_id="c", priority=PRIORITY_INTERACTIVE),
+    ]
+    release.set()
+    for job in jobs:
+        job.wait(5)
+
+    # 交互 > 自动pump > 批量；批量任务在群组间轮询，a 的大批量不会饿死 b
+    assert order == ["ca", "pump", "a1", "b1", "a2", "a3"]
+
+
+def test_get_position_follows_simulated_order(scheduler):
+    blocker, release = block_worker(scheduler)
+    a1 = scheduler.submit(lambda: None, chat_id="a")
+    a2 = scheduler.submit(lambda: None, chat_id="a")
+    b1 = scheduler.submit(lambda: None, chat_id="b")
+    try:
+        assert [scheduler.get_position(job) for job in (a1, b1, a2)] == [1, 2, 3]
+        assert scheduler.get_position(blocker) == 0
+    finally:
+        release.set()
+
+
+def test_queue_limits_reject_jobs(scheduler, settings):
+    settings["max_queue_per_chat"] = 2
+    blocker, release = block_worker(scheduler)
+    try:
+        assert scheduler.submit(lambda: None, chat_id="a") is not None
+        assert scheduler.submit(lambda: None, chat_id="a") is not None
+        assert scheduler.submit(lambda: None, chat_id="a") is None
+        assert scheduler.submit(lambda: None, chat_id="b") is not None
+        assert scheduler.get_stats()["rejected"] == 1
+    finally:
+        release.set()
+
+
+def test_cancel_removes_queued_jobs(scheduler):
+    blocker, release = block_worker(scheduler)
+    ran = []
+    queued = scheduler.submit(ran.append, args=("a",), chat_id="a", tag="cajup")
+    other = scheduler.submit(ran.append, args=("b",), chat_id="b", tag="cajup")
+
+    assert scheduler.cancel_jobs(chat_id="a", tag="cajup") == 1
+    assert queued.state == "cancelled"
+    assert queued.wait(1) is None
+    release.set()
+    other.wait(5)
+    assert ran == ["b"]
+
+
+def test_cancel_sets_flag_on_running_job(scheduler):
+    started = threading.Event()
+
+    def worker():
+        started.set()
+        job = current_job()
+        while not job.should_stop():
+            time.sleep(0.01)
+        return "stopped"
+
+    job = scheduler.submit(worker, chat_id="a", tag="cajup")
+    assert started.wait(5)
+    assert scheduler.cancel_jobs(chat_id="a") == 1
+    assert job.wait(5) == "stopped"
+    assert job.state == "cancelled"
+    assert scheduler.get_stats()["cancelled"] == 1
+
+
+def test_running_job_gets_deadline(scheduler, settings):
+    settings["job_timeout"] = 0.1
+    seen = {}
+
+    def worker():
+        job = current_job()
+        seen["remaining"] = job.remaining(60)
+        while not job.should_stop():
+            time.sleep(0.01)
+        seen["expired"] = job.expired
+        return "done"
+
+    job = scheduler.submit(worker)
+    assert job.wait(5) == "done"
+    assert 0 < seen["remaining"] <= 0.1
+    assert seen["expired"]
+    assert job.finished_at - job.started_at < 1
+
+
+def test_remaining_without_deadline_returns_default(scheduler, settings):
+    settings["job_timeout"] = 0
+    job = scheduler.submit(lambda: current_job().remaining(42))
+    assert job.wait(5) == 42
+    assert current_job() is None
+
+
+def test_failed_job_returns_none_and_is_counted(scheduler):
+    def fail():
+        raise ValueError("boom")
+
+    job = scheduler.submit(fail)
+    assert job.wait(5) is None
+    assert job.state == "failed"
+    assert isinstance(job.error, ValueError)
+    assert scheduler.get_stats()["failed"] == 1
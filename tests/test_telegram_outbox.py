@@ -0,0 +1,153 @@
+"""Telegram 出站队列：错误传递、排队超时撤回与编辑合并"""
+
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from src.services import telegram_outbox as outbox_module
+from src.services.telegram_outbox import QueuedTeleBot, TelegramOutbox
+
+
+class ApiError(Exception):
+    """模拟 telebot 的 ApiTelegramException"""
+
+    def __init__(self, error_code: int, description: str, retry_after: float = None):
+        super().__init__(description)
+        self.error_code = error_code
+        self.result_json = {"parameters": {"retry_after": retry_after}} if retry_after is not None else {}
+
+
+class FakeBot:
+    """记录调用的 TeleBot"""
+
+    def __init__(self):
+        self.calls = []
+        self.errors = []
+        self.sending = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sending.set()
+        self.release.wait(5)
+        self.calls.append(("send_message", chat_id, text))
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"chat_id": chat_id, "text": text}
+
+    def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self.calls.append(("edit_message_text", chat_id, text))
+        return True
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = {"enabled": True, "global_rate": 1000, "chat_rate": 1000.0, "group_rate_per_minute": 60000,
+                "chat_burst": 100, "max_retries": 2, "send_timeout": 5}
+    monkeypatch.setattr(outbox_module, "NETWORK_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(outbox_module, "_get_settings", lambda: settings)
+    return settings
+
+
+@pytest.fixture
+def bot(settings):
+    return FakeBot()
+
+
+@pytest.fixture
+def queued(bot):
+    return QueuedTeleBot(bot, TelegramOutbox())
+
+
+def test_send_returns_bot_result(queued, bot):
+    assert queued.send_message(1, "hello") == {"chat_id": 1, "text": "hello"}
+    assert bot.calls == [("send_message", 1, "hello")]
+
+
+def test_api_error_propagates_to_waiting_caller(queued, bot):
+    bot.errors.append(ApiError(403, "bot was blocked by the user"))
+
+    with pytest.raises(ApiError) as excinfo:
+        queued.send_message(1, "hello")
+    assert excinfo.value.error_code == 403
+    # 业务错误不重试
+    assert len(bot.calls) == 1
+    assert queued._outbox.get_stats()["failures"] == 1
+
+
+def test_network_error_is_retried_then_propagated(queued, bot, settings):
+    bot.errors.extend([ConnectionError("reset")] * (settings["max_retries"] + 1))
+
+    with pytest.raises(ConnectionError):
+        queued.send_message(1, "hello")
+    assert len(bot.calls) == settings["max_retries"] + 1
+
+
+def test_network_error_recovers_on_retry(queued, bot):
+    bot.errors.append(ConnectionError("reset"))
+    assert queued.send_message(1, "hello")["text"] == "hello"
+    assert queued._outbox.get_stats()["retries_network"] == 1
+
+
+def test_rate_limit_pauses_chat_and_retries(queued, bot):
+    bot.errors.append(ApiError(429, "Too Many Requests", retry_after=0.05))
+    assert queued.send_message(1, "hello")["text"] == "hello"
+    assert queued._outbox.get_stats()["retries_429"] == 1
+
+
+def test_message_not_modified_counts_as_success(queued, bot):
+    bot.errors.append(ApiError(400, "Bad Request: message is not modified"))
+    assert queued.send_message(1, "hello") is None
+
+
+def test_no_wait_returns_future(queued, bot):
+    bot.errors.append(ApiError(400, "Bad Request: chat not found"))
+    future = queued.send_message(1, "hello", wait=False)
+    with pytest.raises(ApiError):
+        future.result(timeout=5)
+
+
+def test_wait_timeout_withdraws_queued_request(queued, bot, settings):
+    outbox = queued._outbox
+    bot.release.clear()
+    blocking = queued.send_message(1, "first", wait=False)
+    queued_future = queued.send_message(1, "second", wait=False)
+
+    settings["send_timeout"] = 0.05
+    with pytest.raises(FutureTimeoutError):
+        outbox.wait(queued_future)
+    assert outbox.get_stats()["withdrawn"] == 1
+
+    bot.release.set()
+    blocking.result(timeout=5)
+    # 撤回的请求不会再发出
+    assert [call[2] for call in bot.calls] == ["first"]
+    assert outbox.get_stats()["queued"] == 0
+
+
+def test_wait_timeout_keeps_waiting_for_request_in_flight(queued, bot, settings):
+    outbox = queued._outbox
+    bot.release.clear()
+    future = queued.send_message(1, "slow", wait=False)
+    assert bot.sending.wait(5)
+
+    settings["send_timeout"] = 0.05
+    threading.Timer(0.2, bot.release.set).start()
+    # 已在发送中的请求不能撤回，等待其完成，避免调用方重试造成重复发送
+    assert outbox.wait(future)["text"] == "slow"
+    assert outbox.get_stats()["withdrawn"] == 0
+
+
+def test_queued_edits_are_coalesced(queued, bot):
+    bot.release.clear()
+    blocking = queued.send_message(1, "busy", wait=False)
+    first = queued.edit_message_text("progress 1", chat_id=1, message_id=7, wait=False)
+    second = queued.edit_message_text("progress 2", chat_id=1, message_id=7, wait=False)
+    assert first is second
+
+    bot.release.set()
+    blocking.result(timeout=5)
+    assert second.result(timeout=5) is True
+    assert [call[2] for call in bot.calls] == ["busy", "progress 2"]
+    assert queued._outbox.get_stats()["edits_coalesced"] == 1